@@ -0,0 +1,91 @@
+# benchmarks/generators.py
+"""Генераторы синтетических документов (в формате JsonSaveStrategy) для бенчмарков"""
+import math
+import random
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+COLORS = ["#000000", "#ff0000", "#00aa00", "#0000ff", "#ff9d00"]
+
+
+def project(shapes, width=800, height=600):
+    return {"version": "1.0", "scene": {"width": width, "height": height}, "shapes": shapes}
+
+
+def random_primitive(rnd, x, y):
+    shape_type = rnd.choice(("rect", "ellipse", "line", "polygon"))
+    color = rnd.choice(COLORS)
+    width = rnd.randint(1, 4)
+    w, h = rnd.uniform(4, 40), rnd.uniform(4, 40)
+
+    if shape_type in ("rect", "ellipse"):
+        props = {"x": 0, "y": 0, "w": w, "h": h, "color": color, "width": width}
+    elif shape_type == "line":
+        props = {"x1": 0, "y1": 0, "x2": w, "y2": h, "color": color, "width": width}
+    else:
+        n = rnd.randint(3, 8)
+        pts = [[w * math.cos(2 * math.pi * i / n), h * math.sin(2 * math.pi * i / n)] for i in range(n)]
+        props = {"points": pts, "color": color, "width": width, "is_closed": True}
+    return {"type": shape_type, "pos": [x, y], "props": props}
+
+
+def mixed_document(count, seed=1):
+    """count примитивов, равномерно разбросанных по квадрату (плотность ~ 1 фигура на 50x50)"""
+    rnd = random.Random(seed)
+    side = math.sqrt(count) * 50
+    shapes = [random_primitive(rnd, rnd.uniform(0, side), rnd.uniform(0, side)) for _ in range(count)]
+    return project(shapes, side, side)
+
+
+def deep_groups_document(count, depth=8, per_group=64, seed=2):
+    """Примитивы, упакованные в цепочки вложенных групп глубины depth"""
+    rnd = random.Random(seed)
+    side = math.sqrt(count) * 50
+    shapes = []
+    made = 0
+    while made < count:
+        ox, oy = rnd.uniform(0, side), rnd.uniform(0, side)
+        node = {"type": "group", "pos": [0, 0],
+                "children": [random_primitive(rnd, rnd.uniform(0, 200), rnd.uniform(0, 200))
+                             for _ in range(per_group)]}
+        made += per_group
+        for level in range(depth - 1):
+            node = {"type": "group", "pos": [ox if level == depth - 2 else 0, oy if level == depth - 2 else 0],
+                    "children": [node, random_primitive(rnd, 0, 0)]}
+            made += 1
+        shapes.append(node)
+    return project(shapes, side, side)
+
+
+LABEL_WORDS = ["Насос", "Клапан", "Valve", "Pump", "Щит", "Ввод", "Tank", "Линия", "Узел", "Sensor"]
+
+
+def labels_document(count, seed=4):
+    """Надписи (одна-две строки) с той же плотностью, что и mixed_document"""
+    rnd = random.Random(seed)
+    side = math.sqrt(count) * 50
+    shapes = []
+    for _ in range(count):
+        text = f"{rnd.choice(LABEL_WORDS)} {rnd.randint(1, 999)}"
+        if rnd.random() < 0.3:
+            text += f"\n{rnd.choice(LABEL_WORDS)}"
+        shapes.append({"type": "text", "pos": [rnd.uniform(0, side), rnd.uniform(0, side)],
+                       "props": {"x": 0, "y": 0, "text": text, "font": "Arial", "size": rnd.choice((10, 12, 16)),
+                                 "color": rnd.choice(COLORS)}})
+    return project(shapes, side, side)
+
+
+def long_polygons_document(count, vertices=10_000, seed=3):
+    """Ломаные с большим числом вершин (всего около count вершин)"""
+    rnd = random.Random(seed)
+    shapes = []
+    for i in range(max(1, count // vertices)):
+        x, y = 0.0, i * 40.0
+        pts = []
+        for _ in range(vertices):
+            x += rnd.uniform(0.5, 2)
+            y += rnd.uniform(-1, 1)
+            pts.append([x, y])
+        shapes.append({"type": "polygon", "pos": [0, 0],
+                       "props": {"points": pts, "color": "#000000", "width": 1, "is_closed": False}})
+    return project(shapes, 20_000, 40 * len(shapes))
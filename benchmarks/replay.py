@@ -0,0 +1,147 @@
+# benchmarks/replay.py
+"""
+Воспроизведение записанной сессии ввода без окна и замер задержки обработки каждого события.
+
+    python -m benchmarks.replay session.jsonl                     # проект из заголовка сессии
+    python -m benchmarks.replay session.jsonl --project big.json  # другой файл проекта
+    python -m benchmarks.replay session.jsonl --paint --output latency.json
+    python -m benchmarks.replay session.jsonl --paint --full-quality     # без упрощенной отрисовки
+
+Сессию записывает View -> Record Input Session. Задержка - время работы обработчика EditorCanvas
+(инструмент + команды), с --paint еще и синхронная перерисовка viewport после события.
+"""
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import QTransform
+
+from src.widgets.canvas import EditorCanvas
+from src.logic.factory import ShapeFactory
+from src.logic.tools import PolygonTool
+from src.logic.session import load_session, make_qt_event, HANDLERS
+
+
+def load_project(canvas, data, lazy=False):
+    scene_info = data.get("scene", {})
+    canvas.set_page_size(scene_info.get("width", 800), scene_info.get("height", 600))
+    if lazy:
+        canvas.load_lazy(data.get("shapes", []))
+        return
+    for shape_dict in data.get("shapes", []):
+        item = ShapeFactory.from_dict(shape_dict)
+        if item:
+            canvas.scene.addItem(item)
+
+
+def restore_view(canvas, header):
+    width, height = header["viewport"]
+    # Размер viewport = размер окна холста без рамок и скроллбаров
+    canvas.resize(width + canvas.width() - canvas.viewport().width(),
+                  height + canvas.height() - canvas.viewport().height())
+    x, y, w, h = header["scene_rect"]
+    canvas.scene.setSceneRect(x, y, w, h)
+    canvas.setTransform(QTransform(*header["transform"]))
+    canvas.horizontalScrollBar().setValue(header["scroll"][0])
+    canvas.verticalScrollBar().setValue(header["scroll"][1])
+
+
+def switch_tool(canvas, name):
+    if name is None or canvas.current_tool_name() == name:
+        return
+    if name == "polygon":
+        # Как VectorEditorWindow.on_change_tool
+        canvas.current_tool = PolygonTool(canvas)
+    else:
+        canvas.set_tool(name)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_stats(latencies):
+    values = sorted(latencies)
+    return {"count": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p90_ms": percentile(values, 90) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": (values[-1] if values else 0) * 1000}
+
+
+def replay(header, events, project=None, lazy=False, paint=False, full_quality=False):
+    """Проигрывает события и возвращает {тип события: статистика задержек}"""
+    canvas = EditorCanvas()
+    canvas.set_interaction_quality(not full_quality)
+    canvas.show()
+
+    if project:
+        with open(project, 'r', encoding='utf-8') as f:
+            load_project(canvas, json.load(f), lazy)
+    elif "document" in header:
+        load_project(canvas, header["document"], lazy)
+    elif header.get("project"):
+        with open(header["project"], 'r', encoding='utf-8') as f:
+            load_project(canvas, json.load(f), lazy)
+
+    restore_view(canvas, header)
+    QApplication.processEvents()
+
+    latencies = {}
+    for record in events:
+        switch_tool(canvas, record.get("tool"))
+        event = make_qt_event(record, canvas)
+        handler = getattr(canvas, HANDLERS[record["type"]])
+
+        start = perf_counter()
+        handler(event)
+        if paint:
+            canvas.viewport().repaint()
+        elapsed = perf_counter() - start
+
+        latencies.setdefault(record["type"], []).append(elapsed)
+        # Отложенные дела (таймеры, материализация) выполняем вне замера
+        QApplication.processEvents()
+
+    stats = {event_type: latency_stats(values) for event_type, values in latencies.items()}
+    stats["all"] = latency_stats([v for values in latencies.values() for v in values])
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Воспроизведение сессии ввода с замером задержек")
+    parser.add_argument("session")
+    parser.add_argument("--project", help="Файл проекта (по умолчанию - из заголовка сессии)")
+    parser.add_argument("--lazy", action="store_true", help="Открыть проект в ленивом режиме")
+    parser.add_argument("--paint", action="store_true", help="Включать в замер перерисовку")
+    parser.add_argument("--full-quality", action="store_true",
+                        help="Не упрощать отрисовку во время перетаскивания и зума (для сравнения режимов)")
+    parser.add_argument("--output", help="Записать статистику в JSON")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    header, events = load_session(args.session)
+    stats = replay(header, events, args.project, args.lazy, args.paint, args.full_quality)
+
+    print(f"{'event':12s} {'count':>7s} {'p50 ms':>9s} {'p90 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}")
+    for event_type, s in stats.items():
+        print(f"{event_type:12s} {s['count']:7d} {s['p50_ms']:9.2f} {s['p90_ms']:9.2f} "
+              f"{s['p99_ms']:9.2f} {s['max_ms']:9.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"session": args.session, "latency": stats}, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# benchmarks/run.py
+"""
+Бенчмарки без окна (offscreen-платформа Qt).
+
+Запуск из корня проекта:
+    python -m benchmarks.run                          # все сценарии, 10k фигур
+    python -m benchmarks.run --size 100k -s json_load  # отдельный сценарий
+    python -m benchmarks.run --update-baseline        # записать текущие результаты как эталон
+
+Результаты пишутся в JSON (--output) и сравниваются с benchmarks/baseline.json:
+сценарий, ставший медленнее эталона больше чем в --threshold раз, считается регрессией (код выхода 1).
+
+Эталон хранит не секунды, а доли калибровочной нагрузки (calibrate), замеренной в том же процессе:
+секунды одной машины на другой (или на той же под другой нагрузкой) сравнивать бессмысленно.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+from time import perf_counter
+
+# Платформа должна быть выбрана ДО создания QApplication
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import __version__ as pyside_version
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import QPainterPath
+
+from benchmarks import generators
+from benchmarks.scenarios import SCENARIOS
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+DOCUMENTS = {
+    "mixed": generators.mixed_document,
+    "deep_groups": generators.deep_groups_document,
+    "long_polygons": generators.long_polygons_document,
+    "labels": generators.labels_document,
+}
+
+
+CALIBRATION_SHAPES = 5000
+
+
+def _calibration_workload():
+    """Постоянная нагрузка того же рода, что и сценарии: интерпретатор, вызовы Qt, json"""
+    start = perf_counter()
+    records = []
+    for i in range(CALIBRATION_SHAPES):
+        path = QPainterPath()
+        path.addRect(i % 100 * 30, i // 100 * 20, 20, 10)
+        rect = path.boundingRect()
+        records.append({"type": "rect", "pos": [rect.x(), rect.y()], "props": {"w": rect.width(), "h": rect.height()}})
+    json.loads(json.dumps(records))
+    return perf_counter() - start
+
+
+def calibrate(repeat):
+    """Медиана калибровочной нагрузки (секунды) - единица, в которой хранится эталон"""
+    runs = []
+    for _ in range(max(repeat, 5)):
+        gc.collect()
+        runs.append(_calibration_workload())
+    unit = statistics.median(runs)
+    print(f"{'calibration':28s} median {unit * 1000:10.1f} ms")
+    return unit
+
+
+def run_scenarios(names, size, repeat):
+    count = generators.SIZES[size]
+    documents = {}
+    results = {}
+    for name in names:
+        kind, scenario = SCENARIOS[name]
+        if kind not in documents:
+            documents[kind] = DOCUMENTS[kind](count)
+        runs = []
+        for _ in range(repeat):
+            gc.collect()
+            runs.append(scenario(documents[kind]))
+        results[name] = {"median": statistics.median(runs), "min": min(runs), "runs": runs}
+        print(f"{name:28s} median {results[name]['median'] * 1000:10.1f} ms   min {min(runs) * 1000:10.1f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Список регрессий: (сценарий, было, стало) - в долях калибровки (см. calibrate)"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        ratio = result["normalized"] / reference if reference > 0 else 1
+        mark = "REGRESSION" if ratio > threshold else "ok"
+        print(f"{name:28s} {reference:8.3f} -> {result['normalized']:8.3f} калибровки  x{ratio:5.2f}  {mark}")
+        if ratio > threshold:
+            regressions.append((name, reference, result["normalized"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки векторного редактора")
+    parser.add_argument("--size", choices=sorted(generators.SIZES), default="10k")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Сценарий (можно несколько раз). По умолчанию - все")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Допустимое замедление относительно эталона (1.25 = +25%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    names = args.scenario or list(SCENARIOS)
+    unit = calibrate(args.repeat)
+    results = run_scenarios(names, args.size, args.repeat)
+    for result in results.values():
+        result["normalized"] = result["median"] / unit
+
+    report = {
+        "meta": {"size": args.size, "repeat": args.repeat, "python": platform.python_version(),
+                 "pyside": pyside_version, "platform": platform.platform(), "calibration": unit},
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    print(f"Результаты: {args.output}")
+
+    # Эталон хранит медианы в долях калибровки по размерам документа: {"10k": {"json_load": 2.5, ...}}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline.setdefault(args.size, {}).update({name: round(r["normalized"], 4) for name, r in results.items()})
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f"Эталон обновлен: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline.get(args.size, {}), args.threshold)
+    if regressions:
+        print(f"Регрессий: {len(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
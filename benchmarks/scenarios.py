@@ -0,0 +1,371 @@
+# benchmarks/scenarios.py
+"""
+Замеряемые сценарии. Каждый сценарий - функция (doc) -> секунды.
+Подготовка (создание сцены и т.п.) в замер не входит, только сама операция.
+"""
+import json
+import os
+import tempfile
+from time import perf_counter
+
+from PySide6.QtCore import Qt, QRectF, QPointF
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import QPainterPath
+
+from src.widgets.canvas import EditorCanvas
+from src.logic.factory import ShapeFactory
+from src.logic.commands import MoveCommand
+from src.logic.strategies import JsonSaveStrategy, ImageSaveStrategy
+from src.logic.shapes import is_root_item
+from benchmarks.generators import COLORS
+
+
+def load_canvas(doc):
+    """Холст с документом (так же, как VectorEditorWindow.on_open_clicked в обычном режиме)"""
+    canvas = EditorCanvas()
+    canvas.set_page_size(doc["scene"]["width"], doc["scene"]["height"])
+    for shape_dict in doc["shapes"]:
+        item = ShapeFactory.from_dict(shape_dict)
+        if item:
+            canvas.scene.addItem(item)
+    return canvas
+
+
+def _timed(func):
+    start = perf_counter()
+    func()
+    return perf_counter() - start
+
+
+def json_load(doc):
+    text = json.dumps(doc)
+
+    def run():
+        canvas = EditorCanvas()
+        for shape_dict in json.loads(text)["shapes"]:
+            canvas.scene.addItem(ShapeFactory.from_dict(shape_dict))
+        run.canvas = canvas  # Удаление сцены в замер не входит
+    return _timed(run)
+
+
+def json_load_saved(doc):
+    """Загрузка файла, записанного JsonSaveStrategy (длинные ломаные в нем - блоками байтов)"""
+    canvas = load_canvas(doc)
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        JsonSaveStrategy().save(path, canvas.scene)
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    finally:
+        os.remove(path)
+    return json_load(json.loads(text))
+
+
+def json_save(doc):
+    canvas = load_canvas(doc)
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        return _timed(lambda: JsonSaveStrategy().save(path, canvas.scene))
+    finally:
+        os.remove(path)
+
+
+def json_save_after_edit(doc):
+    """Повторное сохранение после сдвига одной фигуры (остальные записи берутся из кэша)"""
+    canvas = load_canvas(doc)
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        JsonSaveStrategy().save(path, canvas.scene)
+        item = next(item for item in canvas.scene.items() if is_root_item(item))
+        canvas.undo_stack.push(MoveCommand(item, item.pos(), item.pos() + QPointF(5, 5)))
+        return _timed(lambda: JsonSaveStrategy().save(path, canvas.scene))
+    finally:
+        os.remove(path)
+
+
+def image_export(doc):
+    canvas = load_canvas(doc)
+    # Экспорт всего содержимого, но не больше 4000px по стороне (иначе меряем память, а не отрисовку)
+    canvas.set_page_size(min(doc["scene"]["width"], 4000), min(doc["scene"]["height"], 4000))
+    fd, path = tempfile.mkstemp(suffix=".png")
+    os.close(fd)
+    try:
+        return _timed(lambda: ImageSaveStrategy("PNG", "white").save(path, canvas.scene))
+    finally:
+        os.remove(path)
+
+
+def rubber_band_select(doc):
+    canvas = load_canvas(doc)
+    # То же, что делает QGraphicsView при выделении рамкой: выделяем левую половину документа
+    path = QPainterPath()
+    path.addRect(QRectF(0, 0, doc["scene"]["width"] / 2, doc["scene"]["height"]))
+    return _timed(lambda: canvas.scene.setSelectionArea(
+        path, Qt.ItemSelectionOperation.ReplaceSelection, Qt.ItemSelectionMode.ContainsItemShape))
+
+
+def bulk_move_undo_redo(doc):
+    canvas = load_canvas(doc)
+    items = [item for item in canvas.scene.items() if is_root_item(item)]
+    stack = canvas.undo_stack
+
+    def run():
+        # Как SelectionTool.mouse_release: один макрос на всё перемещение
+        stack.beginMacro("Move Items")
+        for item in items:
+            old_pos = item.pos()
+            stack.push(MoveCommand(item, old_pos, old_pos + QPointF(10, 10)))
+        stack.endMacro()
+        stack.undo()
+        stack.redo()
+    return _timed(run)
+
+
+def group_ungroup(doc):
+    canvas = load_canvas(doc)
+    for item in canvas.scene.items():
+        if is_root_item(item):
+            item.setSelected(True)
+
+    def run():
+        canvas.group_selection()
+        canvas.ungroup_selection()
+    return _timed(run)
+
+
+def snap_index_build(doc):
+    canvas = load_canvas(doc)
+    engine = canvas.init_snapping()
+    return _timed(engine.update_index)
+
+
+def snap_queries(doc):
+    """1000 запросов привязки (точка + перетаскиваемые габариты), как при движении мыши"""
+    canvas = load_canvas(doc)
+    engine = canvas.init_snapping()
+    engine.grid_enabled = True
+    engine.update_index()
+    side = doc["scene"]["width"]
+    step = side / 500
+
+    def run():
+        for i in range(500):
+            x, y = i * step, (i * 7919 % 500) * step
+            engine.snap_point(QPointF(x, y), 8)
+            engine.snap_rect(QRectF(x, y, 30, 20), 8)
+    return _timed(run)
+
+
+def align_rotate_selection(doc):
+    """Выравнивание, распределение и поворот всего документа (как команды меню Object)"""
+    canvas = load_canvas(doc)
+    for item in canvas.scene.items():
+        if is_root_item(item):
+            item.setSelected(True)
+
+    def run():
+        canvas.transform_selection("align", "left")
+        canvas.transform_selection("distribute", "vertical")
+        canvas.transform_selection("rotate", 90)
+    return _timed(run)
+
+
+def duplicate_selection(doc):
+    """Дублирование всего документа (Ctrl+D) с отменой и повтором"""
+    canvas = load_canvas(doc)
+    for item in canvas.scene.items():
+        if is_root_item(item):
+            item.setSelected(True)
+
+    def run():
+        canvas.duplicate_selection()
+        canvas.undo_stack.undo()
+        canvas.undo_stack.redo()
+    return _timed(run)
+
+
+def attribute_query(doc):
+    """Поиск по атрибутам с выделением найденного (индекс уже построен, как после первого поиска)"""
+    canvas = load_canvas(doc)
+    canvas.init_query_index().update()
+
+    def run():
+        for color in COLORS:
+            canvas.select_query(type=("line", "polygon"), color=color, width=(2, 3))
+            canvas.select_similar(("color",))
+    return _timed(run)
+
+
+def vertex_drag(doc):
+    """Перетаскивание вершины самой длинной ломаной инструментом Nodes: 200 движений мыши и одна команда"""
+    canvas = load_canvas(doc)
+    item = max((item for item in canvas.scene.items() if hasattr(item, "coords")), key=lambda item: len(item.coords))
+    item.setSelected(True)
+    canvas.set_tool("nodes")
+    tool = canvas.current_tool
+    vertex = len(item.coords) // 4
+    start = item.mapToScene(QPointF(item.coords[2 * vertex], item.coords[2 * vertex + 1]))
+
+    def run():
+        tool.select_vertices([vertex])
+        tool.begin_drag(vertex, start)
+        for i in range(200):
+            tool.drag_to(start + QPointF(i * 0.5, i * 0.25), Qt.KeyboardModifier.AltModifier)
+        tool.end_drag()
+    return _timed(run)
+
+
+def _write_svg(doc, path, per_group=64):
+    """Документ в SVG: каждая фигура со своим transform, по per_group фигур в <g>"""
+    with open(path, 'w', encoding='utf-8') as f:
+        scene = doc["scene"]
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{scene["width"]}" height="{scene["height"]}">\n')
+        for i, shape in enumerate(doc["shapes"]):
+            if i % per_group == 0:
+                f.write('<g style="fill:none">\n' if i == 0 else '</g>\n<g style="fill:none">\n')
+            props, (x, y) = shape["props"], shape["pos"]
+            attrs = f'transform="translate({x:.3f},{y:.3f})" stroke="{props["color"]}" stroke-width="{props["width"]}"'
+            if shape["type"] == "rect":
+                f.write(f'<rect x="{props["x"]}" y="{props["y"]}" width="{props["w"]:.3f}" height="{props["h"]:.3f}" {attrs}/>\n')
+            elif shape["type"] == "ellipse":
+                rx, ry = props["w"] / 2, props["h"] / 2
+                f.write(f'<ellipse cx="{rx:.3f}" cy="{ry:.3f}" rx="{rx:.3f}" ry="{ry:.3f}" {attrs}/>\n')
+            elif shape["type"] == "line":
+                f.write(f'<line x1="{props["x1"]}" y1="{props["y1"]}" x2="{props["x2"]:.3f}" y2="{props["y2"]:.3f}" {attrs}/>\n')
+            else:
+                points = " ".join(f"{px:.3f},{py:.3f}" for px, py in props["points"])
+                f.write(f'<polygon points="{points}" {attrs}/>\n')
+        f.write('</g>\n</svg>\n')
+
+
+def svg_import(doc):
+    """Импорт SVG-файла (фигуры по 64 в группах) партиями на холст и одна команда истории"""
+    from src.logic.svg_import import SvgImporter
+    fd, path = tempfile.mkstemp(suffix=".svg")
+    os.close(fd)
+    try:
+        _write_svg(doc, path)
+        canvas = EditorCanvas()
+
+        def run():
+            canvas.import_shapes(SvgImporter(path).batches(), "Import SVG")
+        return _timed(run)
+    finally:
+        os.remove(path)
+
+
+def geojson_import(doc):
+    """Импорт GeoJSON из длинных ломаных (без bbox: первый проход) с вписыванием в лист и упрощением"""
+    from src.logic.geojson_import import GeoJsonImporter
+    features = [{"type": "Feature", "properties": {},
+                 "geometry": {"type": "LineString", "coordinates": shape["props"]["points"]}}
+                for shape in doc["shapes"]]
+    fd, path = tempfile.mkstemp(suffix=".geojson")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+    try:
+        canvas = EditorCanvas()
+        canvas.set_page_size(doc["scene"]["width"], doc["scene"]["height"])
+
+        def run():
+            canvas.import_shapes(GeoJsonImporter(path, canvas.scene.page_rect, "planar").batches(), "Import GeoJSON")
+        return _timed(run)
+    finally:
+        os.remove(path)
+
+
+def memory_scan(doc):
+    """Полный подсчет панели статистики (шагами по 30 мс, как по таймеру окна) после удаления части фигур"""
+    from src.logic.memory_stats import MemoryScan
+    canvas = load_canvas(doc)
+    roots = [item for item in canvas.scene.items() if is_root_item(item)]
+    canvas.select_items(roots[::10])
+    canvas.delete_selected()
+
+    def run():
+        scan = MemoryScan(canvas)
+        while not scan.run(0.03):
+            pass
+    return _timed(run)
+
+
+def _pan_repaint(doc, fast, baked=False):
+    """Панорамирование по всему документу с синхронной перерисовкой каждого кадра"""
+    canvas = load_canvas(doc)
+    canvas.set_interaction_quality(fast)
+    if baked:
+        canvas.set_baking(True)
+        canvas.bake_now()
+    canvas.resize(1200, 800)
+    canvas.show()
+    canvas.fit_to_content()
+    QApplication.processEvents()
+
+    def run():
+        for _ in range(20):
+            canvas._pan_by(15, 10)
+            canvas.viewport().repaint()
+    return _timed(run)
+
+
+def pan_repaint(doc):
+    return _pan_repaint(doc, fast=False)
+
+
+def pan_repaint_fast(doc):
+    """То же с упрощенной отрисовкой на время взаимодействия"""
+    return _pan_repaint(doc, fast=True)
+
+
+def baked_pan_repaint(doc):
+    """То же с запеченными фигурами (запекание - вне замера)"""
+    return _pan_repaint(doc, fast=False, baked=True)
+
+
+def label_repaint(doc):
+    """Перерисовка надписей: весь документ в окне (мелкие надписи - полосками) и крупный план"""
+    canvas = load_canvas(doc)
+    canvas.resize(1200, 800)
+    canvas.show()
+    canvas.fit_to_content()
+    QApplication.processEvents()
+
+    def run():
+        for zoom in (1.0, 8.0):
+            canvas.scale(zoom, zoom)
+            for _ in range(10):
+                canvas._pan_by(15, 10)
+                canvas.viewport().repaint()
+    return _timed(run)
+
+
+# Набор сценариев: имя -> (генератор документа, функция замера)
+SCENARIOS = {
+    "json_load": ("mixed", json_load),
+    "json_load_deep_groups": ("deep_groups", json_load),
+    "json_load_long_polygons": ("long_polygons", json_load),
+    "json_load_long_polygons_saved": ("long_polygons", json_load_saved),
+    "json_save": ("mixed", json_save),
+    "json_save_long_polygons": ("long_polygons", json_save),
+    "json_save_after_edit": ("mixed", json_save_after_edit),
+    "image_export": ("mixed", image_export),
+    "rubber_band_select": ("mixed", rubber_band_select),
+    "bulk_move_undo_redo": ("mixed", bulk_move_undo_redo),
+    "group_ungroup": ("mixed", group_ungroup),
+    "snap_index_build": ("mixed", snap_index_build),
+    "snap_queries": ("mixed", snap_queries),
+    "align_rotate_selection": ("mixed", align_rotate_selection),
+    "duplicate_selection": ("mixed", duplicate_selection),
+    "attribute_query": ("mixed", attribute_query),
+    "vertex_drag": ("long_polygons", vertex_drag),
+    "svg_import": ("mixed", svg_import),
+    "geojson_import": ("long_polygons", geojson_import),
+    "memory_scan": ("deep_groups", memory_scan),
+    "pan_repaint": ("mixed", pan_repaint),
+    "pan_repaint_fast": ("mixed", pan_repaint_fast),
+    "label_repaint": ("labels", label_repaint),
+    "baked_pan_repaint": ("mixed", baked_pan_repaint),
+}
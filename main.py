@@ -1,16 +1,39 @@
 # vector_editor/main.py
 import sys
-from PySide6.QtWidgets import QApplication
-from src.app import VectorEditorWindow
+from src.startup import StartupProfiler
 
 def main():
+    # Пул миниатюр запускает процессы через spawn: в собранном .exe они стартуют с этого же файла
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+
+    # --profile-startup: печатаем шкалу импорта/инициализации до первой отрисовки окна
+    profiler = None
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        profiler = StartupProfiler()
+        profiler.install_import_hook()
+
+    # Qt и само приложение импортируем здесь, чтобы импорт попал в профиль
+    from PySide6.QtWidgets import QApplication
+    if profiler: profiler.mark("import PySide6.QtWidgets")
+
     app = QApplication(sys.argv)
+    app.setApplicationName("VectorEditor")  # Папка кэша миниатюр и настроек
+    if profiler: profiler.mark("QApplication created")
 
     # Инициализация и настройка темы оформления (опционально)
     app.setStyle("Fusion")
 
-    window = VectorEditorWindow()
+    from src.app import VectorEditorWindow
+    if profiler: profiler.mark("import src.app")
+
+    window = VectorEditorWindow(profiler)
+    if profiler: profiler.mark("window constructed")
+
     window.show()
+    if profiler: profiler.mark("window.show()")
 
     sys.exit(app.exec())
 
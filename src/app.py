@@ -3,22 +3,75 @@ from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                                QPushButton, QFrame, QColorDialog, QFileDialog,
                                QMessageBox, QGraphicsView)
 from PySide6.QtGui import QAction, QKeySequence
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer, QEvent
 from src.widgets.canvas import EditorCanvas
-from src.widgets.properties import PropertiesPanel
-from src.logic.strategies import JsonSaveStrategy, ImageSaveStrategy
-from src.logic.factory import ShapeFactory
-from src.logic.tools import SelectionTool, CreationTool, PolygonTool
-import json
+from src.logic.tools import PolygonTool
+from src.logic.profiling import TRACER
+# Быстрый старт: стратегии сохранения, фабрика, json, панели свойств и миникарты
+# импортируются при первом использовании (см. on_save_clicked, on_open_clicked, _build_side_panels)
+
+# Документы с таким числом фигур открываются в ленивом режиме (если он включен)
+LAZY_LOADING_THRESHOLD = 5000
 
 class VectorEditorWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, profiler=None):
         super().__init__()
+        self.profiler = profiler  # StartupProfiler (main.py --profile-startup) или None
         self.setWindowTitle("Vector Editor")
         self.resize(1000, 700)
+        self.current_path = None  # Открытый/сохраненный файл проекта
+        self._boolean_worker = None  # BooleanWorker, пока считается булева операция
+        self.statistics_dialog = None  # StatisticsDialog (создается при первом открытии)
         self._setup_layout()
         self._init_ui()
 
+        # Вторичные панели строим после первой отрисовки холста
+        self.props_panel = None
+        self.minimap = None
+        self.layers_panel = None
+        self.canvas.viewport().installEventFilter(self)
+        self.canvas.scene.selectionChanged.connect(self._build_side_panels)
+
+    def eventFilter(self, obj, event):
+        if obj is self.canvas.viewport() and event.type() == QEvent.Type.Paint:
+            # Первая отрисовка: окно уже видно, остальное доделаем в следующей итерации цикла событий
+            self.canvas.viewport().removeEventFilter(self)
+            if self.profiler:
+                self.profiler.mark("first paint")
+            QTimer.singleShot(0, self._build_side_panels)
+        return super().eventFilter(obj, event)
+
+    def _build_side_panels(self):
+        """Панель свойств и миникарта (создаются один раз, при первой необходимости)"""
+        if self.props_panel is not None:
+            return
+        from src.widgets.properties import PropertiesPanel
+        from src.widgets.minimap import MinimapPanel
+        from src.widgets.layers import LayersPanel
+
+        self.canvas.scene.selectionChanged.disconnect(self._build_side_panels)
+
+        self.props_panel = PropertiesPanel(self.canvas.scene, self.canvas.undo_stack)
+        self.side_layout.addWidget(self.props_panel, 1)
+
+        self.layers_panel = LayersPanel(self.canvas.scene, self.canvas.undo_stack)
+        self.side_layout.addWidget(self.layers_panel)
+
+        self.minimap = MinimapPanel(self.canvas)
+        self.side_layout.addWidget(self.minimap)
+
+        # Панель могла создаться уже при выделенных фигурах
+        self.props_panel.on_selection_changed()
+
+        # Движок привязки (и numpy) грузим здесь, а не при первом клике
+        self.canvas.init_snapping()
+
+        if self.profiler:
+            self.profiler.mark("side panels built")
+            self.profiler.uninstall_import_hook()
+            self.profiler.report()
+            self.profiler = None
+
     def _init_ui(self):
         self.statusBar().showMessage("Готов к работе")
         menubar = self.menuBar()
@@ -30,11 +83,34 @@ class VectorEditorWindow(QMainWindow):
         open_action.triggered.connect(self.on_open_clicked)
         file_menu.addAction(open_action)
 
+        open_recent_action = QAction("Open Recent...", self)
+        open_recent_action.setShortcut(QKeySequence("Ctrl+Shift+O"))
+        open_recent_action.triggered.connect(self.on_open_recent_clicked)
+        file_menu.addAction(open_recent_action)
+
+        import_svg_action = QAction("Import SVG...", self)
+        import_svg_action.setShortcut(QKeySequence("Ctrl+Shift+I"))
+        import_svg_action.triggered.connect(self.on_import_svg_clicked)
+        file_menu.addAction(import_svg_action)
+
+        import_geojson_action = QAction("Import GeoJSON...", self)
+        import_geojson_action.triggered.connect(self.on_import_geojson_clicked)
+        file_menu.addAction(import_geojson_action)
+
         save_action = QAction("Save / Export...", self)
         save_action.setShortcut(QKeySequence.Save)
         save_action.triggered.connect(self.on_save_clicked)
         file_menu.addAction(save_action)
 
+        file_menu.addSeparator()
+        compare_action = QAction("Compare With Version...", self)
+        compare_action.triggered.connect(self.on_compare_clicked)
+        file_menu.addAction(compare_action)
+
+        clear_compare_action = QAction("Clear Comparison", self)
+        clear_compare_action.triggered.connect(lambda: self.canvas.set_diff_overlay(None))
+        file_menu.addAction(clear_compare_action)
+
         file_menu.addSeparator()
         exit_action = QAction("Exit", self)
         exit_action.setShortcut("Ctrl+Q")
@@ -64,11 +140,191 @@ class VectorEditorWindow(QMainWindow):
         edit_menu.addSeparator()
         edit_menu.addAction(delete_action)
         edit_menu.addSeparator()
+
+        copy_action = QAction("Copy", self)
+        copy_action.setShortcut(QKeySequence.Copy)
+        copy_action.triggered.connect(self.canvas.copy_selection)
+        edit_menu.addAction(copy_action)
+
+        paste_action = QAction("Paste", self)
+        paste_action.setShortcut(QKeySequence.Paste)
+        paste_action.triggered.connect(self.canvas.paste)
+        edit_menu.addAction(paste_action)
+
+        duplicate_action = QAction("Duplicate", self)
+        duplicate_action.setShortcut(QKeySequence("Ctrl+D"))
+        duplicate_action.triggered.connect(self.canvas.duplicate_selection)
+        edit_menu.addAction(duplicate_action)
+        edit_menu.addSeparator()
         edit_menu.addAction(group_action)
         edit_menu.addAction(ungroup_action)
+        edit_menu.addSeparator()
 
-        self.props_panel = PropertiesPanel(self.canvas.scene, stack)
-        self.main_layout.addWidget(self.props_panel)
+        # Поиск по атрибутам (инвертированные индексы, см. logic/query.py)
+        similar_menu = edit_menu.addMenu("Select Similar")
+        for fields, title, shortcut in ((("type", "color", "width"), "Type and Style", "Ctrl+Shift+A"),
+                                        (("type",), "Type", None),
+                                        (("color",), "Color", None),
+                                        (("width",), "Stroke Width", None),
+                                        (("layer",), "Layer", None)):
+            action = QAction(title, self)
+            if shortcut:
+                action.setShortcut(QKeySequence(shortcut))
+            action.triggered.connect(lambda checked=False, f=fields: self.on_select_similar(f))
+            similar_menu.addAction(action)
+
+        find_action = QAction("Find by Attributes...", self)
+        find_action.setShortcut(QKeySequence.Find)
+        find_action.triggered.connect(self.on_find_clicked)
+        edit_menu.addAction(find_action)
+        self.query_toolbar = None  # Строка поиска (создается при первом Ctrl+F)
+
+        # Булевы операции над выделением (считаются в фоне, см. on_boolean_operation)
+        boolean_menu = edit_menu.addMenu("Boolean")
+        for operation, title, shortcut in (("union", "Union", "Ctrl+Alt+U"),
+                                           ("intersection", "Intersection", "Ctrl+Alt+I"),
+                                           ("difference", "Difference", "Ctrl+Alt+D"),
+                                           ("xor", "Exclude", "Ctrl+Alt+X")):
+            action = QAction(title, self)
+            action.setShortcut(QKeySequence(shortcut))
+            action.triggered.connect(lambda checked=False, op=operation: self.on_boolean_operation(op))
+            boolean_menu.addAction(action)
+
+        # Преобразования выделения (одна команда истории на всё выделение, см. canvas.transform_selection)
+        object_menu = menubar.addMenu("&Object")
+        align_menu = object_menu.addMenu("Align")
+        for mode, title in (("left", "Left"), ("hcenter", "Horizontal Center"), ("right", "Right"),
+                            ("top", "Top"), ("vcenter", "Vertical Center"), ("bottom", "Bottom")):
+            action = QAction(title, self)
+            action.triggered.connect(lambda checked=False, m=mode: self.canvas.transform_selection("align", m))
+            align_menu.addAction(action)
+
+        distribute_menu = object_menu.addMenu("Distribute")
+        for axis, title in (("horizontal", "Horizontally"), ("vertical", "Vertically")):
+            action = QAction(title, self)
+            action.triggered.connect(lambda checked=False, a=axis: self.canvas.transform_selection("distribute", a))
+            distribute_menu.addAction(action)
+
+        object_menu.addSeparator()
+        for angle, title, shortcut in ((90, "Rotate 90° Clockwise", "Ctrl+R"),
+                                       (-90, "Rotate 90° Counterclockwise", "Ctrl+Shift+R")):
+            action = QAction(title, self)
+            action.setShortcut(QKeySequence(shortcut))
+            action.triggered.connect(lambda checked=False, a=angle: self.canvas.transform_selection("rotate", a))
+            object_menu.addAction(action)
+
+        rotate_action = QAction("Rotate...", self)
+        rotate_action.triggered.connect(self.on_rotate_clicked)
+        object_menu.addAction(rotate_action)
+
+        scale_action = QAction("Scale...", self)
+        scale_action.triggered.connect(self.on_scale_clicked)
+        object_menu.addAction(scale_action)
+
+        view_menu = menubar.addMenu("&View")
+        zoom_in_action = QAction("Zoom In", self)
+        zoom_in_action.setShortcut(QKeySequence.ZoomIn)
+        zoom_in_action.triggered.connect(self.canvas.zoom_in)
+
+        zoom_out_action = QAction("Zoom Out", self)
+        zoom_out_action.setShortcut(QKeySequence.ZoomOut)
+        zoom_out_action.triggered.connect(self.canvas.zoom_out)
+
+        zoom_reset_action = QAction("Actual Size", self)
+        zoom_reset_action.setShortcut(QKeySequence("Ctrl+1"))
+        zoom_reset_action.triggered.connect(self.canvas.zoom_reset)
+
+        fit_content_action = QAction("Fit to Content", self)
+        fit_content_action.setShortcut(QKeySequence("Ctrl+0"))
+        fit_content_action.triggered.connect(self.canvas.fit_to_content)
+
+        fit_selection_action = QAction("Fit to Selection", self)
+        fit_selection_action.setShortcut(QKeySequence("Ctrl+2"))
+        fit_selection_action.triggered.connect(self.canvas.fit_to_selection)
+
+        view_menu.addAction(zoom_in_action)
+        view_menu.addAction(zoom_out_action)
+        view_menu.addAction(zoom_reset_action)
+        view_menu.addSeparator()
+        view_menu.addAction(fit_content_action)
+        view_menu.addAction(fit_selection_action)
+        view_menu.addSeparator()
+
+        # Привязка (зажатый Alt временно отключает её)
+        snap_grid_action = QAction("Snap to Grid", self)
+        snap_grid_action.setCheckable(True)
+        snap_grid_action.setShortcut(QKeySequence("Ctrl+'"))
+        snap_grid_action.toggled.connect(lambda checked: self.canvas.set_snap_option("grid", checked))
+
+        snap_objects_action = QAction("Snap to Objects", self)
+        snap_objects_action.setCheckable(True)
+        snap_objects_action.setChecked(True)
+        snap_objects_action.toggled.connect(lambda checked: self.canvas.set_snap_option("objects", checked))
+
+        smart_guides_action = QAction("Smart Guides", self)
+        smart_guides_action.setCheckable(True)
+        smart_guides_action.setChecked(True)
+        smart_guides_action.toggled.connect(lambda checked: self.canvas.set_snap_option("guides", checked))
+
+        view_menu.addAction(snap_grid_action)
+        view_menu.addAction(snap_objects_action)
+        view_menu.addAction(smart_guides_action)
+        view_menu.addSeparator()
+
+        self.lazy_action = QAction("Lazy Loading (large documents)", self)
+        self.lazy_action.setCheckable(True)
+        self.lazy_action.setChecked(True)
+        view_menu.addAction(self.lazy_action)
+
+        fast_interaction_action = QAction("Fast Rendering While Interacting", self)
+        fast_interaction_action.setCheckable(True)
+        fast_interaction_action.setChecked(True)
+        fast_interaction_action.toggled.connect(self.canvas.set_interaction_quality)
+        view_menu.addAction(fast_interaction_action)
+
+        interaction_settings_action = QAction("Interaction Quality Settings...", self)
+        interaction_settings_action.triggered.connect(self.on_interaction_settings_clicked)
+        view_menu.addAction(interaction_settings_action)
+
+        # Невыделенные фигуры, которых давно не трогали, рисуются чанками (распекаются при клике/правке)
+        bake_action = QAction("Bake Static Shapes", self)
+        bake_action.setCheckable(True)
+        bake_action.toggled.connect(self.canvas.set_baking)
+        view_menu.addAction(bake_action)
+
+        # Диагностика производительности
+        view_menu.addSeparator()
+        overlay_action = QAction("Performance Overlay", self)
+        overlay_action.setCheckable(True)
+        overlay_action.toggled.connect(self.canvas.set_perf_overlay)
+        view_menu.addAction(overlay_action)
+
+        trace_action = QAction("Record Trace", self)
+        trace_action.setCheckable(True)
+        trace_action.setChecked(TRACER.enabled)
+        trace_action.toggled.connect(TRACER.enable)
+        view_menu.addAction(trace_action)
+
+        export_trace_action = QAction("Export Trace...", self)
+        export_trace_action.triggered.connect(self.on_export_trace_clicked)
+        view_menu.addAction(export_trace_action)
+
+        statistics_action = QAction("Document Statistics...", self)
+        statistics_action.triggered.connect(self.on_statistics_clicked)
+        view_menu.addAction(statistics_action)
+
+        record_session_action = QAction("Record Input Session", self)
+        record_session_action.setCheckable(True)
+        record_session_action.toggled.connect(self.on_record_session_toggled)
+        view_menu.addAction(record_session_action)
+
+        # Правая колонка: свойства сверху, миникарта снизу (наполняется в _build_side_panels)
+        side_panel = QWidget()
+        side_panel.setMinimumWidth(250)
+        self.side_layout = QVBoxLayout(side_panel)
+        self.side_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.main_layout.addWidget(side_panel)
 
 
     def _setup_layout(self):
@@ -102,13 +358,16 @@ class VectorEditorWindow(QMainWindow):
         self.btn_rect = QPushButton("Rect")
         self.btn_ellipse = QPushButton("Ellipse")
         self.btn_poly = QPushButton("Polygon") # <--- ТУТ
+        self.btn_nodes = QPushButton("Nodes")  # Правка вершин ломаной или отрезка
+        self.btn_text = QPushButton("Text")    # Надписи (клик - новая, клик по надписи - правка)
 
         self.btn_color = QPushButton("Color")
         self.btn_color.setFixedHeight(50)
         self.btn_color.setStyleSheet("background-color: #000000; color: white; border-radius: 6px; border: 2px solid #555;")
 
         # Помещаем в список для стилизации
-        buttons = [self.btn_select, self.btn_line, self.btn_rect, self.btn_ellipse, self.btn_poly]
+        buttons = [self.btn_select, self.btn_line, self.btn_rect, self.btn_ellipse, self.btn_poly, self.btn_nodes,
+                   self.btn_text]
 
         for btn in buttons:
             btn.setCheckable(True)
@@ -129,6 +388,8 @@ class VectorEditorWindow(QMainWindow):
         self.btn_rect.clicked.connect(lambda: self.on_change_tool("rect"))
         self.btn_ellipse.clicked.connect(lambda: self.on_change_tool("ellipse"))
         self.btn_poly.clicked.connect(lambda: self.on_change_tool("polygon")) # <--- И ТУТ
+        self.btn_nodes.clicked.connect(lambda: self.on_change_tool("nodes"))
+        self.btn_text.clicked.connect(lambda: self.on_change_tool("text"))
 
         self.btn_color.clicked.connect(self.on_select_color)
 
@@ -143,6 +404,8 @@ class VectorEditorWindow(QMainWindow):
         self.btn_rect.setChecked(tool_name == "rect")
         self.btn_ellipse.setChecked(tool_name == "ellipse")
         self.btn_poly.setChecked(tool_name == "polygon")
+        self.btn_nodes.setChecked(tool_name == "nodes")
+        self.btn_text.setChecked(tool_name == "text")
 
         if tool_name == "polygon":
             # ВЫКЛЮЧАЕМ ладошку принудительно
@@ -154,6 +417,11 @@ class VectorEditorWindow(QMainWindow):
         else:
             # Для остальных инструментов (select, rect и т.д.)
             self.canvas.set_tool(tool_name)
+            if tool_name == "nodes":
+                self.statusBar().showMessage("Инструмент: Вершины (Перетаскивание - сдвиг, Shift/рамка - выделение, "
+                                             "двойной клик по ребру - новая вершина, Delete - удалить)")
+            elif tool_name == "text":
+                self.statusBar().showMessage("Инструмент: Текст (Клик - новая надпись, клик по надписи - правка)")
 
     def on_select_color(self):
         color = QColorDialog.getColor()
@@ -197,6 +465,135 @@ class VectorEditorWindow(QMainWindow):
 
         return project_data
 
+    def on_rotate_clicked(self):
+        from PySide6.QtWidgets import QInputDialog
+        angle, ok = QInputDialog.getDouble(self, "Rotate", "Угол (градусы, по часовой стрелке):", 45, -360, 360, 2)
+        if ok:
+            self.canvas.transform_selection("rotate", angle)
+
+    def on_scale_clicked(self):
+        from PySide6.QtWidgets import QInputDialog
+        percent, ok = QInputDialog.getDouble(self, "Scale", "Масштаб (%):", 100, 1, 10000, 2)
+        if ok:
+            self.canvas.transform_selection("scale", percent / 100)
+
+    def on_interaction_settings_clicked(self):
+        """Пороги упрощенной отрисовки на время взаимодействия (см. EditorCanvas._note_interaction)"""
+        from PySide6.QtWidgets import QDialog, QFormLayout, QSpinBox, QDoubleSpinBox, QDialogButtonBox
+        canvas = self.canvas
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Interaction Quality")
+        form = QFormLayout(dialog)
+
+        idle = QSpinBox()
+        idle.setRange(0, 5000)
+        idle.setSuffix(" мс")
+        idle.setValue(canvas.interaction_idle_ms)
+        form.addRow("Полное качество после паузы:", idle)
+
+        min_pixels = QDoubleSpinBox()
+        min_pixels.setRange(0, 100)
+        min_pixels.setSuffix(" px")
+        min_pixels.setValue(canvas.interaction_min_pixels)
+        form.addRow("Не рисовать фигуры меньше:", min_pixels)
+
+        slow_frame = QDoubleSpinBox()
+        slow_frame.setRange(0, 1000)
+        slow_frame.setSuffix(" мс")
+        slow_frame.setValue(canvas.interaction_slow_frame_ms)
+        form.addRow("Упрощать, если кадр дольше:", slow_frame)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+
+        if dialog.exec():
+            canvas.set_interaction_quality(canvas.interaction_quality, idle.value(), min_pixels.value(),
+                                           slow_frame.value())
+
+    def on_select_similar(self, fields):
+        if not self.canvas.scene.selectedItems():
+            self.statusBar().showMessage("Выделите образец", 3000)
+            return
+        count = self.canvas.select_similar(fields)
+        self.statusBar().showMessage(f"Выделено похожих: {count}", 3000)
+
+    def on_find_clicked(self):
+        """Показывает строку поиска фигур по атрибутам"""
+        if self.query_toolbar is None:
+            from PySide6.QtWidgets import QToolBar
+            from src.widgets.query_bar import QueryBar
+            self.query_toolbar = QToolBar("Find by Attributes", self)
+            self.query_toolbar.setMovable(False)
+            self.query_bar = QueryBar(self.canvas)
+            self.query_toolbar.addWidget(self.query_bar)
+            self.addToolBar(Qt.TopToolBarArea, self.query_toolbar)
+        self.query_toolbar.show()
+        self.query_bar.focus()
+
+    def on_boolean_operation(self, operation):
+        from PySide6.QtWidgets import QProgressDialog
+        from src.logic.boolean_ops import BooleanWorker, selected_operands, operand_state, OPERATIONS
+
+        if self._boolean_worker is not None:
+            self.statusBar().showMessage("Булева операция уже выполняется", 3000)
+            return
+
+        sources, paths = selected_operands(self.canvas.scene)
+        if len(sources) < 2:
+            self.statusBar().showMessage("Выделите хотя бы две фигуры с площадью (линии не участвуют)", 3000)
+            return
+
+        # Геометрия на момент запуска: если фигуры успеют измениться (сдвиг, поворот, правка вершин, Undo
+        # до появления окна прогресса), результат посчитан по старым контурам и уже неактуален
+        self._boolean_sources = [(item, operand_state(item)) for item in sources]
+        self._boolean_operation = operation
+
+        worker = BooleanWorker(paths, operation, self)
+        dialog = QProgressDialog(f"{OPERATIONS[operation]}: {len(sources)} фигур...", "Отмена", 0, worker.total, self)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+        dialog.canceled.connect(worker.cancel)
+        worker.progress.connect(self._on_boolean_progress)
+        worker.done.connect(self._on_boolean_done)
+        worker.finished.connect(self._on_boolean_finished)
+        self._boolean_worker = worker
+        self._boolean_dialog = dialog
+        worker.start()
+
+    def _on_boolean_progress(self, completed, total):
+        self._boolean_dialog.setValue(completed)
+
+    def _on_boolean_done(self, path):
+        from src.logic.boolean_ops import OPERATIONS, operand_state
+        from src.logic.commands import BooleanOperationCommand
+        from src.logic.shapes import PathShape
+
+        scene = self.canvas.scene
+        if any(item.scene() is not scene or operand_state(item) != state for item, state in self._boolean_sources):
+            self.statusBar().showMessage("Фигуры изменились во время операции, результат отброшен", 3000)
+            return
+        if path.isEmpty():
+            self.statusBar().showMessage("Результат операции пуст", 3000)
+            return
+
+        sources = [item for item, _ in self._boolean_sources]
+        result = PathShape.from_painter_path(path, sources[0].color, sources[0].stroke_width)
+        result.setZValue(max(item.zValue() for item in sources))
+        result.layer = sources[-1].layer
+        self.canvas.undo_stack.push(
+            BooleanOperationCommand(scene, sources, result, OPERATIONS[self._boolean_operation]))
+        scene.clearSelection()
+        result.setSelected(True)
+
+    def _on_boolean_finished(self):
+        self._boolean_dialog.reset()
+        self._boolean_dialog.deleteLater()
+        self._boolean_worker.deleteLater()
+        self._boolean_worker = None
+        self._boolean_sources = []
+
     def on_save_clicked(self):
         # Добавляем новый фильтр "PNG Cropped"
         filters = (
@@ -213,6 +610,8 @@ class VectorEditorWindow(QMainWindow):
         if not filename:
             return
 
+        from src.logic.strategies import JsonSaveStrategy, ImageSaveStrategy
+
         strategy = None
         ext = filename.lower()
 
@@ -227,16 +626,102 @@ class VectorEditorWindow(QMainWindow):
         else:
             if not ext.endswith(".json"):
                 filename += ".json"
-            strategy = JsonSaveStrategy()
+            # Миниатюра для окна недавних проектов - картинка миникарты (она уже нарисована)
+            strategy = JsonSaveStrategy(thumbnail=self.minimap.thumbnail() if self.minimap else None)
 
         try:
             strategy.save(filename, self.canvas.scene)
+            if isinstance(strategy, JsonSaveStrategy):
+                self.current_path = filename
+                self.canvas.undo_stack.setClean()
+                self._remember_project(filename, strategy.thumbnail)
             self.statusBar().showMessage(f"Сохранено успешно: {filename}", 3000)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить:\n{str(e)}")
 
 
 
+    def on_export_trace_clicked(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Export Trace", "trace.json", "Chrome Trace (*.json)")
+        if not filename:
+            return
+        try:
+            TRACER.export_chrome_trace(filename)
+            self.statusBar().showMessage(f"Трасса сохранена: {filename} ({len(TRACER.events)} событий)", 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить трассу:\n{str(e)}")
+
+    def on_statistics_clicked(self):
+        """Панель статистики документа и памяти (не модальная, подсчет идет в фоне по таймеру)"""
+        if self.statistics_dialog is None:
+            from src.widgets.statistics import StatisticsDialog
+            self.statistics_dialog = StatisticsDialog(self)
+        self.statistics_dialog.show()
+        self.statistics_dialog.raise_()
+
+    def on_record_session_toggled(self, checked):
+        from src.logic.session import SessionRecorder
+        if checked:
+            # Если документ менялся после открытия, кладем его снимок в сессию - иначе воспроизведение разойдется
+            snapshot = None
+            if self.current_path is None or not self.canvas.undo_stack.isClean():
+                page = self.canvas.scene.page_rect
+                snapshot = {"version": "1.0", "scene": {"width": page.width(), "height": page.height()},
+                            "shapes": list(self.canvas.scene.shape_dicts())}
+            self.canvas.recorder = SessionRecorder(self.canvas, self.current_path, snapshot)
+            self.statusBar().showMessage("Запись сессии...")
+            return
+
+        recorder, self.canvas.recorder = self.canvas.recorder, None
+        if recorder is None:
+            return
+        filename, _ = QFileDialog.getSaveFileName(self, "Save Session", "session.jsonl", "Input Session (*.jsonl)")
+        if not filename:
+            return
+        try:
+            recorder.save(filename)
+            self.statusBar().showMessage(f"Сессия сохранена: {filename} ({len(recorder.events)} событий)", 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить сессию:\n{str(e)}")
+
+    def on_compare_clicked(self):
+        """Подсветка отличий текущего документа от другой (обычно более старой) версии проекта"""
+        path, _ = QFileDialog.getOpenFileName(self, "Сравнить с версией", "", "Vector Project (*.json *.vec)")
+        if not path:
+            return
+
+        from src.logic.diff import DiffOverlay, diff_document, diff_files
+        try:
+            # Сохраненный документ сравниваем файлами: одинаковые записи отсеиваются без разбора
+            if self.current_path and self.canvas.undo_stack.isClean():
+                result = diff_files(path, self.current_path)
+            else:
+                result = diff_document(path, self.canvas.scene)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сравнить:\n{str(e)}")
+            return
+
+        self.canvas.set_diff_overlay(DiffOverlay(result) if result else None)
+        message = f"Отличия от {path}: {result.summary()}" if result else f"Отличий от {path} нет"
+        self.statusBar().showMessage(message)
+
+    def _remember_project(self, path, thumbnail=None):
+        """Добавляет проект в недавние (и кладет его миниатюру в кэш, если она уже есть)"""
+        from src.widgets.recent import add_recent_project
+        add_recent_project(path)
+        if thumbnail is not None and not thumbnail.isNull():
+            from src.logic.thumbnails import default_cache_dir, png_bytes, scaled, store_thumbnail
+            try:
+                store_thumbnail(default_cache_dir(), path, png_bytes(scaled(thumbnail)))
+            except OSError as e:
+                print(f"Error caching thumbnail: {e}")
+
+    def on_open_recent_clicked(self):
+        from src.widgets.recent import RecentProjectsDialog, recent_projects
+        dialog = RecentProjectsDialog(recent_projects(), parent=self)
+        if dialog.exec() and dialog.selected_path:
+            self.open_project(dialog.selected_path)
+
     def on_open_clicked(self):
         # 1. Спрашиваем пользователя
         path, _ = QFileDialog.getOpenFileName(
@@ -248,6 +733,125 @@ class VectorEditorWindow(QMainWindow):
 
         if not path:
             return # Пользователь нажал Отмена
+        self.open_project(path)
+
+    def on_import_svg_clicked(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт SVG", "", "SVG (*.svg)")
+        if path:
+            self.import_svg(path)
+
+    def import_svg(self, path):
+        """Фигуры SVG-файла в активный слой - одним действием в истории"""
+        from src.logic.svg_import import SvgImporter
+        try:
+            importer = SvgImporter(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка импорта", f"Не удалось открыть файл:\n{e}")
+            return
+        count = self._run_import(importer, "SVG")
+        if count is None:
+            return
+        if importer.skipped:
+            self.statusBar().showMessage(f"Импортировано фигур: {count} (пропущено элементов: {importer.skipped})")
+        else:
+            self.statusBar().showMessage(f"Импортировано фигур: {count}")
+
+    def on_import_geojson_clicked(self):
+        from PySide6.QtWidgets import QDialog, QFormLayout, QComboBox, QDoubleSpinBox, QDialogButtonBox
+        from src.logic.geojson_import import PROJECTIONS, DEFAULT_TOLERANCE
+
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт GeoJSON", "", "GeoJSON (*.geojson *.json)")
+        if not path:
+            return
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Import GeoJSON")
+        form = QFormLayout(dialog)
+
+        projection = QComboBox()
+        for key, name in PROJECTIONS.items():
+            projection.addItem(name, key)
+        form.addRow("Проекция:", projection)
+
+        scale = QDoubleSpinBox()
+        scale.setRange(0, 1e9)
+        scale.setDecimals(4)
+        scale.setSpecialValueText("Вписать в лист")
+        form.addRow("Пикселей на единицу проекции:", scale)
+
+        tolerance = QDoubleSpinBox()
+        tolerance.setRange(0, 100)
+        tolerance.setSingleStep(0.25)
+        tolerance.setSuffix(" px")
+        tolerance.setValue(DEFAULT_TOLERANCE)
+        form.addRow("Допуск упрощения:", tolerance)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+
+        if dialog.exec():
+            self.import_geojson(path, projection.currentData(), scale.value() or None, tolerance.value())
+
+    def import_geojson(self, path, projection="mercator", scale=None, tolerance=None):
+        """
+        Линии и полигоны GeoJSON в активный слой - одним действием в истории.
+        Без scale данные вписываются в лист; каждая линия упрощается с допуском tolerance (пиксели сцены).
+        """
+        from src.logic.geojson_import import GeoJsonImporter, DEFAULT_TOLERANCE
+        try:
+            importer = GeoJsonImporter(path, self.canvas.scene.page_rect, projection, scale,
+                                       DEFAULT_TOLERANCE if tolerance is None else tolerance)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка импорта", f"Не удалось открыть файл:\n{e}")
+            return
+        count = self._run_import(importer, "GeoJSON")
+        if count is None:
+            return
+        message = f"Импортировано фигур: {count}, вершин: {importer.vertices_in} -> {importer.vertices_out}"
+        if importer.skipped:
+            message += f" (пропущено объектов: {importer.skipped})"
+        self.statusBar().showMessage(message)
+
+    def _run_import(self, importer, kind):
+        """
+        Импорт партиями с прогрессом по прочитанным байтам (importer - SvgImporter, GeoJsonImporter).
+        -> число фигур или None (отменен или ошибка - пользователю уже сообщено)
+        """
+        from PySide6.QtWidgets import QProgressDialog
+
+        # Шкала в килобайтах: размер файла в байтах может не поместиться в int прогресса
+        dialog = QProgressDialog(f"Импорт {kind}...", "Отмена", 0, max(1, importer.total // 1024), self)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+
+        def progress():
+            # У модального диалога setValue сам обрабатывает события (в том числе кнопку Отмена)
+            dialog.setMaximum(max(1, importer.total // 1024))
+            dialog.setValue(importer.position // 1024)
+            dialog.setLabelText(f"Импорт {kind}: {importer.created} фигур...")
+            return not dialog.wasCanceled()
+
+        try:
+            count = self.canvas.import_shapes(importer.batches(), f"Import {kind}", progress)
+        except (ValueError, OSError) as e:
+            count, error = None, str(e)
+        else:
+            error = None
+        canceled = dialog.wasCanceled()
+        dialog.reset()
+        dialog.deleteLater()
+
+        if error:
+            QMessageBox.critical(self, "Ошибка импорта", error)
+        elif canceled:
+            self.statusBar().showMessage(f"Импорт {kind} отменен", 3000)
+            return None
+        return count
+
+    def open_project(self, path):
+        import json
+        from src.logic.factory import ShapeFactory
 
         # 2. Попытка загрузки (Безопасный блок)
         try:
@@ -268,12 +872,14 @@ class VectorEditorWindow(QMainWindow):
         # Сначала очищаем старое!
         self.canvas.scene.clear()
         self.canvas.undo_stack.clear()
+        self.canvas.set_diff_overlay(None)
 
-        # 4. Восстанавливаем настройки сцены
+        # 4. Восстанавливаем настройки сцены и слои (до фигур: фигура скрытого слоя сразу уходит в слой)
+        self.canvas.scene.layers.load(data.get("layers"))
         scene_info = data.get("scene", {})
         width = scene_info.get("width", 800)
         height = scene_info.get("height", 600)
-        self.canvas.scene.setSceneRect(0, 0, width, height)
+        self.canvas.set_page_size(width, height)
 
         # 5. Восстанавливаем фигуры
         shapes_data = data.get("shapes", [])
@@ -281,6 +887,12 @@ class VectorEditorWindow(QMainWindow):
         # Счетчик ошибок (если вдруг одна фигура битая, не ломаем всё остальное)
         errors_count = 0
 
+        if self.lazy_action.isChecked() and len(shapes_data) >= LAZY_LOADING_THRESHOLD:
+            # Большой документ: держим записи, а фигуры создаем только для видимой области
+            document = self.canvas.load_lazy(shapes_data)
+            errors_count = document.errors_count
+            shapes_data = []
+
         for shape_dict in shapes_data:
             try:
                 # ВАЖНО: Используем Фабрику из Модуля 4 (с рекурсией для групп)
@@ -293,6 +905,12 @@ class VectorEditorWindow(QMainWindow):
                 print(f"Error loading shape: {e}")
                 errors_count += 1
 
+        self._build_side_panels()
+        self.minimap.refresh()
+        self.current_path = path
+        self.canvas.undo_stack.setClean()
+        self._remember_project(path)
+
         # 6. Финал
         if errors_count > 0:
             self.statusBar().showMessage(f"Загружено с ошибками ({errors_count} фигур пропущено)")
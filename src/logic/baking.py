@@ -0,0 +1,435 @@
+# src/logic/baking.py
+"""
+Запекание статичных фигур (режим View → Bake Static Shapes).
+
+Большинство фигур после размещения не двигается, но каждая остается отдельным элементом сцены:
+отдельно рисуется и отдельно ищется. Здесь невыделенные и давно не тронутые фигуры ячейки сетки
+(CELL_SIZE) собираются в один элемент - чанк (BakedChunk): он рисует "партии" - контуры фигур
+с одним пером, склеенные в один QPainterPath, и кэширует картинку в пикселях экрана.
+
+Сами фигуры при этом остаются в сцене, но скрытыми (setVisible(False)): Qt не рисует их и не находит
+под курсором и в рамке, зато порядок наложения, id, история Undo, сохранение и индексы привязки и атрибутов
+работают с ними как раньше. Распекание - просто показать фигуры и убрать чанк.
+
+Чанк распекается, когда внутри него что-то происходит: клик, рамка выделения, перетаскивание над ним,
+выделение найденных фигур, любое изменение фигур в его области (EditorScene.items_changed). Ячейки
+распеченных и измененных чанков запекаются заново, когда пользователь ничего не делает (см. EditorCanvas).
+
+Порядок наложения. Чанк встает в порядок элементов сцены сразу над своей верхней фигурой (z и stackBefore),
+а фигура, перекрытая живой (не запекаемой) фигурой, начинает следующий чанк, - поэтому внутри ячейки
+порядок сохраняется точно (см. StaticBaker._bake_cell). Между запеченными фигурами соседних ячеек
+на их границе порядок приблизительный: чанк ячейки рисуется целиком выше или ниже соседнего.
+Внутри чанка фигура попадает в партию своего пера, только если после этой партии не рисовалось ничего,
+что её перекрывает (грубая сетка ORDER_GRID, см. batch_strokes).
+"""
+import math
+import sys
+from time import perf_counter
+from PySide6.QtWidgets import QGraphicsScene, QGraphicsItem, QGraphicsPathItem, QGraphicsItemGroup
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QPainterPath
+
+ORDER_GRID = 16          # Сетка порядка наложения внутри чанка (ячеек на сторону)
+PATH_ELEMENT_BYTES = 24  # Оценка памяти элемента QPainterPath (x, y, тип)
+
+
+def item_strokes(root):
+    """
+    Контуры фигуры (у группы - всех её фигур) в координатах сцены в порядке отрисовки: [(перо, QPainterPath)].
+    None - фигуру нельзя запечь без изменений на экране: в ней есть не контур (надпись), заливка,
+    пунктир или растяжение (у пера чанка толщина не масштабируется).
+    """
+    strokes = []
+    pending = [root]
+    while pending:
+        item = pending.pop()
+        children = item.childItems()
+        if children:
+            # Дети в порядке наложения (снизу вверх): первым со стека снимается нижний
+            pending.extend(reversed(children))
+        if isinstance(item, QGraphicsItemGroup):
+            continue
+        if not isinstance(item, QGraphicsPathItem) or item.brush().style() != Qt.BrushStyle.NoBrush:
+            return None
+        pen = item.pen()
+        if pen.style() != Qt.PenStyle.SolidLine:
+            return None
+        t = item.sceneTransform()
+        if abs(t.m11() * t.m22() - t.m12() * t.m21() - 1) > 1e-6 or abs(t.m11() ** 2 + t.m12() ** 2 - 1) > 1e-6:
+            return None
+        strokes.append((pen, t.map(item.path())))
+    return strokes
+
+
+def pen_key(pen):
+    return (pen.color().rgba(), pen.widthF(), pen.capStyle(), pen.joinStyle(), pen.miterLimit(), pen.isCosmetic())
+
+
+def batch_strokes(strokes, rect):
+    """
+    Склеивает контуры (снизу вверх) в партии [(перо, QPainterPath)] с сохранением порядка наложения.
+    Контур уходит в последнюю партию своего пера, если ни одна более поздняя партия не рисует в тех же
+    ячейках сетки ORDER_GRID x ORDER_GRID над rect, иначе начинает новую партию.
+    """
+    step = max(rect.width(), rect.height()) / ORDER_GRID or 1.0
+    left, top = rect.left(), rect.top()
+    batches = []   # [[перо, QPainterPath], ...]
+    last = {}      # {ключ пера: индекс последней партии}
+    heights = {}   # {ячейка сетки: индекс последней партии, рисующей в ней}
+    for pen, path in strokes:
+        pad = pen.widthF() / 2 + 1
+        box = path.controlPointRect()
+        gx1, gx2 = int((box.left() - pad - left) // step), int((box.right() + pad - left) // step)
+        gy1, gy2 = int((box.top() - pad - top) // step), int((box.bottom() + pad - top) // step)
+        cells = [(gx, gy) for gx in range(gx1, gx2 + 1) for gy in range(gy1, gy2 + 1)]
+        covered = max((heights.get(cell, -1) for cell in cells), default=-1)
+        key = pen_key(pen)
+        index = last.get(key)
+        if index is None or index < covered:
+            index = last[key] = len(batches)
+            batches.append([pen, QPainterPath()])
+        batches[index][1].addPath(path)
+        for cell in cells:
+            heights[cell] = index
+    return [(pen, path) for pen, path in batches]
+
+
+class BakedChunk(QGraphicsItem):
+    """
+    Запеченные фигуры одной ячейки: один элемент сцены вместо сотен.
+    members - фигуры (снизу вверх), они скрыты, пока чанк в сцене.
+    """
+
+    def __init__(self, cell, members, batches, rect):
+        super().__init__()
+        self.cell = cell
+        self.members = members
+        self.batches = batches
+        self._rect = rect
+        self.setAcceptedMouseButtons(Qt.MouseButton.NoButton)
+        # Картинка кэшируется в пикселях экрана: при панорамировании контуры не перерисовываются
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+
+    def boundingRect(self):
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for pen, path in self.batches:
+            painter.setPen(pen)
+            painter.drawPath(path)
+
+    def members_in(self, rect):
+        """Фигуры чанка с габаритами, пересекающими rect (для поиска по области)"""
+        return [item for item in self.members if item.sceneBoundingRect().intersects(rect)]
+
+    def memory_bytes(self):
+        """Оценка памяти партий (без картинки кэша Qt)"""
+        return (sys.getsizeof(self.members) + sys.getsizeof(self.batches)
+                + sum(path.elementCount() for _, path in self.batches) * PATH_ELEMENT_BYTES)
+
+
+def with_baked(items, rect):
+    """
+    Элементы сцены из поиска по области + скрытые фигуры (и их потомки) из найденных чанков:
+    поиск по области (привязка к контуру, запросы по атрибутам) видит и запеченные фигуры
+    """
+    for item in items:
+        if not isinstance(item, BakedChunk):
+            yield item
+            continue
+        for member in item.members_in(rect):
+            pending = [member]
+            while pending:
+                node = pending.pop()
+                yield node
+                pending.extend(node.childItems())
+
+
+class StaticBaker:
+    """
+    Чанки сцены и очередь ячеек на запекание.
+    Сцена сообщает об измененных фигурах (touch), холст распекает чанки под действиями пользователя
+    (release_at, release_rect, release_items) и в простое зовет run() - запекание частями по времени.
+    """
+
+    CELL_SIZE = 1024    # Сторона ячейки (единицы сцены): фигура относится к ячейке своего центра
+                        # и запекается, только если не больше ячейки
+    MIN_ITEMS = 8       # Ячейку с меньшим числом запекаемых фигур не запекаем
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.enabled = False
+        self.chunks = {}     # {(cx, cy): [BakedChunk, ...]} (по чанку на слой)
+        self._owner = {}     # {фигура: чанк}
+        self._dirty = set()    # Ячейки, которые надо (пере)запечь
+        self._waiting = set()  # Ячейки, где что-то не запеклось из-за выделения: ждут следующего простоя
+        self._all_dirty = True  # Ячейки еще не собраны по всем фигурам сцены
+        self._steps = None
+        scene.layers.changed.connect(self._on_layers_changed)
+
+    # --- ВКЛЮЧЕНИЕ ---
+
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        if not enabled:
+            self.release_all()
+        self._forget_queue()
+
+    def reset(self):
+        """Сцена очищена: чанки удалены вместе с ней"""
+        self.chunks.clear()
+        self._owner.clear()
+        self._forget_queue()
+
+    def _forget_queue(self):
+        self._dirty.clear()
+        self._waiting.clear()
+        self._all_dirty = True
+        self._steps = None
+
+    @property
+    def baked_count(self):
+        return len(self._owner)
+
+    def chunk_count(self):
+        return sum(len(chunks) for chunks in self.chunks.values())
+
+    def is_baked(self, item):
+        return item in self._owner
+
+    def memory_bytes(self):
+        """Оценка памяти чанков (панель статистики)"""
+        return (sys.getsizeof(self._owner) + sys.getsizeof(self.chunks)
+                + sum(chunk.memory_bytes() for chunks in self.chunks.values() for chunk in chunks))
+
+    # --- ЯЧЕЙКИ ---
+
+    def _cell_range(self, rect):
+        c = self.CELL_SIZE
+        return (math.floor(rect.left() / c), math.floor(rect.top() / c),
+                math.floor(rect.right() / c), math.floor(rect.bottom() / c))
+
+    def _cell_rect(self, cell):
+        c = self.CELL_SIZE
+        return QRectF(cell[0] * c, cell[1] * c, c, c)
+
+    def _cell_of(self, rect):
+        c = self.CELL_SIZE
+        center = rect.center()
+        return math.floor(center.x() / c), math.floor(center.y() / c)
+
+    def _chunks_in(self, rect):
+        """Чанки, чьи габариты пересекают rect (чанк выходит за свою ячейку не больше чем на полячейки)"""
+        half = self.CELL_SIZE / 2
+        cx1, cy1, cx2, cy2 = self._cell_range(rect.adjusted(-half, -half, half, half))
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.chunks):
+            cells = [cell for cell in self.chunks if cx1 <= cell[0] <= cx2 and cy1 <= cell[1] <= cy2]
+        else:
+            cells = [(cx, cy) for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1) if (cx, cy) in self.chunks]
+        return [chunk for cell in cells for chunk in self.chunks[cell] if chunk.boundingRect().intersects(rect)]
+
+    def _mark(self, rect):
+        # Ячейки соседних чанков, которые фигура перекрывает, ставит в очередь release
+        self._dirty.add(self._cell_of(rect))
+
+    # --- РАСПЕКАНИЕ ---
+
+    def release(self, chunk):
+        """Показывает фигуры чанка и убирает его со сцены (ячейка встает в очередь на запекание)"""
+        chunks = self.chunks.get(chunk.cell)
+        if not chunks or chunk not in chunks:
+            return
+        chunks.remove(chunk)
+        if not chunks:
+            del self.chunks[chunk.cell]
+        for item in chunk.members:
+            if self._owner.get(item) is chunk:
+                del self._owner[item]
+                item.setVisible(True)
+        # Мимо EditorScene.removeItem: документ не изменился, уведомлять индексы не о чем
+        QGraphicsScene.removeItem(self.scene, chunk)
+        self._dirty.add(chunk.cell)
+
+    def release_rect(self, rect):
+        for chunk in self._chunks_in(rect):
+            self.release(chunk)
+
+    def release_at(self, point):
+        # Пустой QRectF ни с чем не пересекается: берем квадрат в единицу сцены вокруг точки
+        self.release_rect(QRectF(point.x() - 0.5, point.y() - 0.5, 1, 1))
+
+    def release_items(self, items):
+        """Распекает чанки, в которых лежат items (перед выделением: скрытую фигуру Qt не выделяет)"""
+        for item in items:
+            chunk = self._owner.get(item)
+            if chunk is not None:
+                self.release(chunk)
+
+    def release_all(self):
+        for chunks in list(self.chunks.values()):
+            for chunk in list(chunks):
+                self.release(chunk)
+
+    def touch(self, items):
+        """
+        Фигуры добавлены, удалены или изменены (EditorScene.items_changed): чанки в их области распекаются,
+        а ячейки встают в очередь - фигуры там могли стать запекаемыми
+        """
+        if not self.enabled:
+            return
+        for item in items:
+            chunk = self._owner.get(item)
+            if chunk is not None:
+                self.release(chunk)
+            try:
+                rect = item.sceneBoundingRect()
+            except RuntimeError:
+                continue  # Фигура уже удалена
+            if self.chunks:
+                self.release_rect(rect)
+            self._mark(rect)
+
+    def _on_layers_changed(self):
+        # Прозрачность слоя меняется в обход items_changed: полупрозрачные фигуры не запекаются
+        for chunks in list(self.chunks.values()):
+            for chunk in list(chunks):
+                if chunk.members[0].opacity() < 1:
+                    self.release(chunk)
+
+    # --- ЗАПЕКАНИЕ ---
+
+    def wake(self):
+        """Начало простоя: ячейки, ждавшие снятия выделения, снова в очереди"""
+        self._dirty.update(self._waiting)
+        self._waiting.clear()
+
+    def run(self, budget=None, focus=None, pinned=()):
+        """
+        Запекает ячейки из очереди не дольше budget секунд (None - все) -> True, если очередь пуста.
+        focus - точка сцены, ближайшие к которой ячейки запекаются первыми (видимая область),
+        pinned - фигуры, которые нельзя запекать (например, правка вершин).
+        """
+        if not self.enabled:
+            return True
+        deadline = None if budget is None else perf_counter() + budget
+        while True:
+            if self._steps is None:
+                if not (self._all_dirty or self._dirty):
+                    return True
+                self._steps = self._bake_steps(focus, set(pinned))
+            for _ in self._steps:
+                if deadline is not None and perf_counter() >= deadline:
+                    return False
+            # Проход закончен; ячейки, распеченные за это время, - следующим проходом
+            self._steps = None
+
+    def _bake_steps(self, focus, pinned):
+        if self._all_dirty:
+            # Первый проход: ячейки всех фигур сцены (дальше очередь пополняют touch и release)
+            for item in self.scene.items():
+                try:
+                    if self._is_shape(item) and item.isVisible():
+                        self._mark(item.sceneBoundingRect())
+                except RuntimeError:
+                    pass  # Фигура удалена, пока шел проход
+                yield
+            self._all_dirty = False
+
+        cells = list(self._dirty)
+        if focus is not None:
+            c = self.CELL_SIZE
+            cells.sort(key=lambda cell: ((cell[0] + 0.5) * c - focus.x()) ** 2 + ((cell[1] + 0.5) * c - focus.y()) ** 2)
+        for cell in cells:
+            if cell in self._dirty and not self._bake_cell(cell, pinned):
+                self._waiting.add(cell)
+            yield
+
+    @staticmethod
+    def _is_shape(item):
+        return hasattr(item, "to_dict") and not getattr(item, "is_preview", False) and item.topLevelItem() is item
+
+    def _bake_cell(self, cell, pinned):
+        """
+        Собирает чанки ячейки заново -> False, если что-то в ней не запеклось из-за выделения или pinned.
+
+        Элементы вокруг ячейки обходятся снизу вверх. Запекаемые фигуры ячейки копятся в текущую серию
+        своего слоя; живая фигура, перекрывающая фигуру серии, закрывает серию (она должна остаться над ней),
+        следующие фигуры слоя начинают новую. Каждая серия из MIN_ITEMS фигур и больше становится чанком.
+        Запекаемые фигуры соседних ячеек не мешают: их запекут чанки соседей.
+        """
+        for chunk in list(self.chunks.get(cell, ())):
+            self.release(chunk)
+        self._dirty.discard(cell)
+
+        rect = self._cell_rect(cell)
+        half = self.CELL_SIZE / 2
+        runs = []      # [[фигуры, их габариты, индекс верхней фигуры в order], ...]
+        current = {}   # {слой: открытая серия}
+        order = []     # Живые фигуры: [(элемент, габариты)] снизу вверх
+        settled = True
+        seen = set()
+        for item in self.scene.items(rect.adjusted(-half, -half, half, half),
+                                     Qt.ItemSelectionMode.IntersectsItemBoundingRect, Qt.SortOrder.AscendingOrder):
+            root = item.topLevelItem()
+            if root in seen or isinstance(root, BakedChunk):
+                continue
+            seen.add(root)
+            box = root.sceneBoundingRect()
+            state = self._bakeable(root, box, pinned)
+            if state and rect.contains(box.center()):
+                run = current.get(root.layer)
+                if run is None:
+                    run = current[root.layer] = [[], [], 0]
+                    runs.append(run)
+                run[0].append(root)
+                run[1].append(box)
+                run[2] = len(order)
+                continue
+            if state:
+                continue  # Фигура соседней ячейки
+            order.append((root, box))
+            for layer, run in list(current.items()):
+                if any(box.intersects(other) for other in run[1]):
+                    del current[layer]
+            if state is None:
+                settled = False
+
+        for members, boxes, top in runs:
+            if len(members) >= self.MIN_ITEMS:
+                self._add_chunk(cell, members, order[top:])
+        return settled
+
+    def _bakeable(self, item, box, pinned):
+        """True - фигуру можно запечь, False - нельзя, None - нельзя только пока (выделена или pinned)"""
+        if not self._is_shape(item):
+            return False if hasattr(item, "to_dict") else None  # Превью и прочие временные элементы
+        if item.isSelected() or item in pinned:
+            return None
+        return (item.isVisible() and item.opacity() >= 1
+                and box.width() <= self.CELL_SIZE and box.height() <= self.CELL_SIZE
+                and item_strokes(item) is not None)
+
+    def _add_chunk(self, cell, members, above):
+        """above - живые фигуры выше верхней фигуры чанка (снизу вверх)"""
+        strokes = []
+        bounds = QRectF()
+        for item in members:
+            strokes.extend(item_strokes(item))
+            bounds = bounds.united(item.sceneBoundingRect())
+        chunk = BakedChunk(cell, members, batch_strokes(strokes, bounds), bounds)
+        z = members[-1].zValue()
+        chunk.setZValue(z)
+        # Мимо EditorScene.addItem (как и в release): документ не изменился
+        QGraphicsScene.addItem(self.scene, chunk)
+        # Новый элемент встает последним среди равных z - опускаем его под первую живую фигуру над серией
+        for item, box in above:
+            if item.zValue() == z and box.intersects(bounds):
+                chunk.stackBefore(item)
+                break
+        for item in members:
+            item.setVisible(False)
+            self._owner[item] = chunk
+        self.chunks.setdefault(cell, []).append(chunk)
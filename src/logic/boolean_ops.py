@@ -0,0 +1,151 @@
+# src/logic/boolean_ops.py
+from PySide6.QtCore import Qt, QThread, QRectF, Signal
+from PySide6.QtGui import QPainterPath
+from src.logic.shapes import Line
+
+# Операция -> название (для меню и истории)
+OPERATIONS = {
+    "union": "Union",
+    "intersection": "Intersection",
+    "difference": "Difference",
+    "xor": "Exclude",
+}
+
+
+class BooleanCanceled(Exception):
+    pass
+
+
+def operand_path(item):
+    """
+    Контур фигуры в координатах сцены (копия, её можно отдать в другой поток).
+    Линии площади не имеют и в операциях не участвуют (None). Группа - объединение детей.
+    """
+    if isinstance(item, Line):
+        return None
+    if hasattr(item, "path"):
+        path = item.sceneTransform().map(item.path())
+        return path if not path.isEmpty() else None
+
+    children = [p for p in (operand_path(child) for child in item.childItems()) if p is not None]
+    if not children:
+        return None
+    path = QPainterPath()
+    for child in children:
+        path.addPath(child)
+    return path.simplified()
+
+
+def operand_state(item):
+    """
+    Геометрия фигуры и всех её потомков: [(sceneTransform, контур)]. Снимок дешевый (контуры Qt
+    copy-on-write) и меняется от любого сдвига, поворота, масштаба и правки вершин - в том числе
+    от перетаскивания вершины, которое еще не попало в историю.
+    """
+    state = []
+    pending = [item]
+    while pending:
+        node = pending.pop()
+        state.append((node.sceneTransform(), node.path() if hasattr(node, "path") else None))
+        pending.extend(node.childItems())
+    return state
+
+
+def selected_operands(scene):
+    """
+    Выделенные фигуры с площадью снизу вверх по порядку наложения и их контуры:
+    -> ([фигура, ...], [QPainterPath, ...])
+    """
+    selected = set(scene.selectedItems())
+    if not selected:
+        return [], []
+    bounds = QRectF()
+    for item in selected:
+        bounds = bounds.united(item.sceneBoundingRect())
+    sources, paths = [], []
+    for item in scene.items(bounds, Qt.ItemSelectionMode.IntersectsItemBoundingRect, Qt.SortOrder.AscendingOrder):
+        if item not in selected:
+            continue
+        path = operand_path(item)
+        if path is not None:
+            sources.append(item)
+            paths.append(path)
+    return sources, paths
+
+
+def _xor(a, b):
+    return a.subtracted(b).united(b.subtracted(a))
+
+
+def _reduce_balanced(paths, combine, step):
+    """
+    Сворачивает контуры попарно, уровень за уровнем: ((a+b)+(c+d))+... вместо (((a+b)+c)+d)+...
+    Промежуточные контуры растут постепенно, и большие объединения считаются намного быстрее.
+    """
+    level = list(paths)
+    while len(level) > 1:
+        merged = []
+        for i in range(0, len(level) - 1, 2):
+            merged.append(combine(level[i], level[i + 1]))
+            step()
+        if len(level) % 2:
+            merged.append(level[-1])
+        level = merged
+    return level[0]
+
+
+def combine_paths(paths, operation, step=lambda: None):
+    """
+    Булева операция над списком контуров (снизу вверх по порядку наложения).
+    difference - из нижнего контура вычитаются все остальные.
+    step() вызывается после каждой попарной операции; может бросить BooleanCanceled.
+    """
+    if operation == "union":
+        return _reduce_balanced(paths, QPainterPath.united, step)
+    if operation == "intersection":
+        return _reduce_balanced(paths, QPainterPath.intersected, step)
+    if operation == "xor":
+        return _reduce_balanced(paths, _xor, step)
+    if operation == "difference":
+        if len(paths) < 2:
+            return paths[0]
+        cutter = _reduce_balanced(paths[1:], QPainterPath.united, step)
+        result = paths[0].subtracted(cutter)
+        step()
+        return result
+    raise ValueError(f"Неизвестная операция: {operation}")
+
+
+class BooleanWorker(QThread):
+    """
+    Считает булеву операцию в отдельном потоке над копиями контуров.
+    Сигналы: progress(выполнено, всего), done(QPainterPath) - только если операцию не отменили.
+    """
+    progress = Signal(int, int)
+    done = Signal(object)
+
+    def __init__(self, paths, operation, parent=None):
+        super().__init__(parent)
+        self.paths = [QPainterPath(p) for p in paths]
+        self.operation = operation
+        # Любая операция над n контурами - это n - 1 попарных операций
+        self.total = max(len(paths) - 1, 0)
+        self._completed = 0
+        self._canceled = False
+
+    def cancel(self):
+        self._canceled = True
+
+    def _step(self):
+        if self._canceled:
+            raise BooleanCanceled()
+        self._completed += 1
+        self.progress.emit(self._completed, self.total)
+
+    def run(self):
+        try:
+            result = combine_paths(self.paths, self.operation, self._step)
+        except BooleanCanceled:
+            return
+        if not self._canceled:
+            self.done.emit(result)
@@ -0,0 +1,197 @@
+# src/logic/clipboard.py
+"""
+Копирование, вставка и дублирование фигур.
+
+Внутри процесса фигуры клонируются из слепков (ShapeSnapshot) без круга to_dict -> from_dict:
+контур QPainterPath и перо QPen у Qt copy-on-write, поэтому слепок и все вставленные копии делят
+одни и те же данные, пока их не изменят. Для других окон/процессов в системный буфер публикуется
+сжатый JSON (MIME_TYPE) в обычном QMimeData, а слепки остаются в модуле (_copied) и вставляются,
+пока в буфере лежит именно этот JSON. Перед выходом приложения свое содержимое буфера очищается:
+QMimeData, созданный из Python, Qt иначе удаляет уже после остановки интерпретатора, и выход падает.
+Копия - новая фигура: id оригинала она не наследует.
+"""
+import json
+import zlib
+from PySide6.QtCore import QMimeData, QPointF
+from PySide6.QtGui import QGuiApplication
+from PySide6.QtWidgets import QGraphicsPathItem, QGraphicsItem
+from src.logic.factory import ShapeFactory
+from src.logic.shapes import Shape, Group, is_root_item
+from src.logic.save_cache import SHAPES_LEVEL
+
+MIME_TYPE = "application/x-vector-editor-shapes"
+PAYLOAD_VERSION = 1
+
+# Последнее копирование этим процессом: [сжатый JSON из буфера, слепки, сколько раз уже вставили, QMimeData]
+_copied = None
+
+
+class ShapeSnapshot:
+    """
+    Неизменяемый слепок фигуры на момент копирования.
+    attrs - атрибуты Python-обертки (цвет, точки и т.п.). Списки точек общие со слепком: фигуры
+    их не меняют на месте, а заменяют целиком (см. transforms.set_item_geometry).
+    """
+    __slots__ = ("cls", "attrs", "path", "pen", "flags", "pos", "rotation", "z", "children")
+
+    def __init__(self, item):
+        self.cls = type(item)
+        self.attrs = dict(item.__dict__)
+        self.flags = item.flags()
+        self.pos = (item.x(), item.y())
+        self.rotation = item.rotation()
+        self.z = item.zValue()
+        if isinstance(item, Group):
+            self.path = self.pen = None
+            self.children = [ShapeSnapshot(child) for child in item.childItems() if isinstance(child, Shape)]
+        elif not isinstance(item, QGraphicsPathItem):
+            # Надпись: текст, перо и готовая разметка - в атрибутах (разметку копии делят)
+            self.path = self.pen = None
+            self.children = None
+        else:
+            self.path = item.path()
+            self.pen = item.pen()
+            self.children = None
+
+    def create(self, dx=0.0, dy=0.0):
+        """Новая фигура по слепку, сдвинутая на (dx, dy)"""
+        if self.children is not None:
+            item = Group()
+            item.setPos(self.pos[0] + dx, self.pos[1] + dy)
+            for snapshot in self.children:
+                child = snapshot.create()
+                item.addToGroup(child)
+                child.setPos(*snapshot.pos)
+            item.__dict__.update(self.attrs)
+            item.shape_id = None
+            item._save_chunk = None
+        else:
+            # Конструктор класса не вызываем: он заново строит контур, а мы берем готовый (общий)
+            item = self.cls.__new__(self.cls)
+            (QGraphicsPathItem if self.path is not None else QGraphicsItem).__init__(item)
+            Shape.__init__(item)
+            item.__dict__.update(self.attrs)
+            item.shape_id = None
+            item._save_chunk = None
+            if self.path is not None:
+                item.setPath(self.path)
+                item.setPen(self.pen)
+            item.setPos(self.pos[0] + dx, self.pos[1] + dy)
+        item.setFlags(self.flags)
+        item.setZValue(self.z)
+        # Поворот группы - после добавления детей (как в ShapeFactory._create_group)
+        item.setRotation(self.rotation)
+        return item
+
+
+def selection_roots(scene, items):
+    """Корневые фигуры из items в порядке наложения (снизу вверх)"""
+    selected = {item for item in items if is_root_item(item) and isinstance(item, Shape)}
+    if not selected:
+        return []
+    ordered = [item for item in scene.items() if item in selected]
+    ordered.reverse()
+    return ordered
+
+
+def take_snapshots(scene, items):
+    """Слепки корневых фигур из items в порядке наложения (снизу вверх)"""
+    return [ShapeSnapshot(item) for item in selection_roots(scene, items)]
+
+
+def encode_payload(roots):
+    """
+    Сжатый JSON фигур roots прямо из исходных фигур. Запись неизмененной фигуры - готовые байты
+    кэша сохранения (save_cache), остальные - to_dict подряд идущих фигур одним компактным json.dumps
+    (кэш сохранения не заполняем: он с отступами и строится заметно дольше).
+    id в записях остаются: при вставке их снимает decode_payload.
+    """
+    parts = []
+    batch = []
+    for item in roots:
+        cached = item._save_chunk
+        if cached is None or cached[0] != SHAPES_LEVEL:
+            batch.append(item.to_dict())
+            continue
+        if batch:
+            parts.append(_dump_records(batch))
+            batch = []
+        parts.append(cached[1])
+    if batch:
+        parts.append(_dump_records(batch))
+    return zlib.compress(b'{"version":%d,"shapes":[' % PAYLOAD_VERSION + b",".join(parts) + b"]}")
+
+
+def _dump_records(records):
+    """Записи через запятую (без скобок списка)"""
+    return json.dumps(records, separators=(",", ":"), ensure_ascii=False)[1:-1].encode("utf-8")
+
+
+def _drop_ids(shape_dict):
+    """Словарь фигуры без id (у вставленной копии и её детей будут свои)"""
+    shape_dict.pop("id", None)
+    for child in shape_dict.get("children", ()):
+        _drop_ids(child)
+    return shape_dict
+
+
+def decode_payload(data):
+    """Фигуры из сжатого JSON другого окна (битые записи пропускаются)"""
+    try:
+        payload = json.loads(zlib.decompress(bytes(data)).decode("utf-8"))
+    except (zlib.error, ValueError):
+        return []
+    items = []
+    for shape_dict in payload.get("shapes", []):
+        try:
+            item = ShapeFactory.from_dict(_drop_ids(shape_dict))
+        except Exception as e:
+            print(f"Error pasting shape: {e}")
+            continue
+        if item:
+            items.append(item)
+    return items
+
+
+def copy_to_clipboard(scene, items):
+    """Слепки корневых фигур из items - в _copied, в системный буфер - готовый сжатый JSON -> число фигур"""
+    global _copied
+    roots = selection_roots(scene, items)
+    if not roots:
+        return 0
+    if _copied is None:
+        QGuiApplication.instance().aboutToQuit.connect(_release_clipboard)
+    snapshots = [ShapeSnapshot(item) for item in roots]
+    payload = encode_payload(roots)
+    mime = QMimeData()
+    mime.setData(MIME_TYPE, payload)
+    _copied = [payload, snapshots, 0, mime]
+    QGuiApplication.clipboard().setMimeData(mime)
+    return len(roots)
+
+
+def _release_clipboard():
+    # Только свой QMimeData: содержимое, которое положил кто-то другой, создано не из Python
+    clipboard = QGuiApplication.clipboard()
+    if clipboard.ownsClipboard() or clipboard.mimeData() is _copied[3]:
+        clipboard.clear()
+
+
+def paste_from_clipboard(offset):
+    """
+    Новые фигуры из буфера обмена, сдвинутые на offset * (номер вставки).
+    -> [фигура, ...] (пусто, если в буфере нет фигур)
+    """
+    mime = QGuiApplication.clipboard().mimeData()
+    if mime is None or not mime.hasFormat(MIME_TYPE):
+        return []
+    data = mime.data(MIME_TYPE).data()
+    if _copied is not None and data == _copied[0]:
+        # Скопировано этим процессом: клоны из слепков, каждая вставка сдвигается дальше
+        _copied[2] += 1
+        shift = offset * _copied[2]
+        return [snapshot.create(shift, shift) for snapshot in _copied[1]]
+    items = decode_payload(data)
+    for item in items:
+        item.setPos(item.pos() + QPointF(offset, offset))
+    return items
@@ -1,6 +1,31 @@
 #src/logic/commands.py
 
-from PySide6.QtGui import QUndoCommand, QColor
+from PySide6.QtGui import QUndoCommand, QUndoStack, QColor
+from src.logic.profiling import TRACER, traced
+
+
+class UndoStack(QUndoStack):
+    """QUndoStack со счетчиком команд для трассировки"""
+
+    def push(self, cmd):
+        if TRACER.enabled:
+            TRACER.count("commands_pushed")
+        super().push(cmd)
+
+
+def command_items(cmd):
+    """Фигуры, которых касается команда (включая дочерние команды макроса)"""
+    items = []
+    pending = [cmd]
+    while pending:
+        cmd = pending.pop()
+        item = getattr(cmd, "item", None)
+        if item is not None:
+            items.append(item)
+        items.extend(getattr(cmd, "items", ()))
+        pending.extend(cmd.child(i) for i in range(cmd.childCount()))
+    return items
+
 
 class AddShapeCommand(QUndoCommand):
     def __init__(self, scene, item):
@@ -19,6 +44,7 @@ class AddShapeCommand(QUndoCommand):
             name = item.type_name
         self.setText(f"Add {name}")
 
+    @traced("AddShapeCommand.redo")
     def redo(self):
         # Выполняется при первом добавлении И при Ctrl+Y (Redo)
 
@@ -26,12 +52,33 @@ class AddShapeCommand(QUndoCommand):
         if self.item.scene() != self.scene:
             self.scene.addItem(self.item)
 
+    @traced("AddShapeCommand.undo")
     def undo(self):
         # Выполняется при Ctrl+Z (Undo)
         self.scene.removeItem(self.item)
         # Фигура исчезла с экрана, но self.item хранит её в памяти!
 
 
+class AddShapesCommand(QUndoCommand):
+    def __init__(self, scene, items, text):
+        """Пакетное добавление фигур (вставка, дублирование) - одно действие в истории"""
+        super().__init__()
+        self.scene = scene
+        self.items = list(items)
+        self.setText(f"{text} ({len(self.items)} shapes)")
+
+    @traced("AddShapesCommand.redo")
+    def redo(self):
+        for item in self.items:
+            if item.scene() != self.scene:
+                self.scene.addItem(item)
+
+    @traced("AddShapesCommand.undo")
+    def undo(self):
+        for item in self.items:
+            self.scene.removeItem(item)
+
+
 class DeleteShapeCommand(QUndoCommand):
     def __init__(self, scene, item):
         super().__init__()
@@ -41,13 +88,160 @@ class DeleteShapeCommand(QUndoCommand):
         name = getattr(item, 'type_name', 'Shape')
         self.setText(f"Delete {name}")
 
+    @traced("DeleteShapeCommand.redo")
     def redo(self):
         self.scene.removeItem(self.item)
 
+    @traced("DeleteShapeCommand.undo")
     def undo(self):
         self.scene.addItem(self.item)
 
 
+class BooleanOperationCommand(QUndoCommand):
+    def __init__(self, scene, sources, result, operation_name):
+        """
+        Заменяет исходные фигуры результатом булевой операции (одно действие в истории)
+        :param sources: Исходные фигуры (уходят со сцены)
+        :param result: Новая фигура (PathShape)
+        """
+        super().__init__()
+        self.scene = scene
+        self.sources = list(sources)
+        self.result = result
+        # Все фигуры команды (для ленивого режима и индекса привязки, см. command_items)
+        self.items = self.sources + [result]
+        self.setText(f"{operation_name} ({len(self.sources)} shapes)")
+
+    @traced("BooleanOperationCommand.redo")
+    def redo(self):
+        for item in self.sources:
+            self.scene.removeItem(item)
+        if self.result.scene() != self.scene:
+            self.scene.addItem(self.result)
+
+    @traced("BooleanOperationCommand.undo")
+    def undo(self):
+        self.scene.removeItem(self.result)
+        for item in self.sources:
+            self.scene.addItem(item)
+
+
+class TransformCommand(QUndoCommand):
+    def __init__(self, items, before, after, text):
+        """
+        Пакетное преобразование фигур одним действием истории (выравнивание, масштаб, поворот)
+        :param before: Состояние фигур до (TransformState, см. logic/transforms.py)
+        :param after: Состояние после - применяется в redo(), в том числе при первом push()
+        """
+        super().__init__()
+        self.items = list(items)
+        self.before = before
+        self.after = after
+        self.setText(text)
+
+    @traced("TransformCommand.redo")
+    def redo(self):
+        self.after.apply(self.items)
+
+    @traced("TransformCommand.undo")
+    def undo(self):
+        self.before.apply(self.items)
+
+
+class EditVerticesCommand(QUndoCommand):
+    def __init__(self, item, before, after, text, changed=None):
+        """
+        Правка вершин ломаной или отрезка одним действием истории (инструмент Nodes)
+        :param before: Вершины до (array('d') x0, y0, x1, y1, ..., см. logic/points.py)
+        :param after: Вершины после - применяются в redo(), в том числе при первом push()
+        :param changed: Индексы сдвинутых вершин, если их число не менялось (контур правится только в них)
+        """
+        super().__init__()
+        self.item = item
+        self.before = before
+        self.after = after
+        self.changed = changed
+        self.setText(text)
+
+    @traced("EditVerticesCommand.redo")
+    def redo(self):
+        self.item.set_coords(self.after, self.changed)
+
+    @traced("EditVerticesCommand.undo")
+    def undo(self):
+        self.item.set_coords(self.before, self.changed)
+
+
+class EditTextCommand(QUndoCommand):
+    """Правка текста и шрифта надписи: before/after - (текст, шрифт, размер), см. TextShape.text_style"""
+
+    def __init__(self, item, before, after):
+        super().__init__()
+        self.item = item
+        self.before = before
+        self.after = after
+        self.setText("Edit Text")
+
+    @traced("EditTextCommand.redo")
+    def redo(self):
+        self.item.set_text(*self.after)
+
+    @traced("EditTextCommand.undo")
+    def undo(self):
+        self.item.set_text(*self.before)
+
+
+class MoveToLayerCommand(QUndoCommand):
+    def __init__(self, layers, items, layer):
+        """
+        Перенос фигур в слой: меняются их атрибут layer и полоса z (см. LayerModel)
+        :param layers: LayerModel сцены
+        """
+        super().__init__()
+        self.layers = layers
+        self.items = [item for item, _, _, _ in layers.placements(items)]
+        self.layer = layer
+        self.before = []  # [(фигура, слой, z, сосед)] до переноса - заполняет redo()
+        self.setText(f"Move to {layer.name} ({len(self.items)} shapes)")
+
+    @traced("MoveToLayerCommand.redo")
+    def redo(self):
+        self.before = self.layers.move_items(self.items, self.layer)
+
+    @traced("MoveToLayerCommand.undo")
+    def undo(self):
+        self.layers.place(self.before)
+
+
+class RemoveLayerCommand(QUndoCommand):
+    def __init__(self, layers, layer):
+        """
+        Удаление слоя (в модели должно быть не меньше двух слоев): фигуры переходят в нижний соседний слой,
+        отмена возвращает слой на место, а фигурам - их слой и z
+        """
+        super().__init__()
+        self.layers = layers
+        self.layer = layer
+        self.items = []   # Фигуры слоя - заполняет redo()
+        self.before = []
+        self.index = 0
+        self.visible = layer.visible
+        self.active = False
+        self.setText(f"Delete Layer {layer.name}")
+
+    @traced("RemoveLayerCommand.redo")
+    def redo(self):
+        self.index = self.layers.layers.index(self.layer)
+        self.visible = self.layer.visible
+        self.active = self.layers.active is self.layer
+        self.before = self.layers.remove_layer(self.layer)
+        self.items = [item for item, _, _, _ in self.before]
+
+    @traced("RemoveLayerCommand.undo")
+    def undo(self):
+        self.layers.restore_layer(self.layer, self.index, self.before, self.visible, self.active)
+
+
 class MoveCommand(QUndoCommand):
     def __init__(self, item, old_pos, new_pos):
         super().__init__()
@@ -56,9 +250,11 @@ class MoveCommand(QUndoCommand):
         self.new_pos = new_pos
         self.setText(f"Move {getattr(item, 'type_name', 'Item')}")
 
+    @traced("MoveCommand.undo")
     def undo(self):
         self.item.setPos(self.old_pos)
 
+    @traced("MoveCommand.redo")
     def redo(self):
         self.item.setPos(self.new_pos)
 
@@ -76,10 +272,12 @@ class ChangeColorCommand(QUndoCommand):
 
         self.setText(f"Change Color to {new_color_hex}")
 
+    @traced("ChangeColorCommand.redo")
     def redo(self):
         if hasattr(self.item, "set_active_color"):
             self.item.set_active_color(self.new_color)
 
+    @traced("ChangeColorCommand.undo")
     def undo(self):
         if hasattr(self.item, "set_active_color"):
             self.item.set_active_color(self.old_color)
@@ -99,6 +297,7 @@ class ChangeWidthCommand(QUndoCommand):
 
         self.setText(f"Change Width to {new_width}")
 
+    @traced("ChangeWidthCommand.redo")
     def redo(self):
         # Используем метод, который есть в нашем интерфейсе Shape (shapes.py)
         if hasattr(self.item, "set_stroke_width"):
@@ -109,6 +308,7 @@ class ChangeWidthCommand(QUndoCommand):
             p.setWidth(self.new_width)
             self.item.setPen(p)
 
+    @traced("ChangeWidthCommand.undo")
     def undo(self):
         if hasattr(self.item, "set_stroke_width"):
             self.item.set_stroke_width(self.old_width)
@@ -0,0 +1,330 @@
+# src/logic/diff.py
+"""
+Структурное сравнение двух версий проекта по постоянным id фигур.
+
+Запуск из корня проекта:
+    python -m src.logic.diff old.json new.json             # сводка и первые изменения каждого вида
+    python -m src.logic.diff old.json new.json --limit 0   # только сводка
+    python -m src.logic.diff old.json new.json --json      # полный список изменений в JSON
+
+Каждая фигура (и каждый ребенок группы) сводится к трем хешам своей записи:
+  place - где лежит (родитель, pos, rotation), style - как выглядит (color, width, layer),
+  shape - всё остальное (тип, геометрия, у группы - id детей).
+Фигуры сопоставляются по id, у записей без id (файлы старых версий) ключ - путь в дереве ("#3/1").
+Хеши считает встроенный hash() кортежей - без сериализации записей; габариты для подсветки
+на холсте считаются только для изменившихся фигур.
+
+Файлы, записанные JsonSaveStrategy (indent=4), целиком не разбираются: корневые записи
+режутся по разметке прямо в байтах и сравниваются хешами байтов, а json.loads и разбор выше
+достаются только записям, которых нет в другой версии (json.load файла на 500k фигур в разы дольше).
+Код выхода CLI: 0 - версии совпадают, 1 - есть изменения, 2 - ошибка чтения.
+"""
+import argparse
+import json
+import sys
+from itertools import compress
+from operator import not_
+from time import perf_counter
+from src.logic.io_manager import FileManager
+from src.logic.lazy_document import record_bounds, _rotated_bounds
+
+# Вид изменения -> цвет подсветки на холсте
+KINDS = {
+    "added": "#00c853",
+    "removed": "#ff1744",
+    "moved": "#2979ff",
+    "restyled": "#ff9d00",
+    "reshaped": "#d500f9",
+}
+STYLE_KEYS = ("color", "width")
+
+# Разметка json.dump(indent=4): корневые записи фигур - объекты с отступом 8 внутри "shapes"
+# (вложенные объекты отступают глубже, поэтому такие последовательности байт бывают только между записями)
+SHAPES_MARK = b'\n    "shapes": [\n        {'
+RECORD_SEPARATOR = b"\n        },\n        {"
+SHAPES_END = b"\n        }\n    ]"
+LAYERS_AFTER_SHAPES = SHAPES_END + b',\n    "layers": ['
+RECORD_CLOSE = b"\n        }"
+
+
+def _freeze(value):
+    """Хешируемая копия значения из JSON (списки точек -> кортежи)"""
+    if type(value) is list:
+        return tuple([_freeze(v) for v in value])
+    return value
+
+
+def index_shapes(shapes, parent=None, path="#", entries=None):
+    """
+    Все фигуры дерева (вместе с детьми групп): {ключ: (словарь, ключ родителя, place, style, shape)}.
+    Ключ - id фигуры, а если его нет (или он повторяется) - путь в дереве.
+    """
+    if entries is None:
+        entries = {}
+    keys = []
+    for i, data in enumerate(shapes):
+        key = data.get("id")
+        if key is None or key in entries:
+            key = f"{path}{i}"
+        props = data.get("props") or {}
+        geometry = tuple([(name, _freeze(value)) for name, value in props.items() if name not in STYLE_KEYS])
+        children = data.get("children")
+        if children:
+            geometry = (geometry, tuple(index_shapes(children, key, key + "/", entries)[1]))
+        entries[key] = (data, parent,
+                        hash((parent, _freeze(data.get("pos")), data.get("rotation", 0))),
+                        hash((props.get("color"), props.get("width"), data.get("layer"))),
+                        hash((data.get("type"), geometry)))
+        keys.append(key)
+    return entries, keys
+
+
+def scene_bounds(entries, key):
+    """Габариты фигуры (x1, y1, x2, y2) в координатах сцены: record_bounds + позиции и повороты предков"""
+    data, parent = entries[key][:2]
+    box = record_bounds(data)
+    while box is not None and parent is not None:
+        data, parent = entries[parent][:2]
+        px, py = data.get("pos", (0, 0))
+        box = _rotated_bounds((box[0] + px, box[1] + py, box[2] + px, box[3] + py),
+                              px, py, data.get("rotation", 0))
+    return box
+
+
+def split_records(filename):
+    """
+    Корневые записи файла проекта без разбора JSON: -> [байты записи без внешних скобок, ...]
+    или None, если файл записан не JsonSaveStrategy (другая разметка - нужен обычный json.load).
+    """
+    try:
+        with open(filename, "rb") as f:
+            text = f.read()
+    except OSError as e:
+        raise IOError(f"Ошибка чтения файла: {e}")
+    # Слои пишутся после фигур, и их список закрывается так же, как список фигур: ищем конец фигур по ним
+    # (rfind быстрый - слои в конце файла)
+    end_mark = LAYERS_AFTER_SHAPES if text.rfind(LAYERS_AFTER_SHAPES) >= 0 else SHAPES_END
+    parts = text.split(RECORD_SEPARATOR)
+    del text
+    start = parts[0].find(SHAPES_MARK)
+    if start < 0:
+        return None
+    parts[0] = parts[0][start + len(SHAPES_MARK):]
+    # Конец списка фигур - в одной из последних частей (за ним идут записи слоев)
+    for i in range(len(parts) - 1, -1, -1):
+        end = parts[i].find(end_mark)
+        if end >= 0:
+            parts[i] = parts[i][:end]
+            del parts[i + 1:]
+            return parts
+    return None
+
+
+def chunk_digest(chunk):
+    """Хеш байтов корневой записи из кэша сохранения - тот же, что у её части в split_records"""
+    return hash(memoryview(chunk)[1:-len(RECORD_CLOSE)])
+
+
+def _changed_records(parts, digests, other_digests, complete=False):
+    """
+    Словари записей, байтов которых нет в другой версии (одинаковые байты - та же фигура с тем же id).
+    complete - записи целиком (байты кэша сохранения), иначе - части split_records без внешних скобок.
+    Записи без id получают ключ-путь по своему месту в файле, как в index_shapes.
+    """
+    changed = []
+    unmatched = map(not_, map(other_digests.__contains__, digests))
+    for index, part in compress(enumerate(parts), unmatched):
+        data = json.loads(part if complete else b"{" + part + RECORD_CLOSE)
+        data.setdefault("id", f"#{index}")
+        changed.append(data)
+    return changed
+
+
+class ShapeDiff:
+    """
+    Результат сравнения: changes - {вид изменения: [ключ, ...]}.
+    Одна фигура может попасть сразу в несколько видов (например, сдвинута и перекрашена).
+    old/new - разобранные записи версий (при сравнении файлов - только отличающиеся),
+    shape_counts - число корневых фигур в каждой версии.
+    """
+
+    def __init__(self, old_entries, new_entries, shape_counts):
+        self.old = old_entries
+        self.new = new_entries
+        self.shape_counts = shape_counts
+        self.changes = {kind: [] for kind in KINDS}
+
+    def __bool__(self):
+        return any(self.changes.values())
+
+    def counts(self):
+        return {kind: len(keys) for kind, keys in self.changes.items()}
+
+    def summary(self):
+        return ", ".join(f"{kind}: {count}" for kind, count in self.counts().items())
+
+    def bounds(self, kind):
+        """Габариты изменившихся фигур вида kind в координатах сцены (удаленные - по старой версии)"""
+        entries = self.old if kind == "removed" else self.new
+        boxes = (scene_bounds(entries, key) for key in self.changes[kind])
+        return [box for box in boxes if box is not None]
+
+    def to_dict(self):
+        return {"counts": self.counts(), "changes": self.changes}
+
+
+def diff_shapes(old_shapes, new_shapes, shape_counts=None):
+    """Сравнение двух списков словарей фигур (как в поле "shapes" файла проекта) -> ShapeDiff"""
+    old, _ = index_shapes(old_shapes)
+    new, _ = index_shapes(new_shapes)
+    result = ShapeDiff(old, new, shape_counts or (len(old_shapes), len(new_shapes)))
+    added, moved = result.changes["added"], result.changes["moved"]
+    restyled, reshaped = result.changes["restyled"], result.changes["reshaped"]
+
+    for key, entry in new.items():
+        before = old.get(key)
+        if before is None:
+            added.append(key)
+            continue
+        if before[2] != entry[2]:
+            moved.append(key)
+        if before[3] != entry[3]:
+            restyled.append(key)
+        if before[4] != entry[4]:
+            reshaped.append(key)
+    result.changes["removed"] = [key for key in old if key not in new]
+    return result
+
+
+def diff_files(old_filename, new_filename):
+    """
+    Сравнение двух файлов проекта -> ShapeDiff.
+    Корневые записи, чьи байты (вместе со всеми детьми) есть в другой версии, отсеиваются по хешу без разбора.
+    """
+    old_parts, new_parts = split_records(old_filename), split_records(new_filename)
+    if old_parts is None or new_parts is None:
+        return diff_shapes(FileManager.load_project(old_filename).get("shapes", []),
+                           FileManager.load_project(new_filename).get("shapes", []))
+    old_digests, new_digests = list(map(hash, old_parts)), list(map(hash, new_parts))
+    return diff_shapes(_changed_records(old_parts, old_digests, set(new_digests)),
+                       _changed_records(new_parts, new_digests, set(old_digests)),
+                       (len(old_parts), len(new_parts)))
+
+
+def diff_document(filename, scene):
+    """
+    Сравнение версии из файла (старой) с текущим документом сцены (новой) -> ShapeDiff.
+    Документ берется байтами кэша сохранения (EditorScene.shape_chunks): неизмененные фигуры не сериализуются.
+    """
+    old_parts = split_records(filename)
+    if old_parts is None:
+        return diff_shapes(FileManager.load_project(filename).get("shapes", []), list(scene.shape_dicts()))
+    chunks = list(scene.shape_chunks())
+    old_digests, new_digests = list(map(hash, old_parts)), list(map(chunk_digest, chunks))
+    return diff_shapes(_changed_records(old_parts, old_digests, set(new_digests)),
+                       _changed_records(chunks, new_digests, set(old_digests), complete=True),
+                       (len(old_parts), len(chunks)))
+
+
+class DiffOverlay:
+    """
+    Подсветка результата сравнения на холсте (рисуется в EditorCanvas.drawForeground).
+    Габариты хранятся numpy-массивами по видам: в кадр попадает только то, что пересекает
+    перерисовываемую область. При сильном отдалении фигуры меньше пары пикселей рисуются точками
+    через одну картинку размером с экран - сколько бы их ни было в документе.
+    """
+    MAX_MARKS = 5000  # Больше рамок на кадр - мелкие превращаем в точки
+    MIN_BOX_PIXELS = 3
+
+    def __init__(self, diff):
+        import numpy as np
+        self.counts = diff.counts()
+        self.boxes = {kind: np.array(diff.bounds(kind), dtype=float).reshape(-1, 4) for kind in KINDS}
+
+    def paint(self, painter, rect):
+        import numpy as np
+        from PySide6.QtCore import QRectF, Qt
+        from PySide6.QtGui import QPen, QColor
+
+        pixel = 1 / max(painter.worldTransform().m11(), 1e-9)  # Размер пикселя экрана в единицах сцены
+        x1, y1, x2, y2 = rect.getCoords()
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for kind, color in KINDS.items():
+            boxes = self.boxes[kind]
+            boxes = boxes[(boxes[:, 0] <= x2) & (boxes[:, 2] >= x1) & (boxes[:, 1] <= y2) & (boxes[:, 3] >= y1)]
+            if len(boxes) > self.MAX_MARKS:
+                small = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]) < self.MIN_BOX_PIXELS * pixel
+                self._paint_dots(painter, (boxes[small, :2] + boxes[small, 2:]) / 2, QColor(color))
+                boxes = boxes[~small]
+            if not len(boxes):
+                continue
+            pen = QPen(QColor(color), 2, Qt.PenStyle.DashLine if kind == "removed" else Qt.PenStyle.SolidLine)
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            painter.drawRects([QRectF(a, b, c - a, d - b) for a, b, c, d in boxes.tolist()])
+
+    def _paint_dots(self, painter, centers, color):
+        """Точки 2x2 пикселя в центрах фигур: пиксели пишутся в numpy-буфер, а рисуется одна картинка"""
+        import numpy as np
+        from PySide6.QtGui import QImage
+
+        transform = painter.worldTransform()
+        width, height = painter.device().width(), painter.device().height()
+        xs = np.floor(centers[:, 0] * transform.m11() + transform.dx()).astype(np.int64)
+        ys = np.floor(centers[:, 1] * transform.m22() + transform.dy()).astype(np.int64)
+        inside = (xs >= 0) & (xs < width - 1) & (ys >= 0) & (ys < height - 1)
+        xs, ys = xs[inside], ys[inside]
+        dots = np.zeros((height, width), dtype=np.uint32)  # Прозрачный ARGB
+        for dy in (0, 1):
+            for dx in (0, 1):
+                dots[ys + dy, xs + dx] = color.rgba()
+        image = QImage(dots.data, width, height, QImage.Format.Format_ARGB32)
+        painter.save()
+        painter.resetTransform()
+        painter.drawImage(0, 0, image)
+        painter.restore()
+
+    def paint_legend(self, painter, height):
+        """Сводка в левом нижнем углу (координаты экрана)"""
+        from PySide6.QtGui import QColor, QFont
+        painter.setFont(QFont("Monospace", 9))
+        lines = [(kind, count) for kind, count in self.counts.items() if count]
+        top = height - 16 * len(lines) - 16
+        painter.fillRect(8, top, 160, 16 * len(lines) + 8, QColor(0, 0, 0, 160))
+        for i, (kind, count) in enumerate(lines):
+            painter.setPen(QColor(KINDS[kind]))
+            painter.drawText(14, top + 16 + 16 * i, f"{kind}: {count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение двух версий проекта по id фигур")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--limit", type=int, default=10, help="Сколько ключей показать для каждого вида изменений")
+    parser.add_argument("--json", action="store_true", help="Вывести все изменения в JSON")
+    args = parser.parse_args(argv)
+
+    start = perf_counter()
+    try:
+        result = diff_files(args.old, args.new)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    elapsed = perf_counter() - start
+
+    if args.json:
+        json.dump(result.to_dict(), sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        print(f"{result.shape_counts[0]} -> {result.shape_counts[1]} shapes, {elapsed:.2f} s")
+        for kind, keys in result.changes.items():
+            print(f"{kind:10s} {len(keys)}")
+            for key in keys[:args.limit]:
+                print(f"    {key}")
+            if len(keys) > args.limit > 0:
+                print(f"    ... ({len(keys) - args.limit} more)")
+    return 1 if result else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
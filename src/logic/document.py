@@ -0,0 +1,263 @@
+# src/logic/document.py
+"""
+Документ без окна: открыть проект, найти фигуры, изменить их пачкой и сохранить.
+
+Работает со словарями фигур - теми же, что пишет to_dict и читает ShapeFactory.from_dict, поэтому
+не нужны ни QApplication, ни сцена, ни объекты фигур. Файл пишется так же, как из редактора
+(FileManager.save_project: json.dump(indent=4) - его байт в байт повторяет и JsonSaveStrategy).
+Картинка документа (render) рисуется в QImage - для неё хватит offscreen-платформы.
+
+    from src.logic.document import Document
+    doc = Document.open("plan.json")
+    doc.select(type="rect", color="#ff0000").restyle(color="#00aa00").translate(10, 0)
+    doc.select(layer="Черновик").delete()
+    doc.save()
+"""
+from src.logic.io_manager import FileManager
+from src.logic.layers import Layer, DEFAULT_LAYER
+from src.logic.lazy_document import ensure_ids, record_bounds
+from src.logic.shapes import new_shape_id
+
+DEFAULT_PAGE = (800.0, 600.0)
+
+
+def _primitives(record):
+    """Простые фигуры поддерева записи (группы раскрываются)"""
+    if record.get("type") == "group":
+        for child in record.get("children", ()):
+            yield from _primitives(child)
+    else:
+        yield record
+
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class Document:
+    """
+    Проект как данные. shapes - словари корневых фигур снизу вверх, layers - словари слоев снизу вверх.
+    Изменения делаются через Selection (select / all) и помечают документ измененным (modified).
+    """
+
+    def __init__(self, data=None, filename=None):
+        if data is None:
+            data = {"version": "1.0", "scene": {"width": DEFAULT_PAGE[0], "height": DEFAULT_PAGE[1]},
+                    "shapes": [], "layers": []}
+        data.setdefault("shapes", [])
+        if not data.get("layers"):
+            data["layers"] = [Layer(DEFAULT_LAYER).to_dict()]
+        # У фигур старых файлов id нет - выдаем, чтобы по ним можно было искать и сравнивать версии
+        for shape in data["shapes"]:
+            ensure_ids(shape)
+        self.data = data
+        self.filename = filename
+        self.modified = False
+
+    @classmethod
+    def open(cls, filename):
+        data = FileManager.load_project(filename)
+        if "version" not in data or "shapes" not in data:
+            raise ValueError("Некорректный формат файла")
+        return cls(data, filename)
+
+    def save(self, filename=None):
+        """Сохраняет проект (по умолчанию - в файл, из которого открыт)"""
+        filename = filename or self.filename
+        if not filename:
+            raise ValueError("Не указан файл для сохранения")
+        if "thumbnail" in self.data and self.modified:
+            # Встроенная миниатюра устарела - рисуем новую по словарям (см. logic/thumbnails.py)
+            from src.logic.thumbnails import encode_thumbnail, render_shapes
+            self.data["thumbnail"] = encode_thumbnail(render_shapes(self.data))
+        FileManager.save_project(filename, self.data)
+        self.filename = filename
+        self.modified = False
+
+    # --- СОДЕРЖИМОЕ ---
+
+    @property
+    def shapes(self):
+        return self.data["shapes"]
+
+    @property
+    def layers(self):
+        return self.data["layers"]
+
+    @property
+    def page_size(self):
+        scene = self.data.get("scene", {})
+        return scene.get("width", DEFAULT_PAGE[0]), scene.get("height", DEFAULT_PAGE[1])
+
+    def layer_of(self, record):
+        """Имя слоя корневой фигуры (без слоя или с неизвестным слоем - нижний, как в LayerModel.layer_of)"""
+        name = record.get("layer")
+        return name if any(layer.get("name") == name for layer in self.layers) else self.layers[0]["name"]
+
+    def add_layer(self, name, visible=True, locked=False, opacity=1.0):
+        if any(layer.get("name") == name for layer in self.layers):
+            raise ValueError(f"Слой уже есть: {name}")
+        self.layers.append(Layer(name, visible, locked, opacity).to_dict())
+        self.modified = True
+
+    def add(self, shape_dicts, layer=None):
+        """Добавляет фигуры (словари формата to_dict) поверх остальных -> Selection из них"""
+        records = []
+        for record in shape_dicts:
+            ensure_ids(record)
+            if layer is not None:
+                record["layer"] = layer
+            records.append(record)
+        self.shapes.extend(records)
+        self.modified = True
+        return Selection(self, records)
+
+    def find(self, shape_id):
+        """Фигура (в том числе вложенная в группу) по id или None"""
+        pending = list(self.shapes)
+        while pending:
+            record = pending.pop()
+            if record.get("id") == shape_id:
+                return record
+            pending.extend(record.get("children", ()))
+        return None
+
+    # --- ВЫБОРКИ ---
+
+    def all(self):
+        return Selection(self, list(self.shapes))
+
+    def select(self, predicate=None, **criteria):
+        """Корневые фигуры по условиям (см. Selection.filter)"""
+        return self.all().filter(predicate, **criteria)
+
+    def render(self, size=1024):
+        """Картинка документа, вписанная в квадрат size (QImage; без окна - с offscreen-платформой)"""
+        from src.logic.thumbnails import render_shapes
+        return render_shapes(self.data, size)
+
+
+class Selection:
+    """
+    Набор корневых фигур документа с пакетными операциями над всем набором сразу.
+    Операции возвращают выборку, поэтому их можно выстраивать цепочкой.
+    """
+
+    def __init__(self, document, records):
+        self.document = document
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __bool__(self):
+        return bool(self.records)
+
+    def ids(self):
+        return [record["id"] for record in self.records]
+
+    def bounds(self):
+        """Общие габариты (x1, y1, x2, y2) или None"""
+        boxes = [box for box in map(record_bounds, self.records) if box]
+        if not boxes:
+            return None
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+    def filter(self, predicate=None, type=None, color=None, layer=None, within=None, intersects=None, ids=None):
+        """
+        Подвыборка. type - тип или кортеж типов ("rect", "group", ...), color - цвет хотя бы одной
+        простой фигуры поддерева, layer - имя слоя, within / intersects - прямоугольник (x1, y1, x2, y2),
+        в котором габариты фигуры лежат целиком / с которым пересекаются, ids - набор id,
+        predicate(словарь) -> bool - произвольное условие.
+        """
+        records = self.records
+        if type is not None:
+            types = (type,) if isinstance(type, str) else tuple(type)
+            records = [r for r in records if r.get("type") in types]
+        if color is not None:
+            color = color.lower()
+            records = [r for r in records
+                       if any(str(p.get("props", {}).get("color", "black")).lower() == color for p in _primitives(r))]
+        if layer is not None:
+            records = [r for r in records if self.document.layer_of(r) == layer]
+        if ids is not None:
+            ids = set(ids)
+            records = [r for r in records if r.get("id") in ids]
+        if within is not None or intersects is not None:
+            boxed = [(r, record_bounds(r)) for r in records]
+            if within is not None:
+                x1, y1, x2, y2 = within
+                boxed = [(r, b) for r, b in boxed if b and x1 <= b[0] and y1 <= b[1] and b[2] <= x2 and b[3] <= y2]
+            if intersects is not None:
+                boxed = [(r, b) for r, b in boxed if b and _overlaps(b, intersects)]
+            records = [r for r, _ in boxed]
+        if predicate is not None:
+            records = [r for r in records if predicate(r)]
+        return Selection(self.document, records)
+
+    # --- ПАКЕТНЫЕ ПРАВКИ ---
+
+    def restyle(self, color=None, width=None):
+        """Цвет и/или толщина пера всех простых фигур выборки (группы - целиком, как в редакторе)"""
+        for record in self.records:
+            for primitive in _primitives(record):
+                props = primitive.setdefault("props", {})
+                if color is not None:
+                    props["color"] = color
+                if width is not None:
+                    props["width"] = width
+        self._touch()
+        return self
+
+    def translate(self, dx, dy):
+        for record in self.records:
+            x, y = record.get("pos", [0, 0])
+            record["pos"] = [x + dx, y + dy]
+        self._touch()
+        return self
+
+    def move_to_layer(self, name):
+        if not any(layer.get("name") == name for layer in self.document.layers):
+            raise ValueError(f"Нет слоя: {name}")
+        for record in self.records:
+            record["layer"] = name
+        self._touch()
+        return self
+
+    def delete(self):
+        """Удаляет фигуры выборки из документа (выборка становится пустой)"""
+        removed = set(map(id, self.records))
+        self.document.shapes[:] = [r for r in self.document.shapes if id(r) not in removed]
+        self.records = []
+        self._touch()
+        return self
+
+    def group(self):
+        """
+        Объединяет фигуры выборки в группу -> выборка из неё.
+        Как в редакторе: группа в начале координат (дети сохраняют позиции), в слое первой фигуры;
+        встает на место верхней из фигур, порядок детей - порядок наложения.
+        """
+        if len(self.records) < 2:
+            raise ValueError("Для группы нужно хотя бы две фигуры")
+        members = set(map(id, self.records))
+        shapes = self.document.shapes
+        indexes = [i for i, r in enumerate(shapes) if id(r) in members]
+        children = [shapes[i] for i in indexes]
+        group = {"type": "group", "pos": [0.0, 0.0], "children": children, "id": new_shape_id()}
+        layer = self.records[0].get("layer")
+        if layer:
+            group["layer"] = layer
+        top = indexes[-1] - (len(indexes) - 1)
+        shapes[:] = [r for r in shapes if id(r) not in members]
+        shapes.insert(top, group)
+        self.records = [group]
+        self._touch()
+        return self
+
+    def _touch(self):
+        self.document.modified = True
@@ -1,7 +1,10 @@
-from src.logic.shapes import Rectangle, Line, Ellipse, Group, Polygon
+from src.logic.shapes import (Rectangle, Line, Ellipse, Group, Polygon, PathShape, TextShape, DEFAULT_FONT,
+                              DEFAULT_FONT_SIZE)
+from src.logic.profiling import traced
 
 class ShapeFactory:
     @staticmethod
+    @traced("ShapeFactory.create_shape")
     def create_shape(shape_type: str, start_point, end_point, color: str):
         """
         start_point, end_point: QPointF (координаты сцены)
@@ -28,13 +31,14 @@ class ShapeFactory:
             raise ValueError(f"Неизвестный тип фигуры: {shape_type}")
 
     @staticmethod
+    @traced("ShapeFactory.from_dict")
     def from_dict(data: dict):
         shape_type = data.get("type")
 
         if shape_type == "group":
             return ShapeFactory._create_group(data)
         # Добавляем "polygon" в этот список
-        elif shape_type in ["rect", "line", "ellipse", "polygon"]:
+        elif shape_type in ["rect", "line", "ellipse", "polygon", "path", "text"]:
             return ShapeFactory._create_primitive(data)
         else:
             raise ValueError(f"Unknown type: {shape_type}")
@@ -49,37 +53,35 @@ class ShapeFactory:
 
         obj = None
 
+        # x/y - локальное смещение контура относительно pos (to_dict сохраняет их отдельно)
         if shape_type == "rect":
-            obj = Rectangle(0, 0, props.get('w', 0), props.get('h', 0), color, width)
+            obj = Rectangle(props.get('x', 0), props.get('y', 0), props.get('w', 0), props.get('h', 0), color, width)
         elif shape_type == "ellipse":
-            obj = Ellipse(0, 0, props.get('w', 0), props.get('h', 0), color, width)
+            obj = Ellipse(props.get('x', 0), props.get('y', 0), props.get('w', 0), props.get('h', 0), color, width)
         elif shape_type == "line":
             obj = Line(props.get('x1', 0), props.get('y1', 0),
                        props.get('x2', 0), props.get('y2', 0), color, width)
         elif shape_type == "polygon":
-            from PySide6.QtCore import QPointF
-            from src.logic.shapes import Polygon
+            from src.logic.points import decode_points
 
-            # Конвертируем список списков в список QPointF
-            pts = [QPointF(p[0], p[1]) for p in props.get("points", [])]
+            # Вершины сразу в упакованный массив (список пар или блок байтов, см. logic/points.py)
             is_closed = props.get("is_closed", True)
-
-            # Создаем полигон
-            obj = Polygon(pts, color, width, is_closed)
+            obj = Polygon.from_points(decode_points(props.get("points")), color, width, is_closed)
+        elif shape_type == "path":
+            from PySide6.QtCore import QPointF
+            contours = [[QPointF(p[0], p[1]) for p in contour] for contour in props.get("contours", [])]
+            obj = PathShape([c for c in contours if c], color, width)
+        elif shape_type == "text":
+            obj = TextShape(props.get("text", ""), props.get("x", 0), props.get("y", 0),
+                            props.get("font", DEFAULT_FONT), props.get("size", DEFAULT_FONT_SIZE), color, width)
 
         if obj:
             # 2. Восстанавливаем позицию
             pos_data = data.get("pos", [0, 0])
-            target_x = pos_data[0]
-            target_y = pos_data[1]
-
-            # Если для примитивов (кроме линий и полигонов) pos нулевой,
-            # берем x/y из пропсов (совместимость со старым форматом)
-            if shape_type in ["rect", "ellipse"] and target_x == 0 and target_y == 0:
-                target_x = props.get('x', 0)
-                target_y = props.get('y', 0)
-
-            obj.setPos(target_x, target_y)
+            obj.setPos(pos_data[0], pos_data[1])
+            obj.setRotation(data.get("rotation", 0))
+            obj.layer = data.get("layer")
+            obj.shape_id = data.get("id")  # Нет в старых файлах - будет выдан новый
 
             if hasattr(obj, 'apply_initial_config'):
                 obj.apply_initial_config()
@@ -113,6 +115,11 @@ class ShapeFactory:
                 if "pos" in child_dict:
                     child_item.setPos(child_dict["pos"][0], child_dict["pos"][1])
 
+        # Поворот группы - после добавления детей, иначе addToGroup компенсирует его в transform() детей
+        group.setRotation(data.get("rotation", 0))
+        group.layer = data.get("layer")
+        group.shape_id = data.get("id")
+
         if hasattr(group, 'apply_initial_config'):
             group.apply_initial_config()
 
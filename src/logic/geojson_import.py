@@ -0,0 +1,405 @@
+# src/logic/geojson_import.py
+"""
+Импорт GeoJSON: LineString / Polygon (кольца) -> Polygon (is_closed - замкнуто ли), фича из нескольких
+частей (MultiLineString, MultiPolygon, полигон с дырками, GeometryCollection) -> Group из Polygon.
+Точки (Point, MultiPoint) пропускаются.
+
+- Фичи читаются из файла по одной (JsonStream: буфер дочитывается кусками, значение за значением
+  разбирает json.JSONDecoder.raw_decode), весь файл в памяти не держится.
+- Координаты проецируются (PROJECTIONS) и вписываются в прямоугольник сцены (лист) или масштабируются
+  заданным числом пикселей на единицу проекции. Для этого нужны габариты данных: bbox файла
+  перед "features" или первый проход (см. GeoJsonImporter).
+- Каждая линия/кольцо упрощается уже в пикселях сцены: сначала отбрасываются подряд идущие точки
+  в одной клетке сетки tolerance / 2, затем Рамер-Дуглас-Пекер с допуском tolerance. Кольца, которые
+  стянулись меньше чем в три вершины, пропускаются: на листе они меньше пикселя.
+"""
+import json
+import math
+import os
+import re
+import tempfile
+from itertools import chain
+import numpy as np
+from src.logic.shapes import Polygon, Group
+from src.logic.svg_import import parse_color
+from src.logic.profiling import traced
+
+BATCH_SIZE = 2000          # Фигур в партии (между партиями окно обновляет прогресс)
+CHUNK_SIZE = 1 << 20       # Символов за одно чтение файла
+DEFAULT_TOLERANCE = 0.5    # Допуск упрощения (пиксели сцены)
+FIT_MARGIN = 0.05          # Поля при вписывании в лист (доля его стороны)
+MAX_LATITUDE = 85.05112878  # Граница Web Mercator
+
+# Проекция -> название (для диалога импорта)
+PROJECTIONS = {
+    "mercator": "Web Mercator",
+    "equirectangular": "Equirectangular (lon, lat)",
+    "planar": "Planar (координаты как есть)",
+}
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class JsonStream:
+    """Значения JSON по одному из текстового файла (буфер дочитывается кусками по мере надобности)"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size=CHUNK_SIZE):
+        data = self.f.read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Следующий значимый символ ('' - конец файла)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Файл GeoJSON поврежден: ожидался «{char}», а не «{found or 'конец файла'}»")
+        self.pos += 1
+
+    def value(self):
+        """Следующее значение целиком. Не поместилось в буфер - дочитываем (каждый раз вдвое больше)"""
+        self.peek()
+        size = CHUNK_SIZE
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self.eof or not self._fill(size):
+                    raise ValueError(f"Файл GeoJSON поврежден: {e}")
+                size *= 2
+                continue
+            # Число в самом конце буфера могло оборваться посередине
+            if end == len(self.buffer) and not self.eof and self._fill(size):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_features(stream, header):
+    """
+    Фичи верхнего объекта файла по одной. Остальные поля объекта (type, bbox, crs...) складываются
+    в header по мере чтения. Файл из одной фичи или геометрии выдается как одна фича.
+    """
+    stream.expect("{")
+    found = False
+    while True:
+        char = stream.peek()
+        if char == "}" or char == "":
+            break
+        if char == ",":
+            stream.pos += 1
+            continue
+        key = stream.value()
+        stream.expect(":")
+        if key != "features":
+            header[key] = stream.value()
+            continue
+        found = True
+        stream.expect("[")
+        while True:
+            char = stream.peek()
+            if char == "]":
+                stream.pos += 1
+                break
+            if char == ",":
+                stream.pos += 1
+                continue
+            if char == "":
+                raise ValueError("Файл GeoJSON поврежден: список features не закрыт")
+            yield stream.value()
+    if not found and header.get("type"):
+        yield header if header["type"] == "Feature" else {"type": "Feature", "geometry": header}
+
+
+def geometry_parts(geometry):
+    """Геометрия -> [(координаты линии/кольца, замкнута ли), ...]; у точек и пустых геометрий - []"""
+    if not geometry:
+        return []
+    kind, coords = geometry.get("type"), geometry.get("coordinates") or []
+    if kind == "LineString":
+        return [(coords, False)]
+    if kind == "MultiLineString":
+        return [(line, False) for line in coords]
+    if kind == "Polygon":
+        return [(ring, True) for ring in coords]
+    if kind == "MultiPolygon":
+        return [(ring, True) for polygon in coords for ring in polygon]
+    if kind == "GeometryCollection":
+        return [part for child in geometry.get("geometries", ()) for part in geometry_parts(child)]
+    return []
+
+
+def _lonlat(coords):
+    """Список позиций [x, y(, z...)] -> массив (n, 2)"""
+    try:
+        xy = np.asarray(coords, dtype=float)
+    except ValueError:
+        # Позиции разной длины (часть с высотой)
+        xy = np.asarray([p[:2] for p in coords], dtype=float)
+    if xy.ndim != 2 or xy.shape[1] < 2:
+        return np.empty((0, 2))
+    return xy[:, :2]
+
+
+def project(xy, projection):
+    """Координаты (n, 2) -> проекция (x вправо, y вверх; у географических проекций - в градусах)"""
+    if projection in ("planar", "equirectangular"):
+        return xy
+    if projection == "mercator":
+        lat = np.radians(np.clip(xy[:, 1], -MAX_LATITUDE, MAX_LATITUDE))
+        return np.column_stack((xy[:, 0], np.degrees(np.log(np.tan(np.pi / 4 + lat / 2)))))
+    raise ValueError(f"Неизвестная проекция: {projection}")
+
+
+def simplify(xy, tolerance):
+    """
+    Ломаная (n, 2) с погрешностью порядка tolerance: прореживание по сетке tolerance / 2 (линейно),
+    затем Рамер-Дуглас-Пекер (без рекурсии, расстояния до отрезка - numpy по всему участку сразу).
+    Первая и последняя точки сохраняются всегда.
+    """
+    if tolerance <= 0 or len(xy) <= 2:
+        return xy
+    cells = np.floor(xy / (tolerance / 2))
+    keep = np.empty(len(xy), dtype=bool)
+    keep[0] = True
+    np.any(cells[1:] != cells[:-1], axis=1, out=keep[1:])
+    keep[-1] = True
+    xy = xy[keep]
+    n = len(xy)
+    if n <= 2:
+        return xy
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    # Все участки одного уровня делятся за один проход numpy (а не по участку за итерацию Python)
+    firsts, lasts = np.array([0]), np.array([n - 1])
+    while len(firsts):
+        counts = lasts - firsts - 1  # Внутренних точек участка
+        offsets = np.cumsum(counts) - counts
+        segment = np.repeat(np.arange(len(firsts)), counts)
+        index = np.arange(len(segment)) - offsets[segment] + firsts[segment] + 1
+        start = xy[firsts][segment]
+        delta = xy[lasts][segment] - start
+        rest = xy[index] - start
+        length2 = np.einsum("ij,ij->i", delta, delta)
+        # Расстояние до отрезка, а не до прямой: петли за концами отрезка не теряются.
+        # У замкнутого кольца первая и последняя точки совпадают - это расстояние до точки
+        t = np.einsum("ij,ij->i", rest, delta) / np.where(length2 > 0, length2, 1.0)
+        np.minimum(np.maximum(t, 0.0, out=t), 1.0, out=t)
+        dist = np.hypot(rest[:, 0] - t * delta[:, 0], rest[:, 1] - t * delta[:, 1])
+        farthest = np.maximum.reduceat(dist, offsets)
+        # Первая точка участка с наибольшим расстоянием
+        hits = np.flatnonzero(dist == farthest[segment])
+        _, first_hit = np.unique(segment[hits], return_index=True)
+        middle = index[hits[first_hit]]
+        split = farthest > tolerance
+        middle = middle[split]
+        keep[middle] = True
+        firsts, lasts = np.concatenate((firsts[split], middle)), np.concatenate((middle, lasts[split]))
+        inner = lasts - firsts >= 2
+        firsts, lasts = firsts[inner], lasts[inner]
+    return xy[keep]
+
+
+class GeoJsonImporter:
+    """
+    Потоковый импорт GeoJSON-файла. batches() выдает списки готовых корневых фигур;
+    position / total - для прогресса. После разбора: created / skipped - фигур создано / фич пропущено,
+    vertices_in / vertices_out - вершин в файле и после упрощения.
+
+    target - QRectF, в который вписываются данные (лист сцены); scale - пикселей сцены на единицу
+    проекции (None - вписать); tolerance - допуск упрощения в пикселях сцены.
+
+    Если в файле нет bbox, габариты известны только после чтения всех фич. JSON второй раз не
+    разбирается: на первом проходе координаты в проекции пишутся во временный файл (float64 подряд,
+    как array('d')), а на втором читаются оттуда частями - память по-прежнему не растет с размером файла.
+    """
+
+    def __init__(self, filename, target, projection="mercator", scale=None, tolerance=DEFAULT_TOLERANCE,
+                 batch_size=BATCH_SIZE):
+        if projection not in PROJECTIONS:
+            raise ValueError(f"Неизвестная проекция: {projection}")
+        self.filename = filename
+        self.target = target
+        self.projection = projection
+        self.scale = scale
+        self.tolerance = tolerance
+        self.batch_size = batch_size
+        self.total = os.path.getsize(filename)
+        self.position = 0
+        self.created = 0
+        self.skipped = 0
+        self.vertices_in = 0
+        self.vertices_out = 0
+        self._origin = None  # (x, y) проекции, попадающая в центр target
+        self._factor = None  # Пикселей сцены на единицу проекции
+
+    # --- ГАБАРИТЫ И МАСШТАБ ---
+
+    def _bbox_bounds(self, bbox):
+        """Поле bbox файла ([x1, y1, x2, y2] или с высотами) -> габариты в проекции"""
+        if not isinstance(bbox, list) or len(bbox) not in (4, 6):
+            return None
+        half = len(bbox) // 2
+        corners = project(np.array([bbox[0:2], bbox[half:half + 2]], dtype=float), self.projection)
+        return corners.min(axis=0), corners.max(axis=0)
+
+    def _set_mapping(self, bounds):
+        if bounds is None:
+            self._origin, self._factor = (0.0, 0.0), self.scale or 1.0
+            return
+        (x1, y1), (x2, y2) = bounds
+        self._origin = ((x1 + x2) / 2, (y1 + y2) / 2)
+        if self.scale:
+            self._factor = self.scale
+            return
+        width = self.target.width() * (1 - 2 * FIT_MARGIN)
+        height = self.target.height() * (1 - 2 * FIT_MARGIN)
+        factor = min(width / (x2 - x1) if x2 > x1 else math.inf, height / (y2 - y1) if y2 > y1 else math.inf)
+        self._factor = factor if math.isfinite(factor) else 1.0
+
+    def to_scene(self, xy):
+        """Проекция (n, 2) -> координаты сцены (y вниз, центр данных - в центре target)"""
+        center = self.target.center()
+        scene = np.empty_like(xy)
+        scene[:, 0] = center.x() + (xy[:, 0] - self._origin[0]) * self._factor
+        scene[:, 1] = center.y() - (xy[:, 1] - self._origin[1]) * self._factor
+        return scene
+
+    # --- ФИГУРЫ ---
+
+    def feature_parts(self, feature):
+        """Фича -> (цвет, толщина, [(координаты в проекции (n, 2), замкнута ли), ...])"""
+        properties = feature.get("properties") or {}
+        # Стиль simplestyle (stroke, stroke-width), если он есть в свойствах фичи
+        color = parse_color(str(properties.get("stroke", "#000000"))) or "#000000"
+        try:
+            width = max(1, round(float(properties.get("stroke-width", 1))))
+        except (TypeError, ValueError):
+            width = 1
+        parts = []
+        for coords, closed in geometry_parts(feature.get("geometry")):
+            xy = _lonlat(coords)
+            self.vertices_in += len(xy)
+            if len(xy) >= 2:
+                parts.append((project(xy, self.projection), closed))
+        return color, width, parts
+
+    def _part(self, xy, closed, color, width):
+        xy = simplify(self.to_scene(xy), self.tolerance)
+        if closed and np.array_equal(xy[0], xy[-1]):
+            xy = xy[:-1]
+        if len(xy) < (3 if closed else 2):
+            return None
+        self.vertices_out += len(xy)
+        return Polygon.from_points(xy, color, width, closed)
+
+    def build_shape(self, color, width, parts):
+        """Фигура (Polygon или Group) или None (точки, пустая геометрия, всё меньше допуска)"""
+        shapes = [shape for shape in (self._part(xy, closed, color, width) for xy, closed in parts) if shape]
+        if len(shapes) < 2:
+            return shapes[0] if shapes else None
+        group = Group()
+        for shape in shapes:
+            group.addToGroup(shape)
+        return group
+
+    def _features(self, f, header):
+        """Фичи файла -> (цвет, толщина, части); битая фича пропускается"""
+        for feature in iter_features(JsonStream(f), header):
+            try:
+                yield self.feature_parts(feature)
+            except (TypeError, ValueError, AttributeError) as e:
+                print(f"Error importing GeoJSON feature: {e}")
+                yield None
+
+    # --- ПРОХОДЫ ---
+
+    @traced("GeoJsonImporter.batches")
+    def batches(self):
+        header = {}
+        with open(self.filename, 'r', encoding='utf-8') as f:
+            features = self._features(f, header)
+            # К первой фиче поля перед "features" (и bbox среди них) уже прочитаны
+            first = next(features, None)
+            features = chain((first,), features) if first is not None else iter(())
+            bounds = self._bbox_bounds(header.get("bbox"))
+            if bounds is not None:
+                self._set_mapping(bounds)
+                yield from self._build(features, lambda: f.buffer.tell())
+                return
+            with tempfile.TemporaryFile() as spill:
+                records = yield from self._spill(features, spill, f)
+                spill_size = spill.tell()
+                spill.seek(0)
+                # Второй проход - вторая половина шкалы прогресса
+                size = self.total
+                self.total = 2 * size
+                self.position = size
+                yield from self._build(self._unspill(records, spill), lambda: size + spill.tell() * size // max(1, spill_size))
+
+    def _spill(self, features, spill, f):
+        """
+        Первый проход: координаты в проекции - во временный файл, габариты - по ходу дела.
+        -> [(цвет, толщина, [(число вершин, замкнута ли), ...]) или None, ...]. Генератор: пустые партии
+        - чтобы окно обновляло прогресс.
+        """
+        low, high = np.full(2, np.inf), np.full(2, -np.inf)
+        records = []
+        for i, record in enumerate(features):
+            if record is not None:
+                color, width, parts = record
+                for xy, _ in parts:
+                    low, high = np.minimum(low, xy.min(axis=0)), np.maximum(high, xy.max(axis=0))
+                    spill.write(np.ascontiguousarray(xy, dtype=float).tobytes())
+                record = (color, width, [(len(xy), closed) for xy, closed in parts])
+            records.append(record)
+            if i % self.batch_size == 0:
+                self.position = f.buffer.tell()
+                yield []
+        self._set_mapping((low, high) if np.all(low <= high) else None)
+        return records
+
+    def _unspill(self, records, spill):
+        for record in records:
+            if record is None:
+                yield None
+                continue
+            color, width, parts = record
+            yield color, width, [(np.frombuffer(spill.read(16 * n), dtype=float).reshape(-1, 2), closed)
+                                 for n, closed in parts]
+
+    def _build(self, features, position):
+        ready = []
+        for record in features:
+            item = self.build_shape(*record) if record is not None else None
+            if item is None:
+                self.skipped += 1
+                continue
+            self.created += 1
+            ready.append(item)
+            if len(ready) >= self.batch_size:
+                self.position = position()
+                yield ready
+                ready = []
+        self.position = self.total
+        if ready:
+            yield ready
@@ -0,0 +1,308 @@
+# src/logic/layers.py
+from PySide6.QtCore import QObject, Signal, Qt
+from PySide6.QtWidgets import QGraphicsItem
+
+DEFAULT_LAYER = "Layer 1"
+
+
+class Layer:
+    """
+    Слой документа.
+    hidden_items - фигуры скрытого слоя (снизу вверх). Их нет в сцене вообще: ни в отрисовке,
+    ни в индексе сцены для поиска под курсором/рамкой, ни в индексе привязки.
+    """
+    __slots__ = ("name", "visible", "locked", "opacity", "hidden_items")
+
+    def __init__(self, name, visible=True, locked=False, opacity=1.0):
+        self.name = name
+        self.visible = visible
+        self.locked = locked
+        self.opacity = opacity
+        self.hidden_items = []
+
+    def to_dict(self):
+        return {"name": self.name, "visible": self.visible, "locked": self.locked, "opacity": self.opacity}
+
+
+class LayerModel(QObject):
+    """
+    Слои сцены (снизу вверх). Фигура знает свой слой по имени (атрибут layer, сохраняется в to_dict).
+
+    Порядок наложения слоев задается полосами zValue: z фигуры = индекс слоя * Z_STEP + её z внутри слоя.
+    Поэтому фигуры скрытого слоя, вернувшись в сцену, встают ровно на свои места.
+    Сцена зовет attach() для каждой добавленной фигуры и take() для удаляемой (см. EditorScene).
+    """
+    Z_STEP = 1000.0
+
+    changed = Signal()
+
+    def __init__(self, scene):
+        super().__init__()
+        self.scene = scene
+        self.layers = [Layer(DEFAULT_LAYER)]
+        self.active = self.layers[0]
+
+    # --- ПОИСК ---
+
+    def layer(self, name):
+        for layer in self.layers:
+            if layer.name == name:
+                return layer
+        return None
+
+    def layer_of(self, item):
+        return self.layer(getattr(item, "layer", None)) or self.layers[0]
+
+    def is_hidden(self, name):
+        """Скрыт ли слой с таким именем (для записей ленивого документа, у которых еще нет фигур)"""
+        layer = self.layer(name) if name else self.layers[0]
+        return layer is not None and not layer.visible
+
+    def is_stashed(self, item):
+        """Фигура убрана из сцены вместе со скрытым слоем"""
+        layer = self.layer_of(item)
+        return not layer.visible and item in layer.hidden_items
+
+    @staticmethod
+    def _is_shape(item):
+        return hasattr(item, "to_dict") and not getattr(item, "is_preview", False)
+
+    # --- ФИГУРЫ ---
+
+    def attach(self, item):
+        """
+        Фигура добавляется в сцену: приводим её к состоянию слоя.
+        -> False, если слой скрыт (фигура отложена в слой и в сцену добавляться не должна)
+        """
+        if not self._is_shape(item):
+            return True
+        layer = self.layer(getattr(item, "layer", None))
+        if layer is None:
+            layer = self.active
+        item.layer = layer.name
+        if not layer.visible:
+            if item not in layer.hidden_items:
+                layer.hidden_items.append(item)
+            return False
+        self._apply(item, layer)
+        return True
+
+    def take(self, item):
+        """Фигура удаляется со сцены. -> True, если она лежала в скрытом слое (и сцены не касается)"""
+        if not self._is_shape(item):
+            return False
+        layer = self.layer_of(item)
+        if layer.visible or item not in layer.hidden_items:
+            return False
+        layer.hidden_items.remove(item)
+        return True
+
+    def _apply(self, item, layer):
+        z = item.zValue()
+        item.setZValue(self.layers.index(layer) * self.Z_STEP + (z - round(z / self.Z_STEP) * self.Z_STEP))
+        item.setOpacity(layer.opacity)
+        # Заблокированный слой: фигуры не выделяются, не двигаются, а клики проходят сквозь них
+        item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable, not layer.locked)
+        item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable, not layer.locked)
+        item.setAcceptedMouseButtons(Qt.MouseButton.NoButton if layer.locked else Qt.MouseButton.AllButtons)
+        if layer.locked:
+            item.setSelected(False)
+
+    def _scene_items(self, layer):
+        """Корневые фигуры слоя, которые сейчас в сцене (снизу вверх)"""
+        name = layer.name
+        default = layer is self.layers[0]
+        return [item for item in reversed(self.scene.items())
+                if self._is_shape(item) and item.topLevelItem() is item
+                and (getattr(item, "layer", None) == name or (default and self.layer(getattr(item, "layer", None)) is None))]
+
+    def _reapply(self, layer):
+        for item in self._scene_items(layer) if layer.visible else ():
+            self._apply(item, layer)
+
+    def placements(self, items):
+        """
+        Слой, z и соседа сверху корневых фигур из items снизу вверх: [(фигура, слой, z, сосед)] (см. place).
+        Сосед - ближайшая фигура выше с тем же z не из items: фигура, вернувшаяся в сцену из скрытого слоя,
+        встает под него, а не поверх всех фигур с тем же z.
+        """
+        items = {item for item in items if self._is_shape(item) and item.topLevelItem() is item}
+        if not items:
+            return []
+        placements = []
+        nearest = {}  # {z: самая нижняя из пройденных фигур с этим z}
+        # Сверху вниз: сосед каждой фигуры - последняя пройденная фигура с её z
+        for item in self.scene.items(Qt.SortOrder.DescendingOrder):
+            if item.topLevelItem() is not item:
+                continue
+            z = item.zValue()
+            if item in items:
+                placements.append((item, self.layer_of(item), z, nearest.get(z)))
+            elif self._is_shape(item):
+                nearest[z] = item
+        placements.reverse()
+        # Фигуры скрытых слоев (не в сцене): их место восстановит показ слоя
+        placements.extend((item, self.layer_of(item), item.zValue(), None) for item in items
+                          if item.scene() is not self.scene)
+        return placements
+
+    def move_items(self, items, layer):
+        """
+        Переносит фигуры в слой -> их слои и z до переноса (placements). Правка документа:
+        из панели слоев идет через историю (MoveToLayerCommand)
+        """
+        before = self.placements(items)
+        self.place([(item, layer, z, None) for item, _, z, _ in before])
+        return before
+
+    def place(self, placements):
+        """
+        Ставит фигуры в слои с заданными z: [(фигура, слой, z, сосед)] снизу вверх (см. placements).
+        Слой не из модели - нижний слой.
+        """
+        items = [item for item, _, _, _ in placements]
+        self.scene.items_changed(items)
+        for item, layer, z, above in placements:
+            if layer not in self.layers:
+                layer = self.layers[0]
+            stashed = self.take(item)
+            item.layer = layer.name
+            item.setZValue(z)
+            if not layer.visible:
+                # В скрытый слой: из сцены фигура уходит (removeItem), в сцену не возвращается (attach)
+                if not stashed:
+                    self.scene.removeItem(item)
+                self.attach(item)
+            elif stashed:
+                self.scene.addItem(item)
+                if (above is not None and above.scene() is self.scene and above.topLevelItem() is above
+                        and above.zValue() == item.zValue()):
+                    item.stackBefore(above)
+            else:
+                # Из видимого слоя в видимый: место среди фигур с тем же z не меняется
+                self._apply(item, layer)
+        self.changed.emit()
+
+    # --- СЛОИ ---
+
+    def add_layer(self, name=None):
+        if not name:
+            number = len(self.layers) + 1
+            while self.layer(f"Layer {number}"):
+                number += 1
+            name = f"Layer {number}"
+        layer = Layer(name)
+        self.layers.append(layer)
+        self.active = layer
+        self.changed.emit()
+        return layer
+
+    def remove_layer(self, layer):
+        """
+        Удаляет слой, его фигуры переходят в нижний соседний слой (последний слой удалить нельзя).
+        -> слои и z фигур до переноса (для restore_layer) или None
+        """
+        if len(self.layers) < 2:
+            return None
+        index = self.layers.index(layer)
+        target = self.layers[index - 1] if index else self.layers[1]
+        if not layer.visible:
+            self.set_visible(layer, True)
+        before = self.placements(self._scene_items(layer))  # Пока слой в модели: layer_of находит его
+        self.layers.remove(layer)
+        if self.active is layer:
+            self.active = target
+        self.move_items([item for item, _, _, _ in before], target)
+        # Индексы слоев выше удаленного сдвинулись - сдвигаем и их полосы z
+        for upper in self.layers[index:]:
+            self._reapply(upper)
+        self.changed.emit()
+        return before
+
+    def restore_layer(self, layer, index, placements, visible, active):
+        """Отмена remove_layer: слой возвращается на место index, его фигуры - в него"""
+        self.layers.insert(index, layer)
+        for upper in self.layers[index + 1:]:
+            self._reapply(upper)
+        self.place(placements)
+        if not visible:
+            self.set_visible(layer, False)
+        if active:
+            self.active = layer
+        self.changed.emit()
+
+    def rename_layer(self, layer, name):
+        if not name or self.layer(name):
+            return False
+        items = self._scene_items(layer) + layer.hidden_items
+        old_name, layer.name = layer.name, name
+        for item in items:
+            item.layer = name
+        self.scene.items_changed(items)
+        if self.scene.document:
+            self.scene.document.rename_layer(old_name, name)
+        if getattr(self.scene, "query_index", None):
+            self.scene.query_index.rename_layer(old_name, name)
+        self.changed.emit()
+        return True
+
+    def set_active(self, layer):
+        self.active = layer
+        self.changed.emit()
+
+    def set_visible(self, layer, visible):
+        if layer.visible == visible:
+            return
+        if not visible:
+            items = self._scene_items(layer)
+            layer.visible = False
+            # Фигуры уходят из сцены целиком (скрытие через opacity/setVisible оставило бы их в индексах)
+            for item in items:
+                self.scene.removeItem(item)
+            layer.hidden_items = items
+        else:
+            layer.visible = True
+            items, layer.hidden_items = layer.hidden_items, []
+            for item in items:
+                self.scene.addItem(item)
+        self.changed.emit()
+
+    def set_locked(self, layer, locked):
+        layer.locked = locked
+        self._reapply(layer)
+        self.changed.emit()
+
+    def set_opacity(self, layer, opacity):
+        layer.opacity = opacity
+        for item in self._scene_items(layer) if layer.visible else ():
+            item.setOpacity(opacity)
+        self.changed.emit()
+
+    # --- СОХРАНЕНИЕ ---
+
+    def hidden_shapes(self, document=None):
+        """Фигуры скрытых слоев для сохранения (фигуры ленивого документа он сохраняет сам)"""
+        for layer in self.layers:
+            for item in layer.hidden_items:
+                if document is None or not document.owns(item):
+                    yield item
+
+    def to_list(self):
+        return [layer.to_dict() for layer in self.layers]
+
+    def load(self, layers_data):
+        """Слои из файла проекта (до добавления фигур). Пустой список - один слой по умолчанию"""
+        self.layers = []
+        for data in layers_data or ():
+            name = data.get("name")
+            if name and not self.layer(name):
+                self.layers.append(Layer(name, data.get("visible", True), data.get("locked", False),
+                                         data.get("opacity", 1.0)))
+        if not self.layers:
+            self.layers = [Layer(DEFAULT_LAYER)]
+        self.active = next((layer for layer in reversed(self.layers) if layer.visible and not layer.locked),
+                           self.layers[-1])
+        self.changed.emit()
+
+    def reset(self):
+        self.load(None)
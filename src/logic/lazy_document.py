@@ -0,0 +1,299 @@
+# src/logic/lazy_document.py
+import math
+import sys
+from src.logic.factory import ShapeFactory
+from src.logic.commands import command_items
+from src.logic.shapes import is_root_item, new_shape_id, DEFAULT_FONT_SIZE
+from src.logic.points import decode_points, points_bounds
+
+TEXT_CHAR_WIDTH = 1.0    # Оценка ширины знака надписи (доля высоты шрифта, с запасом)
+TEXT_LINE_SPACING = 1.3  # Оценка межстрочного интервала (доля высоты шрифта)
+
+
+class ShapeRecord:
+    """Лёгкая запись о фигуре: словарь из JSON + габариты. QGraphicsItem создаётся только по требованию."""
+    __slots__ = ("data", "bounds", "order", "item", "chunk")
+
+    def __init__(self, data, order):
+        ensure_ids(data)
+        self.data = data
+        self.order = order
+        self.bounds = record_bounds(data)
+        self.item = None  # Материализованная фигура (или None, если только запись)
+        self.chunk = None  # Байты записи для сохранения (см. save_cache.root_chunks)
+
+
+def ensure_ids(data):
+    """Выдает id записи из старого файла (и детям группы), чтобы они сохранились и при следующей загрузке"""
+    if "id" not in data:
+        data["id"] = new_shape_id()
+    for child in data.get("children", ()):
+        ensure_ids(child)
+
+
+def record_bounds(data):
+    """
+    Габариты фигуры (x1, y1, x2, y2) в координатах родителя, вычисленные по словарю.
+    Повторяет логику ShapeFactory.from_dict, но НЕ создаёт объектов Qt.
+    """
+    shape_type = data.get("type")
+    pos = data.get("pos", [0, 0])
+    px, py = pos[0], pos[1]
+
+    if shape_type == "group":
+        children = data.get("children", [])
+        if not children:
+            return None
+        if len(children) == 1:
+            # Фабрика возвращает единственного ребенка без группы
+            return record_bounds(children[0])
+        boxes = [b for b in (record_bounds(c) for c in children) if b]
+        if not boxes:
+            return None
+        return _rotated_bounds((px + min(b[0] for b in boxes), py + min(b[1] for b in boxes),
+                                px + max(b[2] for b in boxes), py + max(b[3] for b in boxes)),
+                               px, py, data.get("rotation", 0))
+
+    props = data.get("props", {})
+    pad = props.get("width", 2) / 2 + 1  # Запас на толщину пера
+
+    if shape_type in ("rect", "ellipse"):
+        x1, y1 = px + props.get("x", 0), py + props.get("y", 0)
+        x2, y2 = x1 + props.get("w", 0), y1 + props.get("h", 0)
+    elif shape_type == "line":
+        xs = (props.get("x1", 0), props.get("x2", 0))
+        ys = (props.get("y1", 0), props.get("y2", 0))
+        x1, y1 = px + min(xs), py + min(ys)
+        x2, y2 = px + max(xs), py + max(ys)
+    elif shape_type == "polygon":
+        box = points_bounds(decode_points(props.get("points")))
+        if box is None:
+            return None
+        x1, y1, x2, y2 = px + box[0], py + box[1], px + box[2], py + box[3]
+    elif shape_type == "path":
+        pts = [p for contour in props.get("contours", []) for p in contour]
+        if not pts:
+            return None
+        x1 = px + min(p[0] for p in pts)
+        y1 = py + min(p[1] for p in pts)
+        x2 = px + max(p[0] for p in pts)
+        y2 = py + max(p[1] for p in pts)
+    elif shape_type == "text":
+        w, h = text_extent(props)
+        x1, y1 = px + props.get("x", 0), py + props.get("y", 0)
+        x2, y2 = x1 + w, y1 + h
+    else:
+        return None
+
+    return _rotated_bounds((x1 - pad, y1 - pad, x2 + pad, y2 + pad), px, py, data.get("rotation", 0))
+
+
+def text_extent(props):
+    """
+    Размер надписи (ширина, высота) по словарю без шрифтов Qt - с запасом: ширина знака
+    не больше TEXT_CHAR_WIDTH высоты шрифта, межстрочный интервал - TEXT_LINE_SPACING высоты
+    """
+    size = props.get("size", DEFAULT_FONT_SIZE)
+    rows = str(props.get("text", "")).split("\n")
+    return max(len(row) for row in rows) * size * TEXT_CHAR_WIDTH, len(rows) * size * TEXT_LINE_SPACING
+
+
+def _rotated_bounds(box, px, py, angle):
+    """Габариты box, повернутого на angle градусов вокруг позиции фигуры (px, py)"""
+    if not angle:
+        return box
+    c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    xs, ys = [], []
+    for x, y in ((box[0], box[1]), (box[2], box[1]), (box[2], box[3]), (box[0], box[3])):
+        dx, dy = x - px, y - py
+        xs.append(px + dx * c - dy * s)
+        ys.append(py + dx * s + dy * c)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def undo_referenced_items(undo_stack):
+    """Фигуры, на которые ссылаются команды истории (их нельзя выгружать из сцены)"""
+    referenced = set()
+    for i in range(undo_stack.count()):
+        referenced.update(command_items(undo_stack.command(i)))
+    return referenced
+
+
+class LazyDocument:
+    """
+    Документ в "ленивом" режиме.
+    Хранит все фигуры как записи (ShapeRecord) и сеточный пространственный индекс по их габаритам.
+    В сцене живут только фигуры, попадающие в видимую область (+ запас).
+    """
+
+    CELL_SIZE = 512       # Размер ячейки сетки (в единицах сцены)
+    MAX_CELLS = 64        # Слишком большие фигуры не раскладываем по ячейкам
+
+    def __init__(self, shapes_data):
+        self.records = []
+        self.errors_count = 0
+        self._cells = {}   # {(cx, cy): [record, ...]}
+        self._large = []   # Фигуры, покрывающие слишком много ячеек
+        self._materialized = {}   # {item: record} - фигуры, сейчас живущие в сцене
+
+        for shape_dict in shapes_data:
+            try:
+                record = ShapeRecord(shape_dict, len(self.records))
+            except Exception as e:
+                print(f"Error loading shape: {e}")
+                self.errors_count += 1
+                continue
+            if record.bounds is None:
+                continue
+            self.records.append(record)
+            self._index(record)
+        self._order_scale = max(len(self.records), 1)
+
+    # --- ПРОСТРАНСТВЕННЫЙ ИНДЕКС ---
+
+    def _cell_range(self, bounds):
+        c = self.CELL_SIZE
+        return (math.floor(bounds[0] / c), math.floor(bounds[1] / c),
+                math.floor(bounds[2] / c), math.floor(bounds[3] / c))
+
+    def _index(self, record):
+        cx1, cy1, cx2, cy2 = self._cell_range(record.bounds)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > self.MAX_CELLS:
+            self._large.append(record)
+            return
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                self._cells.setdefault((cx, cy), []).append(record)
+
+    def _unindex(self, record):
+        cx1, cy1, cx2, cy2 = self._cell_range(record.bounds)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > self.MAX_CELLS:
+            self._large.remove(record)
+            return
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                self._cells[(cx, cy)].remove(record)
+
+    def memory_bytes(self):
+        """Оценка памяти сетки и списков документа (панель статистики; сами записи считаются отдельно)"""
+        key = sys.getsizeof((0, 0)) + 2 * sys.getsizeof(0)
+        return (sys.getsizeof(self.records) + sys.getsizeof(self._large) + sys.getsizeof(self._materialized)
+                + sys.getsizeof(self._cells) + sum(sys.getsizeof(cell) + key for cell in self._cells.values()))
+
+    def query(self, x1, y1, x2, y2):
+        """Записи, чьи габариты пересекают прямоугольник"""
+        found = set()
+        cx1, cy1, cx2, cy2 = self._cell_range((x1, y1, x2, y2))
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                found.update(self._cells.get((cx, cy), ()))
+        found.update(self._large)
+        return [r for r in found
+                if r.bounds[0] <= x2 and r.bounds[2] >= x1 and r.bounds[1] <= y2 and r.bounds[3] >= y1]
+
+    def bounds(self):
+        """Общие габариты документа (x1, y1, x2, y2) или None"""
+        if not self.records:
+            return None
+        return (min(r.bounds[0] for r in self.records), min(r.bounds[1] for r in self.records),
+                max(r.bounds[2] for r in self.records), max(r.bounds[3] for r in self.records))
+
+    # --- МАТЕРИАЛИЗАЦИЯ ---
+
+    def materialize(self, record, scene):
+        if record.item is not None:
+            return record.item
+        try:
+            item = ShapeFactory.from_dict(record.data)
+        except Exception as e:
+            print(f"Error loading shape: {e}")
+            item = None
+        if item is None:
+            # Битая запись: больше не пытаемся её создать
+            self._unindex(record)
+            self.records.remove(record)
+            self.errors_count += 1
+            return None
+
+        # Порядок наложения из файла: все записи лежат ниже новых фигур (z от -1 до 0)
+        item.setZValue(-1.0 + record.order / self._order_scale)
+        record.item = item
+        self._materialized[item] = record
+        scene.addItem(item)
+        return item
+
+    def dematerialize(self, record, scene):
+        """Возвращает фигуру обратно в запись (с учетом всех правок пользователя)"""
+        item = record.item
+        record.data = item.to_dict()
+        record.chunk = None
+        new_bounds = record_bounds(record.data)
+        if new_bounds is not None and new_bounds != record.bounds:
+            self._unindex(record)
+            record.bounds = new_bounds
+            self._index(record)
+        scene.removeItem(item)
+        record.item = None
+        del self._materialized[item]
+
+    def update_visible(self, scene, rect, margin, pinned=()):
+        """
+        Материализует записи в rect + margin и выгружает те, что ушли дальше rect + 2 * margin.
+        pinned - фигуры, которые нельзя выгружать (на них ссылается история Undo).
+        """
+        x1, y1 = rect.left() - margin, rect.top() - margin
+        x2, y2 = rect.right() + margin, rect.bottom() + margin
+
+        for record in self.query(x1, y1, x2, y2):
+            if record.item is None and not scene.layers.is_hidden(record.data.get("layer")):
+                self.materialize(record, scene)
+
+        # Гистерезис: выгружаем только то, что ушло далеко, чтобы не "дребезжать" при прокрутке
+        fx1, fy1 = x1 - margin, y1 - margin
+        fx2, fy2 = x2 + margin, y2 + margin
+        for item, record in list(self._materialized.items()):
+            # Удаленные, сгруппированные, выделенные и "занятые" историей фигуры не трогаем
+            if item.scene() is not scene or not is_root_item(item):
+                continue
+            if item.isSelected() or item in pinned:
+                continue
+            b = item.sceneBoundingRect()
+            if b.left() > fx2 or b.right() < fx1 or b.top() > fy2 or b.bottom() < fy1:
+                self.dematerialize(record, scene)
+
+    def materialize_all(self, scene):
+        """Материализует весь документ. Возвращает список созданных записей (для обратной выгрузки)"""
+        created = [r for r in self.records if r.item is None and not scene.layers.is_hidden(r.data.get("layer"))]
+        for record in created:
+            self.materialize(record, scene)
+        return [r for r in created if r.item is not None]
+
+    @property
+    def materialized_count(self):
+        return len(self._materialized)
+
+    # --- СОХРАНЕНИЕ ---
+
+    def owns(self, item):
+        return item in self._materialized
+
+    def record_of(self, item):
+        """Запись материализованной фигуры или None"""
+        return self._materialized.get(item)
+
+    def shape_sources(self, scene):
+        """Все фигуры документа в исходном порядке: записи (ShapeRecord) или материализованные фигуры"""
+        for record in self.records:
+            item = record.item
+            if item is None:
+                yield record
+            elif (item.scene() is scene and is_root_item(item)) or scene.layers.is_stashed(item):
+                yield item
+            # Иначе фигура удалена или стала частью новой группы
+
+    def rename_layer(self, old_name, new_name):
+        """Слой переименован: записи без фигур тоже переходят в него"""
+        for record in self.records:
+            if record.item is None and record.data.get("layer") == old_name:
+                record.data["layer"] = new_name
+                record.chunk = None
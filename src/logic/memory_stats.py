@@ -0,0 +1,479 @@
+# src/logic/memory_stats.py
+"""
+Статистика документа и оценка занимаемой памяти (панель View -> Document Statistics).
+
+Подсчет идет частями (MemoryScan.run с бюджетом времени): таймер окна продолжает его между событиями,
+поэтому панель на документе в миллион фигур открывается сразу. Один шаг - одна корневая фигура,
+запись ленивого документа или команда истории. Единственный неделимый вызов - scene.items()
+(список корневых фигур сцены); в ленивом режиме в сцене только видимая часть документа.
+
+Байты - оценка, а не точный замер: размер объектов C++ (QGraphicsItem, контур) берется по константам,
+Python-часть - через sys.getsizeof по атрибутам. Категории:
+- items - объекты QGraphicsItem (C++ и обертки shiboken);
+- paths - элементы QPainterPath;
+- python - атрибуты фигур (__dict__, вершины array('d')) и словари записей ленивого документа;
+- undo - команды истории и фигуры, которые держит только история (удаленные из сцены);
+- caches - кэш сохранения, индексы (привязка, атрибуты, сетка документа) и картинки отрисовки.
+Точную картину Python-выделений дает AllocationTracker (разница двух снимков tracemalloc).
+"""
+import heapq
+import json
+import os
+import sys
+from time import perf_counter
+from PySide6.QtCore import QObject
+from PySide6.QtWidgets import QGraphicsItem, QGraphicsView
+from src.logic.commands import command_items
+from src.logic.shapes import is_root_item
+
+ITEM_BYTES = 360          # QGraphicsPathItem: объект C++ + приватные данные (перо, кисть, габариты) + обертка
+GROUP_BYTES = 320         # QGraphicsItemGroup
+PATH_BYTES = 64           # QPainterPath без элементов
+PATH_ELEMENT_BYTES = 24   # QPainterPath::Element: x, y (double) + тип
+COMMAND_BYTES = 96        # QUndoCommand: объект C++ + обертка
+LARGEST_COUNT = 20        # Сколько самых тяжелых фигур попадает в отчет
+BOX_VERTICES = 4          # Прямоугольник и эллипс (четыре опорные точки)
+
+CATEGORIES = (
+    ("items", "Объекты QGraphicsItem"),
+    ("paths", "Данные контуров"),
+    ("python", "Атрибуты Python"),
+    ("undo", "История отмены"),
+    ("caches", "Кэши и индексы"),
+)
+CACHE_NAMES = {
+    "save_chunks": "Кэш сохранения",
+    "snap_index": "Индекс привязки",
+    "query_index": "Индекс атрибутов",
+    "document_grid": "Сетка ленивого документа",
+    "minimap": "Картинка миникарты",
+    "view_background": "Кэш фона холста",
+    "baked_chunks": "Запеченные чанки",
+}
+
+
+def object_bytes(value, skip=(), depth=4):
+    """
+    Размер значения атрибута (sys.getsizeof) вместе с содержимым контейнеров до depth уровней.
+    Объекты Qt (фигуры, сцена) считаются отдельно, значения с id из skip - уже учтены.
+    """
+    if value is None or isinstance(value, (bool, QGraphicsItem, QObject)) or id(value) in skip:
+        return 0
+    size = sys.getsizeof(value)
+    if depth:
+        if isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(object_bytes(v, skip, depth - 1) for v in value)
+        elif isinstance(value, dict):
+            size += sum(object_bytes(k, skip, depth - 1) + object_bytes(v, skip, depth - 1)
+                        for k, v in value.items())
+    return size
+
+
+def data_bytes(data):
+    """
+    Размер словаря фигуры из JSON со всем содержимым (вложенность не ограничена).
+    Ключи не считаются: json.load создает каждую строку ключа один раз на весь файл.
+    """
+    size = 0
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+    return size
+
+
+def record_vertices(kind, props):
+    """Число вершин фигуры по словарю (без разбора блоков вершин)"""
+    if kind == "polygon":
+        points = props.get("points") or ()
+        if isinstance(points, dict):
+            # Блок f64le в base64: 4 символа - 3 байта, 16 байт - вершина
+            return len(points.get("data", "")) * 3 // 4 // 16
+        return len(points)
+    if kind == "path":
+        return sum(len(contour) for contour in props.get("contours", ()))
+    if kind == "line":
+        return 2
+    return BOX_VERTICES if kind in ("rect", "ellipse") else 0
+
+
+def item_vertices(item):
+    if not hasattr(item, "path"):
+        return 0  # Надпись
+    coords = getattr(item, "coords", None)  # Polygon, Line
+    if coords is not None:
+        return len(coords) // 2
+    contours = getattr(item, "contours", None)  # PathShape
+    if contours is not None:
+        return sum(len(contour) for contour in contours)
+    return BOX_VERTICES
+
+
+def process_memory():
+    """Память процесса (resident set, байты) или None, если платформа не поддерживается"""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+    return None
+
+
+def format_bytes(size):
+    for unit in ("Б", "КБ", "МБ"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "Б" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
+
+class MemoryScan:
+    """
+    Подсчет статистики документа частями: run(budget) работает не дольше budget секунд.
+    Готовый результат - report() (словарь, его же пишет экспорт в JSON).
+    extra - дополнительные владельцы кэшей [(имя, объект с memory_bytes())], например миникарта.
+    """
+
+    def __init__(self, canvas, extra=()):
+        self.canvas = canvas
+        self.scene = canvas.scene
+        self.undo_stack = canvas.undo_stack
+        self.extra = list(extra)
+
+        self.done = False
+        self.position = 0   # Обработано шагов
+        self.total = 0      # Всего шагов (известно после первого шага)
+        self.elapsed = 0.0  # Время подсчета без пауз между шагами
+        self.roots = 0
+        self.records = 0
+        self.hidden = 0
+        self.vertices = 0
+        self.max_depth = 0
+        self.types = {}     # тип -> [число фигур, вершины]
+        self.bytes = dict.fromkeys((key for key, _ in CATEGORIES), 0)
+        self.caches = dict.fromkeys(CACHE_NAMES, 0)
+        self.commands = 0
+        self.held_items = 0  # Фигуры, которых нет в сцене и слоях - их держит только история
+        self._largest = []  # Куча (байты, номер, описание, источник)
+        self._steps = self._scan()
+
+    def run(self, budget=None):
+        """Продолжает подсчет не дольше budget секунд (None - до конца) -> True, если подсчет закончен"""
+        start = perf_counter()
+        deadline = None if budget is None else start + budget
+        try:
+            for _ in self._steps:
+                if deadline is not None and perf_counter() >= deadline:
+                    return False
+            self.done = True
+            return True
+        finally:
+            self.elapsed += perf_counter() - start
+
+    # --- ПОДСЧЕТ ---
+
+    def _scan(self):
+        scene = self.scene
+        document = scene.document
+        records = document.records if document else []
+        # Список содержит и детей групп: корни отбираются по ходу подсчета
+        items = scene.items()
+        hidden = list(scene.layers.hidden_shapes())
+        self.total = len(records) + len(items) + len(hidden) + self.undo_stack.count() + 1
+        yield
+
+        for record in records:
+            self.position += 1
+            if record.item is None:
+                self._add_record(record)
+                yield
+        for item in items:
+            self.position += 1
+            if hasattr(item, "to_dict") and not item.is_preview and is_root_item(item):
+                self._add_root(item, "scene")
+                yield
+        for item in hidden:
+            self.position += 1
+            self._add_root(item, "hidden")
+            yield
+
+        held = set()
+        for i in range(self.undo_stack.count()):
+            self._add_command(self.undo_stack.command(i), held)
+            self.position += 1
+            yield
+
+        self._add_caches()
+        self.position += 1
+
+    def _count(self, kind, vertices):
+        entry = self.types.get(kind)
+        if entry is None:
+            entry = self.types[kind] = [0, 0]
+        entry[0] += 1
+        entry[1] += vertices
+        self.vertices += vertices
+
+    def _push_largest(self, size, info, source):
+        entry = (size, self.position, info, source)
+        if len(self._largest) < LARGEST_COUNT:
+            heapq.heappush(self._largest, entry)
+        elif size > self._largest[0][0]:
+            heapq.heapreplace(self._largest, entry)
+
+    def _add_record(self, record):
+        """Запись ленивого документа без фигуры: словарь JSON + байты сохранения"""
+        self.roots += 1
+        self.records += 1
+        python = sys.getsizeof(record) + data_bytes(record.data)
+        chunk = sys.getsizeof(record.chunk) if record.chunk is not None else 0
+        self.bytes["python"] += python
+        self.caches["save_chunks"] += chunk
+
+        vertices = 0
+        pending = [(record.data, 0)]
+        while pending:
+            data, depth = pending.pop()
+            children = data.get("children", ())
+            if data.get("type") == "group" and len(children) != 1:
+                depth += 1
+                self.max_depth = max(self.max_depth, depth)
+                self._count("group", 0)
+            if data.get("type") == "group":
+                # Группу из одного ребенка фабрика заменяет самим ребенком
+                pending.extend((child, depth) for child in children)
+                continue
+            count = record_vertices(data.get("type"), data.get("props", {}))
+            self._count(data.get("type"), count)
+            vertices += count
+        info = {"id": record.data.get("id"), "type": record.data.get("type"), "where": "record",
+                "bytes": python + chunk, "vertices": vertices}
+        self._push_largest(python + chunk, info, record)
+
+    def _item_bytes(self, root, count=True, skip=()):
+        """Оценка фигуры со всеми детьми -> (items, paths, python, кэш сохранения, вершины)"""
+        qt = paths = python = chunks = vertices = 0
+        pending = [(root, 0)]
+        while pending:
+            item, depth = pending.pop()
+            attributes = getattr(item, "__dict__", {})
+            python += sys.getsizeof(attributes) + sum(object_bytes(value, skip) for key, value in attributes.items()
+                                                      if key != "_save_chunk")
+            chunk = attributes.get("_save_chunk")
+            if chunk is not None:
+                chunks += sys.getsizeof(chunk[1])
+            kind = item.type_name.lower() if hasattr(item, "type_name") else "other"
+            if kind == "group":
+                qt += GROUP_BYTES
+                depth += 1
+                if count:
+                    self.max_depth = max(self.max_depth, depth)
+                    self._count(kind, 0)
+                pending.extend((child, depth) for child in item.childItems())
+                continue
+            qt += ITEM_BYTES
+            if hasattr(item, "path"):
+                paths += PATH_BYTES + PATH_ELEMENT_BYTES * item.path().elementCount()
+            count_vertices = item_vertices(item)
+            vertices += count_vertices
+            if count:
+                self._count(kind, count_vertices)
+        return qt, paths, python, chunks, vertices
+
+    def _add_root(self, item, where):
+        """Корневая фигура сцены или скрытого слоя"""
+        try:
+            qt, paths, python, chunks, vertices = self._item_bytes(item)
+        except RuntimeError:
+            return  # Фигуру удалили, пока шел подсчет
+        self.roots += 1
+        if where == "hidden":
+            self.hidden += 1
+        self.bytes["items"] += qt
+        self.bytes["paths"] += paths
+        self.bytes["python"] += python
+        self.caches["save_chunks"] += chunks
+        size = qt + paths + python + chunks
+        info = {"id": item.shape_id, "type": item.type_name.lower(), "where": where,
+                "bytes": size, "vertices": vertices}
+        self._push_largest(size, info, item)
+
+    def _add_command(self, cmd, held):
+        """
+        Команда истории (с дочерними командами макроса) и фигуры, которые держит только она.
+        Массивы вершин, общие с живыми фигурами (слепки отмены делят их), уже учтены в фигурах.
+        """
+        if cmd is None:
+            return
+        scene, layers = self.scene, self.scene.layers
+        items = command_items(cmd)
+        skip = {id(getattr(item, "coords", None)) for item in items}
+        size = 0
+        pending = [cmd]
+        while pending:
+            command = pending.pop()
+            size += COMMAND_BYTES + object_bytes(getattr(command, "__dict__", {}), skip)
+            pending.extend(command.child(i) for i in range(command.childCount()))
+        for item in items:
+            try:
+                if item in held or item.scene() is scene or layers.is_stashed(item):
+                    continue
+                held.add(item)
+                size += sum(self._item_bytes(item, count=False, skip=skip)[:4])
+            except RuntimeError:
+                continue
+        self.held_items = len(held)
+        self.commands += 1
+        self.bytes["undo"] += size
+
+    def _add_caches(self):
+        """Индексы и картинки: их владельцы сами знают свой размер (memory_bytes)"""
+        owners = [("snap_index", self.scene.snap_engine), ("query_index", self.scene.query_index),
+                  ("document_grid", self.scene.document), ("baked_chunks", self.scene.baker)] + self.extra
+        for name, owner in owners:
+            memory_bytes = getattr(owner, "memory_bytes", None)
+            if memory_bytes is not None:
+                self.caches[name] = memory_bytes()
+        view = self.canvas
+        if view.cacheMode() & QGraphicsView.CacheModeFlag.CacheBackground:
+            ratio = view.viewport().devicePixelRatioF()
+            self.caches["view_background"] = int(view.viewport().width() * view.viewport().height() * 4 * ratio ** 2)
+        self.bytes["caches"] = sum(self.caches.values())
+
+    # --- ОТЧЕТ ---
+
+    def largest(self):
+        """Самые тяжелые корневые фигуры по убыванию -> [(описание, источник)]"""
+        return [(info, source) for _, _, info, source in sorted(self._largest, key=lambda e: (-e[0], e[1]))]
+
+    def report(self):
+        return {
+            "complete": self.done,
+            "elapsed": round(self.elapsed, 3),
+            "shapes": {"roots": self.roots, "records": self.records, "hidden": self.hidden,
+                       "total": sum(count for count, _ in self.types.values()),
+                       "vertices": self.vertices, "max_group_depth": self.max_depth,
+                       "by_type": {kind: {"count": count, "vertices": vertices}
+                                   for kind, (count, vertices) in sorted(self.types.items())}},
+            "bytes": dict(self.bytes, total=sum(self.bytes.values())),
+            "caches": dict(self.caches),
+            "undo": {"commands": self.commands, "held_items": self.held_items},
+            "largest": [info for info, _ in self.largest()],
+            "process_memory": process_memory(),
+        }
+
+
+def format_report(report, allocations=None):
+    """Отчет текстом (экспорт в .txt); allocations - строки AllocationTracker.diff"""
+    shapes = report["shapes"]
+    lines = ["Статистика документа", ""]
+    lines.append(f"Корневых фигур: {shapes['roots']} (записей без фигур: {shapes['records']}, "
+                 f"в скрытых слоях: {shapes['hidden']})")
+    lines.append(f"Всего фигур: {shapes['total']}, вершин: {shapes['vertices']}, "
+                 f"наибольшая вложенность групп: {shapes['max_group_depth']}")
+    lines += ["", "Фигуры по типам:"]
+    for kind, entry in shapes["by_type"].items():
+        lines.append(f"  {kind:<10} {entry['count']:>10} шт. {entry['vertices']:>12} вершин")
+    lines += ["", "Память (оценка):"]
+    for key, title in CATEGORIES:
+        lines.append(f"  {title:<28} {format_bytes(report['bytes'][key]):>12}")
+    lines.append(f"  {'Итого':<28} {format_bytes(report['bytes']['total']):>12}")
+    for key, title in CACHE_NAMES.items():
+        if report["caches"].get(key):
+            lines.append(f"    {title:<26} {format_bytes(report['caches'][key]):>12}")
+    if report["process_memory"]:
+        lines.append(f"  {'Процесс целиком':<28} {format_bytes(report['process_memory']):>12}")
+    lines.append(f"История: {report['undo']['commands']} команд, "
+                 f"фигур только в истории: {report['undo']['held_items']}")
+    lines += ["", "Самые тяжелые фигуры:"]
+    for info in report["largest"]:
+        lines.append(f"  {format_bytes(info['bytes']):>10}  {info['type']:<8} {info['vertices']:>9} вершин  "
+                     f"{info['where']:<7} {info['id']}")
+    if allocations:
+        lines += ["", "Разница снимков tracemalloc:"]
+        for row in allocations:
+            lines.append(f"  {format_bytes(row['size_diff']):>10} {row['count_diff']:>+9}  {row['where']}")
+    if not report["complete"]:
+        lines += ["", "Подсчет не закончен: данные неполные"]
+    return "\n".join(lines) + "\n"
+
+
+def export_report(filename, report, allocations=None):
+    """Отчет в файл: .json - словарь report (+ allocations), иначе - текстом"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        if filename.lower().endswith(".json"):
+            json.dump(dict(report, allocations=allocations or []), f, indent=4, ensure_ascii=False)
+        else:
+            f.write(format_report(report, allocations))
+
+
+class AllocationTracker:
+    """
+    Разница Python-выделений между двумя моментами (tracemalloc): start() запоминает снимок,
+    diff() снимает второй и сравнивает по строкам кода. Пока трассировка включена, выделения
+    памяти заметно медленнее, поэтому она включается только по кнопке и выключается после diff().
+    """
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self._before = None
+        self._started = False  # Трассировку включили мы (а не python -X tracemalloc)
+
+    @property
+    def active(self):
+        return self._before is not None
+
+    @staticmethod
+    def _snapshot():
+        import tracemalloc
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def start(self):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+        self._before = self._snapshot()
+
+    def diff(self, limit=25):
+        """Второй снимок -> [{"where", "size_diff", "count_diff", "size"}] по убыванию роста"""
+        if self._before is None:
+            return []
+        stats = self._snapshot().compare_to(self._before, "lineno")
+        self.stop()
+        return [{"where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_diff": stat.size_diff, "count_diff": stat.count_diff, "size": stat.size}
+                for stat in stats[:limit]]
+
+    def stop(self):
+        import tracemalloc
+        self._before = None
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
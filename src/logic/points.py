@@ -0,0 +1,87 @@
+# src/logic/points.py
+"""
+Упакованные вершины ломаных: array('d') подряд x0, y0, x1, y1, ... (float64, 16 байт на вершину)
+вместо списка QPointF (Python-обертка + C++-объект на каждую вершину).
+
+- Контур строится из массива целиком: байты массива читаются в QPolygonF через QDataStream
+  (формат QList<QPointF>: число точек + пары double), без QPointF на вершину.
+- В JSON короткие ломаные пишутся как раньше - списком [[x, y], ...], длинные - блоком
+  {"encoding": "f64le", "data": base64 байтов массива}: без разбора тысяч чисел при загрузке.
+  Разностное кодирование не используется: сумма разностей float64 не восстанавливает точки побитно.
+- tobytes() массива - сырые байты для двоичных форматов (тот же формат, что в блоке).
+"""
+import base64
+import struct
+import sys
+from array import array
+from itertools import chain
+from PySide6.QtCore import QByteArray, QDataStream, QIODevice
+from PySide6.QtGui import QPolygonF
+
+PACKED_MIN_POINTS = 64  # Ломаные короче пишутся в JSON списком точек (читаемо и совместимо со старыми версиями)
+ENCODING = "f64le"
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def pack_points(points):
+    """
+    Вершины -> array('d'). Принимает массив array('d') (используется как есть, без копии),
+    массив numpy (n, 2), список QPointF или список пар [x, y].
+    """
+    if isinstance(points, array):
+        return points
+    if hasattr(points, "dtype"):
+        return array('d', points.astype(float, copy=False).tobytes())
+    if points and hasattr(points[0], "x"):
+        return array('d', chain.from_iterable((p.x(), p.y()) for p in points))
+    return array('d', chain.from_iterable(points))
+
+
+def point_pairs(coords):
+    """Пары (x, y) массива вершин"""
+    return zip(coords[0::2], coords[1::2])
+
+
+def encode_points(coords):
+    """Значение поля "points" в JSON: список пар для коротких ломаных, блок байтов для длинных"""
+    if len(coords) < 2 * PACKED_MIN_POINTS:
+        return [[x, y] for x, y in point_pairs(coords)]
+    if _BIG_ENDIAN:
+        coords = array('d', coords)
+        coords.byteswap()
+    return {"encoding": ENCODING, "data": base64.b64encode(coords.tobytes()).decode("ascii")}
+
+
+def decode_points(value):
+    """Поле "points" из JSON (список пар или блок) -> array('d')"""
+    if isinstance(value, dict):
+        if value.get("encoding") != ENCODING:
+            raise ValueError(f"Неизвестная кодировка точек: {value.get('encoding')}")
+        coords = array('d', base64.b64decode(value.get("data", "")))
+        if _BIG_ENDIAN:
+            coords.byteswap()
+        return coords
+    return pack_points(value or [])
+
+
+def points_bounds(coords):
+    """Габариты вершин (x1, y1, x2, y2) или None"""
+    if not coords:
+        return None
+    xs, ys = coords[0::2], coords[1::2]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def to_polygonf(coords):
+    """QPolygonF из массива вершин одним чтением байтов (без QPointF на вершину)"""
+    header = struct.pack("<I", len(coords) // 2)
+    if _BIG_ENDIAN:
+        coords = array('d', coords)
+        coords.byteswap()
+    data = QByteArray(header + coords.tobytes())  # Поток не владеет буфером: держим ссылку до чтения
+    stream = QDataStream(data, QIODevice.ReadOnly)
+    stream.setByteOrder(QDataStream.LittleEndian)
+    stream.setFloatingPointPrecision(QDataStream.DoublePrecision)
+    polygon = QPolygonF()
+    stream >> polygon
+    return polygon
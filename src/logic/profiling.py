@@ -0,0 +1,131 @@
+# src/logic/profiling.py
+import functools
+import os
+import threading
+from collections import deque, defaultdict
+from time import perf_counter_ns
+
+
+class Tracer:
+    """
+    Легковесная трассировка "горячих" мест (обработчики мыши, инструменты, команды, фабрика, сохранение, отрисовка).
+
+    Выключенный трассировщик стоит одну проверку флага. Включенный пишет интервалы
+    в кольцевой буфер (старые события вытесняются) и умеет выгружать их в формат
+    Chrome Trace Event (открывается в chrome://tracing или https://ui.perfetto.dev).
+    Вложенность интервалов восстанавливается по времени начала и длительности.
+    """
+
+    def __init__(self, capacity=200_000):
+        self.enabled = False
+        self.events = deque(maxlen=capacity)  # (ph, name, ts_ns, dur_ns | value, tid)
+        self.counters = defaultdict(int)
+        self._origin = perf_counter_ns()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def clear(self):
+        self.events.clear()
+        self.counters.clear()
+        self._origin = perf_counter_ns()
+
+    # --- ЗАПИСЬ ---
+
+    def span(self, name):
+        """Контекстный менеджер: with TRACER.span("load"): ..."""
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def add_span(self, name, start_ns, end_ns):
+        self.events.append(("X", name, start_ns, end_ns - start_ns, threading.get_ident()))
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def snapshot_counters(self):
+        """Кладет текущие значения счетчиков в буфер (в трассе они станут графиками)"""
+        if not self.enabled:
+            return
+        now = perf_counter_ns()
+        tid = threading.get_ident()
+        for name, value in self.counters.items():
+            self.events.append(("C", name, now, value, tid))
+
+    # --- ВЫГРУЗКА ---
+
+    def to_chrome_trace(self):
+        pid = os.getpid()
+        trace = []
+        for ph, name, ts, value, tid in list(self.events):
+            event = {"name": name, "ph": ph, "ts": (ts - self._origin) / 1000, "pid": pid, "tid": tid}
+            if ph == "X":
+                event["dur"] = value / 1000
+            else:
+                event["args"] = {name: value}
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, filename):
+        import json
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def summary(self):
+        """{имя: (кол-во вызовов, суммарно мс, максимум мс)}"""
+        stats = {}
+        for ph, name, _, dur, _ in list(self.events):
+            if ph != "X":
+                continue
+            count, total, worst = stats.get(name, (0, 0, 0))
+            stats[name] = (count + 1, total + dur, max(worst, dur))
+        return {name: (c, total / 1e6, worst / 1e6) for name, (c, total, worst) in stats.items()}
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add_span(self.name, self.start, perf_counter_ns())
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+# Глобальный трассировщик приложения. Можно включить при запуске: VECTOR_EDITOR_TRACE=1
+TRACER = Tracer()
+TRACER.enable(os.environ.get("VECTOR_EDITOR_TRACE") == "1")
+
+
+def traced(name):
+    """Декоратор: замеряет время вызова функции, если трассировка включена"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                TRACER.add_span(name, start, perf_counter_ns())
+        return wrapper
+    return decorator
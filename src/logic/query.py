@@ -0,0 +1,322 @@
+# src/logic/query.py
+"""
+Поиск фигур по атрибутам: тип, цвет, толщина, слой, область, группа ("Select Similar", строка поиска).
+
+Инвертированные индексы: значение атрибута -> множество фигур. Запрос - пересечение нескольких
+множеств (от меньшего к большему), поэтому стоит миллисекунды и на сотнях тысяч фигур.
+Индексируются корневые фигуры сцены и записи ленивого документа, еще не ставшие фигурами.
+Цвет и толщина группы - цвета и толщины всех фигур её поддерева (как у ChangeColorCommand для группы).
+
+Индекс строится при первом запросе, дальше обновляются только измененные фигуры: о них сообщает
+EditorScene.items_changed() (команды истории через холст, слои, группировка) - как и индексу привязки.
+"""
+import shlex
+import sys
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QColor
+from src.logic.shapes import Shape, Group, DEFAULT_STROKE_WIDTH, is_root_item
+from src.logic.profiling import traced
+from src.logic.baking import with_baked
+
+FIELDS = ("type", "color", "width", "layer")
+# Ключи строки поиска -> параметры QueryIndex.query
+QUERY_KEYS = {"type": "type", "color": "color", "width": "width", "layer": "layer", "group": "grouped", "in": "region"}
+
+_colors = {}  # Строка цвета из файла/фигуры -> #rrggbb (разных цветов в документе немного)
+
+
+def color_key(color):
+    key = _colors.get(color)
+    if key is None:
+        key = _colors[color] = QColor(color).name()
+    return key
+
+
+def _item_style(item, colors, widths):
+    """Цвета и толщины простых фигур поддерева фигуры"""
+    if isinstance(item, Group):
+        for child in item.childItems():
+            if isinstance(child, Shape):
+                _item_style(child, colors, widths)
+    else:
+        colors.add(color_key(item.color))
+        widths.add(item.stroke_width)
+
+
+def _data_style(data, colors, widths):
+    """То же по словарю записи (ShapeFactory.from_dict дал бы фигуру с такими цветами и толщинами)"""
+    children = data.get("children")
+    if children is not None:
+        for child in children:
+            _data_style(child, colors, widths)
+    else:
+        props = data.get("props", {})
+        colors.add(color_key(props.get("color", "black")))
+        widths.add(props.get("width", DEFAULT_STROKE_WIDTH))
+
+
+def item_keys(item):
+    """Значения атрибутов фигуры: (тип, цвета, толщины, слой)"""
+    colors, widths = set(), set()
+    _item_style(item, colors, widths)
+    return item.type_name.lower(), tuple(colors), tuple(widths), item.layer
+
+
+def record_keys(data):
+    """Значения атрибутов записи ленивого документа (группа из одного ребенка - это сам ребенок)"""
+    while data.get("type") == "group" and len(data.get("children", ())) == 1:
+        data = data["children"][0]
+    colors, widths = set(), set()
+    _data_style(data, colors, widths)
+    return data.get("type"), tuple(colors), tuple(widths), data.get("layer")
+
+
+def _values(value):
+    """Одно значение или набор значений критерия"""
+    return tuple(value) if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+
+
+def parse_query(text):
+    """
+    Строка поиска -> параметры QueryIndex.query. Формат: ключ:значение через пробел,
+    несколько значений - через запятую, значения с пробелами - в кавычках:
+        type:line,polygon color:red width:3 layer:"Layer 1" group:no in:view
+    in - view (видимая область), selection (габариты выделения) или x1,y1,x2,y2.
+    """
+    criteria = {}
+    try:
+        tokens = shlex.split(text)
+    except ValueError as e:
+        raise ValueError(f"Ошибка в запросе: {e}")
+    for token in tokens:
+        key, sep, value = token.partition(":")
+        if not sep:
+            key, sep, value = token.partition("=")
+        key = key.strip().lower()
+        if not sep or key not in QUERY_KEYS or not value:
+            raise ValueError(f"Непонятное условие: {token} (ключи: {', '.join(QUERY_KEYS)})")
+        values = [v.strip() for v in value.split(",") if v.strip()]
+        if key == "type":
+            criteria["type"] = tuple(v.lower() for v in values)
+        elif key == "color":
+            for v in values:
+                if not QColor.isValidColorName(v):
+                    raise ValueError(f"Неизвестный цвет: {v}")
+            criteria["color"] = tuple(QColor(v).name() for v in values)
+        elif key == "width":
+            try:
+                criteria["width"] = tuple(int(float(v)) for v in values)
+            except ValueError:
+                raise ValueError(f"Толщина должна быть числом: {value}")
+        elif key == "layer":
+            criteria["layer"] = tuple(values)
+        elif key == "group":
+            if value.lower() not in ("yes", "no", "true", "false", "1", "0"):
+                raise ValueError(f"group: yes или no, а не {value}")
+            criteria["grouped"] = value.lower() in ("yes", "true", "1")
+        elif key == "in":
+            if value.lower() in ("view", "selection"):
+                criteria["region"] = value.lower()
+            else:
+                try:
+                    x1, y1, x2, y2 = (float(v) for v in values)
+                except ValueError:
+                    raise ValueError(f"in: view, selection или x1,y1,x2,y2, а не {value}")
+                criteria["region"] = QRectF(min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1))
+    return criteria
+
+
+class QueryIndex:
+    """
+    Инвертированные индексы атрибутов сцены (и ленивого документа).
+    Источник - корневая фигура сцены или запись ShapeRecord без фигуры.
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self._built = False
+        self._dirty = set()
+        self._keys = {}  # источник -> (тип, цвета, толщины, слой)
+        self._index = {field: {} for field in FIELDS}  # поле -> значение -> {источник}
+
+    def reset(self):
+        """Сцена очищена: индекс будет построен заново при следующем запросе"""
+        self._built = False
+        self._dirty.clear()
+        self._keys.clear()
+        self._index = {field: {} for field in FIELDS}
+
+    def memory_bytes(self):
+        """Оценка памяти индекса (панель статистики): ключи источников + множества значений"""
+        entry = sys.getsizeof((None,) * 4) + 2 * sys.getsizeof((None,))
+        return (sys.getsizeof(self._keys) + len(self._keys) * entry
+                + sum(sys.getsizeof(sources) for index in self._index.values() for sources in index.values()))
+
+    def invalidate(self, items):
+        """Фигуры добавлены, удалены или изменены (обновятся при следующем запросе)"""
+        if not self._built:
+            return
+        document = self.scene.document
+        for item in items:
+            self._dirty.add(item)
+            # Материализация и выгрузка ленивого документа меняют и запись фигуры
+            record = document.record_of(item) if document else None
+            if record is not None:
+                self._dirty.add(record)
+
+    def rename_layer(self, old_name, new_name):
+        """Слой переименован: записи ленивого документа меняют слой без уведомлений о фигурах"""
+        index = self._index["layer"]
+        sources = index.pop(old_name, set())
+        if not sources:
+            return
+        index.setdefault(new_name, set()).update(sources)
+        for source in sources:
+            kind, colors, widths, _ = self._keys[source]
+            self._keys[source] = (kind, colors, widths, new_name)
+
+    # --- ПОСТРОЕНИЕ ---
+
+    def _is_indexed(self, item):
+        return (isinstance(item, Shape) and not item.is_preview
+                and item.scene() is self.scene and is_root_item(item))
+
+    def _add(self, source, keys):
+        self._keys[source] = keys
+        kind, colors, widths, layer = keys
+        index = self._index
+        index["type"].setdefault(kind, set()).add(source)
+        for color in colors:
+            index["color"].setdefault(color, set()).add(source)
+        for width in widths:
+            index["width"].setdefault(width, set()).add(source)
+        index["layer"].setdefault(layer, set()).add(source)
+
+    def _remove(self, source):
+        keys = self._keys.pop(source, None)
+        if keys is None:
+            return
+        kind, colors, widths, layer = keys
+        for field, values in (("type", (kind,)), ("color", colors), ("width", widths), ("layer", (layer,))):
+            index = self._index[field]
+            for value in values:
+                sources = index[value]
+                sources.discard(source)
+                if not sources:
+                    del index[value]
+
+    @traced("QueryIndex.update")
+    def update(self):
+        if not self._built:
+            self._built = True
+            for item in self.scene.items():
+                if self._is_indexed(item):
+                    self._add(item, item_keys(item))
+            if self.scene.document:
+                for record in self.scene.document.records:
+                    if record.item is None:
+                        self._add(record, record_keys(record.data))
+            return
+
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        roots = set()
+        for source in dirty:
+            self._remove(source)
+            if not isinstance(source, Shape):
+                # Запись индексируется, только пока у неё нет фигуры (иначе индексируется фигура)
+                if source.item is None:
+                    self._add(source, record_keys(source.data))
+            elif source.scene() is self.scene:
+                # Фигура внутри группы обновляется вместе с группой
+                roots.add(source.topLevelItem())
+        for root in roots:
+            self._remove(root)
+            if self._is_indexed(root):
+                self._add(root, item_keys(root))
+
+    # --- ЗАПРОСЫ ---
+
+    def _layer_names(self, names):
+        """Ключи индекса слоев для имен слоев (в нижний слой попадают и фигуры без слоя / с неизвестным слоем)"""
+        layers = self.scene.layers
+        bottom = layers.layers[0].name
+        keys = set(names)
+        if bottom in keys:
+            keys.update(key for key in self._index["layer"] if layers.layer(key) is None)
+        return keys
+
+    def _region_sources(self, rect):
+        """Источники, чьи габариты пересекают rect (индекс сцены Qt с запеченными фигурами + сетка ленивого документа)"""
+        keys = self._keys
+        items = with_baked(self.scene.items(rect, Qt.ItemSelectionMode.IntersectsItemBoundingRect), rect)
+        found = {root for root in (item.topLevelItem() for item in items) if root in keys}
+        document = self.scene.document
+        if document:
+            found.update(record for record in document.query(rect.left(), rect.top(), rect.right(), rect.bottom())
+                         if record.item is None)
+        return found
+
+    @traced("QueryIndex.query")
+    def query(self, type=None, color=None, width=None, layer=None, region=None, grouped=None):
+        """
+        Фигуры, подходящие под все условия (None - условие не задано) -> множество источников.
+        Каждое условие - одно значение или набор значений (подходит любое из них).
+        Фигуры заблокированных и скрытых слоев не возвращаются: выделить их нельзя.
+        """
+        self.update()
+        index = self._index
+        sets = []
+        for field, value in (("type", type), ("color", color), ("width", width)):
+            if value is not None:
+                values = _values(value)
+                if field == "color":
+                    values = [color_key(v) for v in values]
+                sets.append(set().union(*(index[field].get(v, ()) for v in values)))
+        if layer is not None:
+            sets.append(set().union(*(index["layer"].get(key, ()) for key in self._layer_names(_values(layer)))))
+        if grouped is not None:
+            groups = index["type"].get("group", set())
+            sets.append(groups if grouped else set(self._keys).difference(groups))
+        if region is not None:
+            sets.append(self._region_sources(region))
+
+        if not sets:
+            found = set(self._keys)
+        else:
+            sets.sort(key=len)
+            found = set(sets[0])
+            for other in sets[1:]:
+                if not found:
+                    break
+                found.intersection_update(other)
+
+        # Скрытых слоев в индексе нет (их фигуры вне сцены), но записи ленивого документа в них есть
+        closed = [layer.name for layer in self.scene.layers.layers if layer.locked or not layer.visible]
+        if closed and found:
+            found.difference_update(*(index["layer"].get(key, ()) for key in self._layer_names(closed)))
+        return found
+
+    def values(self, field):
+        """Значения поля, встречающиеся в документе (для подсказок строки поиска)"""
+        self.update()
+        return sorted(self._index[field], key=str)
+
+
+def similar_criteria(items, fields=("type", "color", "width")):
+    """Условия "Select Similar" по выделенным фигурам: значения полей всех выделенных (любое из них)"""
+    criteria = {field: set() for field in fields}
+    for item in items:
+        if not isinstance(item, Shape):
+            continue
+        keys = dict(zip(FIELDS, item_keys(item)))
+        for field in fields:
+            value = keys[field]
+            if field == "layer":
+                criteria[field].add(value)
+            elif isinstance(value, tuple):
+                criteria[field].update(value)
+            else:
+                criteria[field].add(value)
+    return {field: tuple(values) for field, values in criteria.items() if values}
@@ -0,0 +1,142 @@
+# src/logic/save_cache.py
+"""
+Инкрементальное сохранение проекта в JSON.
+
+Каждая фигура хранит готовые байты своей записи (_save_chunk) - ровно то, что json.dump(indent=4)
+написал бы для неё на её глубине в файле. Байты группы собираются из байтов детей, поэтому
+после правки одной фигуры заново сериализуется только она, а её предки лишь склеиваются заново.
+Хеш байтов (hash(chunk), bytes его кэширует) - хеш содержимого всего поддерева.
+
+Кэш сбрасывает EditorScene.items_changed: фигура, которой коснулась команда, сериализуется заново
+вместе с потомками (масштаб и цвет группы меняют детей), а у её предков сбрасываются только байты.
+Файл пишется последовательно: заголовок, байты корневых записей, хвост (слои).
+При первом сохранении записи без кэша сериализуются пачками (см. root_chunks).
+"""
+import json
+from src.logic.shapes import Shape, Group, is_root_item
+
+INDENT = 4
+SHAPES_LEVEL = 2  # Глубина корневых записей: {"shapes": [{...}]}
+BATCH_SIZE = 5000
+# Заглушка на месте списка (детей группы или фигур проекта) - подставляем в неё готовые байты
+PLACEHOLDER = "\x00chunks\x00"
+PLACEHOLDER_BYTES = json.dumps(PLACEHOLDER).encode("utf-8")
+
+
+def _indent(level):
+    return b"\n" + b" " * (INDENT * level)
+
+
+def dumps_at(data, level):
+    """Байты json.dumps(indent=4) для значения, которое в файле лежит на глубине level"""
+    text = json.dumps(data, indent=INDENT, ensure_ascii=False)
+    return text.replace("\n", "\n" + " " * (INDENT * level)).encode("utf-8")
+
+
+def list_chunks(chunks, level):
+    """Байты списка на глубине level из готовых байтов элементов (как их разметил бы json.dumps)"""
+    if not chunks:
+        return b"[]"
+    inner = _indent(level + 1)
+    return b"[" + inner + (b"," + inner).join(chunks) + _indent(level) + b"]"
+
+
+def item_chunk(item, level=SHAPES_LEVEL):
+    """Байты записи фигуры (из кэша, если он есть для этой глубины)"""
+    cached = item._save_chunk
+    if cached is not None and cached[0] == level:
+        return cached[1]
+    if isinstance(item, Group):
+        children = [item_chunk(child, level + 2) for child in item.childItems() if isinstance(child, Shape)]
+        chunk = dumps_at(item.to_dict(PLACEHOLDER), level).replace(
+            PLACEHOLDER_BYTES, list_chunks(children, level + 1), 1)
+    else:
+        chunk = dumps_at(item.to_dict(), level)
+    item._save_chunk = (level, chunk)
+    return chunk
+
+
+def _cached_chunk(source):
+    """Байты корневой записи из кэша (source - фигура или запись ленивого документа ShapeRecord)"""
+    if hasattr(source, "to_dict"):
+        cached = source._save_chunk
+        return cached[1] if cached is not None and cached[0] == SHAPES_LEVEL else None
+    return source.chunk
+
+
+def _dump_batch(sources):
+    """
+    Байты корневых записей одним json.dumps на всю пачку (вызов кодировщика на каждую запись
+    заметно дороже). Список режем по началам записей: строка из ровно восьми пробелов и "{"
+    бывает только там - переводы строк внутри строк JSON экранирует.
+    """
+    data = [source.to_dict() if hasattr(source, "to_dict") else source.data for source in sources]
+    text = dumps_at(data, SHAPES_LEVEL - 1)
+    record_start = _indent(SHAPES_LEVEL) + b"{"
+    body = text[len(b"[") + len(record_start):-len(_indent(SHAPES_LEVEL - 1) + b"]")]
+    chunks = body.split(b"," + record_start)
+    for source, chunk in zip(sources, chunks):
+        chunk = b"{" + chunk
+        if hasattr(source, "to_dict"):
+            source._save_chunk = (SHAPES_LEVEL, chunk)
+        else:
+            source.chunk = chunk
+        yield chunk
+
+
+def root_chunks(sources):
+    """Байты корневых записей по порядку: из кэша, а записи без кэша - пачками"""
+    batch = []
+    for source in sources:
+        chunk = _cached_chunk(source)
+        # Группа, в которой правили часть детей, собирается из байтов остальных
+        if chunk is None and isinstance(source, Group) and any(
+                getattr(child, "_save_chunk", None) is not None for child in source.childItems()):
+            chunk = item_chunk(source)
+        if chunk is None:
+            batch.append(source)
+            if len(batch) < BATCH_SIZE:
+                continue
+        if batch:
+            yield from _dump_batch(batch)
+            batch = []
+        if chunk is not None:
+            yield chunk
+    if batch:
+        yield from _dump_batch(batch)
+
+
+def invalidate(items):
+    """Сбрасывает байты фигур, всех их потомков и предков"""
+    for item in items:
+        if not isinstance(item, Shape):
+            continue
+        pending = [item]
+        while pending:
+            node = pending.pop()
+            node._save_chunk = None
+            if isinstance(node, Group):
+                pending.extend(node.childItems())
+        # parentItem() зовем только у вложенных фигур (см. is_root_item)
+        while not is_root_item(item):
+            item = item.parentItem()
+            item._save_chunk = None
+
+
+def write_project(filename, data, chunks):
+    """
+    Записывает проект: data - словарь проекта без фигур, chunks - байты корневых записей по порядку.
+    Результат байт в байт совпадает с json.dump(indent=4, ensure_ascii=False) полного словаря.
+    """
+    text = dumps_at(dict(data, shapes=PLACEHOLDER), 0)
+    head, tail = text.split(PLACEHOLDER_BYTES, 1)
+    inner = _indent(SHAPES_LEVEL)
+    with open(filename, "wb") as f:
+        f.write(head)
+        empty = True
+        for chunk in chunks:
+            f.write(b"[" + inner if empty else b"," + inner)
+            f.write(chunk)
+            empty = False
+        f.write(b"[]" if empty else _indent(SHAPES_LEVEL - 1) + b"]")
+        f.write(tail)
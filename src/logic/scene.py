@@ -0,0 +1,132 @@
+# src/logic/scene.py
+from contextlib import contextmanager
+from PySide6.QtWidgets import QGraphicsScene
+from PySide6.QtCore import QRectF
+from src.logic.shapes import is_root_item
+from src.logic.layers import LayerModel
+from src.logic.baking import StaticBaker
+
+
+class EditorScene(QGraphicsScene):
+    """
+    Сцена редактора.
+    Помимо фигур на сцене знает о "документе" - фигурах, которые пока существуют только как записи
+    (ленивый режим, см. LazyDocument). Сохранение и экспорт работают через неё со ВСЕМ документом.
+
+    Холст бесконечный: sceneRect растет по мере надобности, а размер "листа" хранится отдельно в page_rect.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.document = None  # LazyDocument или None (обычный режим)
+        self.snap_engine = None  # SnapEngine холста: получает уведомления об измененных фигурах
+        self.query_index = None  # QueryIndex холста (поиск по атрибутам): тоже
+        self.layers = LayerModel(self)
+        self.baker = StaticBaker(self)  # Запекание статичных фигур в чанки (выключено, см. EditorCanvas.set_baking)
+        self._chunks_cached = False  # Кэш сохранения уже заполнялся (до этого сбрасывать нечего)
+        # Сцена перерисовывается целиком только из-за смены порога отрисовки (см. set_minimum_render_size)
+        self.render_size_changed = False
+        self.page_rect = QRectF(0, 0, 800, 600)
+        self.setSceneRect(self.page_rect)
+
+    def set_page_size(self, width, height):
+        self.page_rect = QRectF(0, 0, width, height)
+        self.setSceneRect(self.sceneRect().united(self.page_rect))
+
+    def grow_to(self, rect, margin=0):
+        """Расширяет sceneRect так, чтобы он вмещал rect (сцена только растет)"""
+        current = self.sceneRect()
+        if current.contains(rect):
+            return
+        self.setSceneRect(current.united(rect.adjusted(-margin, -margin, margin, margin)))
+
+    def set_minimum_render_size(self, pixels):
+        """
+        Фигуры меньше pixels пикселей экрана не рисуются (0 - рисуются все).
+        Qt при этом обновляет всю сцену - флаг подсказывает миникарте, что документ не менялся.
+        """
+        if pixels == self.minimumRenderSize():
+            return
+        self.render_size_changed = True
+        self.setMinimumRenderSize(pixels)
+
+    def set_document(self, document):
+        self.document = document
+
+    def clear(self):
+        self.document = None
+        super().clear()
+        self.baker.reset()
+        self.layers.reset()
+        if self.snap_engine:
+            self.snap_engine.reset()
+        if self.query_index:
+            self.query_index.reset()
+
+    def addItem(self, item):
+        # Фигура скрытого слоя в сцену не попадает, а откладывается в слой (в том числе при Undo/Redo)
+        if not self.layers.attach(item):
+            return
+        super().addItem(item)
+        self.items_changed((item,))
+
+    def removeItem(self, item):
+        if self.layers.take(item):
+            return
+        super().removeItem(item)
+        self.items_changed((item,))
+
+    def items_changed(self, items):
+        """Фигуры добавлены, удалены или изменены в обход сцены (перемещение, группировка)"""
+        self.baker.touch(items)
+        if self.snap_engine:
+            self.snap_engine.invalidate(items)
+        if self.query_index:
+            self.query_index.invalidate(items)
+        if self._chunks_cached:
+            from src.logic.save_cache import invalidate
+            invalidate(items)
+
+    def shape_sources(self):
+        """
+        Корневые фигуры документа (от нижней к верхней) - и материализованные, и нет:
+        фигуры сцены, записи ленивого документа (ShapeRecord) и фигуры скрытых слоев
+        """
+        if self.document:
+            yield from self.document.shape_sources(self)
+
+        for item in self.items()[::-1]:
+            if not hasattr(item, "to_dict") or not is_root_item(item):
+                continue
+            # Фигуры документа уже выданы выше в правильном порядке
+            if self.document and self.document.owns(item):
+                continue
+            yield item
+
+        # Скрытые слои (порядок внутри слоя сохранен, а между слоями его задают полосы z слоев)
+        yield from self.layers.hidden_shapes(self.document)
+
+    def shape_dicts(self):
+        """Словари корневых фигур (от нижней к верхней)"""
+        for source in self.shape_sources():
+            yield source.to_dict() if hasattr(source, "to_dict") else source.data
+
+    def shape_chunks(self):
+        """Готовые байты записей корневых фигур для JSON-файла (см. logic/save_cache.py)"""
+        from src.logic.save_cache import root_chunks
+        self._chunks_cached = True
+        return root_chunks(self.shape_sources())
+
+    @contextmanager
+    def full_document(self):
+        """Временно материализует весь документ (например, для экспорта в картинку)"""
+        if not self.document:
+            yield self
+            return
+        created = self.document.materialize_all(self)
+        try:
+            yield self
+        finally:
+            for record in created:
+                if record.item is not None and record.item.scene() is self and not record.item.isSelected():
+                    self.document.dematerialize(record, self)
@@ -0,0 +1,119 @@
+# src/logic/session.py
+import json
+from time import perf_counter
+
+from PySide6.QtCore import Qt, QEvent, QPointF, QPoint
+from PySide6.QtGui import QMouseEvent, QKeyEvent, QWheelEvent
+
+# Формат файла сессии (JSON Lines):
+#   1-я строка - заголовок: версия, размер viewport, трансформация вида, прокрутка, проект
+#   остальные  - события: {"t": сек от начала, "type": ..., "tool": ..., координаты/кнопки/клавиши}
+SESSION_VERSION = 1
+
+MOUSE_TYPES = {
+    "press": QEvent.Type.MouseButtonPress,
+    "move": QEvent.Type.MouseMove,
+    "release": QEvent.Type.MouseButtonRelease,
+    "double_click": QEvent.Type.MouseButtonDblClick,
+}
+KEY_TYPES = {
+    "key_press": QEvent.Type.KeyPress,
+    "key_release": QEvent.Type.KeyRelease,
+}
+
+
+def view_state(canvas):
+    """Состояние вида: без него координаты мыши в viewport ничего не значат"""
+    t = canvas.transform()
+    return {
+        "viewport": [canvas.viewport().width(), canvas.viewport().height()],
+        "transform": [t.m11(), t.m12(), t.m21(), t.m22(), t.dx(), t.dy()],
+        "scroll": [canvas.horizontalScrollBar().value(), canvas.verticalScrollBar().value()],
+        "scene_rect": list(canvas.scene.sceneRect().getRect()),
+    }
+
+
+class SessionRecorder:
+    """
+    Записывает поток событий мыши и клавиатуры, который EditorCanvas отдает инструментам.
+    Воспроизведение: benchmarks/replay.py (без окна, с замером задержки на каждое событие).
+    """
+
+    def __init__(self, canvas, project_path=None, document=None):
+        """
+        :param project_path: Файл проекта, с которого начинается сессия
+        :param document: Снимок документа (dict проекта), если он отличается от файла на диске
+        """
+        self.canvas = canvas
+        self.header = {"version": SESSION_VERSION, "project": project_path, **view_state(canvas)}
+        if document is not None:
+            self.header["document"] = document
+        self.events = []
+        self._start = perf_counter()
+
+    def _add(self, event_type, tool, **fields):
+        self.events.append({"t": perf_counter() - self._start, "type": event_type, "tool": tool, **fields})
+
+    def record_mouse(self, event_type, event, tool):
+        pos = event.position()
+        self._add(event_type, tool, x=pos.x(), y=pos.y(),
+                  button=event.button().value, buttons=event.buttons().value,
+                  modifiers=event.modifiers().value)
+
+    def record_key(self, event_type, event, tool):
+        self._add(event_type, tool, key=event.key(), text=event.text(),
+                  modifiers=event.modifiers().value, auto=event.isAutoRepeat())
+
+    def record_wheel(self, event, tool):
+        pos = event.position()
+        self._add("wheel", tool, x=pos.x(), y=pos.y(), angle=event.angleDelta().y(),
+                  modifiers=event.modifiers().value)
+
+    def save(self, filename):
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+            for event in self.events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+def load_session(filename):
+    """-> (заголовок, список событий)"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get("version") != SESSION_VERSION:
+            raise ValueError(f"Неподдерживаемая версия сессии: {header.get('version')}")
+        events = [json.loads(line) for line in f if line.strip()]
+    return header, events
+
+
+def make_qt_event(record, canvas):
+    """Восстанавливает Qt-событие из записи сессии"""
+    event_type = record["type"]
+    modifiers = Qt.KeyboardModifier(record.get("modifiers", 0))
+
+    if event_type in MOUSE_TYPES:
+        local = QPointF(record["x"], record["y"])
+        global_pos = QPointF(canvas.viewport().mapToGlobal(local.toPoint()))
+        return QMouseEvent(MOUSE_TYPES[event_type], local, global_pos,
+                           Qt.MouseButton(record["button"]), Qt.MouseButton(record["buttons"]), modifiers)
+    if event_type in KEY_TYPES:
+        return QKeyEvent(KEY_TYPES[event_type], record["key"], modifiers, record.get("text", ""),
+                         record.get("auto", False))
+    if event_type == "wheel":
+        local = QPointF(record["x"], record["y"])
+        global_pos = QPointF(canvas.viewport().mapToGlobal(local.toPoint()))
+        return QWheelEvent(local, global_pos, QPoint(), QPoint(0, record["angle"]),
+                           Qt.MouseButton.NoButton, modifiers, Qt.ScrollPhase.NoScrollPhase, False)
+    raise ValueError(f"Неизвестный тип события: {event_type}")
+
+
+# Какой метод EditorCanvas обрабатывает событие данного типа
+HANDLERS = {
+    "press": "mousePressEvent",
+    "move": "mouseMoveEvent",
+    "release": "mouseReleaseEvent",
+    "double_click": "mouseDoubleClickEvent",
+    "key_press": "keyPressEvent",
+    "key_release": "keyReleaseEvent",
+    "wheel": "wheelEvent",
+}
@@ -1,26 +1,69 @@
 # src/logic/shapes.py
-from abc import ABC, abstractmethod, ABCMeta
-from PySide6.QtWidgets import QGraphicsPathItem, QGraphicsItemGroup, QGraphicsItem
-from PySide6.QtGui import QPen, QColor, QPainterPath
-from PySide6.QtCore import QPointF
+from abc import ABC, abstractmethod, ABCMeta, _abc_init
+from array import array
+from itertools import count
+from secrets import token_hex
+from PySide6.QtWidgets import QGraphicsPathItem, QGraphicsItemGroup, QGraphicsItem, QStyle, QStyleOptionGraphicsItem
+from PySide6.QtGui import QPen, QColor, QPainterPath, QFont, QFontMetricsF, QStaticText, QTransform
+from PySide6.QtCore import QPointF, QRectF, Qt
+from src.logic.profiling import TRACER
+from src.logic.points import pack_points, point_pairs, encode_points, to_polygonf
+
+def is_root_item(item) -> bool:
+    """
+    True, если элемент не лежит в группе.
+    ВАЖНО: не используем item.parentItem() is None - в PySide6 вызов parentItem(), вернувший None,
+    отвязывает Python-обертку от сцены, и элемент удаляется вместе с временным списком scene.items().
+    """
+    return item.topLevelItem() is item
+
+
+# id фигуры: случайный префикс сеанса + счетчик. Уникален между сеансами и дешевле uuid4 на каждую фигуру
+_ID_PREFIX = token_hex(4)
+_ID_COUNTER = count(1)
+
+def new_shape_id() -> str:
+    return f"{_ID_PREFIX}-{next(_ID_COUNTER):x}"
+
+
+DEFAULT_STROKE_WIDTH = 2
+LONG_POLYLINE_POINTS = 1000  # С этого числа вершин габариты ломаной считаются без обводки (LongPolyline)
+DEFAULT_FONT = "Arial"
+DEFAULT_FONT_SIZE = 16       # Высота шрифта надписи (единицы сцены)
+TEXT_PLACEHOLDER_PIXELS = 5  # Надпись мельче (пиксели экрана) рисуется полосками вместо глифов
+
 
 # 1. Решаем конфликт метаклассов
 class CombinedMetaclass(type(QGraphicsItem), ABCMeta):
-    pass
+    def __new__(mcls, name, bases, namespace, **kwargs):
+        cls = super().__new__(mcls, name, bases, namespace, **kwargs)
+        # Shiboken не вызывает ABCMeta.__new__: без своего _abc_impl все фигуры делят кэш isinstance
+        # класса ABC, и, например, isinstance(rect, Group) == False "запоминается" как isinstance(rect, Shape)
+        if "_abc_impl" not in cls.__dict__:
+            _abc_init(cls)
+        return cls
 
 class Shape(ABC, metaclass=CombinedMetaclass):
     def __init__(self, color: str = "black", stroke_width: int = 2):
         self.color = color
         self.stroke_width = stroke_width
+        # Временная фигура инструмента (превью): не сохраняется и не участвует в привязке
+        self.is_preview = False
+        self.layer = None  # Имя слоя (назначает LayerModel при добавлении в сцену)
+        self._shape_id = None  # Постоянный id (см. shape_id)
+        self._save_chunk = None  # (глубина, байты записи) - кэш сохранения (см. logic/save_cache.py)
         # МЫ НЕ ВЫЗЫВАЕМ методы Qt здесь, чтобы избежать RuntimeError
+        if TRACER.enabled:
+            TRACER.count("items_created")
 
     def apply_initial_config(self):
         """Метод для безопасной настройки свойств Qt после инициализации всех баз"""
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable, True)
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable, True)
 
-        # Красим фигуру (кроме групп, у них своя логика)
+        # Толщина и цвет пера (кроме групп, у них своя логика)
         if not isinstance(self, QGraphicsItemGroup):
+            self.set_stroke_width(self.stroke_width)
             self.set_active_color(self.color)
 
     def set_active_color(self, color: str):
@@ -32,6 +75,42 @@ class Shape(ABC, metaclass=CombinedMetaclass):
             # Обновляем внутреннюю переменную для порядка
             self.stroke_width = current_pen.width()
 
+    def set_stroke_width(self, width: int):
+        self.stroke_width = width
+        if hasattr(self, 'setPen'):
+            current_pen = self.pen()
+            current_pen.setWidth(width)
+            self.setPen(current_pen)
+
+    def style_props(self, props: dict) -> dict:
+        """Дописывает толщину пера в props фигуры, если она не по умолчанию (по умолчанию фабрика берет 2)"""
+        if self.stroke_width != DEFAULT_STROKE_WIDTH:
+            props["width"] = self.stroke_width
+        return props
+
+    @property
+    def shape_id(self) -> str:
+        """
+        Постоянный id фигуры: сохраняется в файл и восстанавливается фабрикой, переживает группировку и Undo.
+        Выдается при первом обращении - фигурам из файла (у них id уже есть) генерировать его не нужно.
+        """
+        if self._shape_id is None:
+            self._shape_id = new_shape_id()
+        return self._shape_id
+
+    @shape_id.setter
+    def shape_id(self, value):
+        self._shape_id = value
+
+    def with_attributes(self, data: dict) -> dict:
+        """Дописывает в словарь фигуры id и необязательные поля: угол поворота (если повернута) и слой"""
+        data["id"] = self.shape_id
+        if self.rotation():
+            data["rotation"] = self.rotation()
+        if self.layer:
+            data["layer"] = self.layer
+        return data
+
     @property
     @abstractmethod
     def type_name(self) -> str:
@@ -83,7 +162,6 @@ class Group(QGraphicsItemGroup, Shape):
         for child in self.childItems():
             if hasattr(child, "set_active_color"):
                 child.set_active_color(color)
-                child.stroke_width = self.stroke_width
 
     def set_stroke_width(self, width: int):
         self.stroke_width = width
@@ -95,16 +173,15 @@ class Group(QGraphicsItemGroup, Shape):
     def set_geometry(self, s, e):
         pass
 
-    def to_dict(self) -> dict:
-        children_data = []
-        for child in self.childItems():
-            if isinstance(child, Shape):
-                children_data.append(child.to_dict())
-        return {
+    def to_dict(self, children_data=None) -> dict:
+        """children_data - готовое значение поля children (по умолчанию - словари детей)"""
+        if children_data is None:
+            children_data = [child.to_dict() for child in self.childItems() if isinstance(child, Shape)]
+        return self.with_attributes({
             "type": self.type_name,
             "pos": [self.x(), self.y()],
             "children": children_data
-        }
+        })
 
 
 class Rectangle(QGraphicsPathItem, Shape):
@@ -133,8 +210,9 @@ class Rectangle(QGraphicsPathItem, Shape):
 
     def to_dict(self) -> dict:
         r = self.path().boundingRect()
-        return {"type": "rect", "pos": [self.x(), self.y()],
-                "props": {"x": r.x(), "y": r.y(), "w": r.width(), "h": r.height(), "color": self.color}}
+        return self.with_attributes({"type": "rect", "pos": [self.x(), self.y()],
+                "props": self.style_props({"x": r.x(), "y": r.y(), "w": r.width(), "h": r.height(),
+                                           "color": self.color})})
 
 
 class Ellipse(QGraphicsPathItem, Shape):
@@ -162,8 +240,9 @@ class Ellipse(QGraphicsPathItem, Shape):
 
     def to_dict(self) -> dict:
         r = self.path().boundingRect()
-        return {"type": "ellipse", "pos": [self.x(), self.y()],
-                "props": {"x": r.x(), "y": r.y(), "w": r.width(), "h": r.height(), "color": self.color}}
+        return self.with_attributes({"type": "ellipse", "pos": [self.x(), self.y()],
+                "props": self.style_props({"x": r.x(), "y": r.y(), "w": r.width(), "h": r.height(),
+                                           "color": self.color})})
 
 
 class Line(QGraphicsPathItem, Shape):
@@ -189,18 +268,31 @@ class Line(QGraphicsPathItem, Shape):
         self.x2, self.y2 = end_point.x(), end_point.y()
         self.set_geometry_data(self.x1, self.y1, self.x2, self.y2)
 
+    @property
+    def coords(self):
+        """Концы отрезка массивом вершин x1, y1, x2, y2 (как у Polygon - для правки вершин)"""
+        return array('d', (self.x1, self.y1, self.x2, self.y2))
+
+    def set_coords(self, coords, changed=None):
+        self.x1, self.y1, self.x2, self.y2 = coords
+        self.set_geometry_data(self.x1, self.y1, self.x2, self.y2)
+
     def to_dict(self) -> dict:
-        return {"type": "line", "pos": [self.x(), self.y()],
-                "props": {"x1": self.x1, "y1": self.y1, "x2": self.x2, "y2": self.y2, "color": self.color}}
+        return self.with_attributes({"type": "line", "pos": [self.x(), self.y()],
+                "props": self.style_props({"x1": self.x1, "y1": self.y1, "x2": self.x2, "y2": self.y2,
+                                           "color": self.color})})
 
 
 class Polygon(QGraphicsPathItem, Shape):
     def __init__(self, points, color="black", stroke_width=2, is_closed=True):
+        """points - список QPointF, пар [x, y], массив numpy (n, 2) или array('d') (см. logic/points.py)"""
         # Порядок важен для PySide6!
         QGraphicsPathItem.__init__(self)
         Shape.__init__(self, color, stroke_width)
 
-        self.points = points
+        # Вершины в упакованном виде: array('d') x0, y0, x1, y1, ... Массив не меняется на месте,
+        # а заменяется целиком (его делят слепки буфера обмена и состояния отмены)
+        self.coords = pack_points(points)
         self.is_closed = is_closed
 
         # Используем внутреннюю переменную
@@ -209,31 +301,263 @@ class Polygon(QGraphicsPathItem, Shape):
         self.apply_initial_config()
         self.update_path()
 
+    @classmethod
+    def from_points(cls, points, color="black", stroke_width=2, is_closed=True):
+        """Многоугольник или ломаная по вершинам: длинные (от LONG_POLYLINE_POINTS вершин) - LongPolyline"""
+        coords = pack_points(points)
+        if len(coords) >= 2 * LONG_POLYLINE_POINTS:
+            return LongPolyline(coords, color, stroke_width, is_closed)
+        return cls(coords, color, stroke_width, is_closed)
+
     @property
     def type_name(self):
         return self._type_name
 
+    @property
+    def points(self):
+        """Вершины списком QPointF (копия: изменения списка на фигуру не влияют)"""
+        return [QPointF(x, y) for x, y in point_pairs(self.coords)]
+
+    @points.setter
+    def points(self, points):
+        self.coords = pack_points(points)
+
+    def setPen(self, pen):
+        super().setPen(pen)
+        self._update_bounds()
+
+    def _set_path(self, path):
+        self.setPath(path)  # Старые габариты Qt берет до замены контура (prepareGeometryChange)
+        self._update_bounds()
+
+    def _update_bounds(self):
+        pass  # Габариты обычного многоугольника считает Qt (см. LongPolyline)
+
     def update_path(self):
-        if not self.points: return
+        if not self.coords: return
+        # Контур строится из массива целиком (moveTo + lineTo по всем вершинам)
         path = QPainterPath()
-        path.moveTo(self.points[0])
-        for p in self.points[1:]:
-            path.lineTo(p)
+        path.addPolygon(to_polygonf(self.coords))
         if self.is_closed:
             path.closeSubpath()
-        self.setPath(path)
+        self._set_path(path)
+
+    def set_coords(self, coords, changed=None):
+        """
+        Новый массив вершин. changed - индексы вершин, которые только сдвинулись (число вершин то же):
+        в контуре меняются только их элементы, а не строится весь контур заново (правка вершин, см. NodeTool)
+        """
+        count = len(coords) // 2
+        path = self.path()
+        elements = path.elementCount()
+        # closeSubpath добавляет элемент count (возврат к первой вершине), если последняя с ней не совпадала
+        closing = self.is_closed and elements == count + 1
+        if (changed is None or len(changed) > count // 4 or len(coords) != len(self.coords)
+                or elements != count + closing
+                or (self.is_closed and not closing and (0 in changed or count - 1 in changed))):
+            self.coords = coords
+            self.update_path()
+            return
+        self.coords = coords
+        for i in changed:
+            x, y = coords[2 * i], coords[2 * i + 1]
+            path.setElementPositionAt(i, x, y)
+            if i == 0 and closing:
+                path.setElementPositionAt(count, x, y)
+        self._set_path(path)
+
+    def set_geometry(self, start_point, end_point):
+        pass  # Многоугольник строится по точкам (PolygonTool), а не по двум углам
 
     def to_dict(self):
-        # Для сохранения нам нужны координаты всех точек
-        pts = [[p.x(), p.y()] for p in self.points]
-        return {
+        return self.with_attributes({
             "type": "polygon",
             "pos": [self.x(), self.y()],
             "props": {
-                "points": pts,
+                "points": encode_points(self.coords),
                 "color": self.color,
                 "width": self.stroke_width,
                 "is_closed": self.is_closed
             }
 
-        }
+        })
+
+
+class LongPolyline(Polygon):
+    """
+    Ломаная (многоугольник) от LONG_POLYLINE_POINTS вершин, см. Polygon.from_points.
+    Qt считает габариты QGraphicsPathItem по обводке контура пером (shape()): на ломаной в десятки тысяч
+    вершин это десятки мс на каждый setPath (перетаскивание вершины). Здесь boundingRect - габариты контура
+    с запасом в толщину пера, надмножество тех же габаритов (выступ квадратного конца линии меньше толщины пера).
+    Только у длинных ломаных: вызов Python-метода из Qt для каждой фигуры замедлил бы загрузку и группировку
+    обычных документов в разы. Класс выбирается при создании: правка вершин его не меняет.
+    """
+
+    _long_bounds = QRectF()
+
+    def _update_bounds(self):
+        pad = self.pen().widthF()
+        self._long_bounds = self.path().controlPointRect().adjusted(-pad, -pad, pad, pad)
+
+    def boundingRect(self):
+        return self._long_bounds
+
+
+class PathShape(QGraphicsPathItem, Shape):
+    """
+    Составной контур: несколько замкнутых ломаных (результат булевых операций).
+    Дырки задаются правилом заливки even-odd, поэтому направление обхода контуров не важно.
+    """
+
+    def __init__(self, contours, color="black", stroke_width=2):
+        QGraphicsPathItem.__init__(self)
+        Shape.__init__(self, color, stroke_width)
+        self.contours = contours  # [[QPointF, ...], ...]
+        self.apply_initial_config()
+        self.update_path()
+
+    @classmethod
+    def from_painter_path(cls, path, color="black", stroke_width=2):
+        """Фигура из произвольного QPainterPath (кривые аппроксимируются ломаными)"""
+        contours = []
+        for polygon in path.toSubpathPolygons():
+            points = list(polygon)
+            # Замкнутый контур повторяет первую точку в конце
+            if len(points) > 1 and points[0] == points[-1]:
+                points.pop()
+            if len(points) >= 3:
+                contours.append(points)
+        return cls(contours, color, stroke_width)
+
+    @property
+    def type_name(self):
+        return "path"
+
+    def update_path(self):
+        path = QPainterPath()
+        path.setFillRule(Qt.FillRule.OddEvenFill)
+        for contour in self.contours:
+            path.moveTo(contour[0])
+            for p in contour[1:]:
+                path.lineTo(p)
+            path.closeSubpath()
+        self.setPath(path)
+
+    def set_geometry(self, start_point, end_point):
+        pass
+
+    def to_dict(self):
+        return self.with_attributes({
+            "type": "path",
+            "pos": [self.x(), self.y()],
+            "props": {
+                "contours": [[[p.x(), p.y()] for p in contour] for contour in self.contours],
+                "color": self.color,
+                "width": self.stroke_width
+            }
+        })
+
+
+class TextLayout:
+    """
+    Разметка надписи, посчитанная один раз на текст и шрифт: строки QStaticText (глифы расставлены
+    заранее, отрисовка их не пересчитывает), габариты и полоски-заглушки для мелкого масштаба.
+    Не меняется после создания - копии надписи (буфер обмена) делят её.
+    """
+    __slots__ = ("font", "lines", "rect", "placeholders")
+
+    def __init__(self, text, left, top, family, size):
+        self.font = QFont(family)
+        self.font.setPixelSize(max(1, round(size)))
+        metrics = QFontMetricsF(self.font)
+        spacing = metrics.lineSpacing()
+        self.lines = []         # [(QPointF, QStaticText)] - левый верхний угол строки
+        self.placeholders = []  # [QRectF] - полоса высотой со строчную букву на месте каждой строки
+        width = 0.0
+        rows = text.split("\n")
+        for i, row in enumerate(rows):
+            if not row.strip():
+                continue
+            y = top + i * spacing
+            advance = metrics.horizontalAdvance(row)
+            width = max(width, advance)
+            static = QStaticText(row)
+            static.setTextFormat(Qt.TextFormat.PlainText)
+            static.prepare(QTransform(), self.font)
+            self.lines.append((QPointF(left, y), static))
+            self.placeholders.append(QRectF(left, y + metrics.ascent() - metrics.xHeight(), advance, metrics.xHeight()))
+        self.rect = QRectF(left, top, width, spacing * len(rows))
+
+
+class TextShape(QGraphicsItem, Shape):
+    """
+    Надпись: одна или несколько строк одним шрифтом. left, top - левый верхний угол текста
+    в локальных координатах (как x, y у прямоугольника), font_size - высота шрифта в единицах сцены.
+    Разметка (TextLayout) пересчитывается только при смене текста, шрифта или положения (set_text_data),
+    а надписи мельче TEXT_PLACEHOLDER_PIXELS на экране рисуются полосками - без глифов.
+    """
+
+    def __init__(self, text, left=0.0, top=0.0, font_family=DEFAULT_FONT, font_size=DEFAULT_FONT_SIZE,
+                 color="black", stroke_width=2):
+        QGraphicsItem.__init__(self)
+        Shape.__init__(self, color, stroke_width)
+        self._pen = QPen(QColor(color), stroke_width)  # Цвет текста (толщина пера на надпись не влияет)
+        self._layout = None
+        self.set_text_data(text, left, top, font_family, font_size)
+        self.apply_initial_config()
+
+    @property
+    def type_name(self):
+        return "text"
+
+    def set_text_data(self, text, left, top, font_family, font_size):
+        if self._layout is not None:
+            self.prepareGeometryChange()
+        self.text, self.left, self.top = text, left, top
+        self.font_family, self.font_size = font_family, font_size
+        self._layout = TextLayout(text, left, top, font_family, font_size)
+
+    def set_text(self, text, font_family, font_size):
+        """Новый текст и шрифт на том же месте"""
+        self.set_text_data(text, self.left, self.top, font_family, font_size)
+
+    @property
+    def text_style(self):
+        """(текст, шрифт, размер) - состояние для правки надписи и её отмены"""
+        return self.text, self.font_family, self.font_size
+
+    def pen(self):
+        return QPen(self._pen)
+
+    def setPen(self, pen):
+        self._pen = QPen(pen)
+        self.update()
+
+    def boundingRect(self):
+        return self._layout.rect
+
+    def paint(self, painter, option, widget=None):
+        layout = self._layout
+        pixels = layout.font.pixelSize() * QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        if pixels < TEXT_PLACEHOLDER_PIXELS:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(self._pen.color())
+            painter.drawRects(layout.placeholders)
+        else:
+            painter.setFont(layout.font)
+            painter.setPen(self._pen)
+            for pos, static in layout.lines:
+                painter.drawStaticText(pos, static)
+        if option.state & QStyle.StateFlag.State_Selected:
+            pen = QPen(Qt.GlobalColor.black, 0, Qt.PenStyle.DashLine)
+            painter.setPen(pen)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawRect(layout.rect)
+
+    def set_geometry(self, start_point, end_point):
+        self.set_text_data(self.text, start_point.x(), start_point.y(), self.font_family, self.font_size)
+
+    def to_dict(self):
+        return self.with_attributes({"type": "text", "pos": [self.x(), self.y()],
+                "props": self.style_props({"x": self.left, "y": self.top, "text": self.text,
+                                           "font": self.font_family, "size": self.font_size, "color": self.color})})
@@ -0,0 +1,420 @@
+# src/logic/snapping.py
+import sys
+from collections import namedtuple
+import numpy as np
+from PySide6.QtCore import Qt, QPointF, QRectF, QLineF
+from PySide6.QtGui import QPainterPath
+from src.logic.shapes import Ellipse, is_root_item
+from src.logic.baking import with_baked
+from src.logic.profiling import traced
+
+# Результат привязки точки:
+#   point  - итоговая точка (QPointF)
+#   kind   - "target" | "vertex" | "edge" | "guide" | "grid" | None (точка не изменилась)
+#   target - индекс сработавшей точки из targets (для kind == "target")
+#   guides - направляющие для отрисовки [QLineF] в координатах сцены
+SnapResult = namedtuple("SnapResult", "point kind target guides")
+
+
+def item_snap_bounds(item):
+    """Габариты фигуры (x1, y1, x2, y2) в координатах сцены - по контуру, без толщины пера"""
+    xs, ys = [], []
+    _collect_vertices(item, xs, ys)
+    if not xs:
+        rect = item.sceneBoundingRect()
+        return rect.left(), rect.top(), rect.right(), rect.bottom()
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _collect_vertices(item, xs, ys):
+    """Дописывает вершины фигуры (в координатах сцены) в xs и ys. У эллипса вершины - 4 крайние точки"""
+    if not hasattr(item, "path"):
+        for child in item.childItems():
+            _collect_vertices(child, xs, ys)
+        return
+
+    transform = item.sceneTransform()
+    if isinstance(item, Ellipse):
+        r = item.path().boundingRect()
+        c = r.center()
+        for point in (QPointF(r.left(), c.y()), QPointF(c.x(), r.top()),
+                      QPointF(r.right(), c.y()), QPointF(c.x(), r.bottom())):
+            point = transform.map(point)
+            xs.append(point.x())
+            ys.append(point.y())
+        return
+
+    for polygon in item.path().toSubpathPolygons(transform):
+        points = list(polygon)
+        # Замкнутый контур повторяет первую точку в конце
+        if len(points) > 1 and points[0] == points[-1]:
+            points.pop()
+        xs += [p.x() for p in points]
+        ys += [p.y() for p in points]
+
+
+def item_segments(item):
+    """Прямые отрезки контура фигуры [(x1, y1, x2, y2)] в координатах сцены (эллипсы пропускаются)"""
+    segments = []
+    if not hasattr(item, "path"):
+        for child in item.childItems():
+            segments.extend(item_segments(child))
+        return segments
+    if isinstance(item, Ellipse):
+        return segments
+    for polygon in item.path().toSubpathPolygons(item.sceneTransform()):
+        for i in range(polygon.size() - 1):
+            a, b = polygon.at(i), polygon.at(i + 1)
+            segments.append((a.x(), a.y(), b.x(), b.y()))
+    return segments
+
+
+def _exclude_mask(owners, exclude):
+    """Маска owners, не входящих в exclude (отсортированный массив без повторов)"""
+    if not len(exclude) or not len(owners):
+        return np.ones(len(owners), dtype=bool)
+    positions = np.minimum(np.searchsorted(exclude, owners), len(exclude) - 1)
+    return exclude[positions] != owners
+
+
+class _SortedColumn:
+    """Значения, отсортированные по ключу: keys[i] (+ other[i]) принадлежат фигуре owners[i]"""
+
+    def __init__(self):
+        self.keys = np.empty(0)
+        self.other = np.empty(0)
+        self.owners = np.empty(0, dtype=np.int64)
+
+    def replace(self, removed_owners, keys, other, owners):
+        """Удаляет значения фигур removed_owners и вставляет новые (без полной пересортировки)"""
+        if len(removed_owners):
+            keep = ~np.isin(self.owners, removed_owners)
+            self.keys, self.other, self.owners = self.keys[keep], self.other[keep], self.owners[keep]
+        if not len(keys):
+            return
+        keys = np.asarray(keys, dtype=float)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        positions = np.searchsorted(self.keys, keys)
+        self.keys = np.insert(self.keys, positions, keys)
+        self.other = np.insert(self.other, positions, np.asarray(other, dtype=float)[order])
+        self.owners = np.insert(self.owners, positions, np.asarray(owners, dtype=np.int64)[order])
+
+    def window(self, low, high):
+        """Срез значений с low <= key <= high"""
+        return slice(np.searchsorted(self.keys, low, "left"), np.searchsorted(self.keys, high, "right"))
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.other.nbytes + self.owners.nbytes
+
+
+class SnapEngine:
+    """
+    Привязка к сетке, к фигурам (вершины, центры, ребра) и умные направляющие (выравнивание по сторонам
+    и центрам габаритов других фигур).
+
+    Индекс - отсортированные массивы numpy (координаты сторон/центров габаритов и вершин), поиск -
+    двоичный (searchsorted) по окну допуска. Ребра ищутся через пространственный индекс сцены.
+    Индекс строится при первой привязке частями по BUILD_CHUNK фигур (остальное доделывает таймер холста),
+    дальше обновляются только измененные фигуры: сцена сообщает о них через EditorScene.items_changed().
+    """
+
+    BUILD_CHUNK = 500   # Фигур за один шаг первичного построения индекса
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.grid_enabled = False
+        self.objects_enabled = True
+        self.guides_enabled = True
+        self.grid_size = 10.0
+
+        self._pending = None  # Фигуры, ждущие первичной индексации (None - индекс еще не строили)
+        self._dirty = set()
+        self._owners = {}     # фигура -> id
+        self._entries = {}    # id -> (фигура, габариты)
+        self._next_owner = 0
+        self._guides_x = _SortedColumn()  # x сторон и центров габаритов
+        self._guides_y = _SortedColumn()
+        self._vertices = _SortedColumn()  # вершины и центры, ключ x, other - y
+
+    @property
+    def building(self):
+        return bool(self._pending)
+
+    @property
+    def enabled(self):
+        return self.grid_enabled or self.objects_enabled or self.guides_enabled
+
+    # --- ИНДЕКС ---
+
+    def reset(self):
+        """Сцена очищена: индекс будет построен заново при следующей привязке"""
+        self._pending = None
+        self._dirty.clear()
+        self._owners.clear()
+        self._entries.clear()
+        self._guides_x = _SortedColumn()
+        self._guides_y = _SortedColumn()
+        self._vertices = _SortedColumn()
+
+    def invalidate(self, items):
+        """Фигуры добавлены, удалены или сдвинуты (обновятся при следующем запросе)"""
+        if self._pending is not None:
+            self._dirty.update(items)
+
+    def memory_bytes(self):
+        """Оценка памяти индекса (панель статистики): массивы столбцов + словари фигур"""
+        entry = sys.getsizeof((None, None)) + sys.getsizeof([0.0] * 4) + 4 * sys.getsizeof(0.0)
+        return (self._guides_x.nbytes + self._guides_y.nbytes + self._vertices.nbytes
+                + sys.getsizeof(self._owners) + sys.getsizeof(self._entries) + len(self._entries) * entry)
+
+    def _is_indexed(self, item):
+        return (hasattr(item, "to_dict") and not getattr(item, "is_preview", False)
+                and item.scene() is self.scene and is_root_item(item))
+
+    @traced("SnapEngine.update_index")
+    def update_index(self, budget=None):
+        """Обновляет измененные фигуры и индексирует до budget фигур из очереди построения (None - всю)"""
+        if self._pending is None:
+            self._pending = self.scene.items()
+
+        if self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            removed = [self._owners.pop(item) for item in dirty if item in self._owners]
+            # Фигура внутри группы обновляется вместе с группой
+            roots = set()
+            for item in dirty:
+                if item.scene() is self.scene:
+                    root = item.topLevelItem()
+                    if root is not item and root in self._owners:
+                        removed.append(self._owners.pop(root))
+                    roots.add(root)
+            for owner in removed:
+                del self._entries[owner]
+            self._add([item for item in roots if self._is_indexed(item)], removed)
+
+        if self._pending:
+            count = len(self._pending) if budget is None else budget
+            batch = self._pending[-count:]
+            del self._pending[-count:]
+            self._add([item for item in batch if item not in self._owners and self._is_indexed(item)], ())
+
+    def _add(self, items, removed):
+        vx, vy, counts = [], [], []
+        for item in items:
+            start = len(vx)
+            _collect_vertices(item, vx, vy)
+            if len(vx) == start:
+                rect = item.sceneBoundingRect()
+                vx += (rect.left(), rect.right())
+                vy += (rect.top(), rect.bottom())
+            counts.append(len(vx) - start)
+
+        owners = np.arange(self._next_owner, self._next_owner + len(items), dtype=np.int64)
+        self._next_owner += len(items)
+        vx, vy = np.asarray(vx, dtype=float), np.asarray(vy, dtype=float)
+
+        # Габариты всех фигур разом: min/max по отрезкам массива вершин
+        if items:
+            starts = np.cumsum(counts) - counts
+            x1, x2 = np.minimum.reduceat(vx, starts), np.maximum.reduceat(vx, starts)
+            y1, y2 = np.minimum.reduceat(vy, starts), np.maximum.reduceat(vy, starts)
+        else:
+            x1 = x2 = y1 = y2 = np.empty(0)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+
+        for item, owner, bbox in zip(items, owners.tolist(), np.column_stack((x1, y1, x2, y2)).tolist()):
+            self._owners[item] = owner
+            self._entries[owner] = (item, bbox)
+
+        removed = np.asarray(removed, dtype=np.int64)
+        guide_owners = np.repeat(owners, 3)
+        guides_x = np.column_stack((x1, cx, x2)).ravel()
+        guides_y = np.column_stack((y1, cy, y2)).ravel()
+        self._guides_x.replace(removed, guides_x, np.zeros(len(guides_x)), guide_owners)
+        self._guides_y.replace(removed, guides_y, np.zeros(len(guides_y)), guide_owners)
+        self._vertices.replace(removed, np.concatenate((vx, cx)), np.concatenate((vy, cy)),
+                               np.concatenate((np.repeat(owners, counts), owners)))
+
+    def owners_of(self, items):
+        """id фигур в индексе (для исключения перетаскиваемых фигур из поиска)"""
+        self.update_index(self.BUILD_CHUNK)
+        # Фигуры, до которых еще не дошло построение, индексируем сразу: иначе они попадут в поиск позже
+        self._add([item for item in items if item not in self._owners and self._is_indexed(item)], ())
+        return np.unique(np.asarray([self._owners[item] for item in items if item in self._owners], dtype=np.int64))
+
+    def items_rect(self, items):
+        """Общие габариты фигур (по контуру, без толщины пера)"""
+        rect = QRectF()
+        for item in items:
+            owner = self._owners.get(item)
+            x1, y1, x2, y2 = self._entries[owner][1] if owner is not None else item_snap_bounds(item)
+            rect = rect.united(QRectF(x1, y1, x2 - x1, y2 - y1))
+        return rect
+
+    # --- ПОИСК ---
+
+    def _nearest_vertex(self, x, y, tolerance, exclude):
+        column = self._vertices
+        window = column.window(x - tolerance, x + tolerance)
+        keys, other, owners = column.keys[window], column.other[window], column.owners[window]
+        mask = (np.abs(other - y) <= tolerance) & _exclude_mask(owners, exclude)
+        if not mask.any():
+            return None
+        keys, other = keys[mask], other[mask]
+        i = np.argmin((keys - x) ** 2 + (other - y) ** 2)
+        if (keys[i] - x) ** 2 + (other[i] - y) ** 2 > tolerance ** 2:
+            return None
+        return QPointF(float(keys[i]), float(other[i]))
+
+    def _nearest_edge_point(self, x, y, tolerance, exclude):
+        area = QRectF(x - tolerance, y - tolerance, 2 * tolerance, 2 * tolerance)
+        excluded = set(exclude.tolist()) if len(exclude) else ()
+        best, best_dist = None, tolerance ** 2
+        seen = set()
+        area_path = QPainterPath()
+        area_path.addRect(area)
+        # Сначала по габаритам, а точная проверка по контуру (shape() - обводка пером, на длинной ломаной
+        # это десятки мс) - только у не исключенных фигур: перетаскиваемая вершина ломаной её не ждет.
+        # Запеченные фигуры скрыты и поиском сцены не находятся - их выдает чанк (with_baked)
+        for item in with_baked(self.scene.items(area, Qt.ItemSelectionMode.IntersectsItemBoundingRect), area):
+            root = item.topLevelItem()
+            owner = self._owners.get(root)
+            if owner is None or owner in excluded or owner in seen:
+                continue
+            if not item.collidesWithPath(item.mapFromScene(area_path)):
+                continue
+            seen.add(owner)
+            for x1, y1, x2, y2 in item_segments(root):
+                dx, dy = x2 - x1, y2 - y1
+                length = dx * dx + dy * dy
+                t = 0.0 if length == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length))
+                px, py = x1 + t * dx, y1 + t * dy
+                dist = (px - x) ** 2 + (py - y) ** 2
+                if dist <= best_dist:
+                    best, best_dist = QPointF(px, py), dist
+        return best
+
+    def _align(self, column, anchors, tolerance, exclude):
+        """
+        Лучшее выравнивание одного из anchors по значениям column.
+        -> (сдвиг, значение, id фигур с этим значением) или None
+        """
+        best = None
+        for anchor in anchors:
+            window = column.window(anchor - tolerance, anchor + tolerance)
+            keys, owners = column.keys[window], column.owners[window]
+            if len(exclude):
+                mask = _exclude_mask(owners, exclude)
+                keys, owners = keys[mask], owners[mask]
+            if not len(keys):
+                continue
+            i = np.argmin(np.abs(keys - anchor))
+            delta = float(keys[i] - anchor)
+            if best is None or abs(delta) < abs(best[0]):
+                best = (delta, float(keys[i]), owners[keys == keys[i]])
+        return best
+
+    def _guide_lines(self, vertical, value, owners, rect):
+        """Направляющая через value от rect до самой дальней выровненной фигуры"""
+        low, high = (rect.top(), rect.bottom()) if vertical else (rect.left(), rect.right())
+        for owner in owners[:64]:
+            x1, y1, x2, y2 = self._entries[int(owner)][1]
+            low, high = (min(low, y1), max(high, y2)) if vertical else (min(low, x1), max(high, x2))
+        if vertical:
+            return QLineF(value, low, value, high)
+        return QLineF(low, value, high, value)
+
+    def _grid(self, value):
+        return round(value / self.grid_size) * self.grid_size
+
+    @traced("SnapEngine.snap_point")
+    def snap_point(self, pos, tolerance, targets=(), target_tolerance=None, enabled=True, exclude=()):
+        """
+        Привязка точки (создание фигур, вершины многоугольника).
+        targets - приоритетные точки (например, первая вершина многоугольника для замыкания),
+        проверяются даже при выключенной привязке, с допуском target_tolerance.
+        """
+        x, y = pos.x(), pos.y()
+        radius = tolerance if target_tolerance is None else target_tolerance
+        best_target, best_dist = None, radius ** 2
+        for i, target in enumerate(targets):
+            dist = (target.x() - x) ** 2 + (target.y() - y) ** 2
+            if dist < best_dist:
+                best_target, best_dist = i, dist
+        if best_target is not None:
+            return SnapResult(QPointF(targets[best_target]), "target", best_target, [])
+
+        if not enabled or not self.enabled:
+            return SnapResult(QPointF(pos), None, None, [])
+
+        self.update_index(self.BUILD_CHUNK)
+        exclude = np.unique(np.asarray(exclude, dtype=np.int64))
+        if self.objects_enabled:
+            point = self._nearest_vertex(x, y, tolerance, exclude)
+            if point is not None:
+                return SnapResult(point, "vertex", None, [])
+            point = self._nearest_edge_point(x, y, tolerance, exclude)
+            if point is not None:
+                return SnapResult(point, "edge", None, [])
+
+        kind, guides = None, []
+        if self.guides_enabled:
+            match_x = self._align(self._guides_x, (x,), tolerance, exclude)
+            match_y = self._align(self._guides_y, (y,), tolerance, exclude)
+            if match_x:
+                x = match_x[1]
+            if match_y:
+                y = match_y[1]
+            cursor = QRectF(x, y, 0, 0)
+            if match_x:
+                guides.append(self._guide_lines(True, x, match_x[2], cursor))
+            if match_y:
+                guides.append(self._guide_lines(False, y, match_y[2], cursor))
+            if guides:
+                kind = "guide"
+        else:
+            match_x = match_y = None
+
+        if self.grid_enabled:
+            if not match_x:
+                x = self._grid(x)
+            if not match_y:
+                y = self._grid(y)
+            kind = kind or "grid"
+        return SnapResult(QPointF(x, y), kind, None, guides)
+
+    @traced("SnapEngine.snap_rect")
+    def snap_rect(self, rect, tolerance, exclude=()):
+        """
+        Привязка перетаскиваемых фигур с габаритами rect: стороны и центр выравниваются по другим фигурам,
+        иначе левый верхний угол - по сетке. -> (dx, dy, направляющие)
+        """
+        if not self.enabled:
+            return 0.0, 0.0, []
+        self.update_index(self.BUILD_CHUNK)
+        exclude = np.unique(np.asarray(exclude, dtype=np.int64))
+        dx = dy = 0.0
+        match_x = match_y = None
+
+        if self.guides_enabled or self.objects_enabled:
+            match_x = self._align(self._guides_x, (rect.left(), rect.center().x(), rect.right()), tolerance, exclude)
+            match_y = self._align(self._guides_y, (rect.top(), rect.center().y(), rect.bottom()), tolerance, exclude)
+        if match_x:
+            dx = match_x[0]
+        elif self.grid_enabled:
+            dx = self._grid(rect.left()) - rect.left()
+        if match_y:
+            dy = match_y[0]
+        elif self.grid_enabled:
+            dy = self._grid(rect.top()) - rect.top()
+
+        guides = []
+        if self.guides_enabled:
+            moved = rect.translated(dx, dy)
+            if match_x:
+                guides.append(self._guide_lines(True, match_x[1], match_x[2], moved))
+            if match_y:
+                guides.append(self._guide_lines(False, match_y[1], match_y[2], moved))
+        return dx, dy, guides
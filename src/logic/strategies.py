@@ -3,7 +3,10 @@
 from abc import ABC, abstractmethod
 from PySide6.QtGui import QImage, QPainter, QColor
 from PySide6.QtCore import QRectF, QSize
+from contextlib import nullcontext
 import json
+from src.logic.profiling import traced
+from src.logic.shapes import is_root_item
 
 class SaveStrategy(ABC):
     @abstractmethod
@@ -16,25 +19,45 @@ class SaveStrategy(ABC):
 
 
 class JsonSaveStrategy(SaveStrategy):
+    def __init__(self, thumbnail=None):
+        # QImage для миниатюры в заголовке файла (окно недавних проектов читает её без разбора документа)
+        self.thumbnail = thumbnail
+
+    @traced("JsonSaveStrategy.save")
     def save(self, filename, scene):
         # 1. Подготовка структуры
+        # У EditorScene размер листа хранится отдельно от растущего sceneRect
+        page = getattr(scene, "page_rect", scene.sceneRect())
         data = {
             "version": "1.0",
             "scene": {
-                "width": scene.width(),
-                "height": scene.height()
-            },
-            "shapes": []
+                "width": page.width(),
+                "height": page.height()
+            }
         }
+        if self.thumbnail is not None and not self.thumbnail.isNull():
+            from src.logic.thumbnails import encode_thumbnail
+            # Перед фигурами: так она лежит в первых килобайтах файла
+            data["thumbnail"] = encode_thumbnail(self.thumbnail)
+        data["shapes"] = []
+        if hasattr(scene, "layers"):
+            data["layers"] = scene.layers.to_list()
 
         # 2. Сбор объектов (от нижнего к верхнему)
+        if hasattr(scene, "shape_chunks"):
+            # EditorScene знает и о фигурах, которые еще не материализованы (ленивый режим), и хранит
+            # готовые байты неизмененных фигур: файл склеивается из них без обхода дерева
+            from src.logic.save_cache import write_project
+            write_project(filename, data, scene.shape_chunks())
+            return
+
         items = scene.items()[::-1]
 
         for item in items:
             # ПРОВЕРКА:
             # 1. Есть ли у нас метод to_dict?
             # 2. Является ли объект корневым (нет родителя)?
-            if hasattr(item, "to_dict") and item.parentItem() is None:
+            if hasattr(item, "to_dict") and is_root_item(item):
                 data["shapes"].append(item.to_dict())
 
         # 3. Запись
@@ -49,17 +72,24 @@ class ImageSaveStrategy(SaveStrategy):
         self.bg_color = background_color
         self.crop_to_content = crop_to_content # Флаг для доп. задания
 
+    @traced("ImageSaveStrategy.save")
     def save(self, filename, scene):
+        # В ленивом режиме на время экспорта материализуем весь документ
+        full_document = getattr(scene, "full_document", None)
+        with full_document() if full_document else nullcontext():
+            self._render(filename, scene)
+
+    def _render(self, filename, scene):
         # 1. Определяем область для рендеринга
         if self.crop_to_content:
             # Берем только рамку, охватывающую все фигуры
             rect = scene.itemsBoundingRect()
             # Если сцена пустая, rect будет невалидным, откатываемся к размеру сцены
             if rect.isEmpty():
-                rect = scene.sceneRect()
+                rect = getattr(scene, "page_rect", scene.sceneRect())
         else:
             # Берем весь размер "листа"
-            rect = scene.sceneRect()
+            rect = getattr(scene, "page_rect", scene.sceneRect())
 
         width = int(rect.width())
         height = int(rect.height())
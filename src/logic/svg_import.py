@@ -0,0 +1,506 @@
+# src/logic/svg_import.py
+"""
+Импорт SVG: <rect>, <ellipse>/<circle>, <line>, <polyline>/<polygon>, простой <path> и группы <g>
+становятся фигурами редактора (Rectangle, Ellipse, Line, Polygon, PathShape, Group).
+
+Файл читается потоково (ElementTree.iterparse): разобранный элемент сразу очищается и удаляется
+из родителя, поэтому в памяти держится только путь от корня до текущего элемента, а не всё дерево -
+файлы в сотни мегабайт читаются с ограниченной памятью. Фигуры выдаются партиями (SvgImporter.batches),
+холст добавляет их одним действием в истории (EditorCanvas.import_shapes).
+
+- transform (в том числе вложенных <g> и viewBox корня) запекается в координаты фигур: без перекоса
+  прямоугольник и эллипс остаются собой (сдвиг + поворот + масштаб сторон), с перекосом - становятся
+  ломаной. Группа - только контейнер, своего преобразования у неё нет.
+- Группа больше GROUP_MAX_CHILDREN фигур не создается: её фигуры выдаются по одной (файл, обернутый
+  целиком в один <g>, иначе держался бы в памяти до конца разбора и стал бы одной огромной группой).
+- <path>: M, L, H, V, Z и кривые C, S, Q, T (аппроксимируются ломаной). Путь с дугами (A) пропускается.
+- Цвет фигуры - stroke, если его нет - fill. <defs>, <symbol>, <clipPath>, текст и т.п. пропускаются.
+"""
+import math
+import os
+import re
+from array import array
+from itertools import chain
+import xml.etree.ElementTree as ET
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QColor, QTransform
+from src.logic.shapes import Rectangle, Ellipse, Line, Polygon, PathShape, Group
+from src.logic.profiling import traced
+
+BATCH_SIZE = 2000           # Фигур в партии (между партиями окно обновляет прогресс)
+GROUP_MAX_CHILDREN = 1000   # Группа крупнее выдается отдельными фигурами
+CURVE_STEPS = 8             # Отрезков на кривую Безье пути
+ELLIPSE_SEGMENTS = 64       # Вершин ломаной у перекошенного эллипса
+NUMPY_MIN_POINTS = 64       # Вершины ломаной длиннее пересчитываются через numpy
+
+SHAPE_TAGS = ("rect", "ellipse", "circle", "line", "polyline", "polygon", "path")
+CONTAINER_TAGS = ("svg", "g", "a", "switch")
+# Содержимое не рисуется напрямую (или не поддерживается) - поддерево пропускается целиком
+SKIPPED_TAGS = ("defs", "symbol", "clipPath", "mask", "marker", "pattern", "linearGradient", "radialGradient",
+                "filter", "style", "script", "title", "desc", "metadata", "text", "foreignObject")
+STYLE_KEYS = ("stroke", "fill", "stroke-width", "display")
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_NUMBER_RE = re.compile(_NUMBER)
+_PATH_TOKEN_RE = re.compile(r"[MmLlHhVvCcSsQqTtAaZz]|" + _NUMBER)
+_TRANSFORM_RE = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+_LENGTH_RE = re.compile(r"\s*(" + _NUMBER + r")\s*(px|pt|pc|mm|cm|in)?\s*$")
+_UNITS = {None: 1.0, "px": 1.0, "pt": 96 / 72, "pc": 16.0, "mm": 96 / 25.4, "cm": 96 / 2.54, "in": 96.0}
+_PATH_ARGS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "Z": 0}
+
+_colors = {}  # Значение stroke/fill -> #rrggbb или None (в файле обычно немного разных цветов)
+
+
+class UnsupportedPath(ValueError):
+    pass
+
+
+# --- АТРИБУТЫ ---
+
+def _numbers(text):
+    return [float(v) for v in _NUMBER_RE.findall(text or "")]
+
+
+def _length(value, default=0.0):
+    """Длина SVG в пикселях (единицы px/pt/mm/...; проценты и прочее -> default)"""
+    if value is None:
+        return default
+    match = _LENGTH_RE.match(value)
+    if not match:
+        return default
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def parse_transform(text):
+    """Атрибут transform -> QTransform (список преобразований применяется справа налево, как в SVG)"""
+    result = QTransform()
+    for name, args in _TRANSFORM_RE.findall(text or ""):
+        v = _numbers(args)
+        if name == "matrix" and len(v) == 6:
+            t = QTransform(*v)
+        elif name == "translate" and v:
+            t = QTransform.fromTranslate(v[0], v[1] if len(v) > 1 else 0.0)
+        elif name == "scale" and v:
+            t = QTransform.fromScale(v[0], v[1] if len(v) > 1 else v[0])
+        elif name == "rotate" and v:
+            t = QTransform().rotate(v[0])
+            if len(v) == 3:
+                t = QTransform.fromTranslate(-v[1], -v[2]) * t * QTransform.fromTranslate(v[1], v[2])
+        elif name == "skewX" and v:
+            t = QTransform(1, 0, math.tan(math.radians(v[0])), 1, 0, 0)
+        elif name == "skewY" and v:
+            t = QTransform(1, math.tan(math.radians(v[0])), 0, 1, 0, 0)
+        else:
+            continue
+        # QTransform умножает точку-строку слева: последнее в списке преобразование применяется первым
+        result = t * result
+    return result
+
+
+def viewbox_transform(attrib):
+    """Преобразование viewBox корневого <svg> в его width/height (без viewBox - тождественное)"""
+    box = _numbers(attrib.get("viewBox"))
+    if len(box) != 4 or box[2] <= 0 or box[3] <= 0:
+        return QTransform()
+    sx = _length(attrib.get("width"), box[2]) / box[2]
+    sy = _length(attrib.get("height"), box[3]) / box[3]
+    return QTransform.fromTranslate(-box[0], -box[1]) * QTransform.fromScale(sx, sy)
+
+
+def element_style(attrib, inherited):
+    """Стиль элемента: атрибуты представления и style="..." поверх унаследованного (словарь не копируется зря)"""
+    own = None
+    for key in STYLE_KEYS:
+        value = attrib.get(key)
+        if value is not None:
+            own = own or dict(inherited)
+            own[key] = value.strip()
+    declarations = attrib.get("style")
+    if declarations:
+        for declaration in declarations.split(";"):
+            key, sep, value = declaration.partition(":")
+            key = key.strip()
+            if sep and key in STYLE_KEYS:
+                own = own or dict(inherited)
+                own[key] = value.strip()
+    return inherited if own is None else own
+
+
+def parse_color(value):
+    """Цвет SVG -> #rrggbb, None для none/transparent. Градиенты, currentColor и т.п. -> черный"""
+    key = _colors.get(value)
+    if key is not None or value in _colors:
+        return key
+    text = value.strip().lower()
+    if text in ("none", "transparent"):
+        key = None
+    elif text.startswith("rgb"):
+        channels = _numbers(text)[:3]
+        if "%" in text:
+            channels = [c * 2.55 for c in channels]
+        key = QColor(*(max(0, min(255, round(c))) for c in channels)).name() if len(channels) == 3 else "#000000"
+    elif QColor.isValidColorName(text):
+        key = QColor(text).name()
+    else:
+        key = "#000000"
+    _colors[value] = key
+    return key
+
+
+# --- ГЕОМЕТРИЯ ---
+
+def decompose(transform):
+    """
+    Аффинное преобразование без перекоса -> (sx, sy, угол в градусах, dx, dy): точка p переходит
+    в R(угол) * (sx * x, sy * y) + (dx, dy). С перекосом -> None.
+    """
+    a, b, c, d = transform.m11(), transform.m12(), transform.m21(), transform.m22()
+    sx, sy = math.hypot(a, b), math.hypot(c, d)
+    if sx == 0 or sy == 0 or abs(a * c + b * d) > 1e-9 * sx * sy:
+        return None
+    if a * d - b * c < 0:
+        sy = -sy  # Отражение
+    return sx, sy, math.degrees(math.atan2(b, a)), transform.dx(), transform.dy()
+
+
+def map_coords(coords, transform):
+    """
+    array('d') вершин через QTransform -> новый array('d') (тождественное - тот же массив).
+    Короткие ломаные считаются в Python: у numpy накладные расходы на вызов больше самой работы.
+    """
+    if transform.isIdentity():
+        return coords
+    m11, m12, m21, m22, dx, dy = (transform.m11(), transform.m12(), transform.m21(), transform.m22(),
+                                  transform.dx(), transform.dy())
+    if len(coords) < 2 * NUMPY_MIN_POINTS:
+        return array('d', chain.from_iterable((x * m11 + y * m21 + dx, x * m12 + y * m22 + dy)
+                                              for x, y in zip(coords[0::2], coords[1::2])))
+    import numpy as np
+    xy = np.frombuffer(coords, dtype=float).reshape(-1, 2)
+    x, y = xy[:, 0], xy[:, 1]
+    return array('d', np.column_stack((x * m11 + y * m21 + dx, x * m12 + y * m22 + dy)).tobytes())
+
+
+def _bezier(coords, x0, y0, controls, steps=CURVE_STEPS):
+    """Дописывает в coords точки кривой Безье (квадратичной или кубической) без начальной точки"""
+    if len(controls) == 4:
+        (x1, y1), (x2, y2) = controls[0:2], controls[2:4]
+        for i in range(1, steps + 1):
+            t = i / steps
+            u = 1 - t
+            coords.append(u * u * x0 + 2 * u * t * x1 + t * t * x2)
+            coords.append(u * u * y0 + 2 * u * t * y1 + t * t * y2)
+    else:
+        (x1, y1), (x2, y2), (x3, y3) = controls[0:2], controls[2:4], controls[4:6]
+        for i in range(1, steps + 1):
+            t = i / steps
+            u = 1 - t
+            coords.append(u * u * u * x0 + 3 * u * u * t * x1 + 3 * u * t * t * x2 + t * t * t * x3)
+            coords.append(u * u * u * y0 + 3 * u * u * t * y1 + 3 * u * t * t * y2 + t * t * t * y3)
+
+
+def parse_path(d):
+    """
+    Данные <path d="..."> -> [(array('d') вершин, замкнут ли), ...] по подпутям.
+    Дуги (A) не поддерживаются: UnsupportedPath.
+    """
+    tokens = _PATH_TOKEN_RE.findall(d or "")
+    subpaths = []
+    coords, closed = None, False
+    x = y = start_x = start_y = 0.0
+    control = None  # Последняя управляющая точка (для S и T): (x, y, кубическая ли)
+    command = None
+    i, n = 0, len(tokens)
+    while i < n:
+        token = tokens[i]
+        if token.isalpha():
+            command = token
+            i += 1
+            if command in "Aa":
+                raise UnsupportedPath("дуги (A) не поддерживаются")
+            if command in "Zz":
+                if coords is not None:
+                    closed = True
+                    x, y = start_x, start_y
+                control = None
+                continue
+        elif command is None:
+            raise ValueError(f"Путь должен начинаться с команды, а не с {token}")
+        upper = command.upper()
+        count = _PATH_ARGS[upper]
+        if i + count > n:
+            break
+        try:
+            v = [float(t) for t in tokens[i:i + count]]
+        except ValueError:
+            raise ValueError(f"Ошибка в данных пути около «{' '.join(tokens[i:i + count])}»")
+        i += count
+        relative = command.islower()
+        if upper == "H":
+            x = x + v[0] if relative else v[0]
+            v = []
+        elif upper == "V":
+            y = y + v[0] if relative else v[0]
+            v = []
+        elif relative:
+            v = [value + (y if k % 2 else x) for k, value in enumerate(v)]
+
+        if upper == "M" or coords is None or closed:
+            # Новый подпуть: M или рисование после Z (продолжается с начальной точки)
+            if coords is not None and len(coords) >= 4:
+                subpaths.append((coords, closed))
+            if upper == "M":
+                x, y = v
+                # Следующие пары после M - неявные L
+                command = "l" if relative else "L"
+            coords, closed = array('d', (x, y)), False
+            start_x, start_y = x, y
+            if upper == "M":
+                control = None
+                continue
+
+        x0, y0 = x, y
+        if upper in ("L", "H", "V"):
+            if upper == "L":
+                x, y = v
+            control = None
+        elif upper in ("C", "Q"):
+            _bezier(coords, x0, y0, v)
+            control = (v[-4], v[-3], upper == "C")
+            x, y = v[-2], v[-1]
+            continue
+        elif upper in ("S", "T"):
+            cubic = upper == "S"
+            # Первая управляющая точка - отражение предыдущей (если предыдущая кривая того же вида)
+            if control is not None and control[2] == cubic:
+                reflected = [2 * x0 - control[0], 2 * y0 - control[1]]
+            else:
+                reflected = [x0, y0]
+            controls = reflected + v
+            _bezier(coords, x0, y0, controls)
+            control = (controls[-4], controls[-3], cubic)
+            x, y = controls[-2], controls[-1]
+            continue
+        coords.append(x)
+        coords.append(y)
+
+    if coords is not None and len(coords) >= 4:
+        subpaths.append((coords, closed))
+    return subpaths
+
+
+def _drop_closing_point(coords):
+    """Замкнутая ломаная без повтора первой вершины в конце"""
+    if len(coords) >= 6 and coords[0] == coords[-2] and coords[1] == coords[-1]:
+        del coords[-2:]
+    return coords
+
+
+# --- ФИГУРЫ ---
+
+def _box_shape(cls, x, y, w, h, transform, color, width):
+    """Прямоугольник или эллипс (габариты x, y, w, h) через transform"""
+    decomposed = decompose(transform)
+    if decomposed is None:
+        # С перекосом фигура перестает быть прямоугольником/эллипсом - ломаная по контуру
+        if cls is Rectangle:
+            corners = (x, y, x + w, y, x + w, y + h, x, y + h)
+        else:
+            cx, cy, rx, ry = x + w / 2, y + h / 2, w / 2, h / 2
+            corners = []
+            for k in range(ELLIPSE_SEGMENTS):
+                angle = 2 * math.pi * k / ELLIPSE_SEGMENTS
+                corners += (cx + rx * math.cos(angle), cy + ry * math.sin(angle))
+        return Polygon(map_coords(array('d', corners), transform), color, width, True)
+    sx, sy, angle, dx, dy = decomposed
+    x1, x2 = sorted((x * sx, (x + w) * sx))
+    y1, y2 = sorted((y * sy, (y + h) * sy))
+    item = cls(x1, y1, x2 - x1, y2 - y1, color, width)
+    item.setPos(dx, dy)
+    item.setRotation(angle)
+    return item
+
+
+def _polyline(coords, closed, transform, color, width):
+    if len(coords) % 2:
+        del coords[-1]
+    if closed:
+        _drop_closing_point(coords)
+    if len(coords) < 4:
+        return None
+    return Polygon.from_points(map_coords(coords, transform), color, width, closed)
+
+
+def build_shape(tag, attrib, transform, color, width):
+    """Фигура по элементу SVG (в координатах сцены) или None, если элемент ничего не рисует"""
+    if tag == "rect":
+        w, h = _length(attrib.get("width")), _length(attrib.get("height"))
+        if w <= 0 or h <= 0:
+            return None
+        return _box_shape(Rectangle, _length(attrib.get("x")), _length(attrib.get("y")), w, h,
+                          transform, color, width)
+    if tag in ("ellipse", "circle"):
+        cx, cy = _length(attrib.get("cx")), _length(attrib.get("cy"))
+        if tag == "circle":
+            rx = ry = _length(attrib.get("r"))
+        else:
+            rx, ry = _length(attrib.get("rx")), _length(attrib.get("ry"))
+        if rx <= 0 or ry <= 0:
+            return None
+        return _box_shape(Ellipse, cx - rx, cy - ry, 2 * rx, 2 * ry, transform, color, width)
+    if tag == "line":
+        p1 = transform.map(QPointF(_length(attrib.get("x1")), _length(attrib.get("y1"))))
+        p2 = transform.map(QPointF(_length(attrib.get("x2")), _length(attrib.get("y2"))))
+        return Line(p1.x(), p1.y(), p2.x(), p2.y(), color, width)
+    if tag in ("polyline", "polygon"):
+        coords = array('d', _numbers(attrib.get("points")))
+        return _polyline(coords, tag == "polygon", transform, color, width)
+    if tag == "path":
+        subpaths = parse_path(attrib.get("d"))
+        if len(subpaths) == 1:
+            return _polyline(subpaths[0][0], subpaths[0][1], transform, color, width)
+        contours = [_drop_closing_point(coords) for coords, closed in subpaths if closed and len(coords) >= 6]
+        if contours and len(contours) == len(subpaths):
+            # Только замкнутые подпути - составной контур (дырки - по правилу even-odd)
+            return PathShape([[QPointF(x, y) for x, y in zip(c[0::2], c[1::2])]
+                              for c in (map_coords(c, transform) for c in contours)], color, width)
+        parts = [p for p in (_polyline(coords, closed, transform, color, width) for coords, closed in subpaths) if p]
+        if len(parts) < 2:
+            return parts[0] if parts else None
+        group = Group()
+        for part in parts:
+            group.addToGroup(part)
+        return group
+    return None
+
+
+class _Frame:
+    """Открытый контейнер (<svg>, <g>, ...): преобразование, стиль и накопленные фигуры группы"""
+    __slots__ = ("transform", "style", "children")
+
+    def __init__(self, transform, style, children):
+        self.transform = transform
+        self.style = style
+        self.children = children  # None - контейнер не становится группой (фигуры уходят выше)
+
+
+class SvgImporter:
+    """
+    Потоковый импорт SVG-файла. batches() выдает списки готовых корневых фигур;
+    position / total - прочитано байт из файла / его размер (для прогресса).
+    После разбора: created - сколько фигур создано, skipped - сколько элементов пропущено.
+    """
+
+    def __init__(self, filename, batch_size=BATCH_SIZE):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.total = os.path.getsize(filename)
+        self.position = 0
+        self.created = 0
+        self.skipped = 0
+        self._frames = []
+        self._ready = []
+
+    def _emit(self, item, depth):
+        """Фигура готова: в ближайшую открытую группу или в партию корневых фигур"""
+        while depth >= 0:
+            frame = self._frames[depth]
+            if frame.children is not None:
+                frame.children.append(item)
+                if len(frame.children) > GROUP_MAX_CHILDREN:
+                    # Слишком большая группа: её фигуры уходят выше, а дальше - по одной
+                    children, frame.children = frame.children, None
+                    for child in children:
+                        self._emit(child, depth - 1)
+                return
+            depth -= 1
+        self._ready.append(item)
+
+    def _close_group(self, frame, depth):
+        children = frame.children
+        if not children:
+            return
+        if len(children) == 1:
+            # Группа из одной фигуры - сама фигура (как в ShapeFactory._create_group)
+            self._emit(children[0], depth - 1)
+            return
+        group = Group()
+        for child in children:
+            group.addToGroup(child)
+        self._emit(group, depth - 1)
+
+    @traced("SvgImporter.batches")
+    def batches(self):
+        frames = self._frames
+        elements = []  # Путь от корня до текущего элемента (для удаления разобранных детей)
+        skip_depth = 0  # > 0 - внутри пропускаемого поддерева
+        with open(self.filename, 'rb') as f:
+            try:
+                for event, elem in ET.iterparse(f, events=("start", "end")):
+                    tag = elem.tag.rpartition("}")[2] if isinstance(elem.tag, str) else ""
+                    if event == "start":
+                        elements.append(elem)
+                        if skip_depth:
+                            skip_depth += 1
+                            continue
+                        parent = frames[-1] if frames else None
+                        style = element_style(elem.attrib, parent.style if parent else {})
+                        if tag in SKIPPED_TAGS or style.get("display") == "none":
+                            skip_depth = 1
+                            continue
+                        if tag in CONTAINER_TAGS:
+                            transform = parse_transform(elem.get("transform"))
+                            if tag == "svg" and parent is None:
+                                transform = viewbox_transform(elem.attrib) * transform
+                            if parent is not None:
+                                transform = transform * parent.transform
+                            frames.append(_Frame(transform, style, [] if tag == "g" else None))
+                        continue
+
+                    # Конец элемента: атрибуты уже разобраны, дети (если были) - тоже
+                    elements.pop()
+                    if skip_depth:
+                        skip_depth -= 1
+                        if not skip_depth and tag in SHAPE_TAGS:
+                            self.skipped += 1
+                    elif tag in CONTAINER_TAGS:
+                        frame = frames.pop()
+                        if frame.children is not None:
+                            self._close_group(frame, len(frames))
+                    elif tag in SHAPE_TAGS and frames:
+                        self._add_shape(tag, elem)
+                    # Разобранный элемент больше не нужен: без этого дерево копилось бы целиком
+                    elem.clear()
+                    if elements:
+                        del elements[-1][:]
+
+                    if len(self._ready) >= self.batch_size:
+                        self.position = f.tell()
+                        ready, self._ready = self._ready, []
+                        yield ready
+            except ET.ParseError as e:
+                raise ValueError(f"Файл SVG поврежден: {e}")
+            self.position = self.total
+        if self._ready:
+            ready, self._ready = self._ready, []
+            yield ready
+
+    def _add_shape(self, tag, elem):
+        frame = self._frames[-1]
+        style = element_style(elem.attrib, frame.style)
+        transform = parse_transform(elem.get("transform")) * frame.transform
+        stroke = parse_color(style.get("stroke", "none"))
+        color = stroke or parse_color(style.get("fill", "black")) or "#000000"
+        # Толщина пера масштабируется вместе с фигурой (среднее растяжение преобразования)
+        scale = math.sqrt(abs(transform.determinant()))
+        width = max(1, round(_length(style.get("stroke-width"), 1.0) * scale))
+        try:
+            item = build_shape(tag, elem.attrib, transform, color, width)
+        except ValueError as e:
+            print(f"Error importing SVG <{tag}>: {e}")
+            item = None
+        if item is None:
+            self.skipped += 1
+            return
+        self.created += 1
+        self._emit(item, len(self._frames) - 1)
@@ -0,0 +1,259 @@
+# src/logic/thumbnails.py
+"""
+Миниатюры проектов (для окна недавних проектов).
+
+1. JsonSaveStrategy встраивает миниатюру (PNG в base64) в заголовок файла - до списка фигур,
+   поэтому она читается из первых килобайт файла без разбора документа (read_embedded).
+2. Локальный кэш: <кэш приложения>/thumbnails/<хеш пути>-<mtime>.png. Изменился файл - изменилось
+   имя, устаревшая миниатюра удаляется при записи новой.
+3. Файлам без встроенной миниатюры (старые версии) она рисуется в пуле процессов прямо по словарям
+   фигур (render_shapes): без QGraphicsScene, без фигур и без нагрузки на процесс окна.
+"""
+import base64
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from PySide6.QtCore import (QObject, Signal, QBuffer, QByteArray, QIODevice, QPointF, QRectF, Qt,
+                            QStandardPaths)
+from PySide6.QtGui import QImage, QPainter, QColor, QPen, QPainterPath, QPolygonF
+from src.logic.points import decode_points, to_polygonf
+
+THUMBNAIL_SIZE = 160
+THUMBNAIL_MARK = b'\n    "thumbnail": "'
+HEAD_BYTES = 256 * 1024  # Миниатюра лежит в самом начале файла
+
+
+# --- КОДИРОВАНИЕ ---
+
+def scaled(image):
+    """Картинка, вписанная в квадрат THUMBNAIL_SIZE"""
+    return image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+def png_bytes(image):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(data)
+
+
+def encode_thumbnail(image):
+    """Миниатюра для поля "thumbnail" файла проекта (PNG в base64)"""
+    return base64.b64encode(png_bytes(scaled(image))).decode("ascii")
+
+
+def read_embedded(filename):
+    """PNG встроенной миниатюры (читается только заголовок файла) или None"""
+    try:
+        with open(filename, 'rb') as f:
+            head = f.read(HEAD_BYTES)
+    except OSError:
+        return None
+    start = head.find(THUMBNAIL_MARK)
+    if start < 0:
+        return None
+    start += len(THUMBNAIL_MARK)
+    end = head.find(b'"', start)
+    if end < 0:
+        return None
+    try:
+        return base64.b64decode(head[start:end], validate=True)
+    except ValueError:
+        return None
+
+
+# --- КЭШ ---
+
+def default_cache_dir():
+    return os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), "thumbnails")
+
+
+def _cache_key(filename):
+    return hashlib.sha1(os.path.abspath(filename).encode("utf-8")).hexdigest()[:20]
+
+
+def cache_path(cache_dir, filename):
+    """Файл миниатюры в кэше для текущей версии файла проекта (None, если проекта нет)"""
+    try:
+        mtime = os.stat(filename).st_mtime_ns
+    except OSError:
+        return None
+    return os.path.join(cache_dir, f"{_cache_key(filename)}-{mtime}.png")
+
+
+def cached_thumbnail(cache_dir, filename):
+    """Путь к миниатюре из кэша или None (дешево: только stat)"""
+    path = cache_path(cache_dir, filename)
+    return path if path and os.path.exists(path) else None
+
+
+def store_thumbnail(cache_dir, filename, png):
+    """Кладет PNG в кэш (и удаляет миниатюры прежних версий файла) -> путь или None"""
+    path = cache_path(cache_dir, filename)
+    if path is None:
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = _cache_key(filename) + "-"
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix):
+            os.remove(os.path.join(cache_dir, name))
+    with open(path, 'wb') as f:
+        f.write(png)
+    return path
+
+
+# --- ОТРИСОВКА ПО СЛОВАРЯМ ---
+
+def _paint_shape(painter, data, pen):
+    """Рисует фигуру по словарю так, как её построила бы ShapeFactory.from_dict"""
+    children = data.get("children", ())
+    if len(children) == 1:
+        # Фабрика возвращает единственного ребенка без группы
+        return _paint_shape(painter, children[0], pen)
+    pos = data.get("pos", [0, 0])
+    painter.save()
+    painter.translate(pos[0], pos[1])
+    painter.rotate(data.get("rotation", 0))
+    shape_type = data.get("type")
+    props = data.get("props", {})
+    if shape_type == "group":
+        for child in children:
+            _paint_shape(painter, child, pen)
+    else:
+        pen.setColor(QColor(props.get("color", "black")))
+        painter.setPen(pen)
+        if shape_type == "rect":
+            painter.drawRect(QRectF(props.get("x", 0), props.get("y", 0), props.get("w", 0), props.get("h", 0)))
+        elif shape_type == "ellipse":
+            painter.drawEllipse(QRectF(props.get("x", 0), props.get("y", 0), props.get("w", 0), props.get("h", 0)))
+        elif shape_type == "line":
+            painter.drawLine(QPointF(props.get("x1", 0), props.get("y1", 0)),
+                             QPointF(props.get("x2", 0), props.get("y2", 0)))
+        elif shape_type == "polygon":
+            polygon = to_polygonf(decode_points(props.get("points")))
+            if props.get("is_closed", True):
+                painter.drawPolygon(polygon)
+            else:
+                painter.drawPolyline(polygon)
+        elif shape_type == "path":
+            path = QPainterPath()
+            for contour in props.get("contours", ()):
+                if contour:
+                    path.addPolygon(QPolygonF([QPointF(p[0], p[1]) for p in contour]))
+                    path.closeSubpath()
+            painter.drawPath(path)
+        elif shape_type == "text":
+            # Шрифты в процессе пула недоступны (нет QGuiApplication): строки - полосками, как мелкие
+            # надписи на холсте (средняя ширина знака - около половины высоты шрифта)
+            from src.logic.lazy_document import TEXT_LINE_SPACING, DEFAULT_FONT_SIZE
+            size = props.get("size", DEFAULT_FONT_SIZE)
+            for i, row in enumerate(str(props.get("text", "")).split("\n")):
+                if row.strip():
+                    painter.fillRect(QRectF(props.get("x", 0), props.get("y", 0) + (i + 0.4) * size * TEXT_LINE_SPACING,
+                                            len(row) * size * 0.55, size * 0.5), pen.color())
+    painter.restore()
+
+
+def render_shapes(data, size=THUMBNAIL_SIZE):
+    """
+    Картинка документа (словарь файла проекта), вписанная в квадрат size -> QImage.
+    Вид как у миникарты: белый лист на сером фоне, фигуры скрытых слоев не рисуются.
+    """
+    from src.logic.lazy_document import record_bounds
+
+    scene_info = data.get("scene", {})
+    world = QRectF(0, 0, scene_info.get("width", 800), scene_info.get("height", 600))
+    page = QRectF(world)
+    # Фигура без слоя (или с неизвестным слоем) лежит в нижнем слое - как в LayerModel.layer_of
+    layers = data.get("layers") or [{}]
+    visible = {layer.get("name"): layer.get("visible", True) for layer in layers}
+    bottom = layers[0].get("name")
+    shapes = [shape for shape in data.get("shapes", ())
+              if visible.get(shape.get("layer") if shape.get("layer") in visible else bottom, True)]
+    for shape in shapes:
+        bounds = record_bounds(shape)
+        if bounds:
+            world = world.united(QRectF(bounds[0], bounds[1], bounds[2] - bounds[0], bounds[3] - bounds[1]))
+    pad = max(world.width(), world.height()) * 0.05
+    world = world.adjusted(-pad, -pad, pad, pad)
+
+    scale = size / max(world.width(), world.height(), 1e-9)
+    image = QImage(max(1, round(world.width() * scale)), max(1, round(world.height() * scale)),
+                   QImage.Format_ARGB32_Premultiplied)
+    image.fill(QColor("#555555"))
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.scale(scale, scale)
+    painter.translate(-world.left(), -world.top())
+    painter.fillRect(page, QColor("white"))
+    # В миниатюре линия толщиной в пиксель (перо в единицах сцены стало бы невидимым)
+    pen = QPen(QColor("black"), 1)
+    pen.setCosmetic(True)
+    for shape in shapes:
+        _paint_shape(painter, shape, pen)
+    painter.end()
+    return image
+
+
+def make_thumbnail(filename, cache_dir):
+    """
+    Задача пула: миниатюра проекта в кэш -> путь к PNG (None, если файл не прочитать).
+    Встроенная миниатюра берется как есть, иначе документ разбирается и рисуется.
+    """
+    png = read_embedded(filename)
+    if png is None:
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            png = png_bytes(render_shapes(data))
+        except Exception as e:
+            print(f"Error rendering thumbnail for {filename}: {e}")
+            return None
+    return store_thumbnail(cache_dir, filename, png)
+
+
+class ThumbnailPool(QObject):
+    """
+    Пул процессов, рисующих недостающие миниатюры.
+    Сигнал ready(путь проекта, путь PNG в кэше) приходит в поток окна (None - не получилось).
+    Процессы запускаются через spawn: форк процесса с живым Qt небезопасен.
+    """
+    ready = Signal(str, object)
+
+    def __init__(self, cache_dir, workers=None, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._executor = None
+        self._pending = {}
+
+    def request(self, filename):
+        if filename in self._pending:
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        future = self._executor.submit(make_thumbnail, filename, self.cache_dir)
+        self._pending[filename] = future
+        # Колбэк вызывается в служебном потоке пула: сигнал доставит результат в поток окна
+        future.add_done_callback(lambda f, name=filename: self._on_done(name, f))
+
+    def _on_done(self, filename, future):
+        self._pending.pop(filename, None)
+        if future.cancelled():
+            return
+        try:
+            path = future.result()
+        except Exception as e:
+            print(f"Error rendering thumbnail for {filename}: {e}")
+            path = None
+        self.ready.emit(filename, path)
+
+    def shutdown(self):
+        """Отменяет еще не начатые задачи (начатые досчитываются в фоне)"""
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
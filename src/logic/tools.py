@@ -1,9 +1,11 @@
 # src/logic/tools.py
 from abc import ABC, abstractmethod
-from PySide6.QtWidgets import QGraphicsView
-from PySide6.QtCore import Qt, QPointF
+from PySide6.QtWidgets import QGraphicsView, QGraphicsItem
+from PySide6.QtCore import Qt, QPointF, QRect, QRectF
 from src.logic.factory import ShapeFactory
-from src.logic.commands import AddShapeCommand, MoveCommand, DeleteShapeCommand
+from src.logic.commands import AddShapeCommand, MoveCommand, DeleteShapeCommand, EditVerticesCommand, EditTextCommand
+from src.logic.shapes import TextShape
+from src.logic.profiling import traced
 
 class Tool(ABC):
     def __init__(self, view):
@@ -31,6 +33,13 @@ class SelectionTool(Tool):
         # Словарь: {item: QPointF(x, y)}
         self.item_positions = {}
 
+        # Привязка при перетаскивании: исходные габариты выделения и id его фигур в индексе привязки
+        self.drag_rect = None
+        self.drag_exclude = ()
+        # Габариты выделения в начале перетаскивания, если в сцене есть запеченные чанки (см. mouse_move)
+        self.drag_bounds = None
+
+    @traced("SelectionTool.mouse_press")
     def mouse_press(self, event):
         self.view.viewport().setCursor(Qt.ClosedHandCursor)
         # 1. Сначала даем Qt обработать клик (выделить объекты)
@@ -41,12 +50,45 @@ class SelectionTool(Tool):
         for item in self.scene.selectedItems():
             self.item_positions[item] = item.pos()
 
+        self.drag_rect = None
+        self.drag_bounds = None
+        if self.item_positions and self.scene.baker.chunks:
+            self.drag_bounds = QRectF()
+            for item in self.item_positions:
+                self.drag_bounds = self.drag_bounds.united(item.sceneBoundingRect())
+        engine = self.view.init_snapping()
+        if self.item_positions and engine.enabled:
+            self.drag_exclude = engine.owners_of(self.item_positions)
+            self.drag_rect = engine.items_rect(self.item_positions)
+
+    @traced("SelectionTool.mouse_move")
     def mouse_move(self, event):
         # Даем Qt визуально двигать объекты
         super(type(self.view), self.view).mouseMoveEvent(event)
 
+        # Чанк рисует все свои фигуры на месте верхней: чтобы перетаскиваемые фигуры легли в свой порядок
+        # наложения относительно запеченных, чанки под ними распекаются
+        if self.drag_bounds is not None and event.buttons() & Qt.LeftButton:
+            item, old_pos = next(iter(self.item_positions.items()))
+            self.scene.baker.release_rect(self.drag_bounds.translated(item.pos() - old_pos))
+
+        # Qt ставит фигуры в "начальная позиция + смещение мыши", мы доводим их до привязки
+        if self.drag_rect is not None and event.buttons() & Qt.LeftButton:
+            item, old_pos = next(iter(self.item_positions.items()))
+            offset = item.pos() - old_pos
+            if offset.isNull():
+                return
+            dx, dy = self.view.snap_items(self.drag_rect.translated(offset), self.drag_exclude, event.modifiers())
+            if dx or dy:
+                for item in self.item_positions:
+                    item.setPos(item.pos() + QPointF(dx, dy))
+
+    @traced("SelectionTool.mouse_release")
     def mouse_release(self, event):
         self.view.viewport().setCursor(Qt.OpenHandCursor)
+        self.view.set_snap_guides([])
+        self.drag_rect = None
+        self.drag_bounds = None
         # 1. Даем Qt завершить процесс перетаскивания
         super(type(self.view), self.view).mouseReleaseEvent(event)
 
@@ -79,9 +121,10 @@ class CreationTool(Tool):
         self.start_pos = None
         self.temp_shape = None # Временная фигура для предпросмотра
 
+    @traced("CreationTool.mouse_press")
     def mouse_press(self, event):
         if event.button() == Qt.LeftButton:
-            self.start_pos = self.view.mapToScene(event.pos())
+            self.start_pos = self.view.snap_point(self.view.mapToScene(event.pos()), event.modifiers()).point
 
             # 1. Создаем фигуру сразу в точке клика
             # Цвет берем из View (Canvas), так как мы его там храним
@@ -92,21 +135,25 @@ class CreationTool(Tool):
                     self.start_pos, # Пока начало и конец совпадают
                     self.view.current_color # <--- Передаем цвет!
                 )
+                self.temp_shape.is_preview = True
                 self.scene.addItem(self.temp_shape)
             except ValueError:
                 pass
 
+    @traced("CreationTool.mouse_move")
     def mouse_move(self, event):
         # 2. Если мы тащим мышь и фигура создана - обновляем её форму
         if self.temp_shape and self.start_pos:
-            current_pos = self.view.mapToScene(event.pos())
+            current_pos = self.view.snap_point(self.view.mapToScene(event.pos()), event.modifiers()).point
             # Вызываем метод set_geometry у фигуры (см. shapes.py)
             self.temp_shape.set_geometry(self.start_pos, current_pos)
 
+    @traced("CreationTool.mouse_release")
     def mouse_release(self, event):
         if event.button() == Qt.LeftButton and self.temp_shape:
             # 1. Запоминаем финальную точку
-            end_pos = self.view.mapToScene(event.pos())
+            end_pos = self.view.snap_point(self.view.mapToScene(event.pos()), event.modifiers()).point
+            self.view.set_snap_guides([])
             color = self.view.current_color
 
             # 2. УДАЛЯЕМ временную фигуру (превью)
@@ -129,27 +176,33 @@ class CreationTool(Tool):
             self.start_pos = None
 
 class PolygonTool(Tool):
+    CLOSE_RADIUS = 15  # Радиус замыкания вокруг первой точки (пиксели экрана)
+
     def __init__(self, view):
         super().__init__(view)
         self.nodes = []      # Список зафиксированных точек
         self.temp_item = None # Превью (нить)
 
+    @traced("PolygonTool.mouse_press")
     def mouse_press(self, event):
         if event.button() == Qt.LeftButton:
-            pos = self.view.mapToScene(event.pos())
-
-            # Если кликнули близко к первой точке (радиус 15 пикселей) — замыкаем
-            if self.nodes and (pos - self.nodes[0]).manhattanLength() < 15:
+            # Первая точка - приоритетная цель привязки: попали в неё - замыкаем
+            snap = self.view.snap_point(self.view.mapToScene(event.pos()), event.modifiers(),
+                                        targets=self.nodes[:1], target_pixels=self.CLOSE_RADIUS)
+            if snap.kind == "target":
                 self.finish_polygon(closed=True)
                 return
+            pos = snap.point
 
             self.nodes.append(pos)
             self._update_preview(pos)
 
+    @traced("PolygonTool.mouse_move")
     def mouse_move(self, event):
         if self.nodes:
-            current_pos = self.view.mapToScene(event.pos())
-            self._update_preview(current_pos)
+            snap = self.view.snap_point(self.view.mapToScene(event.pos()), event.modifiers(),
+                                        targets=self.nodes[:1], target_pixels=self.CLOSE_RADIUS)
+            self._update_preview(snap.point)
 
     def _update_preview(self, cursor_pos):
         if self.temp_item:
@@ -163,9 +216,11 @@ class PolygonTool(Tool):
             from src.logic.shapes import Polygon
             # Нить всегда незамкнута и полупрозрачна
             self.temp_item = Polygon(display_points, self.view.current_color, is_closed=False)
+            self.temp_item.is_preview = True
             self.temp_item.setOpacity(0.5)
             self.scene.addItem(self.temp_item)
 
+    @traced("PolygonTool.finish_polygon")
     def finish_polygon(self, closed=True):
         if len(self.nodes) < 2:
             self._clear_temp()
@@ -182,8 +237,327 @@ class PolygonTool(Tool):
         self.view.undo_stack.push(AddShapeCommand(self.scene, final_poly))
 
     def _clear_temp(self):
+        self.view.set_snap_guides([])
         if self.temp_item:
             self.scene.removeItem(self.temp_item)
             self.temp_item = None
 
-    def mouse_release(self, event): pass
\ No newline at end of file
+    @traced("PolygonTool.mouse_release")
+    def mouse_release(self, event): pass
+
+class TextTool(Tool):
+    """
+    Надписи: клик по пустому месту - новая надпись в этой точке (левый верхний угол текста),
+    клик по надписи - правка её текста и шрифта. Текст и шрифт спрашивает холст (ask_text),
+    последний выбранный шрифт становится шрифтом следующих надписей.
+    """
+
+    def __init__(self, view, undo_stack):
+        super().__init__(view)
+        self.undo_stack = undo_stack
+
+    def text_at(self, scene_pos):
+        """Надпись под курсором, которую можно править (слой не заблокирован), или None"""
+        for item in self.scene.items(scene_pos):
+            if (isinstance(item, TextShape)
+                    and item.topLevelItem().flags() & QGraphicsItem.GraphicsItemFlag.ItemIsSelectable):
+                return item
+        return None
+
+    def edit(self, item):
+        before = item.text_style
+        result = self.view.ask_text(*before)
+        if result is None or result == before or not result[0].strip():
+            return
+        self.view.text_font = result[1:]
+        self.undo_stack.push(EditTextCommand(item, before, result))
+
+    @traced("TextTool.mouse_press")
+    def mouse_press(self, event):
+        if event.button() != Qt.LeftButton:
+            return
+        scene_pos = self.view.mapToScene(event.pos())
+        item = self.text_at(scene_pos)
+        if item is not None:
+            self.edit(item)
+            return
+        pos = self.view.snap_point(scene_pos, event.modifiers()).point
+        result = self.view.ask_text("", *self.view.text_font)
+        if result is None or not result[0].strip():
+            return
+        text, family, size = result
+        self.view.text_font = (family, size)
+        self.undo_stack.push(AddShapeCommand(self.scene, TextShape(text, pos.x(), pos.y(), family, size,
+                                                                   self.view.current_color)))
+
+    def mouse_move(self, event): pass
+
+    def mouse_release(self, event): pass
+
+
+class NodeTool(Tool):
+    """
+    Правка вершин ломаной или отрезка (см. logic/vertex_edit.py).
+    Клик по маркеру - выделить вершину (с Shift - добавить к выделению / убрать), перетаскивание - сдвинуть
+    выделенные вершины, рамка по пустому месту - выделить вершины в ней, двойной клик по ребру - новая вершина,
+    Delete - удалить выделенные вершины. Клик по другой ломаной или отрезку - править её.
+    Каждый жест - одна команда истории (EditVerticesCommand).
+    """
+
+    def __init__(self, view, undo_stack):
+        super().__init__(view)
+        self.undo_stack = undo_stack
+        self.item = None       # Фигура, вершины которой правятся
+        self.selected = set()  # Индексы выделенных вершин
+        self._index = None         # VertexIndex вершин фигуры
+        self._index_coords = None  # Массив вершин, по которому построен индекс
+        # Перетаскивание: (индексы, их исходные позиции (k, 2), исходная позиция захваченной вершины,
+        # смещение захваченной вершины от курсора в координатах сцены)
+        self._drag = None
+        self._before = None   # Вершины до жеста
+        self._working = None  # Копия вершин, которую меняет перетаскивание (до конца жеста её никто не делит)
+        self._exclude = ()    # id фигуры в индексе привязки (к своим же старым вершинам не привязываемся)
+        self._band = None     # Рамка выделения вершин: (начало, конец) в пикселях viewport
+
+    def edit(self, item):
+        """Начинает правку вершин item (None или неподходящая фигура - правки нет)"""
+        from src.logic.vertex_edit import is_editable
+        if item is not None and not is_editable(item):
+            item = None
+        self.item = item
+        self.selected = set()
+        self._index = None
+        self._index_coords = None
+        if item is not None and not item.isSelected():
+            self.view.select_items([item])
+        self.view.viewport().update()
+
+    def deactivate(self):
+        """Выбран другой инструмент"""
+        self.item = None
+        self.selected = set()
+        self._index = None
+        self._index_coords = None
+        self._drag = self._band = None
+
+    def _target(self):
+        """Фигура правки, если она еще на сцене (её могли удалить или отменить её создание)"""
+        if self.item is not None and self.item.scene() is not self.scene:
+            self.deactivate()
+        return self.item
+
+    def vertex_index(self):
+        """Индекс вершин (перестраивается, только если вершины фигуры изменились)"""
+        from src.logic.vertex_edit import VertexIndex
+        # Во время перетаскивания ищем по вершинам до жеста: индекс не перестраивается на каждое движение
+        coords = self._before if self._drag is not None else self.item.coords
+        if self._index is None or (coords is not self._index_coords and coords != self._index_coords):
+            self._index = VertexIndex(coords)
+            self._index_coords = coords
+            # Вершин могло стать меньше (отмена добавления вершины)
+            self.selected = {i for i in self.selected if i < len(self._index)}
+        return self._index
+
+    def _pick_radius(self):
+        from src.logic.vertex_edit import PICK_PIXELS
+        # Фигура только сдвинута и повернута: расстояния в её координатах те же, что в координатах сцены
+        return PICK_PIXELS / self.view.zoom_level()
+
+    def pick(self, scene_pos):
+        """Индекс вершины под точкой сцены или None"""
+        if self._target() is None:
+            return None
+        local = self.item.mapFromScene(scene_pos)
+        return self.vertex_index().nearest(local.x(), local.y(), self._pick_radius())
+
+    def select_vertices(self, indexes, add=False):
+        self.selected = (self.selected if add else set()) | set(indexes)
+        self.view.viewport().update()
+
+    # --- ПЕРЕТАСКИВАНИЕ ---
+
+    def begin_drag(self, grabbed, scene_pos):
+        """Начинает перетаскивание выделенных вершин за вершину grabbed (курсор в scene_pos)"""
+        from array import array
+        from src.logic.vertex_edit import vertex_array
+        self._before = self.item.coords
+        self._working = array('d', self._before)
+        xy = vertex_array(self._before)
+        moving = sorted(self.selected | {grabbed})
+        x, y = xy[grabbed].tolist()
+        self._drag = (moving, xy[moving], (x, y), self.item.mapToScene(QPointF(x, y)) - scene_pos)
+        engine = self.view.init_snapping()
+        self._exclude = engine.owners_of([self.item]) if engine.enabled else ()
+
+    def drag_to(self, scene_pos, modifiers=Qt.KeyboardModifier.NoModifier):
+        """Сдвигает вершины так, чтобы захваченная оказалась под курсором (с привязкой)"""
+        from src.logic.vertex_edit import vertex_array
+        moving, base, (x, y), offset = self._drag
+        pos = self.view.snap_point(scene_pos + offset, modifiers, exclude=self._exclude).point
+        local = self.item.mapFromScene(pos)
+        vertex_array(self._working)[moving] = base + (local.x() - x, local.y() - y)
+        # Контур меняется только в сдвинутых вершинах (см. Polygon.set_coords)
+        self.item.set_coords(self._working, moving)
+
+    def end_drag(self):
+        """Конец перетаскивания: одна команда истории на весь жест"""
+        moving = self._drag[0]
+        before, after = self._before, self._working
+        self._drag = self._before = self._working = None
+        self.view.set_snap_guides([])
+        if after == before:
+            self.item.set_coords(before, moving)
+            return
+        text = "Move Vertex" if len(moving) == 1 else f"Move {len(moving)} Vertices"
+        self.undo_stack.push(EditVerticesCommand(self.item, before, after, text, moving))
+
+    # --- ДОБАВЛЕНИЕ И УДАЛЕНИЕ ---
+
+    def insert_vertex(self, scene_pos):
+        """Новая вершина на ребре под точкой сцены -> её индекс или None (рядом нет ребра)"""
+        import numpy as np
+        from src.logic.points import pack_points
+        from src.logic.vertex_edit import can_change_count, nearest_segment, vertex_array
+        if self._target() is None or not can_change_count(self.item):
+            return None
+        local = self.item.mapFromScene(scene_pos)
+        before = self.item.coords
+        found = nearest_segment(before, self.item.is_closed, local.x(), local.y(), self._pick_radius())
+        if found is None:
+            return None
+        i, x, y = found
+        after = pack_points(np.insert(vertex_array(before), i, (x, y), axis=0))
+        self.undo_stack.push(EditVerticesCommand(self.item, before, after, "Add Vertex"))
+        self.select_vertices([i])
+        return i
+
+    def delete_vertices(self):
+        """
+        Удаляет выделенные вершины -> True, если Delete обработан здесь (иначе холст удаляет фигуры).
+        У ломаной остается не меньше двух вершин, у отрезка вершины не удаляются.
+        """
+        import numpy as np
+        from src.logic.points import pack_points
+        from src.logic.vertex_edit import can_change_count, vertex_array
+        if self._target() is None or not self.selected:
+            return False
+        before = self.item.coords
+        count = len(before) // 2
+        if not can_change_count(self.item) or count - len(self.selected) < 2:
+            return True
+        keep = np.ones(count, dtype=bool)
+        keep[sorted(self.selected)] = False
+        after = pack_points(vertex_array(before)[keep])
+        removed = len(self.selected)
+        self.selected = set()
+        self.undo_stack.push(EditVerticesCommand(
+            self.item, before, after, "Delete Vertex" if removed == 1 else f"Delete {removed} Vertices"))
+        self.view.viewport().update()
+        return True
+
+    # --- СОБЫТИЯ ---
+
+    @traced("NodeTool.mouse_press")
+    def mouse_press(self, event):
+        if event.button() != Qt.LeftButton:
+            return
+        from src.logic.vertex_edit import is_editable
+        scene_pos = self.view.mapToScene(event.pos())
+        add = bool(event.modifiers() & Qt.ShiftModifier)
+        index = self.pick(scene_pos)
+        if index is not None:
+            if add and index in self.selected:
+                self.selected.discard(index)
+                self.view.viewport().update()
+                return
+            if index not in self.selected:
+                self.select_vertices([index], add)
+            self.begin_drag(index, scene_pos)
+            return
+
+        # Мимо вершин: другая ломаная или отрезок - правим её, иначе - рамка выделения вершин
+        hit = self.view.itemAt(event.pos())
+        root = hit.topLevelItem() if hit is not None else None
+        if not add and root is not None and root is not self.item and is_editable(root):
+            self.edit(root)
+            return
+        if not add:
+            self.select_vertices(())
+        self._band = (event.pos(), event.pos())
+
+    @traced("NodeTool.mouse_move")
+    def mouse_move(self, event):
+        if self._drag is not None:
+            if event.buttons() & Qt.LeftButton:
+                self.drag_to(self.view.mapToScene(event.pos()), event.modifiers())
+            return
+        if self._band is not None:
+            old = self._band_rect()
+            self._band = (self._band[0], event.pos())
+            self.view.viewport().update(old.united(self._band_rect()).adjusted(-2, -2, 2, 2))
+            return
+        # Наведение: над вершиной - курсор перемещения
+        over = self.pick(self.view.mapToScene(event.pos())) is not None
+        self.view.viewport().setCursor(Qt.SizeAllCursor if over else Qt.CrossCursor)
+
+    @traced("NodeTool.mouse_release")
+    def mouse_release(self, event):
+        if event.button() != Qt.LeftButton:
+            return
+        if self._drag is not None:
+            self.end_drag()
+        elif self._band is not None:
+            rect = self._band_rect()
+            self._band = None
+            if self._target() is not None and rect.width() > 2 and rect.height() > 2:
+                self.select_vertices(self._vertices_in_band(rect), add=True)
+            self.view.viewport().update()
+
+    def mouse_double_click(self, event):
+        if event.button() == Qt.LeftButton:
+            scene_pos = self.view.mapToScene(event.pos())
+            if self.pick(scene_pos) is None:
+                self.insert_vertex(scene_pos)
+
+    def _band_rect(self):
+        start, end = self._band
+        return QRect(start, end).normalized()
+
+    def _vertices_in_band(self, rect):
+        """Индексы вершин внутри рамки (QRect в пикселях viewport)"""
+        from src.logic.vertex_edit import device_points, vertex_array
+        # Кандидаты - по индексу в габаритах рамки (в координатах фигуры), точная проверка - в пикселях
+        area = self.item.mapRectFromScene(self.view.mapToScene(rect).boundingRect())
+        candidates = self.vertex_index().in_rect(area)
+        points = device_points(vertex_array(self.item.coords)[candidates],
+                               self.item.sceneTransform() * self.view.viewportTransform())
+        inside = ((points[:, 0] >= rect.left()) & (points[:, 0] <= rect.right() + 1)
+                  & (points[:, 1] >= rect.top()) & (points[:, 1] <= rect.bottom() + 1))
+        return candidates[inside].tolist()
+
+    # --- ОТРИСОВКА ---
+
+    def paint(self, painter, rect):
+        """Маркеры вершин в перерисовываемой области rect (координаты сцены) и рамка выделения вершин"""
+        import numpy as np
+        from src.logic.vertex_edit import (HANDLE_PIXELS, MAX_HANDLES, device_points, paint_band, paint_handles,
+                                           vertex_array)
+        painter.save()
+        painter.resetTransform()
+        if self._target() is not None:
+            # Маркеры у края области видны частично: берем вершины с запасом в полмаркера
+            margin = HANDLE_PIXELS / self.view.zoom_level()
+            area = rect.intersected(self.view.visible_scene_rect()).adjusted(-margin, -margin, margin, margin)
+            indexes = self.vertex_index().in_rect(self.item.mapRectFromScene(area))
+            if self._drag is not None:
+                # Индекс - по вершинам до жеста: сдвигаемые вершины рисуем всегда
+                indexes = np.union1d(indexes, self._drag[0])
+            selected = np.isin(indexes, list(self.selected))
+            if len(indexes) > MAX_HANDLES:
+                indexes, selected = indexes[selected][:MAX_HANDLES], selected[selected][:MAX_HANDLES]
+            points = device_points(vertex_array(self.item.coords)[indexes],
+                                   self.item.sceneTransform() * self.view.viewportTransform())
+            paint_handles(painter, points, selected)
+        if self._band is not None:
+            paint_band(painter, self._band_rect())
+        painter.restore()
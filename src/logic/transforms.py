@@ -0,0 +1,209 @@
+# src/logic/transforms.py
+"""
+Пакетные преобразования выделения: выравнивание, распределение, масштаб и поворот.
+
+Новые положения считаются numpy-массивами сразу для всех фигур по их габаритам, а применяются
+одним проходом через TransformState.apply (одна команда истории - TransformCommand).
+Масштаб "запекается" в геометрию (толщина пера не меняется), поворот хранится в rotation() фигуры.
+Опорная точка масштаба и поворота - центр общих габаритов выделения.
+"""
+import numpy as np
+from PySide6.QtCore import QPointF
+from src.logic.shapes import Rectangle, Ellipse, Line, Polygon, PathShape, TextShape, Group, is_root_item
+from src.logic.points import pack_points
+
+# Режим выравнивания -> (ось, какая сторона габаритов выравнивается: 0 - начало, 0.5 - центр, 1 - конец)
+ALIGN_MODES = {
+    "left": (0, 0.0), "hcenter": (0, 0.5), "right": (0, 1.0),
+    "top": (1, 0.0), "vcenter": (1, 0.5), "bottom": (1, 1.0),
+}
+DISTRIBUTE_AXES = {"horizontal": 0, "vertical": 1}
+
+
+def selection_roots(items):
+    """Фигуры верхнего уровня (дети групп двигаются вместе с группой)"""
+    return [item for item in items if is_root_item(item)]
+
+
+def layout_arrays(items):
+    """
+    Позиции (n, 2), углы поворота (n,) и габариты в координатах сцены (n, 4) [x1, y1, x2, y2] за один проход.
+    Габариты неповернутых фигур - локальный boundingRect + позиция: sceneBoundingRect() в разы дороже,
+    его зовем только для повернутых.
+    """
+    data = np.array([(item.x(), item.y(), item.rotation(), *item.boundingRect().getCoords()) for item in items],
+                    dtype=float).reshape(-1, 7)
+    positions, rotations = data[:, :2], data[:, 2]
+    bounds = data[:, 3:] + np.tile(positions, 2)
+    for i in np.flatnonzero(rotations).tolist():
+        bounds[i] = items[i].sceneBoundingRect().getCoords()
+    return positions, rotations, bounds
+
+
+def positions_array(items):
+    return np.array([(item.x(), item.y()) for item in items], dtype=float).reshape(-1, 2)
+
+
+def _points_array(points):
+    return np.array([(p.x(), p.y()) for p in points], dtype=float).reshape(-1, 2)
+
+
+def _points_list(array):
+    return [QPointF(x, y) for x, y in array.tolist()]
+
+
+def item_geometry(item):
+    """Локальная геометрия фигуры (то, что меняет масштаб). Для группы - позиции и геометрия детей"""
+    if isinstance(item, (Rectangle, Ellipse)):
+        return np.array(item.path().boundingRect().getRect(), dtype=float)
+    if isinstance(item, Line):
+        return np.array((item.x1, item.y1, item.x2, item.y2), dtype=float)
+    if isinstance(item, Polygon):
+        # Без копии: массив вершин фигуры на месте не меняется, set_item_geometry заменяет его целиком
+        return np.frombuffer(item.coords, dtype=float).reshape(-1, 2)
+    if isinstance(item, PathShape):
+        return [_points_array(contour) for contour in item.contours]
+    if isinstance(item, TextShape):
+        # Масштаб надписи - масштаб угла текста и высоты шрифта
+        return np.array((item.left, item.top, item.font_size), dtype=float)
+    if isinstance(item, Group):
+        children = item.childItems()
+        return children, positions_array(children), [item_geometry(child) for child in children]
+    return None
+
+
+def scaled_geometry(geometry, factor):
+    if geometry is None:
+        return None
+    if isinstance(geometry, list):
+        return [contour * factor for contour in geometry]
+    if isinstance(geometry, tuple):
+        children, positions, geometries = geometry
+        return children, positions * factor, [scaled_geometry(g, factor) for g in geometries]
+    return geometry * factor
+
+
+def set_item_geometry(item, geometry):
+    if geometry is None:
+        return
+    if isinstance(item, (Rectangle, Ellipse)):
+        item.set_geometry_data(*geometry.tolist())
+    elif isinstance(item, Line):
+        item.x1, item.y1, item.x2, item.y2 = geometry.tolist()
+        item.set_geometry_data(item.x1, item.y1, item.x2, item.y2)
+    elif isinstance(item, Polygon):
+        item.coords = pack_points(geometry)
+        item.update_path()
+    elif isinstance(item, PathShape):
+        item.contours = [_points_list(contour) for contour in geometry]
+        item.update_path()
+    elif isinstance(item, TextShape):
+        left, top, size = geometry.tolist()
+        item.set_text_data(item.text, left, top, item.font_family, size)
+    elif isinstance(item, Group):
+        children, positions, geometries = geometry
+        for child, (x, y), child_geometry in zip(children, positions.tolist(), geometries):
+            child.setPos(x, y)
+            set_item_geometry(child, child_geometry)
+
+
+class TransformState:
+    """
+    Состояние набора фигур: позиции (n, 2), углы поворота (n,) и локальная геометрия (список).
+    rotations/geometry = None - не меняются и не применяются.
+    """
+
+    def __init__(self, positions, rotations=None, geometry=None):
+        self.positions = positions
+        self.rotations = rotations
+        self.geometry = geometry
+
+    def apply(self, items):
+        if self.geometry is not None:
+            for item, geometry in zip(items, self.geometry):
+                set_item_geometry(item, geometry)
+        if self.rotations is not None:
+            for item, angle in zip(items, self.rotations.tolist()):
+                item.setRotation(angle)
+        for item, (x, y) in zip(items, self.positions.tolist()):
+            item.setPos(x, y)
+
+
+def _selection_center(bounds):
+    return np.array(((bounds[:, 0].min() + bounds[:, 2].max()) / 2,
+                     (bounds[:, 1].min() + bounds[:, 3].max()) / 2))
+
+
+def align(items, mode):
+    """Выравнивание сторон/центров габаритов по общим габаритам выделения -> (до, после) или None"""
+    if len(items) < 2:
+        return None
+    axis, side = ALIGN_MODES[mode]
+    positions, _, bounds = layout_arrays(items)
+    starts, ends = bounds[:, axis], bounds[:, axis + 2]
+    anchors = starts + (ends - starts) * side
+    target = starts.min() + (ends.max() - starts.min()) * side
+
+    new_positions = positions.copy()
+    new_positions[:, axis] += target - anchors
+    return TransformState(positions), TransformState(new_positions)
+
+
+def distribute(items, axis_name):
+    """
+    Равные промежутки между габаритами вдоль оси. Крайние фигуры (по центру габаритов) остаются на месте
+    -> (до, после) или None
+    """
+    if len(items) < 3:
+        return None
+    axis = DISTRIBUTE_AXES[axis_name]
+    positions, _, bounds = layout_arrays(items)
+    starts, ends = bounds[:, axis], bounds[:, axis + 2]
+    order = np.argsort((starts + ends) / 2, kind="stable")
+    sizes = (ends - starts)[order]
+    first, last = starts[order[0]], ends[order[-1]]
+    gap = (last - first - sizes.sum()) / (len(items) - 1)
+
+    # Новое начало i-й по порядку фигуры: first + сумма размеров предыдущих + i промежутков
+    new_starts = np.empty(len(items))
+    new_starts[order] = first + np.concatenate(([0.0], np.cumsum(sizes)[:-1])) + gap * np.arange(len(items))
+
+    new_positions = positions.copy()
+    new_positions[:, axis] += new_starts - starts
+    return TransformState(positions), TransformState(new_positions)
+
+
+def scale(items, factor):
+    """Равномерный масштаб относительно центра выделения (геометрия пересчитывается) -> (до, после)"""
+    if not items or factor <= 0 or factor == 1:
+        return None
+    positions, _, bounds = layout_arrays(items)
+    center = _selection_center(bounds)
+    geometry = [item_geometry(item) for item in items]
+    return (TransformState(positions, geometry=geometry),
+            TransformState(center + (positions - center) * factor,
+                           geometry=[scaled_geometry(g, factor) for g in geometry]))
+
+
+def rotate(items, angle):
+    """Поворот на angle градусов (по часовой стрелке на экране) вокруг центра выделения -> (до, после)"""
+    if not items or not angle % 360:
+        return None
+    positions, rotations, bounds = layout_arrays(items)
+    center = _selection_center(bounds)
+    radians = np.radians(angle)
+    c, s = np.cos(radians), np.sin(radians)
+    # Та же матрица, что у QTransform.rotate: точка фигуры pos + R(rotation) * p
+    # переходит в center + R(angle) * (pos - center) + R(rotation + angle) * p
+    new_positions = center + (positions - center) @ np.array(((c, s), (-s, c)))
+    return (TransformState(positions, rotations=rotations),
+            TransformState(new_positions, rotations=np.mod(rotations + angle, 360)))
+
+
+# Операция -> (функция, название для истории)
+TRANSFORMS = {
+    "align": (align, "Align"),
+    "distribute": (distribute, "Distribute"),
+    "scale": (scale, "Scale"),
+    "rotate": (rotate, "Rotate"),
+}
@@ -0,0 +1,130 @@
+# src/logic/vertex_edit.py
+"""
+Правка вершин ломаных (Polygon) и отрезков (Line): индекс вершин и маркеры для инструмента Nodes (tools.NodeTool).
+
+На ломаных в десятки тысяч вершин на движение мыши ничего не перебирается целиком:
+- VertexIndex - вершины, отсортированные по x (как столбцы индекса привязки): ближайшая к курсору вершина
+  и вершины в прямоугольнике (видимая область, рамка) ищутся двоичным поиском по окну x;
+- маркеры рисуются только для вершин в перерисовываемой части видимой области (и не больше MAX_HANDLES);
+- при перетаскивании в контуре меняются только элементы сдвинутых вершин (Polygon.set_coords).
+Вершины - в локальных координатах фигуры: фигура может быть сдвинута и повернута.
+"""
+import numpy as np
+from PySide6.QtWidgets import QGraphicsItem
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QPen, QBrush, QColor
+from src.logic.shapes import Line, Polygon, is_root_item
+
+HANDLE_PIXELS = 7    # Сторона маркера вершины (пиксели экрана)
+PICK_PIXELS = 8      # Допуск попадания в вершину или ребро (пиксели экрана)
+MAX_HANDLES = 5000   # Если в области больше вершин (далекий зум), рисуются маркеры только выделенных
+
+
+def is_editable(item):
+    """Вершины правятся у ломаных и отрезков верхнего уровня, которые можно выделить (слой не заблокирован)"""
+    return (isinstance(item, (Polygon, Line)) and is_root_item(item)
+            and bool(item.flags() & QGraphicsItem.GraphicsItemFlag.ItemIsSelectable))
+
+
+def can_change_count(item):
+    """Добавлять и удалять вершины можно только у ломаной (у отрезка их всегда две)"""
+    return isinstance(item, Polygon)
+
+
+def vertex_array(coords):
+    """Массив вершин (n, 2) поверх array('d') без копии (запись в него меняет и сам array)"""
+    return np.frombuffer(coords, dtype=float).reshape(-1, 2)
+
+
+class VertexIndex:
+    """Вершины фигуры, отсортированные по x: поиск ближайшей к точке и вершин в прямоугольнике"""
+
+    def __init__(self, coords):
+        xy = vertex_array(coords)
+        self.order = np.argsort(xy[:, 0], kind="stable")
+        self.xs = xy[self.order, 0]
+        self.ys = xy[self.order, 1]
+
+    def __len__(self):
+        return len(self.order)
+
+    def _window(self, x1, x2):
+        return slice(np.searchsorted(self.xs, x1, "left"), np.searchsorted(self.xs, x2, "right"))
+
+    def in_rect(self, rect):
+        """Индексы вершин внутри rect (QRectF) по возрастанию"""
+        window = self._window(rect.left(), rect.right())
+        ys = self.ys[window]
+        inside = (ys >= rect.top()) & (ys <= rect.bottom())
+        return np.sort(self.order[window][inside])
+
+    def nearest(self, x, y, radius):
+        """Индекс ближайшей к (x, y) вершины не дальше radius или None"""
+        window = self._window(x - radius, x + radius)
+        dist = (self.xs[window] - x) ** 2 + (self.ys[window] - y) ** 2
+        if not len(dist):
+            return None
+        best = int(np.argmin(dist))
+        if dist[best] > radius ** 2:
+            return None
+        return int(self.order[window][best])
+
+
+def nearest_segment(coords, closed, x, y, radius):
+    """
+    Ребро, ближайшее к (x, y) не дальше radius -> (i, px, py): новая вершина на нем получает номер i
+    (встает между вершинами i - 1 и i), (px, py) - проекция точки на ребро. None - рядом ребер нет.
+    Ребра перебираются целиком (numpy), но только по двойному клику, а не на каждое движение мыши.
+    """
+    xy = vertex_array(coords)
+    if len(xy) < 2:
+        return None
+    # Ребро k: от вершины k к k + 1 (у замкнутой ломаной последнее ребро возвращается к первой вершине)
+    starts = xy if closed else xy[:-1]
+    ends = np.roll(xy, -1, axis=0) if closed else xy[1:]
+    dx, dy = ends[:, 0] - starts[:, 0], ends[:, 1] - starts[:, 1]
+    length2 = dx * dx + dy * dy
+    t = ((x - starts[:, 0]) * dx + (y - starts[:, 1]) * dy) / np.where(length2 > 0, length2, 1.0)
+    t = np.clip(t, 0.0, 1.0)
+    px, py = starts[:, 0] + t * dx, starts[:, 1] + t * dy
+    dist = (px - x) ** 2 + (py - y) ** 2
+    k = int(np.argmin(dist))
+    if dist[k] > radius ** 2:
+        return None
+    return k + 1, float(px[k]), float(py[k])
+
+
+def device_points(xy, transform):
+    """Точки (n, 2) через аффинное QTransform (локальные координаты фигуры -> пиксели viewport)"""
+    x, y = xy[:, 0], xy[:, 1]
+    return np.column_stack((x * transform.m11() + y * transform.m21() + transform.dx(),
+                            x * transform.m12() + y * transform.m22() + transform.dy()))
+
+
+def _handle_rects(points):
+    half = HANDLE_PIXELS / 2
+    return [QRectF(x - half, y - half, HANDLE_PIXELS, HANDLE_PIXELS) for x, y in points.tolist()]
+
+
+def paint_handles(painter, points, selected):
+    """
+    Маркеры вершин в пикселях viewport (painter без преобразования вида).
+    points - (n, 2), selected - маска выделенных вершин (n,)
+    """
+    pen = QPen(QColor("#1e6fff"), 1)
+    pen.setCosmetic(True)
+    painter.setPen(pen)
+    painter.setBrush(QBrush(QColor("white")))
+    painter.drawRects(_handle_rects(points[~selected]))
+    painter.setBrush(QBrush(QColor("#1e6fff")))
+    painter.drawRects(_handle_rects(points[selected]))
+    painter.setBrush(Qt.BrushStyle.NoBrush)
+
+
+def paint_band(painter, rect):
+    """Рамка выделения вершин (QRect в пикселях viewport)"""
+    pen = QPen(QColor("#1e6fff"), 1, Qt.PenStyle.DashLine)
+    painter.setPen(pen)
+    painter.setBrush(QColor(30, 111, 255, 30))
+    painter.drawRect(rect)
+    painter.setBrush(Qt.BrushStyle.NoBrush)
@@ -0,0 +1,60 @@
+# src/startup.py
+# ВАЖНО: модуль импортируется до Qt, поэтому здесь только стандартная библиотека
+import builtins
+import sys
+from time import perf_counter
+
+
+class StartupProfiler:
+    """
+    Профиль холодного старта (main.py --profile-startup).
+    Записывает отметки инициализации и время первого импорта каждого модуля,
+    а при первой отрисовке печатает временную шкалу.
+    """
+
+    def __init__(self, min_import_ms=1.0):
+        self.t0 = perf_counter()
+        self.min_import_ms = min_import_ms
+        self.marks = []     # [(мс от старта, событие)]
+        self.imports = []   # [(мс от старта, длительность мс, глубина, модуль)]
+        self._depth = 0
+        self._original_import = None
+
+    def mark(self, label):
+        self.marks.append(((perf_counter() - self.t0) * 1000, label))
+
+    # --- ИМПОРТЫ ---
+
+    def install_import_hook(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall_import_hook(self):
+        if self._original_import:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Замеряем только первую загрузку модуля, повторные импорты - это просто поиск в sys.modules
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        start = perf_counter()
+        self._depth += 1
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            end = perf_counter()
+            self.imports.append(((start - self.t0) * 1000, (end - start) * 1000, self._depth, name))
+
+    # --- ОТЧЕТ ---
+
+    def report(self, file=sys.stdout):
+        print("=== Startup timeline ===", file=file)
+        for at, label in self.marks:
+            print(f"{at:9.1f} ms  {label}", file=file)
+
+        print(f"=== Imports (>= {self.min_import_ms:g} ms, cumulative) ===", file=file)
+        for at, duration, depth, name in sorted(self.imports):
+            if duration >= self.min_import_ms:
+                print(f"{at:9.1f} ms  {duration:8.1f} ms  {'  ' * depth}{name}", file=file)
@@ -1,32 +1,54 @@
 # src/widgets/canvas.py
-from PySide6.QtWidgets import QGraphicsView, QGraphicsScene
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QPainter, QBrush, QColor, QUndoStack
-from src.logic.commands import DeleteShapeCommand, MoveCommand
+from PySide6.QtWidgets import QGraphicsView
+from PySide6.QtCore import Qt, QTimer, QEvent, QRectF, QPoint, QLineF, Signal
+from PySide6.QtGui import QPainter, QBrush, QColor, QFont, QPen, QTransform, QGuiApplication
+from math import atan2, degrees
+from time import perf_counter
+from src.logic.commands import (AddShapesCommand, DeleteShapeCommand, MoveCommand, TransformCommand, UndoStack,
+                                 command_items)
+from src.logic.profiling import TRACER, traced
+from src.logic.scene import EditorScene
 
 #импорт класса для создания групп
-from src.logic.shapes import Group
+from src.logic.shapes import Group, DEFAULT_FONT, DEFAULT_FONT_SIZE
 
 # Импортируем наши инструменты
-from src.logic.tools import SelectionTool, CreationTool
+from src.logic.tools import SelectionTool, CreationTool, PolygonTool, NodeTool, TextTool
 
 class EditorCanvas(QGraphicsView):
+    # Видимая область изменилась (прокрутка, зум, ресайз) - для миникарты
+    viewport_changed = Signal()
+
+    MIN_ZOOM = 0.01
+    MAX_ZOOM = 64.0
+    SCENE_MARGIN = 2000  # Запас, на который растет сцена при выходе за её границы
+    SNAP_PIXELS = 8      # Допуск привязки (пиксели экрана)
+    PASTE_OFFSET = 10    # Сдвиг вставленных/дублированных фигур (единицы сцены)
+    MIN_GRID_PIXELS = 6  # Более частую сетку не рисуем
+    # Качество на время взаимодействия (перетаскивание, панорамирование, зум, сдвиг стрелками)
+    INTERACTION_IDLE_MS = 200        # Пауза, после которой кадр перерисовывается в полном качестве
+    INTERACTION_MIN_PIXELS = 1.0     # Фигуры меньше (пиксели экрана) при взаимодействии не рисуются; 0 - все
+    INTERACTION_SLOW_FRAME_MS = 0.0  # Упрощать, только если полный кадр рисовался дольше; 0 - всегда
+    # Запекание статичных фигур в чанки (см. logic/baking.py)
+    BAKE_IDLE_MS = 1500       # Пауза, после которой распеченные и измененные ячейки запекаются заново
+    BAKE_STEP_BUDGET = 0.02   # Секунд запекания за один шаг таймера (окно не замирает)
+
     def __init__(self):
         super().__init__()
 
         # --- СЦЕНА ---
-        self.scene = QGraphicsScene(self)
+        self.scene = EditorScene(self)
         self.setScene(self.scene)
-        self.scene.setSceneRect(0, 0, 800, 600)
 
         #Создаем стек истории
-        self.undo_stack = QUndoStack(self)
+        self.undo_stack = UndoStack(self)
         # Опционально: ограничим историю 50 шагами, чтобы экономить память
         self.undo_stack.setUndoLimit(50)
 
         # --- ДИЗАЙН (Белый лист на сером фоне) ---
         self.setStyleSheet("background-color: #555555; border: none;")
-        self.setBackgroundBrush(QBrush(QColor("white")))
+        self.setBackgroundBrush(QBrush(QColor("#555555")))
+        self.page_brush = QBrush(QColor("white"))
 
         # --- НАСТРОЙКИ ---
         self.setRenderHint(QPainter.RenderHint.Antialiasing)
@@ -35,16 +57,35 @@ class EditorCanvas(QGraphicsView):
         # Включаем отслеживание мыши для эффектов наведения (Hover)
         self.setMouseTracking(True)
 
+        # --- ПРОИЗВОДИТЕЛЬНОСТЬ (сотни тысяч фигур) ---
+        # Перерисовываем только реально изменившиеся области
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
+        # Фигуры сами выставляют перо и кисть, сохранять состояние painter'а не нужно
+        self.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontSavePainterState, True)
+        # Фон (серое поле + лист) рисуется один раз и кэшируется
+        self.setCacheMode(QGraphicsView.CacheModeFlag.CacheBackground)
+
+        # --- НАВИГАЦИЯ (зум и панорамирование) ---
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+        self.grabGesture(Qt.GestureType.PinchGesture)
+        self._pan_last = None      # Последняя точка при панорамировании (QPoint) или None
+        self._space_held = False   # Зажат пробел (пробел + перетаскивание = панорамирование)
+        self._space_panned = False
+
+        # Кэш габаритов содержимого (для "Fit to Content" без itemsBoundingRect() на каждый вызов)
+        self._content_bounds = QRectF()
+        self._content_bounds_exact = True
+        self.scene.changed.connect(self._on_scene_changed)
+
         # --- СОСТОЯНИЕ ---
         self.current_color = "#000000" # Цвет по умолчанию
+        self.text_font = (DEFAULT_FONT, DEFAULT_FONT_SIZE)  # Шрифт новых надписей (последний выбранный)
 
         # --- ИНИЦИАЛИЗАЦИЯ ИНСТРУМЕНТОВ ---
+        # Сразу нужен только Select, остальные создаются при первом выборе (см. tool())
         self.tools = {
-            "select": SelectionTool(self, self.undo_stack),
-
-            "line": CreationTool(self, "line", self.undo_stack),
-            "rect": CreationTool(self, "rect", self.undo_stack),
-            "ellipse": CreationTool(self, "ellipse", self.undo_stack)
+            "select": SelectionTool(self, self.undo_stack)
         }
 
         # По умолчанию выбран Select
@@ -54,7 +95,577 @@ class EditorCanvas(QGraphicsView):
 
         self.setRubberBandSelectionMode(Qt.ItemSelectionMode.ContainsItemShape)
 
+        # --- ЛЕНИВЫЙ РЕЖИМ ---
+        # Материализацию по прокрутке откладываем и склеиваем через таймер
+        self._materialize_timer = QTimer(self)
+        self._materialize_timer.setSingleShot(True)
+        self._materialize_timer.setInterval(30)
+        self._materialize_timer.timeout.connect(self.update_materialization)
+
+        self.undo_stack.indexChanged.connect(self._invalidate_content_bounds)
+
+        # --- КАЧЕСТВО ПРИ ВЗАИМОДЕЙСТВИИ ---
+        # Пока пользователь тянет/листает/масштабирует, кадры рисуются без сглаживания и без мелких фигур,
+        # после паузы - снова в полном качестве (см. _note_interaction)
+        self.interaction_quality = True
+        self.interaction_idle_ms = self.INTERACTION_IDLE_MS
+        self.interaction_min_pixels = self.INTERACTION_MIN_PIXELS
+        self.interaction_slow_frame_ms = self.INTERACTION_SLOW_FRAME_MS
+        self._interacting = False
+        self._refine_timer = QTimer(self)
+        self._refine_timer.setSingleShot(True)
+        self._refine_timer.timeout.connect(self._refine)
+
+        # --- ЗАПЕКАНИЕ СТАТИЧНЫХ ФИГУР ---
+        # В простое невыделенные фигуры ячеек собираются в чанки частями по таймеру (см. set_baking)
+        self._bake_idle_timer = QTimer(self)
+        self._bake_idle_timer.setSingleShot(True)
+        self._bake_idle_timer.setInterval(self.BAKE_IDLE_MS)
+        self._bake_idle_timer.timeout.connect(self._start_baking)
+        self._bake_timer = QTimer(self)
+        self._bake_timer.setInterval(0)
+        self._bake_timer.timeout.connect(self._on_bake_timer)
+        self.rubberBandChanged.connect(self._on_rubber_band_changed)
+
+        # --- ОВЕРЛЕЙ ПРОИЗВОДИТЕЛЬНОСТИ ---
+        self.show_perf_overlay = False
+        self._last_frame_start = None
+        self._frame_time = 0.0   # мс между кадрами
+        self._paint_ms = {"full": 0.0, "fast": 0.0}  # мс на отрисовку последнего кадра в каждом режиме
+        self._items_painted = 0
+
+        # --- ЗАПИСЬ СЕССИИ ---
+        self.recorder = None  # SessionRecorder, пока идет запись ввода
+
+        # --- ПРИВЯЗКА ---
+        # Движок создается при первом использовании (см. init_snapping): numpy не нужен для холодного старта
+        self.snap_engine = None
+        self.snap_guides = []  # Направляющие [QLineF] в координатах сцены (рисуются поверх фигур)
+        # Большой документ индексируется для привязки частями между событиями
+        self._snap_index_timer = QTimer(self)
+        self._snap_index_timer.setInterval(0)
+        self._snap_index_timer.timeout.connect(self._on_snap_index_timer)
+        self._undo_index = 0
+        self.undo_stack.indexChanged.connect(self._on_undo_index_changed)
+
+        # --- ПОИСК ПО АТРИБУТАМ ---
+        self.query_index = None  # QueryIndex (создается при первом запросе, см. init_query_index)
+
+        # --- СРАВНЕНИЕ ВЕРСИЙ ---
+        self.diff_overlay = None  # DiffOverlay: подсветка изменений относительно другой версии проекта
+
+    # --- ЗАПЕКАНИЕ ---
+
+    def set_baking(self, enabled):
+        """Режим запекания статичных фигур в чанки (выключение распекает всё)"""
+        self.scene.baker.set_enabled(enabled)
+        self._bake_timer.stop()
+        if enabled:
+            self._bake_idle_timer.start()
+        else:
+            self._bake_idle_timer.stop()
+        self.viewport().update()
+
+    def _postpone_baking(self):
+        """Пользователь что-то делает: запекание ждет паузы в BAKE_IDLE_MS"""
+        if self.scene.baker.enabled:
+            self._bake_timer.stop()
+            self._bake_idle_timer.start()
+
+    def _start_baking(self):
+        self.scene.baker.wake()
+        self._bake_timer.start()
+
+    def _bake_pinned(self):
+        # Ломаную, у которой правятся вершины, не запекаем: инструмент рисует её маркеры и двигает вершины
+        if isinstance(self.current_tool, NodeTool) and self.current_tool.item is not None:
+            return (self.current_tool.item,)
+        return ()
+
+    def _on_bake_timer(self):
+        if self.scene.baker.run(self.BAKE_STEP_BUDGET, self.visible_scene_rect().center(), self._bake_pinned()):
+            self._bake_timer.stop()
+
+    def bake_now(self):
+        """Запекает все ячейки сразу, не дожидаясь простоя (скрипты, бенчмарки)"""
+        self._bake_idle_timer.stop()
+        self._bake_timer.stop()
+        self.scene.baker.wake()
+        self.scene.baker.run(None, self.visible_scene_rect().center(), self._bake_pinned())
+
+    def _on_rubber_band_changed(self, rect, from_point, to_point):
+        # Скрытые фигуры чанка Qt в рамку не выделит: чанки под рамкой распекаются
+        if not rect.isNull():
+            self.scene.baker.release_rect(QRectF(from_point, to_point).normalized())
+
+    # --- ОТРИСОВКА И ЗАМЕРЫ ---
+
+    def set_perf_overlay(self, enabled):
+        self.show_perf_overlay = enabled
+        self.viewport().update()
+
+    def set_diff_overlay(self, overlay):
+        """Подсветка результата сравнения версий (None - убрать)"""
+        self.diff_overlay = overlay
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        # Время кадра нужно и без оверлея: по нему решается, упрощать ли отрисовку (interaction_slow_frame_ms)
+        mode = "fast" if self._interacting else "full"
+        if not (TRACER.enabled or self.show_perf_overlay):
+            start = perf_counter()
+            super().paintEvent(event)
+            self._paint_ms[mode] = (perf_counter() - start) * 1000
+            return
+
+        start = perf_counter()
+        if self._last_frame_start is not None:
+            self._frame_time = (start - self._last_frame_start) * 1000
+        self._last_frame_start = start
+        # Сколько фигур попадает в перерисовываемую область (так считает и сама сцена)
+        self._items_painted = len(self.items(event.rect()))
+
+        with TRACER.span("EditorCanvas.paint.fast" if self._interacting else "EditorCanvas.paint"):
+            super().paintEvent(event)
+
+        self._paint_ms[mode] = (perf_counter() - start) * 1000
+        TRACER.count("items_painted", self._items_painted)
+        TRACER.snapshot_counters()
+
+    # --- КАЧЕСТВО ПРИ ВЗАИМОДЕЙСТВИИ ---
+
+    def set_interaction_quality(self, enabled, idle_ms=None, min_pixels=None, slow_frame_ms=None):
+        """Упрощенная отрисовка на время взаимодействия и её пороги (None - оставить как есть)"""
+        self.interaction_quality = enabled
+        if idle_ms is not None:
+            self.interaction_idle_ms = idle_ms
+        if min_pixels is not None:
+            self.interaction_min_pixels = min_pixels
+        if slow_frame_ms is not None:
+            self.interaction_slow_frame_ms = slow_frame_ms
+        if not enabled and self._interacting:
+            self._refine()
+
+    def _note_interaction(self):
+        """
+        Идет перетаскивание, панорамирование, зум или сдвиг стрелками: рисуем без сглаживания и
+        без фигур мельче interaction_min_pixels, пока не наступит пауза в interaction_idle_ms.
+        """
+        self._postpone_baking()
+        if not self.interaction_quality:
+            return
+        if not self._interacting:
+            # Быстрый документ не упрощаем: полный кадр и так укладывается в порог
+            if self._paint_ms["full"] < self.interaction_slow_frame_ms:
+                return
+            self._interacting = True
+            self.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+            self.scene.set_minimum_render_size(self.interaction_min_pixels)
+            self.viewport().update()
+        self._refine_timer.start(self.interaction_idle_ms)
+
+    def _refine(self):
+        """
+        Пауза: возвращаем полное качество. Упрощенно рисовалось всё, что Qt перерисовал после смены
+        подсказок (viewport целиком), поэтому и уточняем весь viewport.
+        """
+        self._refine_timer.stop()
+        self._interacting = False
+        self.scene.set_minimum_render_size(0.0)
+        self.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        self.viewport().update()
+
+    def drawForeground(self, painter, rect):
+        super().drawForeground(painter, rect)
+        if self.snap_guides:
+            pen = QPen(QColor("#ff00cc"), 1)
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            painter.drawLines(self.snap_guides)
+        if isinstance(self.current_tool, NodeTool):
+            self.current_tool.paint(painter, rect)
+        if self.diff_overlay:
+            self.diff_overlay.paint(painter, rect)
+            painter.save()
+            painter.resetTransform()
+            self.diff_overlay.paint_legend(painter, self.viewport().height())
+            painter.restore()
+        if not self.show_perf_overlay:
+            return
+        # Рисуем в координатах экрана, поверх сцены
+        painter.save()
+        painter.resetTransform()
+        lines = [f"frame: {self._frame_time:.1f} ms",
+                 f"paint: {self._paint_ms['full']:.1f} ms full",
+                 f"paint: {self._paint_ms['fast']:.1f} ms fast",
+                 f"mode:  {'fast' if self._interacting else 'full'}",
+                 f"items: {self._items_painted}"]
+        if self.scene.baker.enabled:
+            lines.append(f"baked: {self.scene.baker.baked_count} / {self.scene.baker.chunk_count()}")
+        painter.setFont(QFont("Monospace", 9))
+        painter.fillRect(8, 8, 170, 16 * len(lines) + 8, QColor(0, 0, 0, 160))
+        painter.setPen(QColor("#00ff66"))
+        for i, line in enumerate(lines):
+            painter.drawText(14, 24 + 16 * i, line)
+        painter.restore()
+
+    # --- БЕСКОНЕЧНЫЙ ХОЛСТ ---
+
+    def set_page_size(self, width, height):
+        self.scene.set_page_size(width, height)
+        self._invalidate_content_bounds()
+        self.resetCachedContent()
+
+    def drawBackground(self, painter, rect):
+        # Серое поле + белый лист (размер листа из файла проекта)
+        super().drawBackground(painter, rect)
+        painter.fillRect(self.scene.page_rect.intersected(rect), self.page_brush)
+        if self.snap_engine and self.snap_engine.grid_enabled:
+            self._draw_grid(painter, rect)
+
+    def _draw_grid(self, painter, rect):
+        step = self.snap_engine.grid_size
+        # При отдалении рисуем каждую 2-ю, 4-ю... линию, чтобы сетка не сливалась
+        while step * self.zoom_level() < self.MIN_GRID_PIXELS:
+            step *= 2
+        left, top = int(rect.left() // step), int(rect.top() // step)
+        right, bottom = int(rect.right() // step) + 1, int(rect.bottom() // step) + 1
+        lines = [QLineF(i * step, rect.top(), i * step, rect.bottom()) for i in range(left, right + 1)]
+        lines += [QLineF(rect.left(), j * step, rect.right(), j * step) for j in range(top, bottom + 1)]
+        pen = QPen(QColor(0, 0, 0, 30), 1)
+        pen.setCosmetic(True)
+        painter.setPen(pen)
+        painter.drawLines(lines)
+
+    def _on_scene_changed(self, regions):
+        """Наращиваем кэш габаритов по измененным областям и растим сцену под содержимое"""
+        scene_rect = self.scene.sceneRect()
+        for region in regions:
+            # Полная перерисовка сцены ничего не говорит о габаритах фигур
+            if region == scene_rect:
+                continue
+            self._content_bounds = self._content_bounds.united(region)
+        if not self._content_bounds.isNull():
+            self.scene.grow_to(self._content_bounds, self.SCENE_MARGIN)
+
+    def _invalidate_content_bounds(self):
+        # После удаления/отмены габариты могли уменьшиться: точно пересчитаем при следующем запросе
+        self._content_bounds_exact = False
+
+    def content_bounds(self, exact=True):
+        """
+        Габариты всего содержимого (включая невыгруженные фигуры ленивого документа).
+        exact=False - вернуть кэш как есть (он может быть чуть больше реального после удалений).
+        """
+        if exact and not self._content_bounds_exact:
+            bounds = self.scene.itemsBoundingRect()
+            document = self.scene.document
+            if document and document.records:
+                x1, y1, x2, y2 = document.bounds()
+                bounds = bounds.united(QRectF(x1, y1, x2 - x1, y2 - y1))
+            self._content_bounds = bounds
+            self._content_bounds_exact = True
+        return QRectF(self._content_bounds)
+
+    def visible_scene_rect(self):
+        return self.mapToScene(self.viewport().rect()).boundingRect()
+
+    # --- ЗУМ ---
+
+    def zoom_level(self):
+        return self.transform().m11()
+
+    def zoom_by(self, factor, anchor=None):
+        """Масштабирование вокруг точки anchor (координаты viewport) или центра"""
+        current = self.zoom_level()
+        factor = max(self.MIN_ZOOM / current, min(self.MAX_ZOOM / current, factor))
+        if factor == 1:
+            return
+        self._note_interaction()
+
+        if anchor is None:
+            anchor = self.viewport().rect().center()
+        scene_anchor = self.mapToScene(anchor)
+
+        # Сцена должна вмещать новую видимую область, иначе скроллбары не дадут отдалиться
+        new_visible = self.visible_scene_rect()
+        new_visible = QRectF(
+            scene_anchor.x() - (scene_anchor.x() - new_visible.left()) / factor,
+            scene_anchor.y() - (scene_anchor.y() - new_visible.top()) / factor,
+            new_visible.width() / factor, new_visible.height() / factor)
+        self.scene.grow_to(new_visible, self.SCENE_MARGIN / min(current * factor, 1))
+
+        anchor_mode = self.transformationAnchor()
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.NoAnchor)
+        self.scale(factor, factor)
+        self.setTransformationAnchor(anchor_mode)
+
+        # Точка сцены под курсором остается под курсором
+        drift = self.mapFromScene(scene_anchor) - anchor
+        self.horizontalScrollBar().setValue(self.horizontalScrollBar().value() + drift.x())
+        self.verticalScrollBar().setValue(self.verticalScrollBar().value() + drift.y())
+        self._on_view_changed()
+
+    def zoom_in(self):
+        self.zoom_by(1.25)
+
+    def zoom_out(self):
+        self.zoom_by(1 / 1.25)
+
+    def zoom_reset(self):
+        self.zoom_by(1 / self.zoom_level())
+
+    def fit_rect(self, rect):
+        if rect.isEmpty():
+            return
+        margin = max(rect.width(), rect.height()) * 0.05 + 10
+        rect = rect.adjusted(-margin, -margin, margin, margin)
+        self.scene.grow_to(rect, self.SCENE_MARGIN)
+        self.fitInView(rect, Qt.AspectRatioMode.KeepAspectRatio)
+        # fitInView не знает про наши пределы зума
+        level = self.zoom_level()
+        if level < self.MIN_ZOOM or level > self.MAX_ZOOM:
+            self.zoom_by(max(self.MIN_ZOOM, min(self.MAX_ZOOM, level)) / level)
+        self._on_view_changed()
+
+    def fit_to_content(self):
+        bounds = self.content_bounds()
+        self.fit_rect(bounds if not bounds.isEmpty() else self.scene.page_rect)
+
+    def fit_to_selection(self):
+        bounds = QRectF()
+        for item in self.scene.selectedItems():
+            bounds = bounds.united(item.sceneBoundingRect())
+        self.fit_rect(bounds)
+
+    def wheelEvent(self, event):
+        if self.recorder:
+            self.recorder.record_wheel(event, self.current_tool_name())
+        # Колесо - плавный зум вокруг курсора (угол 120 = один "щелчок" = ~x1.2)
+        angle = event.angleDelta().y()
+        if angle == 0:
+            super().wheelEvent(event)
+            return
+        self.zoom_by(1.0015 ** angle, event.position().toPoint())
+        event.accept()
+
+    def viewportEvent(self, event):
+        # Пинч на тачпаде (macOS / Windows Precision Touchpad)
+        if event.type() == QEvent.Type.NativeGesture and \
+                event.gestureType() == Qt.NativeGestureType.ZoomNativeGesture:
+            self.zoom_by(1 + event.value(), event.position().toPoint())
+            return True
+        if event.type() == QEvent.Type.Gesture:
+            pinch = event.gesture(Qt.GestureType.PinchGesture)
+            if pinch:
+                center = self.viewport().mapFromGlobal(pinch.centerPoint().toPoint())
+                self.zoom_by(pinch.scaleFactor(), center)
+                return True
+        return super().viewportEvent(event)
+
+    # --- ПАНОРАМИРОВАНИЕ ---
+
+    def _pan_by(self, dx, dy):
+        """Сдвиг вида на (dx, dy) пикселей экрана. Сцена растет, если упираемся в край"""
+        self._note_interaction()
+        level = self.zoom_level()
+        target = self.visible_scene_rect().translated(-dx / level, -dy / level)
+        self.scene.grow_to(target, self.SCENE_MARGIN / min(level, 1))
+        self.horizontalScrollBar().setValue(self.horizontalScrollBar().value() - dx)
+        self.verticalScrollBar().setValue(self.verticalScrollBar().value() - dy)
+
+    def _on_view_changed(self):
+        if self.scene.document:
+            self._materialize_timer.start()
+        self.viewport_changed.emit()
+
+    # --- ЛЕНИВЫЙ РЕЖИМ (большие документы) ---
+
+    def load_lazy(self, shapes_data):
+        """Загружает фигуры как записи. QGraphicsItem создаются только для видимой области"""
+        from src.logic.lazy_document import LazyDocument
+        document = LazyDocument(shapes_data)
+        self.scene.set_document(document)
+        # Сцена сразу охватывает весь документ, чтобы до него можно было докрутить
+        self._invalidate_content_bounds()
+        self.scene.grow_to(self.content_bounds(), self.SCENE_MARGIN)
+        self.update_materialization()
+        return document
+
+    def update_materialization(self):
+        document = self.scene.document
+        if not document:
+            return
+        from src.logic.lazy_document import undo_referenced_items
+        visible = self.mapToScene(self.viewport().rect()).boundingRect()
+        # Запас - половина видимой области, чтобы при прокрутке фигуры уже были готовы
+        margin = max(visible.width(), visible.height()) / 2
+        document.update_visible(self.scene, visible, margin, undo_referenced_items(self.undo_stack))
+
+    def scrollContentsBy(self, dx, dy):
+        # Прокрутка с зажатой кнопкой - перетаскивание полосы прокрутки или панорамирование
+        if QGuiApplication.mouseButtons() != Qt.MouseButton.NoButton:
+            self._note_interaction()
+        super().scrollContentsBy(dx, dy)
+        self._on_view_changed()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._on_view_changed()
+
+    # --- ПРИВЯЗКА ---
+
+    def init_snapping(self):
+        """Движок привязки (создается при первом обращении)"""
+        if self.snap_engine is None:
+            from src.logic.snapping import SnapEngine
+            self.snap_engine = SnapEngine(self.scene)
+            self.scene.snap_engine = self.snap_engine
+        return self.snap_engine
+
+    def set_snap_option(self, option, enabled):
+        """Включает/выключает привязку к сетке ("grid"), к фигурам ("objects") или направляющие ("guides")"""
+        setattr(self.init_snapping(), f"{option}_enabled", enabled)
+        if option == "grid":
+            self.resetCachedContent()
+            self.viewport().update()
+
+    def snap_point(self, pos, modifiers=Qt.KeyboardModifier.NoModifier, targets=(), target_pixels=None, exclude=()):
+        """
+        Привязка точки сцены. Зажатый Alt - без привязки (кроме targets).
+        exclude - id фигур в индексе привязки, к которым не привязываемся (SnapEngine.owners_of). -> SnapResult
+        """
+        level = self.zoom_level()
+        result = self.init_snapping().snap_point(
+            pos, self.SNAP_PIXELS / level, targets,
+            target_pixels / level if target_pixels else None,
+            enabled=not (modifiers & Qt.KeyboardModifier.AltModifier), exclude=exclude)
+        self.set_snap_guides(result.guides)
+        self._schedule_snap_index()
+        return result
+
+    def snap_items(self, rect, exclude, modifiers=Qt.KeyboardModifier.NoModifier):
+        """Сдвиг (dx, dy), прижимающий перетаскиваемые фигуры с габаритами rect к сетке/другим фигурам"""
+        if modifiers & Qt.KeyboardModifier.AltModifier:
+            self.set_snap_guides([])
+            return 0.0, 0.0
+        dx, dy, guides = self.init_snapping().snap_rect(rect, self.SNAP_PIXELS / self.zoom_level(), exclude)
+        self.set_snap_guides(guides)
+        self._schedule_snap_index()
+        return dx, dy
+
+    def _schedule_snap_index(self):
+        # Индекс еще строится: доделываем его порциями в простое
+        if self.snap_engine.building and not self._snap_index_timer.isActive():
+            self._snap_index_timer.start()
+
+    def _on_snap_index_timer(self):
+        self.snap_engine.update_index(self.snap_engine.BUILD_CHUNK)
+        if not self.snap_engine.building:
+            self._snap_index_timer.stop()
+
+    def set_snap_guides(self, guides):
+        if not guides and not self.snap_guides:
+            return
+        # Перерисовываем только полоски под старыми и новыми направляющими
+        for line in self.snap_guides + guides:
+            area = self.mapFromScene(QRectF(line.p1(), line.p2()).normalized()).boundingRect()
+            self.viewport().update(area.adjusted(-2, -2, 2, 2))
+        self.snap_guides = guides
+
+    def _on_undo_index_changed(self, index):
+        """Push/Undo/Redo: фигуры затронутых команд изменились"""
+        low, high = sorted((self._undo_index, index))
+        self._undo_index = index
+        # Push при заполненной истории (undoLimit) не меняет индекс: изменилась последняя команда
+        if low == high:
+            low = max(index - 1, 0)
+        self._postpone_baking()
+        for i in range(low, high):
+            cmd = self.undo_stack.command(i)
+            if cmd is not None:
+                self.scene.items_changed(command_items(cmd))
+
+    # --- ПОИСК ПО АТРИБУТАМ ---
+
+    def init_query_index(self):
+        """Индекс атрибутов (создается при первом запросе, строится при первом поиске)"""
+        if self.query_index is None:
+            from src.logic.query import QueryIndex
+            self.query_index = QueryIndex(self.scene)
+            self.scene.query_index = self.query_index
+        return self.query_index
+
+    def select_items(self, items):
+        """Заменяет выделение на items одним уведомлением selectionChanged (а не одним на фигуру)"""
+        # Скрытую (запеченную) фигуру Qt не выделяет
+        self.scene.baker.release_items(items)
+        self.scene.blockSignals(True)
+        try:
+            self.scene.clearSelection()
+            for item in items:
+                item.setSelected(True)
+        finally:
+            self.scene.blockSignals(False)
+        self.scene.selectionChanged.emit()
+
+    @traced("EditorCanvas.select_query")
+    def select_query(self, **criteria):
+        """
+        Выделяет фигуры по условиям QueryIndex.query -> число выделенных.
+        region может быть "view" (видимая область) или "selection" (габариты текущего выделения).
+        Подходящие записи ленивого документа материализуются.
+        """
+        from src.logic.transforms import selection_roots
+
+        region = criteria.get("region")
+        if region == "view":
+            criteria["region"] = self.visible_scene_rect()
+        elif region == "selection":
+            rect = QRectF()
+            for item in selection_roots(self.scene.selectedItems()):
+                rect = rect.united(item.sceneBoundingRect())
+            criteria["region"] = rect
+        found = self.init_query_index().query(**criteria)
+
+        items = []
+        document = self.scene.document
+        for source in found:
+            if not hasattr(source, "to_dict"):
+                source = document.materialize(source, self.scene)
+            if source is not None:
+                items.append(source)
+        self.select_items(items)
+        return len(items)
+
+    def select_similar(self, fields=("type", "color", "width")):
+        """Выделяет фигуры, совпадающие с выделенными по полям fields ("Select Similar") -> число выделенных"""
+        from src.logic.query import similar_criteria
+        from src.logic.transforms import selection_roots
+
+        criteria = similar_criteria(selection_roots(self.scene.selectedItems()), fields)
+        if not criteria:
+            return 0
+        return self.select_query(**criteria)
+
+    CREATION_TOOLS = ("line", "rect", "ellipse")
+
+    def tool(self, tool_name):
+        """Инструмент по имени (создается при первом обращении)"""
+        if tool_name not in self.tools:
+            if tool_name in self.CREATION_TOOLS:
+                self.tools[tool_name] = CreationTool(self, tool_name, self.undo_stack)
+            elif tool_name == "nodes":
+                self.tools[tool_name] = NodeTool(self, self.undo_stack)
+            elif tool_name == "text":
+                self.tools[tool_name] = TextTool(self, self.undo_stack)
+        return self.tools.get(tool_name)
+
     def set_tool(self, tool_name: str):
+        # Правка вершин начинается с выделенной ломаной или отрезка
+        selected = self.scene.selectedItems() if tool_name == "nodes" else ()
+        if isinstance(self.current_tool, NodeTool):
+            self.current_tool.deactivate()
         self.scene.clearSelection()
         self.setDragMode(QGraphicsView.DragMode.NoDrag)
 
@@ -63,10 +674,26 @@ class EditorCanvas(QGraphicsView):
             self.viewport().setCursor(Qt.OpenHandCursor)
             # Включаем ладошку только для селекта, если тебе нужно выделение рамкой
             # self.setDragMode(QGraphicsView.RubberBandDrag)
-        elif tool_name in self.tools:
-            self.current_tool = self.tools[tool_name]
+        elif self.tool(tool_name):
+            self.current_tool = self.tool(tool_name)
             self.viewport().setCursor(Qt.CrossCursor)
 
+        if tool_name == "nodes":
+            from src.logic.vertex_edit import is_editable
+            self.current_tool.edit(next((item for item in selected if is_editable(item)), None))
+
+    def current_tool_name(self):
+        """Имя активного инструмента (как в set_tool)"""
+        for name, tool in self.tools.items():
+            if tool is self.current_tool:
+                return name
+        if isinstance(self.current_tool, PolygonTool):
+            return "polygon"
+        return None
+
+    def _tool_cursor(self):
+        return Qt.OpenHandCursor if isinstance(self.current_tool, SelectionTool) else Qt.CrossCursor
+
     def set_active_color(self, color_hex):
         """Сохраняем цвет, выбранный в палитре"""
         self.current_color = color_hex
@@ -77,11 +704,25 @@ class EditorCanvas(QGraphicsView):
             # Проверяем, есть ли у предмета наш метод (он есть и у фигур, и у Групп!)
             if hasattr(item, "set_active_color"):
                 item.set_active_color(color_hex)
+        self.scene.items_changed(selected_items)
 
     # --- ДЕЛЕГИРОВАНИЕ СОБЫТИЙ (Паттерн State) ---
     # Мы просто передаем управление активному инструменту
 
+    @traced("EditorCanvas.mousePressEvent")
     def mousePressEvent(self, event):
+        if self.recorder:
+            self.recorder.record_mouse("press", event, self.current_tool_name())
+        # Панорамирование: средняя кнопка или пробел + левая кнопка
+        if event.button() == Qt.MiddleButton or (self._space_held and event.button() == Qt.LeftButton):
+            self._pan_last = event.position().toPoint()
+            self._space_panned = self._space_held
+            self.viewport().setCursor(Qt.ClosedHandCursor)
+            return
+        # Клик по запеченному чанку: сначала показываем его фигуры, чтобы Qt и инструменты их нашли
+        self._postpone_baking()
+        self.scene.baker.release_at(self.mapToScene(event.position().toPoint()))
+
         # Импортируем инструмент внутри для проверки типа
         from src.logic.tools import SelectionTool
 
@@ -96,7 +737,19 @@ class EditorCanvas(QGraphicsView):
             self.setDragMode(QGraphicsView.DragMode.NoDrag)
             self.current_tool.mouse_press(event)
 
+    @traced("EditorCanvas.mouseMoveEvent")
     def mouseMoveEvent(self, event):
+        if self.recorder:
+            self.recorder.record_mouse("move", event, self.current_tool_name())
+        if event.buttons() != Qt.MouseButton.NoButton:
+            self._note_interaction()
+        if self._pan_last is not None:
+            pos = event.position().toPoint()
+            delta = pos - self._pan_last
+            self._pan_last = pos
+            self._pan_by(delta.x(), delta.y())
+            return
+
         # 1. Сначала даем инструменту порисовать или подвигать объект
         if self.current_tool:
             self.current_tool.mouse_move(event)
@@ -108,7 +761,16 @@ class EditorCanvas(QGraphicsView):
             if event.buttons() & Qt.LeftButton and self.scene.selectedItems():
                 self.scene.selectionChanged.emit()
 
+    @traced("EditorCanvas.mouseReleaseEvent")
     def mouseReleaseEvent(self, event):
+        if self.recorder:
+            self.recorder.record_mouse("release", event, self.current_tool_name())
+        if self._pan_last is not None:
+            if event.button() in (Qt.MiddleButton, Qt.LeftButton):
+                self._pan_last = None
+                self.viewport().setCursor(Qt.OpenHandCursor if self._space_held else self._tool_cursor())
+            return
+
         # 1. Сначала даем базовому классу завершить выделение рамкой (если оно было)
         super().mouseReleaseEvent(event)
 
@@ -119,6 +781,27 @@ class EditorCanvas(QGraphicsView):
         # чтобы он не мешал работать инструменту дальше
         self.setDragMode(QGraphicsView.DragMode.NoDrag)
 
+    def mouseDoubleClickEvent(self, event):
+        if self.recorder:
+            self.recorder.record_mouse("double_click", event, self.current_tool_name())
+        # Двойной клик по ребру в режиме правки вершин - новая вершина
+        if isinstance(self.current_tool, NodeTool):
+            self.current_tool.mouse_double_click(event)
+            return
+        # Двойной клик по надписи инструментом Select - правка текста
+        if isinstance(self.current_tool, SelectionTool) and event.button() == Qt.LeftButton:
+            text_tool = self.tool("text")
+            item = text_tool.text_at(self.mapToScene(event.pos()))
+            if item is not None:
+                text_tool.edit(item)
+                return
+        super().mouseDoubleClickEvent(event)
+
+    def ask_text(self, text, family, size):
+        """Текст и шрифт надписи от пользователя -> (текст, шрифт, размер) или None"""
+        from src.widgets.text_dialog import ask_text
+        return ask_text(self, text, family, size)
+
     def group_selection(self):
         """Создает группу из выделенных элементов"""
         selected_items = self.scene.selectedItems()
@@ -127,8 +810,9 @@ class EditorCanvas(QGraphicsView):
         if not selected_items:
             return
 
-        # 1. Создаем группу
+        # 1. Создаем группу (в слое первой выделенной фигуры)
         group = Group()
+        group.layer = getattr(selected_items[0], "layer", None)
 
         # 2. Сначала добавляем пустую группу на сцену!
         # Это важно для корректной инициализации координат.
@@ -144,6 +828,8 @@ class EditorCanvas(QGraphicsView):
             # Она сама пересчитывает координаты item.pos(), чтобы он визуально остался на месте.
             group.addToGroup(item)
 
+        self.scene.items_changed(selected_items)
+
         # 4. Выделяем новую группу, чтобы пользователь видел результат
         group.setSelected(True)
         print("Группа создана")
@@ -155,17 +841,116 @@ class EditorCanvas(QGraphicsView):
         for item in selected_items:
             # Проверяем, является ли элемент группой.
             if isinstance(item, Group):
-                # ИСПРАВЛЕНО: Правильное название метода - destroyItemGroup
-                self.scene.destroyItemGroup(item)
+                children = item.childItems()
+                # Не destroyItemGroup: она удаляет C++-объект группы, а на группу еще ссылаются
+                # уведомления ниже (индекс привязки, кэш сохранения) - обращение к ней роняло процесс
+                for child in children:
+                    item.removeFromGroup(child)
+                self.scene.removeItem(item)
+                # Поворот группы Qt переносит в transform() детей - переводим его в rotation(),
+                # которую сохраняет to_dict (других преобразований, кроме поворота, у фигур нет)
+                for child in children:
+                    transform = child.transform()
+                    if not transform.isIdentity():
+                        child.setTransform(QTransform())
+                        child.setRotation(child.rotation() + degrees(atan2(transform.m12(), transform.m11())))
+                    # Бывшие дети снова фигуры верхнего уровня - в слое группы
+                    child.layer = item.layer
+                    self.scene.layers.attach(child)
+                self.scene.items_changed(children + [item])
                 print("Группа расформирована")
 
+    @traced("EditorCanvas.transform_selection")
+    def transform_selection(self, operation, value):
+        """
+        Выравнивание / распределение / масштаб / поворот выделения одной командой истории.
+        operation - ключ transforms.TRANSFORMS, value - режим выравнивания, ось, коэффициент или угол.
+        """
+        from src.logic.transforms import TRANSFORMS, selection_roots
+
+        items = selection_roots(self.scene.selectedItems())
+        function, name = TRANSFORMS[operation]
+        states = function(items, value)
+        if states is None:
+            return False
+        before, after = states
+        self.undo_stack.push(TransformCommand(items, before, after, f"{name} ({len(items)} shapes)"))
+        self.scene.selectionChanged.emit()  # Панель свойств: позиция могла измениться
+        return True
+
+    def copy_selection(self):
+        """Ctrl+C: слепки выделения в буфер обмена"""
+        from src.logic.clipboard import copy_to_clipboard
+        return copy_to_clipboard(self.scene, self.scene.selectedItems())
+
+    def paste(self):
+        """Ctrl+V: фигуры из буфера обмена, каждая следующая вставка сдвигается на PASTE_OFFSET"""
+        from src.logic.clipboard import paste_from_clipboard
+        items = paste_from_clipboard(self.PASTE_OFFSET)
+        # Вставка - в активный слой (дублирование оставляет копии в слое оригинала)
+        for item in items:
+            item.layer = self.scene.layers.active.name
+        return self._insert_copies(items, "Paste")
+
+    def duplicate_selection(self):
+        """Ctrl+D: копия выделения со сдвигом (буфер обмена не трогаем)"""
+        from src.logic.clipboard import take_snapshots
+        snapshots = take_snapshots(self.scene, self.scene.selectedItems())
+        offset = self.PASTE_OFFSET
+        return self._insert_copies([snapshot.create(offset, offset) for snapshot in snapshots], "Duplicate")
+
+    @traced("EditorCanvas.insert_copies")
+    def _insert_copies(self, items, text):
+        if not items:
+            return 0
+        self.undo_stack.push(AddShapesCommand(self.scene, items, text))
+        self.select_items(items)
+        return len(items)
+
+    @traced("EditorCanvas.import_shapes")
+    def import_shapes(self, batches, text, progress=None):
+        """
+        Импорт: фигуры приходят партиями (batches - итератор списков корневых фигур) и сразу попадают
+        в активный слой сцены, а в историю ложатся одним действием после последней партии.
+        progress() вызывается после каждой партии и возвращает False, если импорт отменен:
+        тогда (и при ошибке разбора) добавленное убирается со сцены. -> число фигур (0 - отменен/пусто)
+        """
+        layer = self.scene.layers.active.name
+        items = []
+        try:
+            for batch in batches:
+                for item in batch:
+                    item.layer = layer
+                    self.scene.addItem(item)
+                items.extend(batch)
+                if progress is not None and not progress():
+                    self._remove_items(items)
+                    return 0
+        except Exception:
+            self._remove_items(items)
+            raise
+        if not items:
+            return 0
+        # Фигуры уже на сцене: первый redo команды их не добавляет повторно
+        self.undo_stack.push(AddShapesCommand(self.scene, items, text))
+        self.select_items(items)
+        return len(items)
+
+    def _remove_items(self, items):
+        for item in items:
+            self.scene.removeItem(item)
+
+    @traced("EditorCanvas.keyPressEvent")
     def keyPressEvent(self, event):
-        # 1. Быстрое переключение на инструмент выделения по ПРОБЕЛУ
+        if self.recorder:
+            self.recorder.record_key("key_press", event, self.current_tool_name())
+        self._postpone_baking()
+        # 1. ПРОБЕЛ: зажат - панорамирование мышью, короткое нажатие - инструмент выделения (см. keyReleaseEvent)
         if event.key() == Qt.Key_Space:
-            # Находим окно, чтобы вызвать смену инструмента (как если бы нажали кнопку)
-            window = self.window()
-            if hasattr(window, "on_change_tool"):
-                window.on_change_tool("select")
+            if not event.isAutoRepeat():
+                self._space_held = True
+                self._space_panned = False
+                self.viewport().setCursor(Qt.OpenHandCursor)
             return
 
         # 2. Обработка Enter для многоугольника
@@ -175,8 +960,10 @@ class EditorCanvas(QGraphicsView):
                 self.current_tool.finish_polygon(closed=False)
                 return
 
-        # 3. Если жмем Delete — удаляем через макрос
+        # 3. Если жмем Delete — удаляем через макрос (в режиме правки вершин - выделенные вершины)
         if event.key() == Qt.Key_Delete:
+            if isinstance(self.current_tool, NodeTool) and self.current_tool.delete_vertices():
+                return
             self.delete_selected()
             return
 
@@ -204,13 +991,33 @@ class EditorCanvas(QGraphicsView):
 
         # 4. ДВИГАЕМ (просто меняем координаты, в Undo пока ничего не пишем)
         if dx != 0 or dy != 0:
+            self._note_interaction()
             for item in selected_items:
                 item.setPos(item.x() + dx, item.y() + dy)
+            # Сдвиг идет мимо истории до отпускания клавиши: кэш сохранения и индексы узнают о нем здесь
+            self.scene.items_changed(selected_items)
             self.scene.selectionChanged.emit()
         else:
             super().keyPressEvent(event)
 
+    @traced("EditorCanvas.keyReleaseEvent")
     def keyReleaseEvent(self, event):
+        if self.recorder:
+            self.recorder.record_key("key_release", event, self.current_tool_name())
+        if event.key() == Qt.Key_Space:
+            if event.isAutoRepeat():
+                return
+            self._space_held = False
+            if self._space_panned or self._pan_last is not None:
+                self.viewport().setCursor(self._tool_cursor())
+                return
+            # Быстрое переключение на инструмент выделения
+            # Находим окно, чтобы вызвать смену инструмента (как если бы нажали кнопку)
+            window = self.window()
+            if hasattr(window, "on_change_tool"):
+                window.on_change_tool("select")
+            return
+
         # 5. Когда стрелку ОТПУСТИЛИ — один раз записываем результат в историю
         if event.key() in [Qt.Key_Left, Qt.Key_Right, Qt.Key_Up, Qt.Key_Down]:
             selected_items = self.scene.selectedItems()
@@ -220,7 +1027,8 @@ class EditorCanvas(QGraphicsView):
                 for item in selected_items:
                     old_pos = self.key_move_positions.get(item)
                     new_pos = item.pos()
-                    if old_pos and old_pos != new_pos:
+                    # QPointF(0, 0) ложен: проверяем именно наличие позиции
+                    if old_pos is not None and old_pos != new_pos:
                         # Создаем команду только по факту итогового сдвига
                         cmd = MoveCommand(item, old_pos, new_pos)
                         self.undo_stack.push(cmd)
@@ -0,0 +1,130 @@
+# src/widgets/layers.py
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QListWidgetItem,
+                               QPushButton, QSlider, QCheckBox, QInputDialog)
+from PySide6.QtCore import Qt
+from src.logic.commands import MoveToLayerCommand, RemoveLayerCommand
+
+
+class LayersPanel(QWidget):
+    """
+    Панель слоев: список (верхний слой сверху), галочка - видимость.
+    Для текущего слоя: блокировка, непрозрачность, перенос выделения в него.
+    Двойной клик - переименование. Перенос фигур и удаление слоя - через историю (Undo),
+    видимость, блокировка и непрозрачность - состояние просмотра, в историю не попадают.
+    """
+
+    def __init__(self, scene, undo_stack):
+        super().__init__()
+        self.scene = scene
+        self.undo_stack = undo_stack
+        self.model = scene.layers
+        self._updating = False
+        self._init_ui()
+
+        self.model.changed.connect(self.refresh)
+        self.refresh()
+
+    def _init_ui(self):
+        self.setMinimumWidth(250)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        title = QLabel("СЛОИ")
+        title.setStyleSheet("font-weight: bold; color: #ff9d00;")
+        layout.addWidget(title)
+
+        self.list = QListWidget()
+        self.list.setMaximumHeight(140)
+        self.list.currentRowChanged.connect(self.on_current_changed)
+        self.list.itemChanged.connect(self.on_item_changed)
+        self.list.itemDoubleClicked.connect(self.on_rename)
+        layout.addWidget(self.list)
+
+        options = QHBoxLayout()
+        self.check_lock = QCheckBox("Заблокирован")
+        self.check_lock.toggled.connect(self.on_lock_toggled)
+        options.addWidget(self.check_lock)
+
+        self.slider_opacity = QSlider(Qt.Horizontal)
+        self.slider_opacity.setRange(0, 100)
+        self.slider_opacity.setToolTip("Непрозрачность слоя")
+        # Непрозрачность применяется по отпусканию ползунка (или по шагу клавиатурой)
+        self.slider_opacity.setTracking(False)
+        self.slider_opacity.valueChanged.connect(self.on_opacity_changed)
+        options.addWidget(self.slider_opacity)
+        layout.addLayout(options)
+
+        buttons = QHBoxLayout()
+        btn_add = QPushButton("+")
+        btn_add.setToolTip("Новый слой")
+        btn_add.clicked.connect(lambda: self.model.add_layer())
+        btn_remove = QPushButton("−")
+        btn_remove.setToolTip("Удалить слой (фигуры перейдут в нижний)")
+        btn_remove.clicked.connect(self.on_remove)
+        btn_move = QPushButton("Выделение сюда")
+        btn_move.setToolTip("Перенести выделенные фигуры в текущий слой")
+        btn_move.clicked.connect(self.on_move_selection)
+        for button in (btn_add, btn_remove):
+            button.setFixedWidth(32)
+            buttons.addWidget(button)
+        buttons.addWidget(btn_move)
+        layout.addLayout(buttons)
+
+    def _layer_at(self, row):
+        # Список показывает слои сверху вниз, модель хранит снизу вверх
+        layers = self.model.layers
+        return layers[len(layers) - 1 - row] if 0 <= row < len(layers) else None
+
+    def refresh(self):
+        """MODEL -> VIEW"""
+        self._updating = True
+        self.list.clear()
+        for layer in reversed(self.model.layers):
+            row = QListWidgetItem(layer.name + ("  [заблокирован]" if layer.locked else ""))
+            row.setFlags(row.flags() | Qt.ItemIsUserCheckable)
+            row.setCheckState(Qt.Checked if layer.visible else Qt.Unchecked)
+            self.list.addItem(row)
+        active = self.model.active
+        self.list.setCurrentRow(len(self.model.layers) - 1 - self.model.layers.index(active))
+        self.check_lock.setChecked(active.locked)
+        self.slider_opacity.setValue(round(active.opacity * 100))
+        self._updating = False
+
+    # --- VIEW -> MODEL ---
+
+    def on_current_changed(self, row):
+        layer = self._layer_at(row)
+        if not self._updating and layer is not None and layer is not self.model.active:
+            self.model.set_active(layer)
+
+    def on_item_changed(self, row_item):
+        if self._updating:
+            return
+        layer = self._layer_at(self.list.row(row_item))
+        if layer is not None:
+            self.model.set_visible(layer, row_item.checkState() == Qt.Checked)
+
+    def on_lock_toggled(self, locked):
+        if not self._updating:
+            self.model.set_locked(self.model.active, locked)
+
+    def on_opacity_changed(self, value):
+        if not self._updating:
+            self.model.set_opacity(self.model.active, value / 100)
+
+    def on_remove(self):
+        if len(self.model.layers) > 1:
+            self.undo_stack.push(RemoveLayerCommand(self.model, self.model.active))
+
+    def on_rename(self, row_item):
+        layer = self._layer_at(self.list.row(row_item))
+        if layer is None:
+            return
+        name, ok = QInputDialog.getText(self, "Слой", "Имя слоя:", text=layer.name)
+        if ok:
+            self.model.rename_layer(layer, name.strip())
+
+    def on_move_selection(self):
+        cmd = MoveToLayerCommand(self.model, self.scene.selectedItems(), self.model.active)
+        if cmd.items:
+            self.undo_stack.push(cmd)
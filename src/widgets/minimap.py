@@ -0,0 +1,186 @@
+# src/widgets/minimap.py
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QTimer, QRectF, QPointF
+from PySide6.QtGui import QImage, QPainter, QColor, QPen
+
+
+class MinimapPanel(QWidget):
+    """
+    Миникарта: уменьшенная копия всего документа + рамка видимой области холста.
+
+    Это НЕ второй QGraphicsView (он удвоил бы стоимость отрисовки). Сцена один раз рисуется
+    в маленькую картинку, а дальше перерисовываются только "грязные" области из scene.changed,
+    не чаще нескольких раз в секунду. Цена правки зависит от её размера, а не от размера документа.
+    """
+
+    UPDATE_INTERVAL = 250   # мс между обновлениями картинки (~4 раза в секунду)
+    MAX_DIRTY_RECTS = 16    # Больше областей - склеиваем в одну
+
+    def __init__(self, canvas):
+        super().__init__()
+        self.canvas = canvas
+        self.scene = canvas.scene
+
+        self.setFixedHeight(180)
+        self.setMinimumWidth(250)
+        self.setCursor(Qt.PointingHandCursor)
+
+        self._image = None          # QImage с уменьшенной сценой
+        self._world = QRectF()      # Какая область сцены нарисована в картинке
+        self._scale = 1.0
+        self._dirty = []            # Измененные области сцены (QRectF)
+        self._full_refresh = True
+
+        # Троттлинг: изменения копятся и применяются пачкой по таймеру
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.UPDATE_INTERVAL)
+        self._timer.timeout.connect(self._flush)
+
+        self.scene.changed.connect(self._on_scene_changed)
+        self.canvas.viewport_changed.connect(self.update)
+
+    # --- ПРИЕМ ИЗМЕНЕНИЙ ---
+
+    def _on_scene_changed(self, regions):
+        scene_rect = self.scene.sceneRect()
+        for region in regions:
+            if region == scene_rect and self.scene.render_size_changed:
+                # Сменился только порог отрисовки (качество на время взаимодействия холста). В то же
+                # обновление могли попасть правки - они в видимой области холста, её и перерисуем
+                self.scene.render_size_changed = False
+                self._dirty.append(self.canvas.visible_scene_rect())
+            # Перерисовка всей сцены (clear(), загрузка файла) - рисуем заново целиком
+            elif region == scene_rect:
+                self._full_refresh = True
+            elif not self._world.contains(region):
+                # Содержимое вылезло за пределы карты - масштаб надо пересчитать
+                self._full_refresh = True
+            else:
+                self._dirty.append(region)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def refresh(self):
+        """Полная перерисовка (например, после открытия файла)"""
+        self._full_refresh = True
+        self._timer.start()
+
+    # --- ОТРИСОВКА КАРТИНКИ ---
+
+    def _flush(self):
+        if self.width() <= 0 or self.height() <= 0:
+            return
+        if self._full_refresh or self._image is None or self._image.size() != self.size():
+            self._rebuild()
+        else:
+            self._render_dirty()
+        self.update()
+
+    def _rebuild(self):
+        self._full_refresh = False
+        self._dirty.clear()
+
+        # Карта охватывает лист и всё содержимое (кэш габаритов холста, без обхода сцены)
+        world = self.scene.page_rect.united(self.canvas.content_bounds(exact=False))
+        pad = max(world.width(), world.height()) * 0.05
+        world = world.adjusted(-pad, -pad, pad, pad)
+
+        self._scale = min(self.width() / world.width(), self.height() / world.height())
+        # Центрируем мир в картинке (лишнее место - тоже часть мира)
+        w, h = self.width() / self._scale, self.height() / self._scale
+        self._world = QRectF(world.center().x() - w / 2, world.center().y() - h / 2, w, h)
+
+        self._image = QImage(self.size(), QImage.Format_ARGB32_Premultiplied)
+        self._render_region(self._world)
+
+    def _render_dirty(self):
+        dirty, self._dirty = self._dirty, []
+        if len(dirty) > self.MAX_DIRTY_RECTS:
+            merged = QRectF()
+            for region in dirty:
+                merged = merged.united(region)
+            dirty = [merged]
+        for region in dirty:
+            # Полпикселя миникарты запаса - чтобы не оставалось "хвостов" от сглаживания
+            pad = 1 / self._scale
+            self._render_region(region.adjusted(-pad, -pad, pad, pad))
+
+    def _to_image(self, rect):
+        return QRectF((rect.left() - self._world.left()) * self._scale,
+                      (rect.top() - self._world.top()) * self._scale,
+                      rect.width() * self._scale, rect.height() * self._scale)
+
+    def _render_region(self, source):
+        """Перерисовывает в картинке только кусок сцены source"""
+        source = source.intersected(self._world)
+        if source.isEmpty():
+            return
+        target = self._to_image(source).toAlignedRect()
+        # Выравниваем область сцены по целым пикселям картинки
+        source = QRectF(self._world.left() + target.left() / self._scale,
+                        self._world.top() + target.top() / self._scale,
+                        target.width() / self._scale, target.height() / self._scale)
+
+        painter = QPainter(self._image)
+        painter.setClipRect(target)
+        painter.fillRect(target, QColor("#555555"))
+        painter.fillRect(self._to_image(self.scene.page_rect), QColor("white"))
+        self.scene.render(painter, QRectF(target), source, Qt.IgnoreAspectRatio)
+
+        # Невыгруженные фигуры ленивого документа рисуем просто рамками
+        document = self.scene.document
+        if document:
+            painter.setPen(QPen(QColor("#888888"), 0))
+            for record in document.query(source.left(), source.top(), source.right(), source.bottom()):
+                if record.item is None:
+                    x1, y1, x2, y2 = record.bounds
+                    painter.drawRect(self._to_image(QRectF(x1, y1, x2 - x1, y2 - y1)))
+        painter.end()
+
+    def thumbnail(self):
+        """Картинка документа для миниатюры файла (с еще не примененными правками) или None"""
+        if self._timer.isActive() or self._image is None:
+            self._timer.stop()
+            self._flush()
+        return self._image
+
+    def memory_bytes(self):
+        """Размер картинки миникарты (панель статистики)"""
+        return self._image.sizeInBytes() if self._image is not None else 0
+
+    # --- ВИДЖЕТ ---
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self._image is None:
+            painter.fillRect(self.rect(), QColor("#555555"))
+            self.refresh()
+            return
+        painter.drawImage(0, 0, self._image)
+
+        # Рамка видимой области холста
+        view_rect = self._to_image(self.canvas.visible_scene_rect())
+        painter.setPen(QPen(QColor("#ff9d00"), 2))
+        painter.setBrush(QColor(255, 157, 0, 40))
+        painter.drawRect(view_rect)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.refresh()
+
+    def _navigate(self, pos):
+        scene_pos = QPointF(self._world.left() + pos.x() / self._scale,
+                            self._world.top() + pos.y() / self._scale)
+        visible = self.canvas.visible_scene_rect()
+        visible.moveCenter(scene_pos)
+        self.scene.grow_to(visible, self.canvas.SCENE_MARGIN)
+        self.canvas.centerOn(scene_pos)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self._image is not None:
+            self._navigate(event.position())
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.LeftButton and self._image is not None:
+            self._navigate(event.position())
@@ -149,8 +149,11 @@ class PropertiesPanel(QWidget):
 
     def on_geo_changed(self):
         """VIEW -> MODEL: Изменение позиции из панели"""
-        for item in self.scene.selectedItems():
+        selected = self.scene.selectedItems()
+        for item in selected:
             item.setPos(self.spin_x.value(), self.spin_y.value())
+        if hasattr(self.scene, "items_changed"):
+            self.scene.items_changed(selected)
 
     def on_width_changed(self, value):
         """Изменение толщины через команду"""
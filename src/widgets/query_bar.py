@@ -0,0 +1,65 @@
+# src/widgets/query_bar.py
+from time import perf_counter
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QLineEdit, QLabel, QPushButton, QCompleter
+from PySide6.QtCore import Qt, QStringListModel
+from src.logic.query import parse_query
+
+
+class QueryBar(QWidget):
+    """
+    Строка поиска фигур по атрибутам: запрос вида type:line color:red width:3 (см. query.parse_query).
+    Enter - выделить найденное. Подсказки - значения, которые есть в документе.
+    """
+
+    def __init__(self, canvas, parent=None):
+        super().__init__(parent)
+        self.canvas = canvas
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(4, 2, 4, 2)
+
+        self.edit = QLineEdit()
+        self.edit.setPlaceholderText('type:line,polygon color:red width:3 layer:"Layer 1" group:no in:view')
+        self.edit.setClearButtonEnabled(True)
+        self.edit.returnPressed.connect(self.run)
+        self._completions = QStringListModel(self)
+        completer = QCompleter(self._completions, self)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.edit.setCompleter(completer)
+        layout.addWidget(self.edit, 1)
+
+        btn_select = QPushButton("Выделить")
+        btn_select.clicked.connect(self.run)
+        layout.addWidget(btn_select)
+
+        self.status = QLabel()
+        self.status.setMinimumWidth(180)
+        layout.addWidget(self.status)
+
+    def focus(self):
+        self._update_completions()
+        self.edit.setFocus()
+        self.edit.selectAll()
+
+    def _update_completions(self):
+        """Подсказки для всех условий по значениям из индекса"""
+        index = self.canvas.init_query_index()
+        words = []
+        for key, field in (("type", "type"), ("color", "color"), ("width", "width"), ("layer", "layer")):
+            for value in index.values(field):
+                if value is None:
+                    continue
+                text = str(value)
+                words.append(f'{key}:"{text}"' if " " in text else f"{key}:{text}")
+        words += ["group:yes", "group:no", "in:view", "in:selection"]
+        self._completions.setStringList(words)
+
+    def run(self):
+        try:
+            criteria = parse_query(self.edit.text())
+        except ValueError as e:
+            self.status.setText(str(e))
+            return
+        start = perf_counter()
+        count = self.canvas.select_query(**criteria)
+        self.status.setText(f"Найдено: {count} ({(perf_counter() - start) * 1000:.1f} мс)")
@@ -0,0 +1,139 @@
+# src/widgets/recent.py
+import os
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem, QLineEdit,
+                               QPushButton, QFileDialog, QListView, QLabel)
+from PySide6.QtCore import Qt, QSize, QSettings
+from PySide6.QtGui import QIcon, QPixmap, QColor
+from src.logic.thumbnails import THUMBNAIL_SIZE, ThumbnailPool, cached_thumbnail, default_cache_dir
+
+MAX_RECENT = 50
+PROJECT_EXTENSIONS = (".json", ".vec")
+
+
+def _settings():
+    return QSettings("VectorEditor", "VectorEditor")
+
+
+def recent_projects():
+    """Недавние проекты (сначала последние), только существующие файлы"""
+    paths = _settings().value("recent_projects", []) or []
+    if isinstance(paths, str):  # QSettings возвращает строку, если в списке один элемент
+        paths = [paths]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def add_recent_project(path):
+    path = os.path.abspath(path)
+    paths = [p for p in recent_projects() if p != path]
+    _settings().setValue("recent_projects", [path] + paths[:MAX_RECENT - 1])
+
+
+class RecentProjectsDialog(QDialog):
+    """
+    Недавние проекты с миниатюрами.
+    Миниатюры из кэша показываются сразу, недостающие досылает ThumbnailPool (в других процессах).
+    Кнопка "Папка..." показывает все проекты выбранной папки. Двойной клик - открыть.
+    """
+
+    def __init__(self, paths, cache_dir=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Недавние проекты")
+        self.resize(760, 520)
+        self.selected_path = None
+        self.cache_dir = cache_dir or default_cache_dir()
+        self._rows = {}  # путь проекта -> QListWidgetItem
+
+        self.pool = ThumbnailPool(self.cache_dir, parent=self)
+        self.pool.ready.connect(self.on_thumbnail_ready)
+
+        self._placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        self._placeholder.fill(QColor("#555555"))
+        self._init_ui()
+        self.show_paths(paths)
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Фильтр по имени файла")
+        self.filter_edit.textChanged.connect(self.on_filter_changed)
+        layout.addWidget(self.filter_edit)
+
+        self.list = QListWidget()
+        self.list.setViewMode(QListView.IconMode)
+        self.list.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.list.setResizeMode(QListView.Adjust)
+        self.list.setMovement(QListView.Static)
+        self.list.setUniformItemSizes(True)
+        self.list.setSpacing(8)
+        self.list.itemActivated.connect(self.on_activated)
+        layout.addWidget(self.list)
+
+        self.status = QLabel()
+        layout.addWidget(self.status)
+
+        buttons = QHBoxLayout()
+        btn_folder = QPushButton("Папка...")
+        btn_folder.setToolTip("Показать все проекты папки")
+        btn_folder.clicked.connect(self.on_folder_clicked)
+        buttons.addWidget(btn_folder)
+        buttons.addStretch()
+        btn_open = QPushButton("Открыть")
+        btn_open.setDefault(True)
+        btn_open.clicked.connect(lambda: self.on_activated(self.list.currentItem()))
+        btn_cancel = QPushButton("Отмена")
+        btn_cancel.clicked.connect(self.reject)
+        buttons.addWidget(btn_open)
+        buttons.addWidget(btn_cancel)
+        layout.addLayout(buttons)
+
+    def show_paths(self, paths):
+        """Заполняет список: миниатюры из кэша сразу, за остальными - в пул"""
+        self.list.clear()
+        self._rows = {}
+        missing = 0
+        for path in paths:
+            row = QListWidgetItem(os.path.basename(path))
+            row.setToolTip(path)
+            row.setData(Qt.UserRole, path)
+            cached = cached_thumbnail(self.cache_dir, path)
+            if cached:
+                row.setIcon(QIcon(cached))
+            else:
+                row.setIcon(QIcon(self._placeholder))
+                self.pool.request(path)
+                missing += 1
+            self.list.addItem(row)
+            self._rows[path] = row
+        self.status.setText(f"Проектов: {len(paths)}" + (f", миниатюр рисуется: {missing}" if missing else ""))
+        self.on_filter_changed(self.filter_edit.text())
+
+    def on_thumbnail_ready(self, path, thumbnail):
+        row = self._rows.get(path)
+        if row is not None and thumbnail:
+            row.setIcon(QIcon(thumbnail))
+
+    def on_filter_changed(self, text):
+        text = text.strip().lower()
+        for i in range(self.list.count()):
+            row = self.list.item(i)
+            row.setHidden(bool(text) and text not in row.text().lower())
+
+    def on_folder_clicked(self):
+        folder = QFileDialog.getExistingDirectory(self, "Папка с проектами")
+        if not folder:
+            return
+        paths = [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+                 if name.lower().endswith(PROJECT_EXTENSIONS)]
+        self.show_paths(paths)
+
+    def on_activated(self, row):
+        if row is None:
+            return
+        self.selected_path = row.data(Qt.UserRole)
+        self.accept()
+
+    def done(self, result):
+        # Недорисованные миниатюры больше не нужны (уже начатые допишутся в кэш в фоне)
+        self.pool.shutdown()
+        super().done(result)
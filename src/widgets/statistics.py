@@ -0,0 +1,211 @@
+# src/widgets/statistics.py
+from PySide6.QtWidgets import (QDialog, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QTabWidget,
+                               QTreeWidget, QTreeWidgetItem, QPushButton, QFileDialog, QMessageBox)
+from PySide6.QtCore import Qt, QTimer
+from src.logic.memory_stats import (MemoryScan, AllocationTracker, CATEGORIES, CACHE_NAMES, format_bytes,
+                                    export_report)
+
+WHERE_TITLES = {"scene": "сцена", "record": "запись", "hidden": "скрытый слой"}
+
+
+class StatisticsDialog(QDialog):
+    """
+    Статистика документа: фигуры по типам, оценка памяти по категориям, самые тяжелые фигуры
+    и разница снимков tracemalloc. Подсчет идет по таймеру частями по STEP_BUDGET секунд
+    (см. MemoryScan) - окно не замирает и на миллионе фигур. Двойной клик по фигуре - выделить её.
+    """
+
+    STEP_BUDGET = 0.03
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.main_window = window
+        self.canvas = window.canvas
+        self.scan = None
+        self.allocations = None
+        self._largest = []  # Источники строк вкладки "Крупнейшие"
+        self.tracker = AllocationTracker()
+        self.setWindowTitle("Document Statistics")
+        self.resize(640, 520)
+        self._init_ui()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._step)
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.summary = QLabel()
+        self.summary.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.summary)
+        self.progress = QProgressBar()
+        layout.addWidget(self.progress)
+
+        tabs = QTabWidget()
+        self.memory_tree = self._tree(["Категория", "Байты (оценка)"])
+        tabs.addTab(self.memory_tree, "Память")
+        self.types_tree = self._tree(["Тип", "Фигур", "Вершин"])
+        tabs.addTab(self.types_tree, "Фигуры")
+        self.largest_tree = self._tree(["Байты", "Тип", "Вершин", "Где", "id"])
+        self.largest_tree.itemDoubleClicked.connect(self.on_largest_activated)
+        tabs.addTab(self.largest_tree, "Крупнейшие")
+
+        allocations = QVBoxLayout()
+        tracker_buttons = QHBoxLayout()
+        self.btn_trace_start = QPushButton("Запомнить снимок")
+        self.btn_trace_start.setToolTip("Включает tracemalloc (выделения памяти станут медленнее) и снимает первый снимок")
+        self.btn_trace_start.clicked.connect(self.on_trace_start)
+        self.btn_trace_diff = QPushButton("Сравнить со снимком")
+        self.btn_trace_diff.setEnabled(False)
+        self.btn_trace_diff.clicked.connect(self.on_trace_diff)
+        tracker_buttons.addWidget(self.btn_trace_start)
+        tracker_buttons.addWidget(self.btn_trace_diff)
+        tracker_buttons.addStretch()
+        allocations.addLayout(tracker_buttons)
+        self.allocations_tree = self._tree(["Рост", "Блоков", "Строка кода"])
+        allocations.addWidget(self.allocations_tree)
+        page = QWidget()
+        page.setLayout(allocations)
+        tabs.addTab(page, "tracemalloc")
+        layout.addWidget(tabs, 1)
+
+        buttons = QHBoxLayout()
+        btn_refresh = QPushButton("Обновить")
+        btn_refresh.clicked.connect(self.refresh)
+        self.btn_export = QPushButton("Экспорт...")
+        self.btn_export.clicked.connect(self.on_export)
+        btn_close = QPushButton("Закрыть")
+        btn_close.clicked.connect(self.close)
+        buttons.addWidget(btn_refresh)
+        buttons.addWidget(self.btn_export)
+        buttons.addStretch()
+        buttons.addWidget(btn_close)
+        layout.addLayout(buttons)
+
+    @staticmethod
+    def _tree(headers):
+        tree = QTreeWidget()
+        tree.setHeaderLabels(headers)
+        tree.setRootIsDecorated(False)
+        tree.setUniformRowHeights(True)
+        return tree
+
+    # --- ПОДСЧЕТ ---
+
+    def refresh(self):
+        """Начинает подсчет заново (снимок документа на текущий момент)"""
+        extra = [("minimap", self.main_window.minimap)] if self.main_window.minimap is not None else []
+        self.scan = MemoryScan(self.canvas, extra)
+        self.btn_export.setEnabled(False)
+        self.progress.setValue(0)
+        self.summary.setText("Подсчет...")
+        self._timer.start()
+
+    def _step(self):
+        scan = self.scan
+        finished = scan.run(self.STEP_BUDGET)
+        self.progress.setMaximum(max(scan.total, 1))
+        self.progress.setValue(scan.position)
+        if finished:
+            self._timer.stop()
+            self._show(scan.report())
+            self.btn_export.setEnabled(True)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.scan is None or not self._timer.isActive():
+            self.refresh()
+
+    def _show(self, report):
+        shapes = report["shapes"]
+        text = (f"Корневых фигур: {shapes['roots']} (записей без фигур: {shapes['records']}, "
+                f"в скрытых слоях: {shapes['hidden']}). Всего фигур: {shapes['total']}, "
+                f"вершин: {shapes['vertices']}, вложенность групп: {shapes['max_group_depth']}.")
+        if report["process_memory"]:
+            text += f"\nПамять процесса: {format_bytes(report['process_memory'])}, " \
+                    f"оценка документа: {format_bytes(report['bytes']['total'])}"
+        text += f"\nПодсчет: {report['elapsed'] * 1000:.0f} мс"
+        self.summary.setText(text)
+
+        self.memory_tree.clear()
+        for key, title in CATEGORIES:
+            row = QTreeWidgetItem([title, format_bytes(report["bytes"][key])])
+            self.memory_tree.addTopLevelItem(row)
+            if key == "caches":
+                for name, cache_title in CACHE_NAMES.items():
+                    if report["caches"].get(name):
+                        row.addChild(QTreeWidgetItem([cache_title, format_bytes(report["caches"][name])]))
+                row.setExpanded(True)
+            elif key == "undo":
+                undo = report["undo"]
+                row.setToolTip(0, f"{undo['commands']} команд, фигур только в истории: {undo['held_items']}")
+        self.memory_tree.addTopLevelItem(QTreeWidgetItem(["Итого", format_bytes(report["bytes"]["total"])]))
+        self.memory_tree.setRootIsDecorated(True)
+
+        self.types_tree.clear()
+        for kind, entry in shapes["by_type"].items():
+            self.types_tree.addTopLevelItem(QTreeWidgetItem([kind, str(entry["count"]), str(entry["vertices"])]))
+
+        self.largest_tree.clear()
+        self._largest = []
+        for info, source in self.scan.largest():
+            row = QTreeWidgetItem([format_bytes(info["bytes"]), info["type"], str(info["vertices"]),
+                                   WHERE_TITLES.get(info["where"], info["where"]), str(info["id"])])
+            row.setData(0, Qt.UserRole, len(self._largest))
+            self._largest.append(source)
+            self.largest_tree.addTopLevelItem(row)
+        for tree in (self.memory_tree, self.types_tree, self.largest_tree):
+            tree.resizeColumnToContents(0)
+
+    def on_largest_activated(self, row):
+        """Выделяет фигуру (запись ленивого документа материализуется) и показывает её на холсте"""
+        source = self._largest[row.data(0, Qt.UserRole)]
+        scene = self.canvas.scene
+        try:
+            if not hasattr(source, "to_dict"):
+                if source.item is None and scene.document:
+                    scene.document.materialize(source, scene)
+                source = source.item
+            if source is None or source.scene() is not scene:
+                self.summary.setText("Фигура не в сцене (скрытый слой или удалена)")
+                return
+        except RuntimeError:
+            return  # Фигура уже удалена
+        self.canvas.select_items([source])
+        self.canvas.centerOn(source)
+
+    # --- TRACEMALLOC ---
+
+    def on_trace_start(self):
+        self.tracker.start()
+        self.btn_trace_diff.setEnabled(True)
+        self.btn_trace_start.setText("Снимок заново")
+
+    def on_trace_diff(self):
+        self.allocations = self.tracker.diff()
+        self.btn_trace_diff.setEnabled(False)
+        self.btn_trace_start.setText("Запомнить снимок")
+        self.allocations_tree.clear()
+        for row in self.allocations:
+            self.allocations_tree.addTopLevelItem(QTreeWidgetItem(
+                [format_bytes(row["size_diff"]), f"{row['count_diff']:+d}", row["where"]]))
+        self.allocations_tree.resizeColumnToContents(0)
+
+    def done(self, result):
+        # Закрытие окна: подсчет останавливается, трассировка выключается
+        self._timer.stop()
+        self.tracker.stop()
+        super().done(result)
+
+    # --- ЭКСПОРТ ---
+
+    def on_export(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Export Statistics", "statistics.json",
+                                                  "JSON (*.json);;Text (*.txt)")
+        if not filename:
+            return
+        try:
+            export_report(filename, self.scan.report(), self.allocations)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить отчет:\n{str(e)}")
@@ -0,0 +1,34 @@
+# src/widgets/text_dialog.py
+from PySide6.QtWidgets import QDialog, QFormLayout, QPlainTextEdit, QFontComboBox, QSpinBox, QDialogButtonBox
+from PySide6.QtGui import QFont
+
+
+def ask_text(parent, text, family, size):
+    """Диалог текста надписи (несколько строк) и шрифта -> (текст, шрифт, размер) или None (отмена)"""
+    dialog = QDialog(parent)
+    dialog.setWindowTitle("Text")
+    form = QFormLayout(dialog)
+
+    edit = QPlainTextEdit(text)
+    edit.setMinimumSize(320, 100)
+    form.addRow("Текст:", edit)
+
+    font = QFontComboBox()
+    font.setCurrentFont(QFont(family))
+    form.addRow("Шрифт:", font)
+
+    spin_size = QSpinBox()
+    spin_size.setRange(1, 1000)
+    spin_size.setSuffix(" px")
+    spin_size.setValue(round(size))
+    form.addRow("Размер:", spin_size)
+
+    buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+    buttons.accepted.connect(dialog.accept)
+    buttons.rejected.connect(dialog.reject)
+    form.addRow(buttons)
+
+    edit.setFocus()
+    if not dialog.exec():
+        return None
+    return edit.toPlainText(), font.currentFont().family(), spin_size.value()
@@ -0,0 +1,66 @@
+# tests/conftest.py
+import json
+import os
+import sys
+
+import pytest
+
+# Qt без окон: тесты идут и на машине без дисплея
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = QApplication.instance() or QApplication([])
+    yield app
+    # QMimeData из Python в буфере роняет выход интерпретатора (см. logic/clipboard.py)
+    app.clipboard().clear()
+
+
+@pytest.fixture
+def canvas(app):
+    from src.widgets.canvas import EditorCanvas
+    canvas = EditorCanvas()
+    canvas.resize(800, 600)
+    canvas.show()
+    app.processEvents()
+    yield canvas
+    canvas.undo_stack.clear()
+    canvas.scene.clear()
+    canvas.close()
+
+
+@pytest.fixture
+def add_rects(canvas):
+    """Добавляет n прямоугольников 20x10 в ряд через историю -> [фигура, ...]"""
+    from PySide6.QtCore import QPointF
+    from src.logic.factory import ShapeFactory
+    from src.logic.commands import AddShapeCommand
+
+    def add(n, color="#000000"):
+        items = []
+        for i in range(n):
+            item = ShapeFactory.create_shape("rect", QPointF(i * 30, 0), QPointF(i * 30 + 20, 10), color)
+            canvas.undo_stack.push(AddShapeCommand(canvas.scene, item))
+            items.append(item)
+        return items
+    return add
+
+
+@pytest.fixture
+def saved(tmp_path):
+    """Сохраняет сцену JsonSaveStrategy -> (байты файла, байты полного json.dumps того же проекта)"""
+    from src.logic.strategies import JsonSaveStrategy
+    counter = iter(range(10 ** 6))
+
+    def save(scene):
+        filename = tmp_path / f"project_{next(counter)}.json"
+        JsonSaveStrategy().save(str(filename), scene)
+        data = filename.read_bytes()
+        project = json.loads(data)
+        project["shapes"] = list(scene.shape_dicts())
+        return data, json.dumps(project, indent=4, ensure_ascii=False).encode("utf-8")
+    return save
@@ -0,0 +1,72 @@
+# tests/test_clipboard.py
+"""Копирование и вставка: клоны из слепков и сжатый JSON для других окон"""
+import json
+import zlib
+
+import pytest
+from PySide6.QtGui import QGuiApplication
+
+from src.logic import clipboard
+from src.logic.clipboard import MIME_TYPE, decode_payload
+
+
+def _records(items):
+    """Записи фигур без id (у копий свои id)"""
+    return [{key: value for key, value in item.to_dict().items() if key != "id"} for item in items]
+
+
+@pytest.fixture
+def rects(canvas, add_rects):
+    items = add_rects(4)
+    items[1].setPos(5, 7)
+    items[2].setRotation(30)
+    for item in items:
+        item.setSelected(True)
+    return items
+
+
+def _shifted_back(items, shift):
+    for item in items:
+        item.setPos(item.x() - shift, item.y() - shift)
+    return items
+
+
+def test_paste_in_process_offsets_each_paste(canvas, rects):
+    offset = canvas.PASTE_OFFSET
+    assert canvas.copy_selection() == 4
+    assert canvas.paste() == 4
+    first = list(canvas.scene.selectedItems())
+    assert canvas.paste() == 4
+    second = list(canvas.scene.selectedItems())
+    assert len(list(canvas.scene.shape_sources())) == 12
+    order = list(canvas.scene.shape_sources())
+    assert _records(_shifted_back(sorted(first, key=order.index), offset)) == _records(rects)
+    assert _records(_shifted_back(sorted(second, key=order.index), 2 * offset)) == _records(rects)
+    canvas.undo_stack.undo()
+    canvas.undo_stack.undo()
+    assert list(canvas.scene.shape_sources()) == rects
+
+
+@pytest.mark.parametrize("warm_cache", [False, True])
+def test_payload_matches_sources(canvas, rects, saved, warm_cache):
+    if warm_cache:
+        saved(canvas.scene)  # Записи фигур берутся из кэша сохранения
+    canvas.copy_selection()
+    payload = QGuiApplication.clipboard().mimeData().data(MIME_TYPE).data()
+    data = json.loads(zlib.decompress(payload))
+    assert [{k: v for k, v in record.items() if k != "id"} for record in data["shapes"]] == _records(rects)
+
+
+def test_paste_from_other_window(canvas, rects, saved):
+    saved(canvas.scene)  # У исходных фигур есть id - у копий их быть не должно
+    canvas.copy_selection()
+    clipboard._copied = None  # Как будто скопировано другим процессом
+    assert canvas.paste() == 4
+    order = list(canvas.scene.shape_sources())
+    pasted = sorted(canvas.scene.selectedItems(), key=order.index)
+    assert not {item.shape_id for item in pasted} & {item.shape_id for item in rects}
+    assert _records(_shifted_back(pasted, canvas.PASTE_OFFSET)) == _records(rects)
+
+
+def test_decode_skips_garbage():
+    assert decode_payload(b"not zlib") == []
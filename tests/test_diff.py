@@ -0,0 +1,61 @@
+# tests/test_diff.py
+"""Сравнение версий проекта: по файлам, по документу сцены и по спискам записей - одни и те же счетчики"""
+from array import array
+
+import pytest
+from PySide6.QtCore import QPointF
+
+from src.logic.commands import (AddShapeCommand, DeleteShapeCommand, MoveCommand, ChangeColorCommand,
+                                EditVerticesCommand)
+from src.logic.diff import diff_files, diff_document, diff_shapes
+from src.logic.shapes import Polygon
+from src.logic.strategies import JsonSaveStrategy
+
+EXPECTED = {"added": 1, "removed": 1, "moved": 1, "restyled": 1, "reshaped": 1}
+
+
+@pytest.fixture
+def versions(canvas, add_rects, tmp_path):
+    """Сохраняет документ, правит по одной фигуре на каждый вид изменения -> (старый файл, старые записи)"""
+    stack, scene = canvas.undo_stack, canvas.scene
+    rects = add_rects(4)
+    polygon = Polygon.from_points(array('d', [0, 50, 40, 60, 20, 90]), "#000000", 2, True)
+    stack.push(AddShapeCommand(scene, polygon))
+    old_file = tmp_path / "old.json"
+    JsonSaveStrategy().save(str(old_file), scene)
+    old_shapes = list(scene.shape_dicts())
+
+    rects[0].setPos(15, 25)
+    stack.push(MoveCommand(rects[0], QPointF(0, 0), QPointF(15, 25)))
+    stack.push(ChangeColorCommand(rects[1], "#ff0000"))
+    stack.push(DeleteShapeCommand(scene, rects[2]))
+    add_rects(1)
+    stack.push(EditVerticesCommand(polygon, array('d', polygon.coords), array('d', [0, 50, 45, 60, 20, 90]),
+                                   "Правка вершин", [1]))
+    return old_file, old_shapes
+
+
+def test_diff_shapes(canvas, versions):
+    _, old_shapes = versions
+    diff = diff_shapes(old_shapes, list(canvas.scene.shape_dicts()))
+    assert diff.counts() == EXPECTED
+    assert not diff_shapes(old_shapes, old_shapes)
+
+
+def test_diff_files(canvas, versions, tmp_path):
+    old_file, _ = versions
+    new_file = tmp_path / "new.json"
+    JsonSaveStrategy().save(str(new_file), canvas.scene)
+    assert diff_files(str(old_file), str(new_file)).counts() == EXPECTED
+    assert not diff_files(str(old_file), str(old_file))
+
+
+def test_diff_document(canvas, versions):
+    old_file, _ = versions
+    diff = diff_document(str(old_file), canvas.scene)
+    assert diff.counts() == EXPECTED
+    assert len(diff.bounds("moved")) == 1 and len(diff.bounds("removed")) == 1
+    # Отмена всех правок возвращает документ к сохраненной версии
+    while canvas.undo_stack.index() > 5:
+        canvas.undo_stack.undo()
+    assert not diff_document(str(old_file), canvas.scene)
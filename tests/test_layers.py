@@ -0,0 +1,68 @@
+# tests/test_layers.py
+"""Слои: перенос фигур и удаление слоя отменяются вместе с порядком наложения"""
+from src.logic.commands import MoveToLayerCommand, RemoveLayerCommand
+
+
+def order(scene):
+    return list(scene.shape_sources())
+
+
+def state(items):
+    return [(item.layer, item.zValue()) for item in items]
+
+
+def test_move_to_hidden_layer_undo_keeps_order(canvas, add_rects):
+    items = add_rects(3)
+    layers = canvas.scene.layers
+    target = layers.add_layer()
+    canvas.undo_stack.push(MoveToLayerCommand(layers, [items[0]], target))
+    layers.set_visible(target, False)
+    assert items[0].scene() is None
+    canvas.undo_stack.undo()
+    assert order(canvas.scene) == items
+    assert state(items) == [(layers.layers[0].name, 0.0)] * 3
+
+
+def test_move_to_layer_undo_redo(canvas, add_rects):
+    items = add_rects(4)
+    layers = canvas.scene.layers
+    before = state(items)
+    target = layers.add_layer()
+    canvas.undo_stack.push(MoveToLayerCommand(layers, items[1:3], target))
+    assert [item.layer for item in items] == [layers.layers[0].name, target.name, target.name, layers.layers[0].name]
+    assert items[1].zValue() == layers.Z_STEP
+    canvas.undo_stack.undo()
+    assert state(items) == before
+    assert order(canvas.scene) == items
+    canvas.undo_stack.redo()
+    assert items[2].layer == target.name
+
+
+def test_remove_layer_undo_after_hiding_target(canvas, add_rects):
+    layers = canvas.scene.layers
+    bottom = layers.layers[0]
+    below = add_rects(2)
+    top = layers.add_layer()
+    moved = add_rects(2)  # Добавляются в активный (новый) слой
+    assert [item.layer for item in moved] == [top.name] * 2
+    canvas.undo_stack.push(RemoveLayerCommand(layers, top))
+    assert [layer.name for layer in layers.layers] == [bottom.name]
+    layers.set_visible(bottom, False)
+    canvas.undo_stack.undo()
+    layers.set_visible(bottom, True)
+    assert [layer.name for layer in layers.layers] == [bottom.name, top.name]
+    assert [item.layer for item in moved] == [top.name] * 2
+    assert order(canvas.scene) == below + moved
+
+
+def test_remove_hidden_layer_undo(canvas, add_rects):
+    layers = canvas.scene.layers
+    top = layers.add_layer()
+    items = add_rects(3)
+    layers.set_visible(top, False)
+    canvas.undo_stack.push(RemoveLayerCommand(layers, top))
+    assert all(item.scene() is canvas.scene for item in items)
+    canvas.undo_stack.undo()
+    assert not top.visible and top.hidden_items == items
+    layers.set_visible(top, True)
+    assert order(canvas.scene) == items
@@ -0,0 +1,60 @@
+# tests/test_points.py
+"""Упакованные вершины: pack/encode/decode без потерь для любых входов"""
+import json
+from array import array
+
+import pytest
+from PySide6.QtCore import QPointF
+
+from src.logic.points import (pack_points, encode_points, decode_points, to_polygonf, points_bounds,
+                              PACKED_MIN_POINTS, ENCODING)
+
+
+def coords(count):
+    # Дробные значения, не представимые в десятичной записи точно: проверка побитного восстановления
+    result = array('d')
+    for i in range(count):
+        result.extend((i / 3.0, -i * 0.1 + 1e-9))
+    return result
+
+
+def test_pack_inputs():
+    expected = coords(5)
+    pairs = [[x, y] for x, y in zip(expected[0::2], expected[1::2])]
+    assert pack_points(expected) is expected
+    assert pack_points(pairs) == expected
+    assert pack_points([QPointF(x, y) for x, y in pairs]) == expected
+    assert pack_points([]) == array('d')
+
+
+def test_pack_numpy():
+    numpy = pytest.importorskip("numpy")
+    expected = coords(5)
+    assert pack_points(numpy.array(expected).reshape(-1, 2)) == expected
+    assert pack_points(numpy.arange(10, dtype=numpy.int32).reshape(-1, 2)) == array('d', range(10))
+
+
+@pytest.mark.parametrize("count", [0, 1, PACKED_MIN_POINTS - 1, PACKED_MIN_POINTS, 1000])
+def test_encode_decode_roundtrip(count):
+    value = encode_points(coords(count))
+    if count < PACKED_MIN_POINTS:
+        assert isinstance(value, list)
+    else:
+        assert value["encoding"] == ENCODING
+    # Через JSON, как в файле проекта
+    assert decode_points(json.loads(json.dumps(value))) == coords(count)
+
+
+def test_decode_rejects_unknown_encoding():
+    with pytest.raises(ValueError):
+        decode_points({"encoding": "f32be", "data": ""})
+    assert decode_points(None) == array('d')
+
+
+def test_polygonf_and_bounds(app):
+    points = coords(PACKED_MIN_POINTS)
+    polygon = to_polygonf(points)
+    assert polygon.size() == PACKED_MIN_POINTS
+    assert pack_points(list(polygon)) == points
+    assert points_bounds(points) == (min(points[0::2]), min(points[1::2]), max(points[0::2]), max(points[1::2]))
+    assert points_bounds(array('d')) is None
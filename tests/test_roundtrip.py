@@ -0,0 +1,111 @@
+# tests/test_roundtrip.py
+"""Сохранение -> загрузка -> сохранение: тот же документ и те же постоянные id фигур"""
+import json
+from array import array
+
+import pytest
+from PySide6.QtCore import QPointF
+
+from src.logic.commands import AddShapeCommand
+from src.logic.factory import ShapeFactory
+from src.logic.io_manager import FileManager
+from src.logic.scene import EditorScene
+from src.logic.shapes import Polygon, TextShape, LONG_POLYLINE_POINTS
+from src.logic.strategies import JsonSaveStrategy
+
+
+def load(filename):
+    """Сцена из файла проекта (как MainWindow.open_project: слои до фигур)"""
+    data = FileManager.load_project(filename)
+    scene = EditorScene()
+    scene.layers.load(data.get("layers"))
+    scene.set_page_size(data["scene"]["width"], data["scene"]["height"])
+    for shape_dict in data["shapes"]:
+        scene.addItem(ShapeFactory.from_dict(shape_dict))
+    return scene
+
+
+def ids(shapes):
+    """Id всех фигур дерева записей (с детьми групп) по порядку"""
+    result = []
+    for shape in shapes:
+        result.append(shape.get("id"))
+        result.extend(ids(shape.get("children", [])))
+    return result
+
+
+@pytest.fixture
+def project(canvas, add_rects):
+    """Документ со всеми видами фигур, группой и скрытым слоем"""
+    def add(item):
+        canvas.undo_stack.push(AddShapeCommand(canvas.scene, item))
+
+    rects = add_rects(3, "#ff0000")
+    add(ShapeFactory.create_shape("ellipse", QPointF(0, 50), QPointF(40, 80), "#00ff00"))
+    add(ShapeFactory.create_shape("line", QPointF(10, 100), QPointF(-20, 140), "#0000ff"))
+    add(Polygon.from_points(array('d', [0, 200, 30, 210, 15, 240]), "#123456", 3, True))
+    coords = array('d')
+    for i in range(LONG_POLYLINE_POINTS + 5):
+        coords.extend((i * 0.5, 300 + (i % 11) * 1.25))
+    add(Polygon.from_points(coords, "#654321", 2, False))
+    add(TextShape("Привет", 100, 400, "Arial", 14, "#000000", 1))
+
+    canvas.select_items(rects[:2])
+    canvas.group_selection()
+
+    layers = canvas.scene.layers
+    hidden = layers.add_layer("Скрытый")
+    layers.set_active(hidden)
+    add_rects(1, "#999999")
+    layers.set_visible(hidden, False)
+    return canvas.scene
+
+
+def save(scene, filename):
+    JsonSaveStrategy().save(str(filename), scene)
+    return filename.read_bytes()
+
+
+def test_roundtrip_keeps_document(project, tmp_path):
+    first = save(project, tmp_path / "first.json")
+    loaded = load(str(tmp_path / "first.json"))
+    assert list(loaded.shape_dicts()) == list(project.shape_dicts())
+    assert save(loaded, tmp_path / "second.json") == first
+
+
+def test_roundtrip_keeps_layers(project, tmp_path):
+    save(project, tmp_path / "project.json")
+    loaded = load(str(tmp_path / "project.json"))
+    assert loaded.layers.to_list() == project.layers.to_list()
+    # Фигура скрытого слоя сохранена, но на сцену не попала
+    last = list(loaded.shape_dicts())[-1]
+    assert last["layer"] == "Скрытый" and loaded.layers.is_hidden("Скрытый")
+    assert not any(getattr(item, "shape_id", None) == last["id"] for item in loaded.items())
+
+
+def test_ids_persist(project, tmp_path):
+    first = json.loads(save(project, tmp_path / "first.json"))["shapes"]
+    first_ids = ids(first)
+    assert all(first_ids) and len(set(first_ids)) == len(first_ids)
+
+    loaded = load(str(tmp_path / "first.json"))
+    second = json.loads(save(loaded, tmp_path / "second.json"))["shapes"]
+    assert ids(second) == first_ids
+
+
+def test_ids_assigned_to_old_files(project, tmp_path):
+    """Файл без id (старая версия): id выдаются при загрузке и дальше не меняются"""
+    data = json.loads(save(project, tmp_path / "project.json"))
+
+    def strip(shapes):
+        for shape in shapes:
+            shape.pop("id", None)
+            strip(shape.get("children", []))
+    strip(data["shapes"])
+    (tmp_path / "old.json").write_text(json.dumps(data, indent=4, ensure_ascii=False), encoding="utf-8")
+
+    loaded = load(str(tmp_path / "old.json"))
+    first = ids(json.loads(save(loaded, tmp_path / "first.json"))["shapes"])
+    second = ids(json.loads(save(loaded, tmp_path / "second.json"))["shapes"])
+    assert all(first) and len(set(first)) == len(first)
+    assert second == first
@@ -0,0 +1,104 @@
+# tests/test_save_cache.py
+"""Инкрементальное сохранение: после любой правки файл совпадает с полной сериализацией документа"""
+import pytest
+from PySide6.QtCore import Qt, QPoint, QPointF
+from PySide6.QtTest import QTest
+
+from src.logic.commands import ChangeColorCommand
+
+
+@pytest.fixture
+def check(canvas, saved):
+    def check():
+        data, expected = saved(canvas.scene)
+        assert data == expected
+    return check
+
+
+def test_first_save_is_full_dump(canvas, add_rects, check):
+    add_rects(5)
+    check()
+    check()  # Второй раз - из кэша
+
+
+def test_keyboard_nudge_from_origin(canvas, add_rects, check):
+    item = add_rects(1)[0]
+    check()
+    item.setSelected(True)
+    QTest.keyClick(canvas, Qt.Key_Right)
+    assert item.pos().x() == 1.0
+    check()
+    assert canvas.undo_stack.count() == 2  # Добавление + сдвиг
+
+
+def test_keyboard_nudge_before_release(canvas, add_rects, saved):
+    item = add_rects(1)[0]
+    saved(canvas.scene)
+    item.setSelected(True)
+    QTest.keyPress(canvas, Qt.Key_Down)
+    data, expected = saved(canvas.scene)
+    assert data == expected
+    QTest.keyRelease(canvas, Qt.Key_Down)
+
+
+def test_mouse_drag(canvas, add_rects, check):
+    item = add_rects(3)[1]
+    check()
+    start = canvas.mapFromScene(item.sceneBoundingRect().center())
+    viewport = canvas.viewport()
+    QTest.mousePress(viewport, Qt.LeftButton, Qt.NoModifier, start)
+    QTest.mouseMove(viewport, start + QPoint(20, 15))
+    QTest.mouseRelease(viewport, Qt.LeftButton, Qt.NoModifier, start + QPoint(20, 15))
+    assert item.pos() != QPointF(0, 0)
+    check()
+
+
+def test_properties_panel(canvas, add_rects, check):
+    from src.widgets.properties import PropertiesPanel
+    items = add_rects(3)
+    panel = PropertiesPanel(canvas.scene, canvas.undo_stack)
+    check()
+    items[0].setSelected(True)
+    panel.on_width_changed(7)
+    check()
+    panel.spin_x.setValue(100)
+    check()
+    canvas.undo_stack.push(ChangeColorCommand(items[2], "#ff0000"))
+    check()
+    canvas.undo_stack.undo()
+    check()
+
+
+def test_transform(canvas, add_rects, check):
+    for item in add_rects(4):
+        item.setSelected(True)
+    check()
+    assert canvas.transform_selection("rotate", 30)
+    check()
+    assert canvas.transform_selection("scale", 1.5)
+    check()
+    canvas.undo_stack.undo()
+    check()
+
+
+def test_group_ungroup(canvas, add_rects, check):
+    items = add_rects(4)
+    check()
+    for item in items[1:3]:
+        item.setSelected(True)
+    canvas.group_selection()
+    check()
+    group = canvas.scene.selectedItems()[0]
+    group.setPos(5, 5)
+    canvas.scene.items_changed([group])
+    check()
+    canvas.ungroup_selection()
+    check()
+
+
+def test_layer_rename(canvas, add_rects, check):
+    add_rects(3)
+    check()
+    layers = canvas.scene.layers
+    assert layers.rename_layer(layers.layers[0], "Контур")
+    check()
@@ -0,0 +1,43 @@
+# tests/test_shapes.py
+"""Фигуры: длинные ломаные считают габариты сами, обычные - средствами Qt"""
+from array import array
+
+from src.logic.clipboard import ShapeSnapshot
+from src.logic.factory import ShapeFactory
+from src.logic.points import encode_points
+from src.logic.shapes import Polygon, LongPolyline, LONG_POLYLINE_POINTS
+
+
+def polyline_dict(count):
+    coords = array('d')
+    for i in range(count):
+        coords.extend((i * 2.0, (i % 7) * 3.0))
+    return {"type": "polygon", "pos": [0, 0],
+            "props": {"points": encode_points(coords), "color": "#000000", "width": 4, "is_closed": False}}
+
+
+def test_class_by_vertex_count(app):
+    short = ShapeFactory.from_dict(polyline_dict(LONG_POLYLINE_POINTS - 1))
+    long = ShapeFactory.from_dict(polyline_dict(LONG_POLYLINE_POINTS))
+    assert type(short) is Polygon
+    assert type(long) is LongPolyline
+    assert "boundingRect" not in long.__dict__ and "boundingRect" not in short.__dict__
+
+
+def test_long_bounds_cover_stroke(app):
+    item = ShapeFactory.from_dict(polyline_dict(LONG_POLYLINE_POINTS + 10))
+    stroke = Polygon.boundingRect(item)  # Габариты по обводке пером (как считает Qt)
+    assert item.boundingRect().contains(stroke)
+    coords = array('d', item.coords)
+    coords[0], coords[1] = -50.0, -60.0
+    item.set_coords(coords, [0])
+    assert item.boundingRect().contains(Polygon.boundingRect(item))
+    assert item.boundingRect().left() <= -50 - 2
+
+
+def test_snapshot_clone_keeps_bounds(app):
+    item = ShapeFactory.from_dict(polyline_dict(LONG_POLYLINE_POINTS))
+    clone = ShapeSnapshot(item).create(10, 0)
+    assert type(clone) is LongPolyline
+    assert clone.boundingRect() == item.boundingRect()
+    assert clone.sceneBoundingRect().left() == item.sceneBoundingRect().left() + 10